@@ -0,0 +1,492 @@
+"""
+YEREL HTTP/JSON API SUNUCUSU
+
+main.py'deki konsol menülerinin etkileşimsiz karşılığı. Trafik ve acil durum
+işlemleri asyncio tabanlı, bağımlılıksız bir HTTP/1.1 sunucusu üzerinden
+JSON olarak sunulur:
+- Kalıcı bağlantılar (keep-alive) ve ardışık istekler (pipelining).
+- Toplu uç noktalar: tek istekte N sensör okuması veya N olay raporu.
+- Günlükler chunked transfer ile akış halinde gönderilir (follow=1 ile canlı takip).
+
+Uç noktalar:
+    GET    /health
+    GET    /traffic/elements?location=&status=&type=
+    GET    /traffic/elements/{id}
+    POST   /traffic/readings             [{"sensor_id", "count", "timestamp"?}, ...]
+    GET    /traffic/density/{sensor_id}
+    GET    /traffic/densities
+    POST   /traffic/lights/{id}/timing   {"density": "Kritik", "sensor_id"?: tahmin için kavşak}
+    GET    /traffic/history?location=|element_id=&start=&end=&resolution=
+    GET    /emergency/units
+    GET    /emergency/stats
+    POST   /emergency/telemetry          [{"unit_id", "lat", "lon", "timestamp"?}, ...]
+    GET    /emergency/telemetry          ETA sapmaları ve yeniden atama adayları
+    POST   /emergency/incidents          {..} veya [{..}, ...], ?dispatch=nearest|batch|none
+    POST   /emergency/incidents/{id}/resolve
+    DELETE /emergency/incidents/{id}
+    GET    /logs?source=traffic|emergency|units&last=100&follow=1
+    GET    /metrics                      Prometheus metin biçimi
+"""
+
+import asyncio
+import json
+import re
+import time
+from http import HTTPStatus
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from app.core.event_log import EventLog
+from app.core.executor import ServiceClosedError
+from app.core.metrics import REGISTRY, Registry
+from app.modules.emergency.async_service import AsyncEmergencyService
+from app.modules.traffic.async_service import AsyncTrafficService
+
+MAX_HEADER_LINES = 100
+JSON_TYPE = "application/json; charset=utf-8"
+
+REQUEST_LATENCY = REGISTRY.histogram("api_request_seconds", "İstek işleme süresi (yanıt yazımı hariç)")
+RESPONSES = REGISTRY.counter("api_responses_total", "Durum koduna göre yanıt sayısı", ("status",))
+
+
+class HttpError(Exception):
+    """İstemciye durum kodu ve JSON hata mesajı olarak dönen hata."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "body", "params", "version")
+
+    def __init__(self, method: str, target: str, version: str, headers: Dict[str, str], body: bytes):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.version = version
+        self.headers = headers
+        self.body = body
+        self.params: Dict[str, str] = {}
+
+    def json(self):
+        if not self.body:
+            raise HttpError(400, "İstek gövdesi boş.")
+        try:
+            return json.loads(self.body)
+        except ValueError as exc:
+            raise HttpError(400, f"Geçersiz JSON: {exc}")
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+class TextResponse:
+    """JSON dışı düz metin yanıt (ör. Prometheus scrape çıktısı)."""
+
+    def __init__(self, text: str, content_type: str = "text/plain; version=0.0.4; charset=utf-8"):
+        self.text = text
+        self.content_type = content_type
+
+
+class StreamResponse:
+    """Gövdesi parça parça (chunked) yazılan yanıt; handler bir async üreteç verir."""
+
+    def __init__(self, chunks, content_type: str = "text/plain; charset=utf-8"):
+        self.chunks = chunks
+        self.content_type = content_type
+
+
+Handler = Callable[[Request], Awaitable[object]]
+
+
+class ApiServer:
+    """
+    Args:
+        traffic / emergency: Asenkron servisler (uygulama durumunun sahibi).
+        log_sources: /logs için kaynak adı -> EventLog.
+        max_body: Kabul edilen en büyük istek gövdesi (bayt).
+        idle_timeout: Boşta bekleyen kalıcı bağlantının kapatılma süresi (sn).
+    """
+
+    def __init__(self, traffic: AsyncTrafficService, emergency: AsyncEmergencyService,
+                 log_sources: Optional[Dict[str, EventLog]] = None, host: str = "127.0.0.1",
+                 port: int = 8080, max_body: int = 8 * 1024 * 1024, idle_timeout: float = 30.0,
+                 follow_interval: float = 0.2, registry: Registry = REGISTRY):
+        self.traffic = traffic
+        self.registry = registry
+        self.emergency = emergency
+        self.log_sources = log_sources if log_sources is not None else {
+            "traffic": traffic.service.repository.events,
+            "emergency": emergency.service.events,
+            "units": emergency.service.repo.events,
+        }
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self.follow_interval = follow_interval
+        self.requests_served = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections = set()
+        self._routes: List[Tuple[str, re.Pattern, Handler]] = []
+        self._register_routes()
+
+    # --- YÖNLENDİRME ---
+
+    def route(self, method: str, pattern: str, handler: Handler):
+        """pattern içindeki {ad} parçaları request.params'a yazılır."""
+        regex = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", pattern) + "$")
+        self._routes.append((method, regex, handler))
+
+    def _register_routes(self):
+        self.route("GET", "/health", self.health)
+        self.route("GET", "/traffic/elements", self.list_elements)
+        self.route("GET", "/traffic/elements/{element_id}", self.get_element)
+        self.route("POST", "/traffic/readings", self.post_readings)
+        self.route("GET", "/traffic/density/{sensor_id}", self.get_density)
+        self.route("GET", "/traffic/densities", self.get_densities)
+        self.route("POST", "/traffic/lights/{light_id}/timing", self.post_light_timing)
+        self.route("GET", "/traffic/history", self.get_history)
+        self.route("GET", "/emergency/units", self.list_units)
+        self.route("GET", "/emergency/stats", self.emergency_stats)
+        self.route("POST", "/emergency/telemetry", self.post_telemetry)
+        self.route("GET", "/emergency/telemetry", self.get_telemetry)
+        self.route("POST", "/emergency/incidents", self.post_incidents)
+        self.route("POST", "/emergency/incidents/{incident_id}/resolve", self.resolve_incident)
+        self.route("DELETE", "/emergency/incidents/{incident_id}", self.cancel_incident)
+        self.route("GET", "/logs", self.stream_logs)
+        self.route("GET", "/metrics", self.metrics)
+
+    def _match(self, request: Request) -> Handler:
+        allowed = False
+        for method, regex, handler in self._routes:
+            found = regex.match(request.path)
+            if found is None:
+                continue
+            if method != request.method:
+                allowed = True
+                continue
+            request.params = found.groupdict()
+            return handler
+        if allowed:
+            raise HttpError(405, f"{request.method} bu adreste desteklenmiyor.")
+        raise HttpError(404, f"Bulunamadı: {request.path}")
+
+    # --- TRAFİK UÇ NOKTALARI ---
+
+    async def health(self, request: Request):
+        return {"status": "ok", "requests_served": self.requests_served}
+
+    async def list_elements(self, request: Request):
+        repository = self.traffic.service.repository
+        elements = repository.query(request.query.get("location"), request.query.get("status"),
+                                    request.query.get("type"))
+        return [element.to_record() for element in elements]
+
+    async def get_element(self, request: Request):
+        element = self.traffic.service.repository.get_by_id(request.params["element_id"])
+        if element is None:
+            raise HttpError(404, f"Cihaz bulunamadı: {request.params['element_id']}")
+        return element.to_record()
+
+    async def post_readings(self, request: Request):
+        payload = request.json()
+        readings = payload.get("readings") if isinstance(payload, dict) else payload
+        if not isinstance(readings, list):
+            raise HttpError(400, "Okumalar bir liste olmalı.")
+        try:
+            ids = [str(reading["sensor_id"]) for reading in readings]
+            counts = [int(reading["count"]) for reading in readings]
+            stamps = [reading.get("timestamp") for reading in readings]
+        except (KeyError, TypeError, ValueError):
+            raise HttpError(400, "Her okuma sensor_id ve count alanlarını içermeli.")
+        if self.traffic.service.sensor_store is not None and None not in stamps:
+            written = await self.traffic.ingest_sensor_tick(ids, counts, [float(s) for s in stamps])
+        else:
+            await asyncio.gather(*(self.traffic.submit_reading(i, c, s) for i, c, s in zip(ids, counts, stamps)))
+            written = len(ids)
+        return {"accepted": written}
+
+    async def get_density(self, request: Request):
+        sensor_id = request.params["sensor_id"]
+        return {"sensor_id": sensor_id, "density": await self.traffic.calculate_intersection_density(sensor_id)}
+
+    async def get_densities(self, request: Request):
+        return await self.traffic.calculate_all_densities()
+
+    async def post_light_timing(self, request: Request):
+        payload = request.json()
+        density = payload.get("density") if isinstance(payload, dict) else None
+        if not density:
+            raise HttpError(400, "density alanı gerekli.")
+        message = await self.traffic.optimize_light_timing(request.params["light_id"], density,
+                                                           payload.get("sensor_id"))
+        if message == "Işık bulunamadı.":
+            raise HttpError(404, message)
+        return {"message": message}
+
+    async def get_history(self, request: Request):
+        """Okuma geçmişi özeti; start/end epoch sn (varsayılan son 7 gün), resolution 60/900/3600."""
+        if self.traffic.service.history is None:
+            raise HttpError(404, "Okuma geçmişi tutulmuyor.")
+        query = request.query
+        series = {name: query[name] for name in ("element_id", "location") if query.get(name)}
+        if not series:
+            raise HttpError(400, "location veya element_id gerekli.")
+        end = float(query["end"]) if query.get("end") else time.time()
+        start = float(query["start"]) if query.get("start") else end - 7 * 86400
+        resolution = int(query["resolution"]) if query.get("resolution") else None
+        return await self.traffic.density_history(start, end, resolution, **series)
+
+    # --- ACİL DURUM UÇ NOKTALARI ---
+
+    async def list_units(self, request: Request):
+        return [unit.to_record() for unit in self.emergency.service.repo.get_all_unit()]
+
+    async def emergency_stats(self, request: Request):
+        stats = self.emergency.service.repo.operational_stats()
+        stats["queued_incidents"] = self.emergency.service.queued_incidents
+        stats["open_incidents"] = self.emergency.service.total_active_cases
+        return stats
+
+    async def post_telemetry(self, request: Request):
+        payload = request.json()
+        positions = payload.get("positions") if isinstance(payload, dict) else payload
+        if not isinstance(positions, list):
+            raise HttpError(400, "Konumlar bir liste olmalı.")
+        try:
+            ids = [str(position["unit_id"]) for position in positions]
+            latitudes = [float(position["lat"]) for position in positions]
+            longitudes = [float(position["lon"]) for position in positions]
+            stamps = [position.get("timestamp") for position in positions]
+        except (KeyError, TypeError, ValueError):
+            raise HttpError(400, "Her konum unit_id, lat ve lon alanlarını içermeli.")
+        now = time.time()
+        stamps = [now if stamp is None else float(stamp) for stamp in stamps]
+        telemetry = self.emergency.telemetry
+        unknown = telemetry.unknown
+        moved = await self.emergency.ingest_positions(ids, latitudes, longitudes, stamps)
+        return {"accepted": len(ids) - (telemetry.unknown - unknown), "moved": moved}
+
+    async def get_telemetry(self, request: Request):
+        telemetry = self.emergency.telemetry
+        return {
+            "received": telemetry.received,
+            "moved": telemetry.moved,
+            "unknown": telemetry.unknown,
+            "drift": telemetry.drifts,
+            "reassignments": [candidate._asdict() for candidate in telemetry.reassignment_candidates()],
+        }
+
+    async def post_incidents(self, request: Request):
+        payload = request.json()
+        single = isinstance(payload, dict) and "incidents" not in payload
+        items = [payload] if single else (payload["incidents"] if isinstance(payload, dict) else payload)
+        if not isinstance(items, list):
+            raise HttpError(400, "Olaylar bir liste olmalı.")
+        mode = request.query.get("dispatch", "nearest")
+        if mode not in ("nearest", "batch", "none"):
+            raise HttpError(400, "dispatch nearest, batch veya none olmalı.")
+
+        results = []
+        created = []
+        for item in items:
+            if not isinstance(item, dict):
+                results.append({"incident_id": None, "error": "Her olay bir nesne olmalı."})
+                continue
+            try:
+                coordinates = item.get("coordinates")
+                incident, message = await self.emergency.report_incident(
+                    str(item["incident_id"]), item["type"], int(item["severity"]), item["location"],
+                    tuple(coordinates) if coordinates else None, dispatch=(mode == "nearest"))
+            except (KeyError, TypeError, ValueError) as exc:
+                results.append({"incident_id": item.get("incident_id"), "error": str(exc)})
+                continue
+            created.append(incident)
+            results.append({"incident_id": incident.incident_id, "result": message})
+        if mode == "batch" and created:
+            assigned = await self.emergency.dispatch_batch(created)
+            for entry in results:
+                if "error" not in entry:
+                    entry["unit_id"] = assigned.get(entry["incident_id"])
+        if single and "error" in results[0]:
+            raise HttpError(400, results[0]["error"])
+        return results[0] if single else results
+
+    async def resolve_incident(self, request: Request):
+        if not await self.emergency.resolve_incident(request.params["incident_id"]):
+            raise HttpError(404, f"Açık olay bulunamadı: {request.params['incident_id']}")
+        return {"resolved": request.params["incident_id"]}
+
+    async def cancel_incident(self, request: Request):
+        if not await self.emergency.cancel_incident(request.params["incident_id"]):
+            raise HttpError(404, f"Bekleyen olay bulunamadı: {request.params['incident_id']}")
+        return {"cancelled": request.params["incident_id"]}
+
+    async def metrics(self, request: Request):
+        return TextResponse(self.registry.render())
+
+    # --- GÜNLÜK AKIŞI ---
+
+    async def stream_logs(self, request: Request):
+        source = request.query.get("source", "emergency")
+        log = self.log_sources.get(source)
+        if log is None:
+            raise HttpError(404, f"Bilinmeyen günlük kaynağı: {source}")
+        try:
+            last = int(request.query.get("last", "100"))
+        except ValueError:
+            raise HttpError(400, "last bir tam sayı olmalı.")
+        follow = request.query.get("follow") in ("1", "true")
+        return StreamResponse(self._log_chunks(log, last, follow))
+
+    async def _log_chunks(self, log: EventLog, last: int, follow: bool):
+        records = log.tail(last)
+        cursor = records[-1].seq + 1 if records else log.total_events
+        if records:
+            yield "".join(record.format() + "\n" for record in records)
+        while follow:
+            await asyncio.sleep(self.follow_interval)
+            records = log.since(cursor)
+            if records:
+                cursor = records[-1].seq + 1
+                yield "".join(record.format() + "\n" for record in records)
+
+    # --- HTTP KATMANI ---
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(400, "Geçersiz istek satırı.")
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            raw = await reader.readline()
+            if raw in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = raw.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HttpError(431, "Çok fazla başlık satırı.")
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HttpError(411, "İstek gövdesi Content-Length ile gönderilmeli.")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HttpError(400, "Geçersiz Content-Length.")
+        if length > self.max_body:
+            raise HttpError(413, "İstek gövdesi çok büyük.")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, version, headers, body)
+
+    @staticmethod
+    def _head(status: int, content_type: str, keep_alive: bool, extra: str) -> bytes:
+        reason = HTTPStatus(status).phrase
+        connection = "keep-alive" if keep_alive else "close"
+        return (f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                f"Connection: {connection}\r\n{extra}\r\n").encode("latin-1")
+
+    def _write_json(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        writer.write(self._head(status, JSON_TYPE, keep_alive, f"Content-Length: {len(body)}\r\n") + body)
+
+    async def _write_stream(self, writer: asyncio.StreamWriter, response: StreamResponse, keep_alive: bool):
+        writer.write(self._head(200, response.content_type, keep_alive, "Transfer-Encoding: chunked\r\n"))
+        try:
+            async for chunk in response.chunks:
+                data = chunk.encode("utf-8")
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+        finally:
+            await response.chunks.aclose()
+        writer.write(b"0\r\n\r\n")
+
+    async def _dispatch(self, request: Request):
+        try:
+            handler = self._match(request)
+            return 200, await handler(request)
+        except HttpError as exc:
+            return exc.status, {"error": exc.message}
+        except ServiceClosedError as exc:
+            return 503, {"error": str(exc)}
+        except TimeoutError:
+            return 504, {"error": "İstek zaman aşımına uğradı."}
+        except (ValueError, KeyError) as exc:
+            return 400, {"error": str(exc)}
+        except Exception as exc:  # Bağlantı açık kalsın, istemci hatayı görsün
+            return 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.idle_timeout)
+                except HttpError as exc:
+                    self._write_json(writer, exc.status, {"error": exc.message}, False)
+                    break
+                except (asyncio.IncompleteReadError, TimeoutError, ValueError):
+                    break
+                if request is None:
+                    break
+                keep_alive = request.keep_alive
+                with REQUEST_LATENCY.time():
+                    status, payload = await self._dispatch(request)
+                RESPONSES.labels(status).inc()
+                self.requests_served += 1
+                if isinstance(payload, StreamResponse):
+                    await self._write_stream(writer, payload, keep_alive)
+                elif isinstance(payload, TextResponse):
+                    body = payload.text.encode("utf-8")
+                    writer.write(self._head(status, payload.content_type, keep_alive,
+                                            f"Content-Length: {len(body)}\r\n") + body)
+                else:
+                    self._write_json(writer, status, payload, keep_alive)
+                # Ardışık isteklerde yanıtlar tamponda birikir; boşaltma yalnızca gerekirse bekler
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    # --- YAŞAM DÖNGÜSÜ ---
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self, grace: float = 5.0):
+        """Yeni bağlantıları keser, açık bağlantıları kapatır ve servisleri sonlandırır."""
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        if self._connections:
+            await asyncio.wait(list(self._connections), timeout=grace)
+        if self._server is not None:
+            await self._server.wait_closed()
+        await self.traffic.close(grace)
+        await self.emergency.close(grace)
@@ -0,0 +1,356 @@
+"""
+BÖLGE BAZLI ÇOK SÜREÇLİ SİMÜLASYON (SHARDED DISTRICT SIMULATION)
+
+Şehrin trafik cihazları (TransportRepository) ve acil durum birimleri
+(EmergencyRepository) konumlarına göre bölgelere ayrılır; her bölge kendi
+işçi sürecinde (worker process) kendi SimulationEngine'i ile çalışır.
+
+Bölgeler arası mesajlar (sınırı geçen bir acil durum birimi, kritik yoğunluk
+bildirimi) sabit uzunluklu dönemler (epoch) sonunda toplu olarak komşu bölgenin
+kuyruğuna yazılır. Her süreç bir sonraki döneme geçmeden önce tüm komşularının
+o döneme ait paketini bekler (muhafazakâr senkronizasyon); paketler gönderen
+adına göre sıralanarak uygulandığı için sonuç süreç sayısından bağımsız ve
+tekrarlanabilirdir. Koordinatör, bölge istatistiklerini birleştirir.
+
+Örnek:
+    districts = DistrictMap({"Merkez": ["Kızılay", "Ulus"], "Batı": ["Eryaman"]})
+    sim = DistrictSimulation(districts, seed=42, epoch=60)
+    stats = sim.run(transport_repo, emergency_repo, until=3600)
+"""
+
+import multiprocessing as mp
+import queue
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.modules.emergency.implementations import unit_from_record
+from app.modules.emergency.repository import EmergencyRepository
+from app.modules.traffic.implementations import CRITICAL_DENSITY_THRESHOLD, IntersectionSensor
+from app.modules.traffic.repository import TransportRepository
+from app.modules.traffic.simulation import SimulationEngine
+from app.modules.traffic.storage import element_from_record
+
+# Bölgeler arası mesaj türleri
+MSG_UNIT = "unit"              # (kayıt, rng durumu): birim bu bölgeye geçti
+MSG_CONGESTION = "congestion"  # (sensör, konum, araç sayısı, zaman)
+
+
+class DistrictMap:
+    """
+    Konum -> bölge eşlemesi ve bölge komşulukları.
+
+    Args:
+        districts: bölge adı -> o bölgedeki konum adları.
+        neighbours: bölge -> komşu bölgeler; verilmezse her bölge diğer
+            hepsine komşu sayılır. Komşuluk simetrik hale getirilir.
+    """
+
+    def __init__(self, districts: Dict[str, Iterable[str]],
+                 neighbours: Optional[Dict[str, Iterable[str]]] = None):
+        if not districts:
+            raise ValueError("En az bir bölge tanımlanmalı.")
+        self.names = sorted(districts)
+        self.locations = {name: list(locations) for name, locations in districts.items()}
+        self._district_of = {}
+        for name, locations in self.locations.items():
+            for location in locations:
+                self._district_of[location.casefold()] = name
+
+        if neighbours is None:
+            self._neighbours = {name: [other for other in self.names if other != name] for name in self.names}
+        else:
+            links = defaultdict(set)
+            for name, others in neighbours.items():
+                for other in others:
+                    if other != name:
+                        links[name].add(other)
+                        links[other].add(name)
+            self._neighbours = {name: sorted(links[name]) for name in self.names}
+
+    def district_of(self, location: str) -> str:
+        """Tanımsız konumlar adlarının sabit özetine (crc32) göre bir bölgeye düşer."""
+        key = (location or "").casefold()
+        name = self._district_of.get(key)
+        if name is None:
+            name = self.names[zlib.crc32(key.encode("utf-8")) % len(self.names)]
+        return name
+
+    def neighbours_of(self, district: str) -> List[str]:
+        return self._neighbours[district]
+
+
+class DistrictWorker:
+    """
+    Tek bir bölgenin simülasyonu. Süreç içinde doğrudan da kullanılabilir;
+    run_worker bu sınıfı bir işçi sürecinde dönem dönem çalıştırır.
+
+    Args:
+        patrol_interval: Birimlerin devriye kararı verme aralığı (sn).
+        cross_prob: Devriyede komşu bölgeye geçme olasılığı.
+    """
+
+    def __init__(self, name: str, district_map: DistrictMap, seed: int = 0, start_time: float = 0.0,
+                 intervals: Optional[dict] = None, patrol_interval: float = 300.0, cross_prob: float = 0.1):
+        self.name = name
+        self.district_map = district_map
+        self.neighbours = district_map.neighbours_of(name)
+        self.intervals = intervals
+        self.patrol_interval = patrol_interval
+        self.cross_prob = cross_prob
+
+        self.engine = SimulationEngine(seed=seed, start_time=start_time)
+        self.engine.after_action = self._after_action
+        self.transport = TransportRepository()
+        self.emergency = EmergencyRepository()
+
+        self._outbox: Dict[str, list] = {neighbour: [] for neighbour in self.neighbours}
+        self._unit_rng = {}
+        self._patrol_token: Dict[str, int] = {}
+        self._critical = set()
+        self.external_congestion: Dict[str, Tuple[str, int, float]] = {}
+        self.sent = 0
+        self.received = 0
+
+    # --- YÜKLEME ---
+
+    def load(self, traffic_records: Iterable[dict], unit_records: Iterable[dict]):
+        self.transport.save_many([element_from_record(record) for record in traffic_records])
+        self.engine.attach_repository(self.transport, self.intervals)
+        for record in unit_records:
+            self._admit(unit_from_record(record), None)
+
+    def _admit(self, unit, rng_state):
+        rng = self.engine.rng_for(f"unit:{unit.unit_id}")
+        if rng_state is not None:
+            rng.setstate(rng_state)
+        self._unit_rng[unit.unit_id] = rng
+        self.emergency.add_unit(unit)
+        token = self._patrol_token.get(unit.unit_id, 0) + 1
+        self._patrol_token[unit.unit_id] = token
+        self.engine.schedule(rng.random() * self.patrol_interval, self._patrol, unit.unit_id, token)
+
+    # --- BÖLGE İÇİ OLAYLAR ---
+
+    def _after_action(self, element):
+        if not isinstance(element, IntersectionSensor):
+            return
+        element_id = element.element_id
+        if element.vehicle_count >= CRITICAL_DENSITY_THRESHOLD:
+            if element_id not in self._critical:
+                self._critical.add(element_id)
+                notice = (MSG_CONGESTION, (element_id, element.location, element.vehicle_count, self.engine.now))
+                for neighbour in self.neighbours:
+                    self._outbox[neighbour].append(notice)
+        else:
+            self._critical.discard(element_id)
+
+    def _patrol(self, unit_id: str, token: int):
+        if self._patrol_token.get(unit_id) != token:
+            return  # birim bölgeden ayrılmış, eski olay
+        rng = self._unit_rng[unit_id]
+        unit = self.emergency.get_unit_by_id(unit_id)
+        if self.neighbours and unit.availability and rng.random() < self.cross_prob:
+            target = self.neighbours[rng.randrange(len(self.neighbours))]
+            locations = self.district_map.locations.get(target)
+            if locations:
+                unit.current_location = locations[rng.randrange(len(locations))]
+            self.emergency.remove_unit(unit_id)
+            self._patrol_token[unit_id] = token + 1  # geri dönerse eski olaylar geçersiz kalsın
+            del self._unit_rng[unit_id]
+            self._outbox[target].append((MSG_UNIT, (unit.to_record(), rng.getstate())))
+            return
+        self.engine.schedule(self.patrol_interval, self._patrol, unit_id, token)
+
+    # --- DÖNEM (EPOCH) ---
+
+    def step(self, until: float) -> Dict[str, list]:
+        """Simülasyonu until'e kadar ilerletir, komşulara gidecek paketleri döndürür."""
+        self.engine.run(until=until)
+        outbox = self._outbox
+        self._outbox = {neighbour: [] for neighbour in self.neighbours}
+        self.sent += sum(len(batch) for batch in outbox.values())
+        return outbox
+
+    def deliver(self, batches: Dict[str, list]):
+        """Komşulardan gelen paketleri gönderen adına göre sırayla uygular."""
+        for sender in sorted(batches):
+            for kind, payload in batches[sender]:
+                self.received += 1
+                if kind == MSG_UNIT:
+                    record, rng_state = payload
+                    self._admit(unit_from_record(record), rng_state)
+                elif kind == MSG_CONGESTION:
+                    sensor_id, location, count, at = payload
+                    self.external_congestion[sensor_id] = (location, count, at)
+
+    def stats(self, include_state: bool = False) -> dict:
+        result = {
+            "district": self.name,
+            "events": self.engine.processed,
+            "actions": dict(self.engine.actions),
+            "elements": len(self.transport.query()),
+            "units": len(self.emergency.get_all_unit()),
+            "sent": self.sent,
+            "received": self.received,
+            "congestion_notices": len(self.external_congestion),
+        }
+        if include_state:
+            result["elements_state"] = SimulationEngine.state_snapshot(self.transport.query())
+            result["units_state"] = sorted((unit.to_record() for unit in self.emergency.get_all_unit()),
+                                           key=lambda record: record["unit_id"])
+        return result
+
+
+def _epoch_ends(start: float, until: float, epoch: float) -> List[float]:
+    ends = []
+    t = start
+    while t < until:
+        t = min(t + epoch, until)
+        ends.append(t)
+    return ends
+
+
+def run_worker(name, district_map, options, traffic_records, unit_records,
+               start_time, until, epoch, inboxes, results, include_state):
+    """İşçi süreç gövdesi: her dönem sonunda komşularla paket alışverişi yapar."""
+    started = time.perf_counter()
+    worker = DistrictWorker(name, district_map, start_time=start_time, **options)
+    worker.load(traffic_records, unit_records)
+    inbox = inboxes[name]
+    early = defaultdict(dict)  # Komşular bir dönem önde olabilir
+    for index, end in enumerate(_epoch_ends(start_time, until, epoch)):
+        for neighbour, batch in worker.step(end).items():
+            inboxes[neighbour].put((index, name, batch))
+        batches = early.pop(index, {})
+        while len(batches) < len(worker.neighbours):
+            got_index, sender, batch = inbox.get()
+            if got_index == index:
+                batches[sender] = batch
+            else:
+                early[got_index][sender] = batch
+        worker.deliver(batches)
+    result = worker.stats(include_state)
+    result["wall_seconds"] = time.perf_counter() - started
+    results.put(result)
+
+
+class DistrictSimulation:
+    """
+    Koordinatör: şehri bölgelere böler, işçileri başlatır, sonuçları birleştirir.
+
+    Args:
+        epoch: Bölgeler arası senkronizasyon aralığı (simülasyon sn). Mesajlar
+            dönem sonunda teslim edildiği için en fazla bu kadar gecikir.
+    """
+
+    def __init__(self, district_map: DistrictMap, seed: int = 0, epoch: float = 60.0,
+                 intervals: Optional[dict] = None, patrol_interval: float = 300.0,
+                 cross_prob: float = 0.1, start_time: float = 0.0):
+        if epoch <= 0:
+            raise ValueError("Dönem süresi pozitif olmalı.")
+        self.district_map = district_map
+        self.epoch = epoch
+        self.start_time = start_time
+        self.options = {
+            "seed": seed,
+            "intervals": intervals,
+            "patrol_interval": patrol_interval,
+            "cross_prob": cross_prob,
+        }
+
+    def partition(self, transport_repo: TransportRepository,
+                  emergency_repo: EmergencyRepository) -> Dict[str, Tuple[list, list]]:
+        """Kayıtları konumlarına göre bölgelere ayırır (süreçlere aktarılabilir sözlükler)."""
+        parts = {name: ([], []) for name in self.district_map.names}
+        for element in transport_repo.query():
+            parts[self.district_map.district_of(element.location)][0].append(element.to_record())
+        for unit in emergency_repo.get_all_unit():
+            parts[self.district_map.district_of(unit.current_location)][1].append(unit.to_record())
+        return parts
+
+    def run(self, transport_repo: TransportRepository, emergency_repo: EmergencyRepository,
+            until: float, processes: bool = True, include_state: bool = False,
+            start_method: Optional[str] = None) -> dict:
+        """
+        Simülasyonu çalıştırır.
+
+        Args:
+            processes: False ise tüm bölgeler bu süreçte sırayla çalışır (aynı sonuç).
+            include_state: Sonuca bölgelerin son cihaz/birim durumlarını ekler.
+        Returns:
+            dict: Birleştirilmiş istatistikler ve "districts" altında bölge sonuçları.
+        """
+        parts = self.partition(transport_repo, emergency_repo)
+        started = time.perf_counter()
+        if processes:
+            results = self._run_processes(parts, until, include_state, start_method)
+        else:
+            results = self._run_inline(parts, until, include_state)
+        return self.merge(results, time.perf_counter() - started)
+
+    def _run_inline(self, parts, until, include_state) -> List[dict]:
+        workers = {}
+        for name, (traffic_records, unit_records) in parts.items():
+            worker = DistrictWorker(name, self.district_map, start_time=self.start_time, **self.options)
+            worker.load(traffic_records, unit_records)
+            workers[name] = worker
+        for end in _epoch_ends(self.start_time, until, self.epoch):
+            inbound = defaultdict(dict)
+            for name in self.district_map.names:
+                for neighbour, batch in workers[name].step(end).items():
+                    inbound[neighbour][name] = batch
+            for name in self.district_map.names:
+                workers[name].deliver(inbound[name])
+        return [workers[name].stats(include_state) for name in self.district_map.names]
+
+    def _run_processes(self, parts, until, include_state, start_method) -> List[dict]:
+        ctx = mp.get_context(start_method)
+        inboxes = {name: ctx.Queue() for name in self.district_map.names}
+        results = ctx.Queue()
+        procs = []
+        for name, (traffic_records, unit_records) in parts.items():
+            proc = ctx.Process(
+                target=run_worker,
+                args=(name, self.district_map, self.options, traffic_records, unit_records,
+                      self.start_time, until, self.epoch, inboxes, results, include_state),
+                name=f"district-{name}",
+                daemon=True,
+            )
+            proc.start()
+            procs.append(proc)
+        collected = []
+        try:
+            while len(collected) < len(procs):
+                try:
+                    collected.append(results.get(timeout=1.0))
+                except queue.Empty:
+                    failed = [proc.name for proc in procs if proc.exitcode not in (None, 0)]
+                    if failed:
+                        raise RuntimeError(f"Bölge süreçleri hata ile sonlandı: {', '.join(failed)}")
+        finally:
+            for proc in procs:
+                proc.join(timeout=5.0)
+                if proc.is_alive():
+                    proc.terminate()
+        return sorted(collected, key=lambda result: result["district"])
+
+    @staticmethod
+    def merge(results: List[dict], wall_seconds: float) -> dict:
+        """Bölge sonuçlarını şehir geneli istatistiklere birleştirir."""
+        actions = defaultdict(int)
+        for result in results:
+            for name, count in result["actions"].items():
+                actions[name] += count
+        events = sum(result["events"] for result in results)
+        return {
+            "districts": {result["district"]: result for result in results},
+            "events": events,
+            "actions": dict(actions),
+            "elements": sum(result["elements"] for result in results),
+            "units": sum(result["units"] for result in results),
+            "messages": sum(result["sent"] for result in results),
+            "wall_seconds": wall_seconds,
+            "events_per_second": events / wall_seconds if wall_seconds > 0 else 0.0,
+        }
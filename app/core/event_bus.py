@@ -0,0 +1,499 @@
+"""
+SÜREÇ İÇİ OLAY VERİYOLU (PUBLISH/SUBSCRIBE EVENT BUS)
+
+Trafik ve acil durum modülleri birbirini içe aktarmadan haberleşir: servisler
+tipli olaylar yayınlar (DensityChanged, IncidentCreated, UnitDispatched,
+UnitStatusChanged, UnitEtaChanged), tepkiler (bkz. reactions.py) bu olaylara abone olur.
+
+Abonelik türleri:
+- "sync": İşleyici yayın sırasında, yayınlayanın iş parçacığında çağrılır.
+- "async": Olaylar aboneliğin sınırlı kuyruğuna (mailbox) girer; olay
+  döngüsündeki bir işçi görevi işleyiciyi olay başına çağırır (coroutine de olabilir).
+- "batch": Aynı kuyruk; işleyici en fazla batch_size olaylık listelerle çağrılır.
+
+Filtreler: topics (olay sınıfları; alt sınıflar da eşleşir, Event hepsini
+kapsar) ve locations (konum adları, büyük/küçük harf duyarsız). Olay tipi
+başına eşleşen abonelikler önbelleğe alınır; yayın maliyeti bir sözlük erişimi
+ve eşleşen abone sayısı kadar çağrı/ekleme ile sınırlıdır.
+
+Kuyruk dolduğunda (backpressure) overflow politikası uygulanır:
+- "block": publish_async yer açılana kadar bekler. Senkron publish, işleyici
+  düz bir fonksiyonsa kuyruğu yayınlayanın iş parçacığında boşaltır (caller
+  runs); coroutine işleyicide BusFullError fırlatır.
+- "drop_oldest": En eski olay atılır, yenisi eklenir.
+- "drop_new": Yeni olay atılır.
+
+Veriyolu kilitsizdir; durum değiştiren her şey tek iş parçacığında (olay
+döngüsü ya da döngüsüz senkron kod) çalışır. Başlatılmış veriyolunda başka
+bir iş parçacığından (ör. executor havuzu) yapılan publish, teslim için olay
+döngüsüne aktarılır; sync işleyiciler de döngüde çalışır. Döngü yoksa
+kuyruklar pump() ile boşaltılır.
+
+Örnek:
+    bus = EventBus()
+    bus.subscribe(on_density, DensityChanged, locations=["Merkez"], mode="batch")
+    async with bus:
+        await bus.publish_async(DensityChanged("S-1", "Merkez", 85, "Kritik", "Normal"))
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+MODES = ("sync", "async", "batch")
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_new")
+
+
+class BusFullError(RuntimeError):
+    """"block" politikalı bir kuyruk doluyken senkron yayın yapılamadığında fırlatılır."""
+
+
+class BusClosedError(RuntimeError):
+    """Kapatılmış veriyoluna yayın yapıldığında fırlatılır."""
+
+
+# --- OLAYLAR ---
+
+class Event:
+    """
+    Tüm olayların ortak tabanı. Alt sınıflar bir location alanı taşımalıdır;
+    location None olan olaylar yalnızca konum filtresiz abonelere gider.
+    """
+    __slots__ = ()
+
+
+@dataclass(slots=True)
+class DensityChanged(Event):
+    """Bir kavşağın yoğunluk etiketi değişti (Düşük/Normal/Kritik)."""
+    sensor_id: str
+    location: Optional[str]
+    vehicle_count: int
+    density: str
+    previous: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass(slots=True)
+class IncidentCreated(Event):
+    """Yeni bir olay raporu açıldı."""
+    incident_id: str
+    incident_type: str
+    severity: int
+    location: str
+    coordinates: Optional[Tuple[float, float]] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass(slots=True)
+class UnitDispatched(Event):
+    """Birim bir olaya atandı; location/coordinates olayın yeridir, origin birimin konumu."""
+    unit_id: str
+    unit_type: str
+    incident_id: str
+    location: str
+    coordinates: Optional[Tuple[float, float]] = None
+    origin: Optional[Tuple[float, float]] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass(slots=True)
+class UnitStatusChanged(Event):
+    """Birimin durumu değişti; old/new durum değerleridir ("Idle", "On Scene", ...)."""
+    unit_id: str
+    unit_type: str
+    location: str
+    old: str
+    new: str
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass(slots=True)
+class UnitEtaChanged(Event):
+    """
+    Yoldaki birimin canlı konumundan hesaplanan ETA'sı (dk) değişti; drift,
+    sevkte planlanan varışa göre gecikmedir (dk, erken varışta negatif).
+    """
+    unit_id: str
+    unit_type: str
+    incident_id: str
+    location: str
+    coordinates: Tuple[float, float]
+    eta: float
+    drift: float
+    timestamp: float = field(default_factory=time.time)
+
+
+# --- ABONELİK ---
+
+class Subscription:
+    """
+    Tek bir abonelik ve (sync dışındaki modlarda) onun sınırlı kuyruğu.
+
+    Sayaçlar: delivered (işleyiciye verilen olay), dropped (taşmada atılan),
+    errors (işleyici hatası; son hata last_error'da tutulur).
+    """
+
+    __slots__ = ("bus", "handler", "topics", "locations", "mode", "queue_size", "batch_size",
+                 "overflow", "name", "is_coroutine", "mailbox", "delivered", "dropped", "errors",
+                 "last_error", "_ready", "_space", "_task", "_inflight", "active")
+
+    def __init__(self, bus: "EventBus", handler: Callable, topics: Optional[Tuple[type, ...]],
+                 locations: Optional[frozenset], mode: str, queue_size: int, batch_size: int,
+                 overflow: str, name: str):
+        self.bus = bus
+        self.handler = handler
+        self.topics = topics
+        self.locations = locations
+        self.mode = mode
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.name = name
+        self.is_coroutine = inspect.iscoroutinefunction(handler)
+        self.mailbox: deque = deque()
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: Optional[BaseException] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # işçinin kuyruktan alıp henüz bitirmediği olay sayısı
+        self._inflight = 0
+        self.active = True
+
+    def matches(self, event_type: type) -> bool:
+        return self.topics is None or issubclass(event_type, self.topics)
+
+    def __len__(self):
+        return len(self.mailbox)
+
+    @property
+    def pending(self) -> int:
+        """Kuyrukta bekleyen ve işlenmekte olan olay sayısı."""
+        return len(self.mailbox) + self._inflight
+
+    def cancel(self):
+        self.bus.unsubscribe(self)
+
+    # --- teslim ---
+
+    def _failed(self, exc: BaseException):
+        self.errors += 1
+        self.last_error = exc
+        self.bus.errors += 1
+
+    def _call(self, event):
+        try:
+            self.handler(event)
+            self.delivered += 1
+        except Exception as exc:
+            self._failed(exc)
+
+    def _offer(self, event) -> bool:
+        """Olayı kuyruğa ekler; "block" politikasında yer yoksa False döner."""
+        mailbox = self.mailbox
+        if len(mailbox) >= self.queue_size:
+            if self.overflow == "drop_new":
+                self.dropped += 1
+                return True
+            if self.overflow == "drop_oldest":
+                mailbox.popleft()
+                self.dropped += 1
+            else:
+                return False
+        mailbox.append(event)
+        ready = self._ready
+        if ready is not None and not ready.is_set():
+            ready.set()
+        return True
+
+    def _take(self) -> list:
+        mailbox = self.mailbox
+        count = min(len(mailbox), self.batch_size)
+        popleft = mailbox.popleft
+        items = [popleft() for _ in range(count)]
+        space = self._space
+        if space is not None and not space.is_set():
+            space.set()
+        return items
+
+    def drain(self) -> int:
+        """Kuyruğu bu iş parçacığında boşaltır (yalnızca düz fonksiyon işleyiciler)."""
+        if self.is_coroutine:
+            raise TypeError(f"{self.name}: coroutine işleyici yalnızca başlatılmış veriyolunda çalışır")
+        handled = 0
+        while self.mailbox:
+            items = self._take()
+            handled += len(items)
+            if self.mode == "batch":
+                try:
+                    self.handler(items)
+                    self.delivered += len(items)
+                except Exception as exc:
+                    self._failed(exc)
+            else:
+                for event in items:
+                    self._call(event)
+        return handled
+
+    async def _run(self):
+        handler = self.handler
+        while True:
+            if not self.mailbox:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            items = self._take()
+            self._inflight = len(items)
+            if self.mode == "batch":
+                try:
+                    result = handler(items)
+                    if self.is_coroutine:
+                        await result
+                    self.delivered += len(items)
+                except Exception as exc:
+                    self._failed(exc)
+            else:
+                for event in items:
+                    try:
+                        result = handler(event)
+                        if self.is_coroutine:
+                            await result
+                        self.delivered += 1
+                    except Exception as exc:
+                        self._failed(exc)
+            self._inflight = 0
+            # Düz fonksiyon işleyiciler dolu bir kuyrukta döngüyü kilitlemesin
+            await asyncio.sleep(0)
+
+
+# --- VERİYOLU ---
+
+class EventBus:
+    """
+    Konu ve konum filtreli yayın/abone veriyolu.
+
+    Args:
+        queue_size: Async/batch abonelikler için varsayılan kuyruk sınırı.
+        batch_size: Varsayılan en büyük grup boyu (async modda bir uyanışta işlenen olay sayısı).
+        overflow: Varsayılan taşma politikası.
+    """
+
+    def __init__(self, queue_size: int = 10000, batch_size: int = 256, overflow: str = "block"):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.published = 0
+        self.errors = 0
+        self.closed = False
+        self._subscriptions: List[Subscription] = []
+        # olay tipi -> (konum filtresiz abonelikler, {konum: abonelikler})
+        self._routes: Dict[type, Tuple[tuple, Dict[str, tuple]]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+
+    # --- abonelik ---
+
+    def subscribe(self, handler: Callable, topics=None, locations: Optional[Iterable[str]] = None,
+                  mode: str = "sync", queue_size: Optional[int] = None, batch_size: Optional[int] = None,
+                  overflow: Optional[str] = None, name: Optional[str] = None) -> Subscription:
+        """
+        İşleyiciyi kaydeder.
+
+        Args:
+            handler: sync/async modda handler(event), batch modda handler(list_of_events).
+            topics: Olay sınıfı ya da sınıf listesi; None tüm olaylar.
+            locations: Yalnızca bu konumlardaki olaylar; None konum filtresi yok.
+            mode: "sync", "async" ya da "batch".
+        Returns:
+            Subscription: cancel() ile abonelik bırakılabilir.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Geçersiz abonelik modu: {mode}")
+        overflow = self.overflow if overflow is None else overflow
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Geçersiz taşma politikası: {overflow}")
+        if mode == "sync" and inspect.iscoroutinefunction(handler):
+            raise ValueError("Coroutine işleyiciler 'async' ya da 'batch' modda kaydedilmeli.")
+        if topics is not None:
+            topics = tuple(topics) if isinstance(topics, (list, tuple, set, frozenset)) else (topics,)
+            for topic in topics:
+                if not (isinstance(topic, type) and issubclass(topic, Event)):
+                    raise TypeError(f"Konu bir Event sınıfı olmalı: {topic!r}")
+        if locations is not None:
+            locations = frozenset(location.casefold() for location in locations)
+        queue_size = self.queue_size if queue_size is None else queue_size
+        batch_size = self.batch_size if batch_size is None else batch_size
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError("queue_size ve batch_size pozitif olmalı.")
+        subscription = Subscription(self, handler, topics, locations, mode, queue_size, batch_size,
+                                    overflow, name or getattr(handler, "__qualname__", repr(handler)))
+        self._subscriptions.append(subscription)
+        self._routes.clear()
+        if self._loop is not None and mode != "sync":
+            self._start_worker(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Aboneliği kaldırır; kuyrukta kalan olaylar atılır."""
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+            self._routes.clear()
+        subscription.active = False
+        subscription.mailbox.clear()
+        if subscription._task is not None:
+            subscription._task.cancel()
+            subscription._task = None
+
+    @property
+    def subscriptions(self) -> List[Subscription]:
+        return list(self._subscriptions)
+
+    def _route(self, event_type: type):
+        unfiltered = []
+        by_location: Dict[str, list] = {}
+        for subscription in self._subscriptions:
+            if not subscription.matches(event_type):
+                continue
+            if subscription.locations is None:
+                unfiltered.append(subscription)
+            else:
+                for location in subscription.locations:
+                    by_location.setdefault(location, []).append(subscription)
+        route = (tuple(unfiltered), {k: tuple(v) for k, v in by_location.items()})
+        self._routes[event_type] = route
+        return route
+
+    def _targets(self, event) -> tuple:
+        route = self._routes.get(type(event))
+        if route is None:
+            route = self._route(type(event))
+        unfiltered, by_location = route
+        if by_location:
+            location = event.location
+            if location is not None:
+                matched = by_location.get(location.casefold())
+                if matched:
+                    return unfiltered + matched
+        return unfiltered
+
+    # --- yayın ---
+
+    def publish(self, event: Event) -> int:
+        """
+        Olayı eşleşen abonelere iletir (sync abonelikler hemen çağrılır).
+
+        Returns:
+            int: Eşleşen abonelik sayısı.
+        """
+        if self.closed:
+            raise BusClosedError("Veriyolu kapatıldı.")
+        if self._thread_id is not None and threading.get_ident() != self._thread_id:
+            self._loop.call_soon_threadsafe(self.publish, event)
+            return len(self._targets(event))
+        self.published += 1
+        targets = self._targets(event)
+        for subscription in targets:
+            if subscription.mode == "sync":
+                subscription._call(event)
+            elif not subscription._offer(event):
+                if subscription.is_coroutine:
+                    raise BusFullError(f"{subscription.name} kuyruğu dolu; publish_async kullanın.")
+                subscription.drain()
+                subscription._offer(event)
+        return len(targets)
+
+    def publish_many(self, events: Iterable[Event]) -> int:
+        """Olayları sırayla yayınlar; toplam eşleşme sayısını döndürür."""
+        publish = self.publish
+        return sum(publish(event) for event in events)
+
+    async def publish_async(self, event: Event) -> int:
+        """publish gibi; "block" politikalı dolu kuyruklarda yer açılmasını bekler."""
+        if self.closed:
+            raise BusClosedError("Veriyolu kapatıldı.")
+        self.published += 1
+        targets = self._targets(event)
+        for subscription in targets:
+            if subscription.mode == "sync":
+                subscription._call(event)
+                continue
+            while not subscription._offer(event):
+                if subscription._space is None:
+                    # Başlatılmamış veriyolunda bekleyecek işçi yok
+                    subscription.drain()
+                    continue
+                subscription._space.clear()
+                await subscription._space.wait()
+        return len(targets)
+
+    def publish_threadsafe(self, event: Event):
+        """Başka bir iş parçacığından bekleyerek yayın (publish_async); concurrent Future döner."""
+        if self._loop is None:
+            raise RuntimeError("publish_threadsafe için veriyolu başlatılmış olmalı.")
+        return asyncio.run_coroutine_threadsafe(self.publish_async(event), self._loop)
+
+    def pump(self) -> int:
+        """Döngüsüz kullanımda bekleyen kuyrukları boşaltır; işlenen olay sayısını döndürür."""
+        return sum(s.drain() for s in self._subscriptions if s.mode != "sync" and not s.is_coroutine)
+
+    # --- yaşam döngüsü ---
+
+    def _start_worker(self, subscription: Subscription):
+        subscription._ready = asyncio.Event()
+        subscription._space = asyncio.Event()
+        if subscription.mailbox:
+            subscription._ready.set()
+        subscription._task = self._loop.create_task(subscription._run(), name=f"bus:{subscription.name}")
+
+    def start(self) -> "EventBus":
+        """Async/batch abonelikler için işçi görevlerini çalışan olay döngüsünde başlatır."""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._thread_id = threading.get_ident()
+            for subscription in self._subscriptions:
+                if subscription.mode != "sync":
+                    self._start_worker(subscription)
+        return self
+
+    async def join(self):
+        """Tüm kuyruklar boşalana kadar bekler."""
+        while any(s.pending for s in self._subscriptions if s._task is not None):
+            await asyncio.sleep(0)
+
+    async def close(self, drain: bool = True):
+        """Yeni yayınları reddeder; drain ise kuyrukların işlenmesini bekler, sonra işçileri durdurur."""
+        if drain and self._loop is not None:
+            await self.join()
+        self.closed = True
+        tasks = [s._task for s in self._subscriptions if s._task is not None]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for subscription in self._subscriptions:
+            subscription._task = subscription._ready = subscription._space = None
+        self._loop = self._thread_id = None
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def stats(self) -> dict:
+        """Veriyolu ve abonelik sayaçları."""
+        return {
+            "published": self.published,
+            "errors": self.errors,
+            "subscriptions": [
+                {"name": s.name, "mode": s.mode, "queued": len(s.mailbox), "delivered": s.delivered,
+                 "dropped": s.dropped, "errors": s.errors}
+                for s in self._subscriptions
+            ],
+        }
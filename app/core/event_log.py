@@ -0,0 +1,216 @@
+"""
+ORTAK OLAY GÜNLÜĞÜ (STRUCTURED EVENT LOG)
+
+Repository ve servislerin sınırsız büyüyen metin listeleri yerine kullandığı
+sabit kapasiteli halka tampon (ring buffer). Her kayıt sabit alanlardan oluşur:
+epoch zaman damgası, olay kodu ve en fazla iki kimlik/değer. Metin biçimlendirme
+yalnızca kayıt okunduğunda (tail/range/get_lines) ya da diske aktarılırken yapılır.
+
+Bellek kullanımı kapasite ile sınırlıdır; sürekli çalışmada sabit kalır.
+"""
+
+import os
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from enum import IntEnum
+from typing import List, NamedTuple, Optional
+
+
+class EventCode(IntEnum):
+    MESSAGE = 0
+    UNIT_REGISTERED = 1
+    UNIT_REMOVED = 2
+    INCIDENT_REGISTERED = 3
+    INCIDENT_ARCHIVED = 4
+    INCIDENT_DISPATCHED = 5
+    INCIDENT_QUEUED = 6
+    INCIDENT_CANCELLED = 7
+    UNITS_BULK_REGISTERED = 8
+    ELEMENT_SAVED = 10
+    ELEMENTS_BULK_SAVED = 11
+    ELEMENT_DELETED = 12
+
+
+# Kod -> mesaj şablonu ({subject} ve {detail} alanları)
+TEMPLATES = {
+    EventCode.MESSAGE: "{subject}",
+    EventCode.UNIT_REGISTERED: "System : New Unit {subject} registered",
+    EventCode.UNIT_REMOVED: "System : Unit {subject} removed",
+    EventCode.INCIDENT_REGISTERED: "Incident {subject} registered",
+    EventCode.INCIDENT_ARCHIVED: "Log: Incident {subject} archived",
+    EventCode.INCIDENT_DISPATCHED: "Unit {detail} dispatched to incident {subject}",
+    EventCode.INCIDENT_QUEUED: "Incident {subject} queued, waiting for a free unit",
+    EventCode.INCIDENT_CANCELLED: "Incident {subject} cancelled",
+    EventCode.UNITS_BULK_REGISTERED: "System : {detail} units registered",
+    EventCode.ELEMENT_SAVED: "KAYIT: {subject} sisteme eklendi.",
+    EventCode.ELEMENTS_BULK_SAVED: "TOPLU KAYIT: {detail} cihaz kaydedildi.",
+    EventCode.ELEMENT_DELETED: "SİLME: {subject} sistemden kaldırıldı.",
+}
+
+
+class EventRecord(NamedTuple):
+    seq: int
+    timestamp: float
+    code: int
+    subject: object
+    detail: object
+
+    def format(self) -> str:
+        stamp = datetime.fromtimestamp(self.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+        template = TEMPLATES.get(self.code, "{subject} {detail}")
+        return f"[{stamp}] " + template.format(subject=self.subject, detail=self.detail)
+
+
+class RotatingFileSpill:
+    """
+    Biçimlendirilmiş kayıtları boyut sınırlı, döndürülen dosyalara yazar.
+    Sınır UTF-8 bayt olarak uygulanır (Türkçe karakterler birden çok bayttır).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+
+    def write_lines(self, lines: List[str]):
+        data = "".join(line + "\n" for line in lines).encode("utf-8")
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+        self._size = 0
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class EventLog:
+    """
+    Sabit kapasiteli yapılandırılmış olay günlüğü.
+
+    Args:
+        capacity: Bellekte tutulacak en fazla kayıt sayısı.
+        spill: İsteğe bağlı RotatingFileSpill; kayıtlar spill_batch'lik gruplar
+            halinde biçimlendirilip diske yazılır.
+        spill_batch: Diske yazmadan önce biriktirilecek kayıt sayısı.
+    """
+
+    def __init__(self, capacity: int = 10000, spill: Optional[RotatingFileSpill] = None,
+                 spill_batch: int = 256):
+        if capacity <= 0:
+            raise ValueError("Kapasite pozitif olmalı.")
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._codes = array("H", bytes(2 * capacity))
+        self._subjects: List[object] = [None] * capacity
+        self._details: List[object] = [None] * capacity
+        self._seq = 0            # şimdiye kadar yazılan toplam kayıt
+        self._last_ts = 0.0
+        self.spill = spill
+        self.spill_batch = min(spill_batch, capacity)
+        self._spilled_seq = 0    # diske yazılmış kayıt sayısı
+
+    def __len__(self):
+        return min(self._seq, self.capacity)
+
+    @property
+    def total_events(self) -> int:
+        return self._seq
+
+    def append(self, code: int, subject=None, detail=None, timestamp: Optional[float] = None):
+        ts = time.time() if timestamp is None else timestamp
+        # Aralık sorguları ikili arama yaptığı için zaman damgaları azalmaz tutulur
+        if ts < self._last_ts:
+            ts = self._last_ts
+        self._last_ts = ts
+        slot = self._seq % self.capacity
+        self._timestamps[slot] = ts
+        self._codes[slot] = code
+        self._subjects[slot] = subject
+        self._details[slot] = detail
+        self._seq += 1
+        if self.spill is not None and self._seq - self._spilled_seq >= self.spill_batch:
+            self.flush()
+
+    def log(self, message: str):
+        """Serbest metin mesajı kaydeder (geriye dönük uyumluluk için)."""
+        self.append(EventCode.MESSAGE, message)
+
+    def _record(self, seq: int) -> EventRecord:
+        slot = seq % self.capacity
+        return EventRecord(seq, self._timestamps[slot], self._codes[slot],
+                           self._subjects[slot], self._details[slot])
+
+    def _first_seq(self) -> int:
+        return max(0, self._seq - self.capacity)
+
+    def tail(self, n: int = 10) -> List[EventRecord]:
+        """Son n kaydı eskiden yeniye döndürür."""
+        start = max(self._first_seq(), self._seq - max(n, 0))
+        return [self._record(seq) for seq in range(start, self._seq)]
+
+    def range(self, start_ts: float, end_ts: float) -> List[EventRecord]:
+        """[start_ts, end_ts] aralığındaki kayıtlar (ikili arama ile)."""
+        first = self._first_seq()
+        view = _TimestampView(self, first)
+        lo = bisect_left(view, start_ts)
+        hi = bisect_right(view, end_ts)
+        return [self._record(first + i) for i in range(lo, hi)]
+
+    def since(self, seq: int) -> List[EventRecord]:
+        """Verilen sıra numarasından sonraki kayıtlar (akış/takip için)."""
+        start = max(seq, self._first_seq())
+        return [self._record(s) for s in range(start, self._seq)]
+
+    def get_lines(self, n: Optional[int] = None) -> List[str]:
+        records = self.tail(self.capacity if n is None else n)
+        return [record.format() for record in records]
+
+    def flush(self):
+        """Henüz diske yazılmamış kayıtları biçimlendirip yazar."""
+        if self.spill is None:
+            return
+        start = max(self._spilled_seq, self._first_seq())
+        if start < self._seq:
+            self.spill.write_lines([self._record(seq).format() for seq in range(start, self._seq)])
+        self._spilled_seq = self._seq
+
+    def close(self):
+        self.flush()
+        if self.spill is not None:
+            self.spill.close()
+
+
+class _TimestampView:
+    """Halka tamponun zaman damgalarını mantıksal sırada gösteren dizi görünümü."""
+
+    __slots__ = ("_log", "_first", "_len")
+
+    def __init__(self, log: EventLog, first: int):
+        self._log = log
+        self._first = first
+        self._len = log._seq - first
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i: int) -> float:
+        return self._log._timestamps[(self._first + i) % self._log.capacity]
@@ -0,0 +1,75 @@
+"""
+ASENKRON SERVİSLER İÇİN ORTAK YÜRÜTÜCÜ (EXECUTOR BRIDGE)
+
+Async servisler durum değiştiren işleri olay döngüsünde (tek iş parçacığı,
+kilit gerektirmez) yapar; ağır hesaplamaları (rota ETA, toplu sınıflandırma,
+atama problemi) bu sınıf üzerinden bir iş parçacığı ya da süreç havuzuna
+gönderir. Her çağrıya zaman aşımı uygulanır ve kapatma sırasında süren işlerin
+bitmesi beklenir.
+
+Not: Havuzda çalışmaya başlamış bir iş zaman aşımında durdurulamaz; çağıran
+taraf TimeoutError alır, iş arka planda tamamlanır. Henüz başlamamış işler
+iptal edilir.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Optional, Set
+
+
+class ServiceClosedError(RuntimeError):
+    """Kapatılmış bir servise yeni istek gönderildiğinde fırlatılır."""
+
+
+class ServiceExecutor:
+    """
+    Olay döngüsü ile havuz arasındaki köprü.
+
+    Args:
+        executor: Kullanılacak havuz; verilmezse tek iş parçacıklı bir havuz
+            oluşturulur (sırayla çalışır, paylaşılan yapılar için kilit gerekmez).
+        timeout: İstek başına varsayılan zaman aşımı (sn); None sınırsız.
+        name: Havuz iş parçacıklarının ön eki.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None, timeout: Optional[float] = 5.0,
+                 name: str = "service"):
+        self._owns_executor = executor is None
+        self.executor = executor if executor is not None else ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.timeout = timeout
+        self.closed = False
+        self._inflight: Set[asyncio.Future] = set()
+
+    def check_open(self):
+        if self.closed:
+            raise ServiceClosedError("Servis kapatıldı, yeni istek kabul edilmiyor.")
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """fn'i havuzda çalıştırır; timeout verilmezse varsayılan kullanılır."""
+        self.check_open()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        self.track(future)
+        # İptal/zaman aşımı, henüz başlamamış işi havuz kuyruğundan da düşürür
+        return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+
+    async def wait_shared(self, future: asyncio.Future, timeout: Optional[float] = None):
+        """Birden çok isteğin beklediği işi bekler; bir çağıranın iptali işi iptal etmez."""
+        return await asyncio.wait_for(asyncio.shield(future), self.timeout if timeout is None else timeout)
+
+    def track(self, future: asyncio.Future):
+        """Havuz dışında başlatılan işleri de kapatmada beklenecekler arasına ekler."""
+        self._inflight.add(future)
+        future.add_done_callback(self._inflight.discard)
+
+    async def close(self, grace: float = 5.0):
+        """Yeni istekleri reddeder, süren işler için grace sn bekler, kalanları iptal eder."""
+        self.closed = True
+        pending = set(self._inflight)
+        if pending:
+            _, still_running = await asyncio.wait(pending, timeout=grace)
+            for future in still_running:
+                future.cancel()
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
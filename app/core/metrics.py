@@ -0,0 +1,457 @@
+"""
+ÖLÇÜM (METRICS) KATMANI
+
+Servislerin sıcak yollarına sürekli açık kalabilecek kadar ucuz ölçümler:
+- Histogram: HDR tarzı log-lineer kovalar (her ikinin kuvveti 16 alt kovaya
+  bölünür, ~%6 göreli hata). Kayıt tek bir bit_length ve liste artırımıdır.
+- Counter / Gauge: etiketli (labels) sayaçlar ve anlık değerler. Gauge (etiket
+  değeri başına) bir fonksiyona bağlanabilir; değer yalnızca dışa aktarımda hesaplanır.
+- RateMeter: anahtar (ör. cihaz) başına güncelleme hızları.
+
+Dışa aktarım Prometheus metin biçimindedir: Registry.render() (scrape uç
+noktası için) veya Registry.write_textfile() (node_exporter textfile
+collector için atomik dosya yazımı).
+
+Kullanım:
+    LATENCY = REGISTRY.histogram("dispatch_seconds", "Sevk süresi")
+
+    @LATENCY.timed
+    def dispatch(...): ...
+
+    with LATENCY.time():
+        ...
+
+Not: Artırımlar kilitsizdir; çok iş parçacıklı kullanımda nadiren bir artırım
+kaybolabilir. Ölçüm amaçlı bu kabul edilebilir bir ödünleşimdir.
+"""
+
+import functools
+import os
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+SUB_BITS = 4                     # İkinin her kuvveti 2**SUB_BITS alt kovaya bölünür
+SUB_COUNT = 1 << SUB_BITS
+LINEAR_LIMIT = SUB_COUNT << 1    # Bu değerin altı tam çözünürlükle tutulur
+BUCKET_COUNT = 64 * SUB_COUNT
+
+# Prometheus'a aktarılan kaba sınırlar (sn); ince kovalar bunlara toplanır
+EXPORT_BOUNDS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+_now_ns = time.perf_counter_ns
+
+
+def bucket_index(value: int) -> int:
+    """Nanosaniye değerinin HDR kova indeksi."""
+    length = value.bit_length()
+    if length <= SUB_BITS + 1:
+        return value
+    shift = length - SUB_BITS - 1
+    return (shift << SUB_BITS) + (value >> shift)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """Kovanın [alt, üst) sınırları (nanosaniye)."""
+    if index < LINEAR_LIMIT:
+        return index, index + 1
+    shift = (index >> SUB_BITS) - 1
+    mantissa = index - (shift << SUB_BITS)
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Timer:
+    """Histogram.time() bağlam yöneticisi."""
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._started = _now_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.record(_now_ns() - self._started)
+        return False
+
+
+class Histogram:
+    """Gecikme histogramı; değerler nanosaniye olarak kaydedilir, saniye olarak aktarılır."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        # Kayıt yolunda yalnızca kova artırımı ve toplam tutulur; adet ve en büyük
+        # değer dışa aktarımda kovalardan türetilir
+        self.counts: List[int] = [0] * BUCKET_COUNT
+        self.total_ns = 0
+
+    def record(self, value_ns: int):
+        if value_ns < LINEAR_LIMIT:
+            self.counts[value_ns if value_ns > 0 else 0] += 1
+        else:
+            shift = value_ns.bit_length() - SUB_BITS - 1
+            index = (shift << SUB_BITS) + (value_ns >> shift)
+            self.counts[index if index < BUCKET_COUNT else BUCKET_COUNT - 1] += 1
+        self.total_ns += value_ns
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    @property
+    def max_ns(self) -> int:
+        for index in range(BUCKET_COUNT - 1, -1, -1):
+            if self.counts[index]:
+                return bucket_bounds(index)[1] - 1
+        return 0
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def timed(self, fn: Callable) -> Callable:
+        """Fonksiyonun her çağrısının süresini kaydeden dekoratör."""
+        counts = self.counts
+        histogram = self
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = _now_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                # record() satır içi yazıldı: çağrı başına bir fonksiyon çağrısı daha az
+                value = _now_ns() - started
+                if value < LINEAR_LIMIT:
+                    counts[value] += 1
+                else:
+                    shift = value.bit_length() - SUB_BITS - 1
+                    index = (shift << SUB_BITS) + (value >> shift)
+                    counts[index if index < BUCKET_COUNT else BUCKET_COUNT - 1] += 1
+                histogram.total_ns += value
+        return wrapper
+
+    def percentile(self, q: float) -> float:
+        """q (0-100) yüzdelik değeri, saniye cinsinden (kova üst sınırı)."""
+        total = self.count
+        if total == 0:
+            return 0.0
+        target = max(1, int(round(total * q / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                seen += count
+                if seen >= target:
+                    return (bucket_bounds(index)[1] - 1) / 1e9
+        return self.max_ns / 1e9
+
+    def reset(self):
+        # Dekoratörler aynı listeyi tuttuğu için yerinde sıfırlanır
+        self.counts[:] = [0] * BUCKET_COUNT
+        self.total_ns = 0
+
+    def render(self) -> List[str]:
+        lines = []
+        cumulative = 0
+        counts = self.counts
+        index = 0
+        for bound in EXPORT_BOUNDS:
+            limit = int(bound * 1e9)
+            # Üst sınırı limit'i aşmayan kovalar bu dilime girer
+            while index < BUCKET_COUNT and bucket_bounds(index)[1] <= limit:
+                cumulative += counts[index]
+                index += 1
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        total = self.count
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {total}')
+        lines.append(f"{self.name}_sum {_number(self.total_ns / 1e9)}")
+        lines.append(f"{self.name}_count {total}")
+        return lines
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_seconds": self.total_ns / 1e9,
+            "max_seconds": self.max_ns / 1e9,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+class _LabeledMetric:
+    """Counter ve Gauge için ortak etiket yönetimi."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0}
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_number(value)}"
+                for key, value in sorted(self.values.items())]
+
+    def snapshot(self):
+        if not self.labelnames:
+            return self.values[()]
+        return {",".join(key): value for key, value in self.values.items()}
+
+
+class _CounterChild:
+    __slots__ = ("_values", "_key")
+
+    def __init__(self, values, key):
+        self._values = values
+        self._key = key
+        values.setdefault(key, 0)
+
+    def inc(self, amount: float = 1):
+        self._values[self._key] += amount
+
+
+class Counter(_LabeledMetric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._children: Dict[Tuple[str, ...], _CounterChild] = {}
+
+    def inc(self, amount: float = 1):
+        self.values[()] += amount
+
+    def labels(self, *values) -> _CounterChild:
+        """Etiket değerleri için alt sayaç; sıcak yolda bir kez alınıp saklanmalı."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} {len(self.labelnames)} etiket bekliyor.")
+            child = self._children[key] = _CounterChild(self.values, key)
+        return child
+
+    def get(self, *values) -> float:
+        return self.values.get(tuple(str(v) for v in values), 0)
+
+
+class Gauge(_LabeledMetric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._functions: Dict[Tuple[str, ...], Callable[[], Optional[float]]] = {}
+
+    def set(self, value: float, *labels):
+        self.values[tuple(str(v) for v in labels)] = value
+
+    def inc(self, amount: float = 1):
+        self.values[()] += amount
+
+    def dec(self, amount: float = 1):
+        self.values[()] -= amount
+
+    def set_function(self, fn: Optional[Callable[[], Optional[float]]], *labels):
+        """
+        Değer dışa aktarım anında fn() ile okunur (kuyruk uzunluğu gibi). Etiketli
+        göstergede her etiket değeri kendi fonksiyonuna bağlanır (ör. servis örneği
+        başına). fn None verilirse ya da fn() None döndürürse bağ ve satır kaldırılır.
+        """
+        key = tuple(str(v) for v in labels)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} {len(self.labelnames)} etiket bekliyor.")
+        if fn is None:
+            self._unbind(key)
+        else:
+            self._functions[key] = fn
+
+    def _unbind(self, key: Tuple[str, ...]):
+        self._functions.pop(key, None)
+        if key:
+            self.values.pop(key, None)
+
+    def _collect(self):
+        for key, fn in list(self._functions.items()):
+            value = fn()
+            if value is None:
+                self._unbind(key)
+            else:
+                self.values[key] = value
+
+    def get(self, *labels) -> float:
+        key = tuple(str(v) for v in labels)
+        fn = self._functions.get(key)
+        if fn is not None:
+            value = fn()
+            if value is not None:
+                return value
+        return self.values.get(key, 0)
+
+    def render(self) -> List[str]:
+        if self._functions:
+            self._collect()
+        return super().render()
+
+    def snapshot(self):
+        if self._functions:
+            self._collect()
+        return super().snapshot()
+
+
+class RateMeter:
+    """
+    Anahtar başına güncelleme hızı (ör. cihaz başına okuma/sn).
+
+    mark() yalnızca sözlükte bir artırım yapar; hızlar dışa aktarımda iki
+    okuma arasındaki farktan hesaplanır. Aktarımda en hızlı top_n anahtar
+    etiketli, tamamı ise toplam olarak yazılır.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = "", label: str = "key", top_n: int = 20):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.top_n = top_n
+        self.counts: Dict[str, int] = {}
+        self.total = 0
+        self._last_counts: Dict[str, int] = {}
+        self._last_total = 0
+        self._last_time: Optional[float] = None  # İlk update_rates taban çizgisini kurar
+        self._rates: Dict[str, float] = {}
+        self._total_rate = 0.0
+
+    def mark(self, key: str, amount: int = 1):
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + amount
+        self.total += amount
+
+    def mark_many(self, keys: Iterable[str]):
+        counts = self.counts
+        get = counts.get
+        added = 0
+        for key in keys:
+            counts[key] = get(key, 0) + 1
+            added += 1
+        self.total += added
+
+    def update_rates(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Son çağrıdan bu yana anahtar başına hızları hesaplar."""
+        now = time.monotonic() if now is None else now
+        if self._last_time is None:
+            self._last_time = now
+            self._last_counts = dict(self.counts)
+            self._last_total = self.total
+            return self._rates
+        elapsed = now - self._last_time
+        if elapsed <= 0:
+            return self._rates
+        last = self._last_counts
+        self._rates = {key: (count - last.get(key, 0)) / elapsed for key, count in self.counts.items()
+                       if count != last.get(key, 0)}
+        self._total_rate = (self.total - self._last_total) / elapsed
+        self._last_counts = dict(self.counts)
+        self._last_total = self.total
+        self._last_time = now
+        return self._rates
+
+    def rate(self, key: str) -> float:
+        return self._rates.get(key, 0.0)
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, float]]:
+        ordered = sorted(self._rates.items(), key=lambda item: (-item[1], item[0]))
+        return ordered[: self.top_n if n is None else n]
+
+    def render(self) -> List[str]:
+        self.update_rates()
+        # Etiketsiz satır tüm anahtarların toplam hızıdır
+        lines = [f"{self.name} {_number(self._total_rate)}"]
+        for key, rate in self.top():
+            lines.append(f'{self.name}{{{self.label}="{_escape(key)}"}} {_number(rate)}')
+        return lines
+
+    def snapshot(self) -> dict:
+        return {"total": self.total, "per_second": self._total_rate, "top": self.top()}
+
+
+class Registry:
+    """Metrik kayıt defteri; aynı isimle tekrar istenen metrik paylaşılır."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"{name} zaten farklı tipte bir metrik olarak kayıtlı.")
+        return metric
+
+    def histogram(self, name: str, help: str = "") -> Histogram:
+        return self._get_or_create(Histogram, name, help)
+
+    def counter(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def rate_meter(self, name: str, help: str = "", label: str = "key", top_n: int = 20) -> RateMeter:
+        return self._get_or_create(RateMeter, name, help, label, top_n)
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus metin biçimi (version 0.0.4)."""
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """Yarım dosya okunmasın diye geçici dosyaya yazıp yerine taşır."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+
+# Uygulama genelinde paylaşılan varsayılan kayıt defteri
+REGISTRY = Registry()
@@ -0,0 +1,212 @@
+"""
+MODÜLLER ARASI TEPKİLER (EVENT BUS ÜZERİNDEN)
+
+Trafik ve acil durum modülleri birbirini tanımaz; bu modül ikisini veriyolu
+olayları üzerinden bağlar:
+
+- DensityChanged (batch): Gruptaki son okumalarla RouteEngine ağırlıkları tek
+  çağrıda güncellenir (TrafficService motoru tahminlerle besliyorsa anlık okumalar
+  ağırlıkları ezmez); yol süreleri değiştiyse yoldaki birimlerin ETA'ları
+  yeniden hesaplanır ve belirgin değişen rotalar günlüğe yazılır. Yoğunluğu
+  değişen konumdaki ışıkların süresi TrafficService ile yeniden ayarlanır
+  (öncelikteki ışıklarda yeni süre öncelik bitince uygulanır).
+- UnitDispatched (sync): Ambulans/itfaiye gönderildiğinde RouteEngine rotası
+  üzerindeki her ışık için aracın tahmini geçişine göre yeşil penceresi
+  planlanır (PreemptionController); olay yerindeki ışıklar birim görevden
+  ayrılana kadar yeşilde tutulur. Rota ETA'sı yoğunluk yüzünden belirgin
+  değişirse pencereler yeni rotaya göre yeniden planlanır.
+- UnitEtaChanged (sync): Telemetri kanalı yoldaki birimin canlı konumundan
+  yeni ETA yayınladığında ETA kaydı güncellenir; öncelikli birimin yeşil
+  pencereleri son konumdan itibaren yeniden planlanır.
+- UnitStatusChanged (sync): Birim görevden ayrılınca (On Scene dışı bir duruma
+  geçince) tuttuğu ışıklar eski renk ve sürelerine döner.
+
+Pencerelerin zamanında açılıp kapanması için preemption.advance() düzenli
+çağrılmalıdır (sunucuda server.py içindeki görev yapar).
+
+Yoğunluk aboneliği "drop_oldest" politikasıyla çalışır: kuyruk taşarsa eski
+okumalar atılır, tepkiler zaten her sensörün son değerini kullanır.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional
+
+from app.core.event_bus import DensityChanged, EventBus, UnitDispatched, UnitEtaChanged, UnitStatusChanged
+from app.modules.traffic.implementations import TrafficLight
+from app.modules.traffic.preemption import PreemptionController
+
+# Işık önceliği verilen birim türleri
+PRIORITY_UNIT_TYPES = ("Medical", "Fire")
+ON_SCENE = "On Scene"
+
+
+class CityReactions:
+    """
+    Veriyoluna abone olan tepki kümesi.
+
+    Args:
+        bus: Olayların dinleneceği EventBus.
+        transport: TransportRepository (ışık aramaları için).
+        emergency: EmergencyService (atamalar ve günlük için).
+        traffic: İsteğe bağlı TrafficService; yoğunluğa göre ışık süresi ayarı.
+        route_engine: İsteğe bağlı RouteEngine; canlı yoğunluk, ETA takibi ve öncelik rotaları.
+            Tahmin modeli olan TrafficService'in motoru yoksa aynısı ona atanır; ağırlıkların
+            tek sahibi o zaman servistir ve anlık sayılar motora yazılmaz.
+        preemption: Işık önceliği denetleyicisi; verilmezse green_seconds ile oluşturulur.
+            TrafficService'in denetleyicisi yoksa aynısı ona da atanır.
+        green_seconds: Öncelik verilen ışığın yeşil süresi (sn).
+        eta_margin: Günlüğe yazılacak ve rotayı yeniden planlatan en küçük ETA değişimi (dk).
+    """
+
+    def __init__(self, bus: EventBus, transport, emergency, traffic=None, route_engine=None,
+                 preemption: Optional[PreemptionController] = None, green_seconds: int = 60,
+                 eta_margin: float = 1.0, queue_size: int = 10000, history: int = 1000):
+        self.bus = bus
+        self.transport = transport
+        self.emergency = emergency
+        self.traffic = traffic
+        self.route_engine = route_engine
+        self.eta_margin = eta_margin
+        if preemption is None:
+            preemption = PreemptionController(transport, green_seconds=green_seconds)
+        self.preemption = preemption
+        if route_engine is not None:
+            # Düğüm -> yer adı eşlemesi bir kez verilir; ışıklar sevk anında depodan okunur
+            preemption.index_locations(route_engine.graph.names)
+        if traffic is not None and traffic.preemption is None:
+            traffic.preemption = preemption
+        if traffic is not None and traffic.forecaster is not None and traffic.route_engine is None:
+            traffic.route_engine = route_engine
+        # olay -> son hesaplanan ETA (dk); birim -> (yola çıkış ya da son konum zamanı, olay)
+        self.etas: Dict[str, float] = {}
+        self._departures: Dict[str, tuple] = {}
+        self.rerouted = 0
+        self._engine_version = route_engine.version if route_engine is not None else None
+        self.actions: deque = deque(maxlen=history)
+        self.subscriptions = [
+            bus.subscribe(self.on_density_batch, DensityChanged, mode="batch", overflow="drop_oldest",
+                          queue_size=queue_size, name="reactions.density"),
+            bus.subscribe(self.on_unit_dispatched, UnitDispatched, name="reactions.preempt"),
+            bus.subscribe(self.on_unit_eta, UnitEtaChanged, name="reactions.telemetry"),
+            bus.subscribe(self.on_unit_status, UnitStatusChanged, name="reactions.release"),
+        ]
+
+    def _record(self, message: str):
+        self.actions.append(message)
+
+    def _lights_at(self, location: Optional[str]) -> List[TrafficLight]:
+        if location is None:
+            return []
+        return [e for e in self.transport.find_all_by_location(location) if isinstance(e, TrafficLight)]
+
+    # --- YOĞUNLUK ---
+
+    def on_density_batch(self, events: List[DensityChanged]):
+        latest = {event.sensor_id: event for event in events}
+        engine = self.route_engine
+        if engine is not None:
+            # Motoru tahminle besleyen servis varsa anlık sayılar o motorun ağırlıklarını ezmez
+            if not self._forecast_owns(engine):
+                engine.update_densities({sensor_id: event.vehicle_count for sensor_id, event in latest.items()})
+            if engine.version != self._engine_version:
+                self._engine_version = engine.version
+                self.refresh_etas()
+        if self.traffic is not None:
+            by_location = {event.location: event.density for event in latest.values() if event.location is not None}
+            for location, density in by_location.items():
+                for light in self._lights_at(location):
+                    self._record(self.traffic.optimize_light_timing(light.element_id, density))
+
+    def _forecast_owns(self, engine) -> bool:
+        traffic = self.traffic
+        return traffic is not None and traffic.feeds_route_forecast and traffic.route_engine is engine
+
+    def refresh_etas(self) -> int:
+        """
+        Atanmış birimlerin olay yerine ETA'larını güncel yol ağırlıklarıyla
+        yeniden hesaplar. Returns: eta_margin'den fazla değişen rota sayısı.
+        """
+        engine = self.route_engine
+        emergency = self.emergency
+        rerouted = 0
+        etas = {}
+        for incident_id, unit_id in emergency.assignments.items():
+            incident = emergency.active_incidents.get(incident_id)
+            unit = emergency.repo.get_unit_by_id(unit_id)
+            if incident is None or unit is None or incident.coordinates is None or unit.coordinates is None:
+                continue
+            eta = engine.eta(unit.coordinates, incident.coordinates)
+            if eta is None:
+                continue
+            etas[incident_id] = eta
+            previous = self.etas.get(incident_id)
+            if previous is not None and abs(eta - previous) >= self.eta_margin:
+                rerouted += 1
+                message = f"Reroute: {unit_id} -> {incident_id}, ETA {previous:.1f} -> {eta:.1f} min"
+                emergency.log_event(message)
+                self._record(message)
+                departure = self._departures.get(unit_id)
+                if departure is not None and departure[1] == incident_id:
+                    self._preempt_route(unit_id, unit.coordinates, incident.coordinates, departure[0])
+        self.etas = etas
+        self.rerouted += rerouted
+        return rerouted
+
+    # --- IŞIK ÖNCELİĞİ ---
+
+    def _preempt_route(self, unit_id: str, origin, destination, departure: float) -> int:
+        route = self.route_engine.route(origin, destination)
+        if route is None:
+            return 0
+        return self.preemption.preempt(unit_id, [(node, departure + minutes * 60) for node, minutes in route])
+
+    def on_unit_dispatched(self, event: UnitDispatched):
+        routed = self.route_engine is not None and event.coordinates is not None and event.origin is not None
+        if routed:
+            eta = self.route_engine.eta(event.origin, event.coordinates)
+            if eta is not None:
+                self.etas[event.incident_id] = eta
+        if event.unit_type not in PRIORITY_UNIT_TYPES:
+            return
+        windows = 0
+        if routed:
+            self._departures[event.unit_id] = (event.timestamp, event.incident_id)
+            windows = self._preempt_route(event.unit_id, event.origin, event.coordinates, event.timestamp)
+        held = self.preemption.hold(event.unit_id, [light.element_id for light in self._lights_at(event.location)])
+        if windows or held:
+            self._record(f"{event.unit_id}: rota boyunca {windows} ışık penceresi, olay yerinde {held} ışık "
+                         f"yeşil öncelikte ({self.preemption.green_seconds} sn)")
+
+    def on_unit_eta(self, event: UnitEtaChanged):
+        self.etas[event.incident_id] = event.eta
+        departure = self._departures.get(event.unit_id)
+        if self.route_engine is None or departure is None or departure[1] != event.incident_id:
+            return
+        # Rota artık birimin son bildirdiği konumdan başlar; pencereler o andan itibaren sayılır
+        self._departures[event.unit_id] = (event.timestamp, event.incident_id)
+        incident = self.emergency.active_incidents.get(event.incident_id)
+        if incident is not None and incident.coordinates is not None:
+            self._preempt_route(event.unit_id, event.coordinates, incident.coordinates, event.timestamp)
+
+    def on_unit_status(self, event: UnitStatusChanged):
+        if event.new != ON_SCENE:
+            self.release(event.unit_id)
+
+    def release(self, unit_id: str) -> int:
+        """Birimin ışık önceliğini bitirir; başka birimin tutmadığı ışıklar normal plana döner."""
+        self._departures.pop(unit_id, None)
+        restored = self.preemption.release(unit_id)
+        if restored:
+            self._record(f"{unit_id}: {restored} ışık normal plana döndü")
+        return restored
+
+    @property
+    def preempted_lights(self) -> List[str]:
+        return self.preemption.preempted_lights
+
+    def close(self):
+        """Abonelikleri bırakır ve tutulan tüm ışıkları eski hallerine döndürür."""
+        for subscription in self.subscriptions:
+            subscription.cancel()
+        for unit_id in self.preemption.vehicles:
+            self.release(unit_id)
@@ -0,0 +1,262 @@
+"""
+ŞEHİR DURUMU ANLIK GÖRÜNTÜSÜ (SNAPSHOT) VE HIZLI GERİ YÜKLEME
+
+Trafik deposu, acil durum deposu ve sevk servisinin durumu tek bir sürümlü
+ikili dosyaya yazılır. Dosya düzeni:
+
+    [başlık 32 bayt][bölüm 1][bölüm 2]...[meta JSON]
+
+- Başlık: sihirli sözcük, biçim sürümü ve meta bölümünün yeri.
+- Trafik cihazları DeviceFleet sütunları olarak (her sütun ayrı, 8 bayt
+  hizalı bir bölüm) ve kimlikler IdTable olarak yazılır.
+- Acil durum birimleri ve servis durumu (açık olaylar, atamalar, bekleme
+  kuyruğu, geçmiş) boşluksuz, UTF-8 JSON bölümleridir (sıkıştırma yapılmaz);
+  birim sayısı cihaz sayısının küçük bir kesridir.
+- Meta JSON: bölüm dizini (ofset, uzunluk, tip kodu), kod tabloları (konum,
+  durum, renk), bayt sırası ve sayılar.
+
+Geri yükleme dosyayı mmap ile eşler; trafik sütunları kopyalanmadan
+memoryview olarak MappedFleet'e verilir ve TransportRepository.from_fleet ile
+tembel bir depo açılır. Cihaz nesneleri ilk erişimde, indeksler ilk sorguda
+üretilir. Bu yüzden açılış süresi cihaz sayısından bağımsızdır; yalnızca acil
+durum birimleri hemen kurulur.
+
+Örnek:
+    write_snapshot("city.snap", transport_repo, emergency_service)
+    with CitySnapshot.open("city.snap") as snapshot:
+        transport, emergency = snapshot.restore()
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from typing import Dict, Optional, Tuple
+
+from app.core.event_log import EventLog
+from app.modules.emergency.implementations import EmergencyService, unit_from_record
+from app.modules.emergency.repository import EmergencyRepository
+from app.modules.traffic.fleet import IdTable, MappedFleet
+from app.modules.traffic.repository import TransportRepository
+
+SNAPSHOT_MAGIC = b"CITYSNAP"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<8sIIQQ")   # sihirli sözcük, sürüm, bayraklar, meta ofseti, meta uzunluğu
+_ALIGN = 8
+
+
+class SnapshotError(ValueError):
+    """Dosya bir snapshot değil, bozuk ya da bu sürümle okunamıyor."""
+
+
+# --- YAZMA ---
+
+class _SectionWriter:
+    def __init__(self, f):
+        self.f = f
+        self.sections: Dict[str, list] = {}
+
+    def put(self, name: str, data, typecode: Optional[str] = None):
+        padding = -self.f.tell() % _ALIGN
+        if padding:
+            self.f.write(b"\0" * padding)
+        offset = self.f.tell()
+        raw = data.tobytes() if isinstance(data, array) else bytes(data)
+        self.f.write(raw)
+        self.sections[name] = [offset, len(raw), typecode, array(typecode).itemsize if typecode else 1]
+
+    def put_json(self, name: str, value):
+        self.put(name, json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def write_snapshot(path: str, transport: TransportRepository, emergency: Optional[EmergencyService] = None) -> dict:
+    """
+    Şehir durumunu dosyaya yazar. Yarım dosya okunmasın diye geçici dosyaya
+    yazılıp fsync sonrası yerine taşınır (yük devri sırasında da tutarlıdır).
+
+    Args:
+        transport: Trafik deposu (tembel açılmış bir depo da olabilir).
+        emergency: Sevk servisi; birimler servisin deposundan alınır.
+
+    Returns:
+        dict: Yazılan meta bilgisi (sayılar, bölümler, boyut).
+    """
+    fleet = transport.to_fleet()
+    offsets, blob, order = IdTable.build(list(fleet.ids()))
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+            writer = _SectionWriter(f)
+            writer.put("ids.offsets", offsets, "Q")
+            writer.put("ids.blob", blob)
+            writer.put("ids.order", order, "I")
+            for name, column in fleet.column_map().items():
+                writer.put(f"traffic.{name}", column, column.typecode)
+
+            meta = {
+                "version": SNAPSHOT_VERSION,
+                "created": time.time(),
+                "byteorder": sys.byteorder,
+                "devices": len(fleet),
+                "locations": fleet.locations.names,
+                "statuses": fleet.statuses.names,
+                "colors": fleet.colors.names,
+                "units": 0,
+            }
+            if emergency is not None:
+                repository = emergency.repo
+                units = [unit.to_record() for unit in repository.get_all_unit()]
+                writer.put_json("emergency.units", units)
+                writer.put_json("emergency.state", emergency.export_state())
+                meta["units"] = len(units)
+                meta["cell_km"] = repository._cell_km
+            meta["sections"] = writer.sections
+
+            meta_offset = f.tell()
+            encoded = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+            f.write(encoded)
+            meta["size"] = f.tell()
+            f.seek(0)
+            f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, meta_offset, len(encoded)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return meta
+
+
+# --- OKUMA ---
+
+class CitySnapshot:
+    """
+    Eşlenmiş (mmap) snapshot dosyası. Açmak yalnızca başlığı ve meta bölümünü
+    okur; trafik sütunları sayfa sayfa, erişildikçe belleğe gelir.
+
+    Dosyadan açılan depolar kullanıldığı sürece close() çağrılmamalıdır
+    (eşlenmiş sütunlar kapatılınca geçersiz olur).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:   # boş dosya
+            self._file.close()
+            raise SnapshotError(f"{path}: boş dosya")
+        self._views = []
+        self._fleet: Optional[MappedFleet] = None
+        try:
+            self.meta = self._read_meta()
+        except BaseException:
+            self.close()
+            raise
+
+    @classmethod
+    def open(cls, path: str) -> "CitySnapshot":
+        return cls(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_meta(self) -> dict:
+        if len(self._mmap) < _HEADER.size:
+            raise SnapshotError(f"{self.path}: başlık eksik")
+        magic, version, _flags, offset, length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"{self.path}: snapshot dosyası değil")
+        if version > SNAPSHOT_VERSION:
+            raise SnapshotError(f"{self.path}: sürüm {version} desteklenmiyor (en fazla {SNAPSHOT_VERSION})")
+        if offset + length > len(self._mmap):
+            raise SnapshotError(f"{self.path}: dosya kesik")
+        try:
+            meta = json.loads(self._mmap[offset:offset + length])
+        except ValueError as exc:
+            raise SnapshotError(f"{self.path}: meta bölümü okunamadı") from exc
+        if meta["byteorder"] != sys.byteorder:
+            raise SnapshotError(f"{self.path}: {meta['byteorder']} bayt sıralı dosya bu makinede eşlenemez")
+        return meta
+
+    @property
+    def version(self) -> int:
+        return self.meta["version"]
+
+    @property
+    def device_count(self) -> int:
+        return self.meta["devices"]
+
+    def _section(self, name: str):
+        """Bölümü kopyalamadan memoryview olarak döndürür (tip kodu varsa o tipe çevrilmiş)."""
+        try:
+            offset, length, typecode, itemsize = self.meta["sections"][name]
+        except KeyError:
+            raise SnapshotError(f"{self.path}: '{name}' bölümü yok") from None
+        view = memoryview(self._mmap)[offset:offset + length]
+        self._views.append(view)
+        if typecode is None:
+            return view
+        if array(typecode).itemsize != itemsize:
+            raise SnapshotError(f"{self.path}: '{name}' öğe boyutu bu platformla uyumsuz")
+        view = view.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def _json(self, name: str):
+        offset, length, _, _ = self.meta["sections"][name]
+        return json.loads(self._mmap[offset:offset + length])
+
+    # --- GERİ YÜKLEME ---
+
+    @property
+    def fleet(self) -> MappedFleet:
+        """Trafik cihazlarının eşlenmiş, salt okunur filosu."""
+        if self._fleet is None:
+            meta = self.meta
+            ids = IdTable(self._section("ids.offsets"), self._section("ids.blob"), self._section("ids.order"))
+            columns = {name[len("traffic."):]: self._section(name)
+                       for name in meta["sections"] if name.startswith("traffic.")}
+            self._fleet = MappedFleet(ids, columns, meta["locations"], meta["statuses"], meta["colors"])
+        return self._fleet
+
+    def transport_repository(self, event_log: Optional[EventLog] = None) -> TransportRepository:
+        return TransportRepository.from_fleet(self.fleet, event_log)
+
+    def emergency_repository(self, event_log: Optional[EventLog] = None) -> EmergencyRepository:
+        repository = EmergencyRepository(self.meta.get("cell_km", 1.0), event_log)
+        if "emergency.units" in self.meta["sections"]:
+            repository.add_units(map(unit_from_record, self._json("emergency.units")))
+        return repository
+
+    def emergency_service(self, repository: Optional[EmergencyRepository] = None,
+                          event_log: Optional[EventLog] = None) -> EmergencyService:
+        service = EmergencyService(repository if repository is not None else self.emergency_repository(),
+                                   event_log)
+        if "emergency.state" in self.meta["sections"]:
+            service.restore_state(self._json("emergency.state"))
+        return service
+
+    def restore(self) -> Tuple[TransportRepository, Optional[EmergencyService]]:
+        """Trafik deposunu (tembel) ve varsa sevk servisini geri yükler."""
+        transport = self.transport_repository()
+        emergency = self.emergency_service() if "emergency.state" in self.meta["sections"] else None
+        return transport, emergency
+
+    def close(self):
+        self._fleet = None
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._mmap.close()
+        self._file.close()
@@ -0,0 +1,75 @@
+import heapq
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+INF = float("inf")
+
+def solve_assignment(costs:Dict[Hashable,List[Tuple[Hashable,float]]], order:Optional[Iterable[Hashable]] = None) -> Dict[Hashable,Hashable]:
+    #sparse Hungarian method: successive shortest augmenting paths with dual potentials
+    #costs maps each row (incident) to its candidate (column, cost) pairs, costs must be >= 0
+    #rows are augmented in the given order; a matched row is never unmatched later,
+    #so listing urgent incidents first gives them priority when units are scarce
+    u:Dict[Hashable,float] = {}
+    v:Dict[Hashable,float] = {}
+    col_match:Dict[Hashable,Hashable] = {}
+    row_match:Dict[Hashable,Hashable] = {}
+    rows = list(order) if order is not None else list(costs)
+
+    for root in rows:
+        if root in row_match or not costs.get(root):
+            continue
+        u.setdefault(root, 0.0)
+        #dijkstra over columns using reduced costs c - u - v (never negative)
+        dist:Dict[Hashable,float] = {}
+        pred:Dict[Hashable,Hashable] = {}
+        final:Dict[Hashable,float] = {}
+        row_dist = {root: 0.0}
+        heap = []
+        counter = 0
+        for col, cost in costs[root]:
+            d = cost - u[root] - v.get(col, 0.0)
+            if d < dist.get(col, INF):
+                dist[col] = d
+                pred[col] = root
+                heapq.heappush(heap, (d, counter, col))
+                counter += 1
+        sink = None
+        while heap:
+            d, _, col = heapq.heappop(heap)
+            if col in final:
+                continue
+            final[col] = d
+            row = col_match.get(col)
+            if row is None:
+                sink = col
+                break
+            row_dist[row] = d
+            base = d - u[row]
+            for next_col, cost in costs[row]:
+                if next_col in final:
+                    continue
+                nd = base + cost - v.get(next_col, 0.0)
+                if nd < dist.get(next_col, INF):
+                    dist[next_col] = nd
+                    pred[next_col] = row
+                    heapq.heappush(heap, (nd, counter, next_col))
+                    counter += 1
+        if sink is None:
+            continue   #no free unit reachable, potentials stay valid
+        total = final[sink]
+        #dual update keeps matched edges tight and every reduced cost non-negative
+        for col, d in final.items():
+            if col != sink:
+                v[col] = v.get(col, 0.0) + d - total
+        for row, d in row_dist.items():
+            u[row] = u.get(row, 0.0) + total - d
+        #flip the augmenting path
+        col = sink
+        while True:
+            row = pred[col]
+            previous = row_match.get(row)
+            row_match[row] = col
+            col_match[col] = row
+            if row == root:
+                break
+            col = previous
+    return row_match
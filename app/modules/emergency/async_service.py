@@ -0,0 +1,97 @@
+from concurrent.futures import Executor
+from typing import Optional, Sequence, Tuple
+
+from app.core.executor import ServiceExecutor
+from app.modules.emergency.base import EmergencyUnit, Incident
+from app.modules.emergency.implementations import EmergencyService
+from app.modules.emergency.telemetry import TelemetryChannel
+
+class AsyncEmergencyService:
+    #asyncio front end for EmergencyService
+    #state changes (reports, assignments, queueing) run on the event loop, so they need no locks;
+    #road ETA ranking and the batch assignment run in the executor on snapshots of the candidates
+    def __init__(self, service:EmergencyService, executor:Optional[Executor] = None, timeout:Optional[float] = 5.0,
+                 telemetry:Optional[TelemetryChannel] = None):
+        self.service = service
+        self.bridge = ServiceExecutor(executor, timeout, name="emergency")
+        self.telemetry = telemetry if telemetry is not None else TelemetryChannel(service)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def report_incident(self, incident_id:str, type:str, severity:int, location:str, coordinates=None,
+                              dispatch:bool = True, timeout:Optional[float] = None) -> Tuple[Incident,Optional[str]]:
+        self.bridge.check_open()
+        incident = self.service.create_incident_report(incident_id, type, severity, location, coordinates)
+        if not dispatch:
+            await self._acknowledge()
+            return incident, None
+        return incident, await self.dispatch_nearest_unit(incident, timeout=timeout)
+
+    async def dispatch_nearest_unit(self, incident:Incident, candidates:int = 5, timeout:Optional[float] = None) -> str:
+        self.bridge.check_open()
+        units = self.service.nearest_candidates(incident, candidates)
+        if units and EmergencyUnit.route_engine is not None:
+            try:
+                units = await self.bridge.run(self.service.rank_candidates, incident, units, timeout=timeout)
+            except TimeoutError:
+                #routing is slow right now, straight-line order is still a sound choice
+                pass
+        #units may have been taken while ranking ran, dispatch_to skips the busy ones
+        message = self.service.dispatch_to(incident, units)
+        await self._acknowledge()
+        return message
+
+    async def dispatch_batch(self, incidents=None, candidates:int = 8, speed_kmh:float = 40.0,
+                             timeout:Optional[float] = None) -> dict:
+        self.bridge.check_open()
+        if incidents is None:
+            incidents = self.service.waiting_for_dispatch()
+        #the executor builds its own spatial pool from this list instead of reading the live indexes
+        units = [unit for unit in self.service.repo.get_all_unit() if unit.availability]
+        active = self.service.active_incidents
+        tracked = {i.incident_id for i in incidents if i.incident_id in active}
+        plan = await self.bridge.run(self.service.plan_batch, incidents, units, candidates, speed_kmh, timeout=timeout)
+        #incidents resolved or cancelled while the plan was computed are dropped
+        result = self.service.apply_batch([(i, u) for i, u in plan if i.incident_id in active or i.incident_id not in tracked])
+        await self._acknowledge()
+        return result
+
+    async def ingest_positions(self, unit_ids:Sequence[str], latitudes:Sequence[float], longitudes:Sequence[float],
+                               timestamps=None) -> int:
+        #moves units and their grid cells, so it runs on the loop like every other state change
+        self.bridge.check_open()
+        return self.telemetry.ingest(unit_ids, latitudes, longitudes, timestamps)
+
+    async def calculate_eta(self, unit_id:str, destination, timeout:Optional[float] = None):
+        unit = self.service.repo.get_unit_by_id(unit_id)
+        if unit is None:
+            raise ValueError(f"Unit {unit_id} not found")
+        return await self.bridge.run(unit.calculate_eta, destination, timeout=timeout)
+
+    async def resolve_incident(self, incident_id:str) -> bool:
+        self.bridge.check_open()
+        resolved = self.service.resolve_incident(incident_id)
+        await self._acknowledge()
+        return resolved
+
+    async def cancel_incident(self, incident_id:str) -> bool:
+        self.bridge.check_open()
+        cancelled = self.service.cancel_incident(incident_id)
+        await self._acknowledge()
+        return cancelled
+
+    async def _acknowledge(self):
+        #with use_journal(wait=False) replies wait here, off the loop, until their records are on disk;
+        #requests appending in the same window share one group commit
+        service = self.service
+        journal = service.journal
+        if journal is None or service.commit_wait or journal.durable_lsn >= service.journal_lsn:
+            return
+        await self.bridge.run(journal.wait_durable, service.journal_lsn)
+
+    async def close(self, grace:float = 5.0):
+        await self.bridge.close(grace)
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import List
+from typing import Callable, List, Optional, Tuple
 
 class UnitStatus(Enum):
     IDLE = "Idle"
@@ -8,19 +8,46 @@ class UnitStatus(Enum):
     MAINTENANCE = "Maintenance"
 
 class Incident:
-    def __init__(self,incident_id:str,incident_type:str,severity:int,location:str,description:str):
+    def __init__(self,incident_id:str,incident_type:str,severity:int,location:str,description:str,coordinates:Optional[Tuple[float,float]] = None):
         self.incident_id = incident_id
         self.incident_type = incident_type
         self.severity = severity
         self.location = location
         self.description = description
+        self.coordinates = coordinates
+
+    def to_record(self) -> dict:
+        return {
+            "incident_id": self.incident_id,
+            "incident_type": self.incident_type,
+            "severity": self.severity,
+            "location": self.location,
+            "description": self.description,
+            "coordinates": list(self.coordinates) if self.coordinates is not None else None,
+        }
+
+    @classmethod
+    def from_record(cls, record:dict):
+        coordinates = record["coordinates"]
+        return cls(record["incident_id"], record["incident_type"], record["severity"], record["location"],
+                   record["description"], tuple(coordinates) if coordinates is not None else None)
 
 class EmergencyUnit(ABC):
-    def __init__(self, unit_id:str, unit_type:str, location:str):
+    #shared RouteEngine used by every unit type for calculate_eta, None means fixed estimates
+    route_engine = None
+    #fixed fields instead of a per-unit __dict__, fleets run into the millions
+    __slots__ = ("__unit_id", "__unit_type", "__current_location", "__coordinates", "__status",
+                 "__observers", "__pending")
+
+    def __init__(self, unit_id:str, unit_type:str, location:str, coordinates:Optional[Tuple[float,float]] = None):
         self.__unit_id = unit_id
         self.__unit_type = unit_type
         self.__current_location = location
+        self.__coordinates = tuple(coordinates) if coordinates is not None else None
         self.__status = UnitStatus.IDLE
+        #empty tuple is shared by every unit without observers, the delivery queue only exists while notifying
+        self.__observers:Tuple[Callable, ...] = ()
+        self.__pending:Optional[List[tuple]] = None
 
     @abstractmethod
     def respond_to_incident(self, incident_id: str, severity:int):
@@ -29,6 +56,17 @@ class EmergencyUnit(ABC):
     @abstractmethod
     def calculate_eta(self, destination: str):
         pass
+
+    @classmethod
+    def use_route_engine(cls, engine):
+        EmergencyUnit.route_engine = engine
+
+    def _route_eta(self, destination, fallback:float) -> float:
+        engine = EmergencyUnit.route_engine
+        if engine is None or self.__coordinates is None:
+            return fallback
+        eta = engine.eta(self.__coordinates, destination)
+        return fallback if eta is None else round(eta, 2)
     
     def update_status(self, status: bool):
         self.availability = status
@@ -37,6 +75,56 @@ class EmergencyUnit(ABC):
     def get_unit_capabilities(self) -> List[str]:
         pass
 
+    def can_respond(self, severity:int) -> bool:
+        #same checks respond_to_incident makes, without changing state
+        return self.availability
+
+    #plain dict form, used to move units between processes and to persist them
+    def to_record(self) -> dict:
+        return {
+            "type": type(self).__name__,
+            "unit_id": self.__unit_id,
+            "location": self.__current_location,
+            "coordinates": list(self.__coordinates) if self.__coordinates is not None else None,
+            "status": self.__status.value,
+        }
+
+    @classmethod
+    @abstractmethod
+    def from_record(cls, record:dict):
+        #subclasses build the instance from their own fields, then call _restore
+        pass
+
+    def _restore(self, record:dict):
+        self.__status = UnitStatus(record["status"])
+        return self
+
+    #observers are called as callback(unit, field, old_value, new_value)
+    def add_observer(self, callback:Callable):
+        if callback not in self.__observers:
+            self.__observers += (callback,)
+
+    def remove_observer(self, callback:Callable):
+        if callback in self.__observers:
+            self.__observers = tuple(c for c in self.__observers if c != callback)
+
+    def _notify(self, field:str, old, new):
+        #changes made by an observer are delivered after the current one, so everyone sees them in order
+        if self.__pending is not None:
+            self.__pending.append((field, old, new))
+            return
+        if not self.__observers:
+            return
+        pending = self.__pending = [(field, old, new)]
+        try:
+            while pending:
+                field, old, new = pending[0]
+                for callback in self.__observers:
+                    callback(self, field, old, new)
+                pending.pop(0)
+        finally:
+            self.__pending = None
+
     @property
     def unit_id(self):
         return self.__unit_id
@@ -49,6 +137,10 @@ class EmergencyUnit(ABC):
     def current_location(self):
         return self.__current_location
 
+    @property
+    def coordinates(self) -> Optional[Tuple[float,float]]:
+        return self.__coordinates
+
     @property
     def availability(self):
         if self.__status == UnitStatus.IDLE:
@@ -66,7 +158,10 @@ class EmergencyUnit(ABC):
     
     @unit_type.setter
     def unit_type(self, value):
+        old = self.__unit_type
         self.__unit_type = value
+        if old != value:
+            self._notify("unit_type", old, value)
 
     
     @current_location.setter
@@ -75,9 +170,21 @@ class EmergencyUnit(ABC):
             raise ValueError("Location must be non-empty string")
         self.__current_location = value
     
+    @coordinates.setter
+    def coordinates(self, value):
+        if value is not None and len(value) != 2:
+            raise ValueError("Coordinates must be a (lat, lon) pair")
+        old = self.__coordinates
+        self.__coordinates = tuple(value) if value is not None else None
+        if old != self.__coordinates:
+            self._notify("coordinates", old, self.__coordinates)
+
     @status.setter
     def status(self,value:UnitStatus):
         if not isinstance(value,UnitStatus):
             raise ValueError("Invalid status type")
+        old = self.__status
         self.__status = value
+        if old != value:
+            self._notify("status", old, value)
 
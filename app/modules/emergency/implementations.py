@@ -1,13 +1,39 @@
+import itertools
+import time
+import weakref
+from typing import List, Optional, Tuple
+
 from app.modules.emergency.base import (
     EmergencyUnit,
     UnitStatus,
     Incident
     )
 from app.modules.emergency.repository import EmergencyRepository
+from app.modules.emergency.scheduler import IncidentScheduler
+from app.modules.emergency.assignment import solve_assignment
+from app.modules.emergency import journal as wal
+from app.modules.emergency.spatial import SpatialGrid
+from app.core.event_bus import IncidentCreated, UnitDispatched, UnitStatusChanged
+from app.core.event_log import EventCode, EventLog
+from app.core.metrics import REGISTRY
+
+#service metrics, see app/core/metrics.py
+DISPATCH_LATENCY = REGISTRY.histogram("emergency_dispatch_seconds", "Nearest-unit dispatch latency")
+BATCH_LATENCY = REGISTRY.histogram("emergency_batch_dispatch_seconds", "Batch dispatch latency")
+DISPATCH_RESULTS = REGISTRY.counter("emergency_dispatch_total", "Dispatch attempts by outcome", ("result",))
+#one series per service instance, read at export time
+QUEUE_DEPTH = REGISTRY.gauge("emergency_queue_depth", "Incidents waiting for a free unit", ("service",))
+ACTIVE_INCIDENTS = REGISTRY.gauge("emergency_active_incidents", "Open incidents", ("service",))
+_SERVICE_IDS = itertools.count(1)
+_DISPATCHED = DISPATCH_RESULTS.labels("dispatched")
+_NO_UNIT = DISPATCH_RESULTS.labels("no_unit")
+_FAILED = DISPATCH_RESULTS.labels("failed")
 
 class FireDepartment(EmergencyUnit):
-    def __init__(self, unit_id,location, water_capacity: int):
-        super().__init__(unit_id, "Fire", location)
+    __slots__ = ("_water_capacity", "_current_water")
+
+    def __init__(self, unit_id,location, water_capacity: int, coordinates=None):
+        super().__init__(unit_id, "Fire", location, coordinates)
         self._water_capacity = water_capacity
         self._current_water = water_capacity
 
@@ -32,15 +58,32 @@ class FireDepartment(EmergencyUnit):
         print(f"{self.unit_id} cannot respond (Low water or busy)")
         return False
     
+    def can_respond(self, severity:int) -> bool:
+        return self.availability and self._current_water > 500
+
     def calculate_eta(self, destination):
-        return 12.5  #Just random value
+        return self._route_eta(destination, 12.5)
     
     def get_unit_capabilities(self):
         return ["Fire Supression","Search or Rescue"]
 
+    def to_record(self) -> dict:
+        record = super().to_record()
+        record["water_capacity"] = self._water_capacity
+        record["current_water"] = self._current_water
+        return record
+
+    @classmethod
+    def from_record(cls, record:dict):
+        unit = cls(record["unit_id"], record["location"], record["water_capacity"], record["coordinates"])
+        unit._current_water = record["current_water"]
+        return unit._restore(record)
+
 class Ambulance(EmergencyUnit):
-    def __init__(self, unit_id, location, medical_tier: str):
-        super().__init__(unit_id, "Medical", location)
+    __slots__ = ("_medical_tier",)
+
+    def __init__(self, unit_id, location, medical_tier: str, coordinates=None):
+        super().__init__(unit_id, "Medical", location, coordinates)
         self._medical_tier = medical_tier
 
     def respond_to_incident(self, incident_id:str, severity:int):
@@ -52,14 +95,25 @@ class Ambulance(EmergencyUnit):
         return False
     
     def calculate_eta(self, destination):
-        return 8.0
+        return self._route_eta(destination, 8.0)
     
     def get_unit_capabilities(self):
         return ["Emergency Medical Care","Patient Transport"]
+
+    def to_record(self) -> dict:
+        record = super().to_record()
+        record["medical_tier"] = self._medical_tier
+        return record
+
+    @classmethod
+    def from_record(cls, record:dict):
+        return cls(record["unit_id"], record["location"], record["medical_tier"], record["coordinates"])._restore(record)
     
 class PoliceUnit(EmergencyUnit):
-    def __init__(self, unit_id, location, patrol_zone: str):
-        super().__init__(unit_id, "Security", location)
+    __slots__ = ("_patrol_zone",)
+
+    def __init__(self, unit_id, location, patrol_zone: str, coordinates=None):
+        super().__init__(unit_id, "Security", location, coordinates)
         self._patrol_zone = patrol_zone
 
     @property
@@ -88,14 +142,25 @@ class PoliceUnit(EmergencyUnit):
         return True
 
     def calculate_eta(self, destination):
-        return 5
+        return self._route_eta(destination, 5)
 
     def get_unit_capabilities(self):
         return ["Traffic Control","Security"]
+
+    def to_record(self) -> dict:
+        record = super().to_record()
+        record["patrol_zone"] = self._patrol_zone
+        return record
+
+    @classmethod
+    def from_record(cls, record:dict):
+        return cls(record["unit_id"], record["location"], record["patrol_zone"], record["coordinates"])._restore(record)
         
 class HazmatUnit(EmergencyUnit):
-    def __init__(self, unit_id, location, protection_level):
-        super().__init__(unit_id, "Radiation", location)
+    __slots__ = ("_protection_level",)
+
+    def __init__(self, unit_id, location, protection_level, coordinates=None):
+        super().__init__(unit_id, "Radiation", location, coordinates)
         self._protection_level = protection_level
 
     def respond_to_incident(self, incident_id, severity):
@@ -108,19 +173,65 @@ class HazmatUnit(EmergencyUnit):
             return True
         return False
     
+    def can_respond(self, severity:int) -> bool:
+        if severity > 3 and self._protection_level != "A":
+            return False
+        return self.availability
+
     def calculate_eta(self, destination):
-        return 15
+        return self._route_eta(destination, 15)
     
     def get_unit_capabilities(self):
         return ["Chemical Detection","Decontamination"]
+
+    def to_record(self) -> dict:
+        record = super().to_record()
+        record["protection_level"] = self._protection_level
+        return record
+
+    @classmethod
+    def from_record(cls, record:dict):
+        return cls(record["unit_id"], record["location"], record["protection_level"], record["coordinates"])._restore(record)
+
+#record "type" field -> unit class
+UNIT_TYPES = {cls.__name__: cls for cls in (FireDepartment, Ambulance, PoliceUnit, HazmatUnit)}
+
+def unit_from_record(record:dict) -> EmergencyUnit:
+    cls = UNIT_TYPES.get(record["type"])
+    if cls is None:
+        raise ValueError(f"Unknown unit type: {record['type']}")
+    return cls.from_record(record)
     
+def _watch(gauge, service, measure):
+    #weak so the registry does not keep a dropped service alive; its series goes away with it
+    ref = weakref.ref(service)
+    def read():
+        target = ref()
+        return None if target is None else measure(target)
+    gauge.set_function(read, service.name)
+
 class EmergencyService:
-    def __init__(self,repository):
-        self.activity_log = []
+    def __init__(self,repository,event_log:EventLog = None,name:str = None):
+        self.events = event_log if event_log is not None else EventLog()
         self.active_incidents = {}
+        #incident_id -> unit_id of the unit working on it
+        self.assignments = {}
+        self.scheduler = IncidentScheduler()
         self.repo = repository
+        self.repo.add_availability_listener(self._on_unit_available)
+        #write-ahead journal, see use_journal
+        self.journal = None
+        self.journal_lsn = 0
+        self.commit_wait = True
+        self._replaying = False
+        #event bus for other modules, see attach_bus
+        self.bus = None
+        #"service" label of the gauges
+        self.name = name if name is not None else f"emergency-{next(_SERVICE_IDS)}"
+        _watch(QUEUE_DEPTH, self, lambda service: len(service.scheduler))
+        _watch(ACTIVE_INCIDENTS, self, lambda service: len(service.active_incidents))
     
-    def create_incident_report(self,incident_id:str,type:str,severity:int,location:str) -> Incident:
+    def create_incident_report(self,incident_id:str,type:str,severity:int,location:str,coordinates=None) -> Incident:
         if not (1 <= severity <= 5):
             raise ValueError("Severity must between 1 to 5")
 
@@ -129,11 +240,16 @@ class EmergencyService:
             incident_type = type,
             severity = severity,
             location = location,
-            description = f"Level {severity} {type} at {location}"
+            description = f"Level {severity} {type} at {location}",
+            coordinates = coordinates
         )
 
+        self._journal(wal.CREATE, new_incident.to_record())
         self.active_incidents[incident_id] = new_incident
-        self.log_event(f"Incident {incident_id} registered")
+        self.events.append(EventCode.INCIDENT_REGISTERED, incident_id)
+        if self.bus is not None:
+            self.bus.publish(IncidentCreated(incident_id, type, severity, location, coordinates))
+        self._complete()
         return new_incident
     
     def generate_intervention_plan(self,incident:Incident,unit:EmergencyUnit) -> str:
@@ -172,26 +288,314 @@ class EmergencyService:
         return "\n".join(plan_steps)
     
     def log_event(self,message:str):
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.activity_log.append(f"[{timestamp}] {message}")
+        self.events.log(message)
+
+    @property
+    def activity_log(self):
+        return self.events.get_lines()
 
     @property
     def total_active_cases(self):
         return len(self.active_incidents)
     
     #dispatching some unit
-    def dispatch_nearest_unit(self,incident:Incident):
-        available_unit = self.repo.get_all_unit()
+    @DISPATCH_LATENCY.timed
+    def dispatch_nearest_unit(self,incident:Incident,candidates:int = 5):
+        return self.dispatch_to(incident, self.rank_candidates(incident, self.nearest_candidates(incident, candidates)))
 
-        suitable_unit = [u for u in available_unit if u.unit_type in incident.incident_type and u.availability]
+    def nearest_candidates(self, incident:Incident, candidates:int = 5) -> List[EmergencyUnit]:
+        if incident.coordinates is None:
+            return []
+        return [u for _, u in self.repo.find_nearest_units(incident.incident_type, incident.coordinates, k=candidates)]
 
+    def rank_candidates(self, incident:Incident, units:List[EmergencyUnit]) -> List[EmergencyUnit]:
+        #straight-line neighbours are re-ranked by road travel time when a route engine is set
+        if EmergencyUnit.route_engine is None or not units:
+            return units
+        ranked = [u for _, u in EmergencyUnit.route_engine.rank_units(units, incident.coordinates)]
+        ranked_ids = {u.unit_id for u in ranked}
+        return ranked + [u for u in units if u.unit_id not in ranked_ids]
+
+    def dispatch_to(self, incident:Incident, suitable_unit:List[EmergencyUnit]) -> str:
+        try:
+            return self._dispatch_to(incident, suitable_unit)
+        finally:
+            self._complete()
+
+    def _dispatch_to(self, incident:Incident, suitable_unit:List[EmergencyUnit]) -> str:
+        #units without coordinates can still be dispatched by type
         if not suitable_unit:
-            return f"No available {incident.incident_type} unit for incident {incident.incident_id} !"
+            suitable_unit = self.repo.get_available_units_for(incident.incident_type)
 
-        unit = suitable_unit[0]
-        success = unit.respond_to_incident(incident.incident_id,incident.severity)
-        
-        if success:
-            return f"Dispatch Successful {unit.unit_id} dispatched into {incident.location}"
-        return f"Dispatch failed"
\ No newline at end of file
+        if not suitable_unit:
+            _NO_UNIT.inc()
+            self._queue(incident)
+            return f"No available {incident.incident_type} unit for incident {incident.incident_id} ! Incident queued"
+
+        for unit in suitable_unit:
+            if unit.respond_to_incident(incident.incident_id,incident.severity):
+                self._assign(incident, unit)
+                return f"Dispatch Successful {unit.unit_id} dispatched into {incident.location}"
+        _FAILED.inc()
+        self._queue(incident)
+        return f"Dispatch failed, incident {incident.incident_id} queued"
+
+    #batch dispatch for bursts of simultaneous incidents
+    @BATCH_LATENCY.timed
+    def dispatch_batch(self, incidents=None, units=None, candidates:int = 8, speed_kmh:float = 40.0) -> dict:
+        if incidents is None:
+            incidents = self.waiting_for_dispatch()
+        return self.apply_batch(self.plan_batch(incidents, units, candidates, speed_kmh))
+
+    def waiting_for_dispatch(self) -> List[Incident]:
+        return [i for i in self.active_incidents.values()
+                if i.incident_id not in self.assignments and i.incident_id not in self.scheduler]
+
+    def plan_batch(self, incidents, units=None, candidates:int = 8, speed_kmh:float = 40.0) -> List[Tuple[Incident,Optional[EmergencyUnit]]]:
+        #only computes the matching; passing a units snapshot keeps it off the live repository indexes
+        incidents = sorted(incidents, key=lambda i: -i.severity)
+        pool = None if units is None else self._candidate_pool(units)
+        engine = EmergencyUnit.route_engine
+
+        costs = {}
+        by_id = {}
+        for incident in incidents:
+            options = self._batch_candidates(incident, pool, candidates)
+            if not options:
+                continue
+            if engine is not None and incident.coordinates is not None:
+                ranked = engine.rank_units([unit for _, unit in options], incident.coordinates)
+                if ranked:
+                    options = ranked
+            else:
+                options = [(d / speed_kmh * 60, unit) for d, unit in options]
+            costs[incident.incident_id] = [(unit.unit_id, max(eta, 0.0)) for eta, unit in options]
+            for _, unit in options:
+                by_id[unit.unit_id] = unit
+
+        matching = solve_assignment(costs, order=[i.incident_id for i in incidents])
+        return [(incident, by_id.get(matching.get(incident.incident_id))) for incident in incidents]
+
+    def apply_batch(self, plan:List[Tuple[Incident,Optional[EmergencyUnit]]]) -> dict:
+        result = {}
+        for incident, unit in plan:
+            if unit is not None and unit.respond_to_incident(incident.incident_id, incident.severity):
+                self._assign(incident, unit)
+                result[incident.incident_id] = unit.unit_id
+            else:
+                (_FAILED if unit is not None else _NO_UNIT).inc()
+                self._queue(incident)
+                result[incident.incident_id] = None
+        self._complete()
+        return result
+
+    def _candidate_pool(self, units) -> dict:
+        pool = {}
+        for unit in units:
+            if not unit.availability:
+                continue
+            entry = pool.setdefault(unit.unit_type, (SpatialGrid(), {}))
+            if unit.coordinates is not None:
+                entry[0].insert(unit.unit_id, unit.coordinates)
+            entry[1][unit.unit_id] = unit
+        return pool
+
+    def _batch_candidates(self, incident:Incident, pool, k:int):
+        #(distance_km, unit) pairs of capable units, nearest first
+        severity = incident.severity
+        if pool is None:
+            if incident.coordinates is not None:
+                found = self.repo.find_nearest_units(incident.incident_type, incident.coordinates, k=k * 2)
+            else:
+                found = [(0.0, u) for u in self.repo.get_available_units_for(incident.incident_type)[:k * 2]]
+        else:
+            found = []
+            for unit_type, (grid, members) in pool.items():
+                if unit_type not in incident.incident_type:
+                    continue
+                if incident.coordinates is None:
+                    found.extend((0.0, u) for u in list(members.values())[:k * 2])
+                    continue
+                found.extend((d, members[uid]) for d, uid in grid.nearest(incident.coordinates, k * 2))
+            found.sort(key=lambda pair: pair[0])
+        return [(d, u) for d, u in found if u.can_respond(severity)][:k]
+
+    def _assign(self, incident:Incident, unit:EmergencyUnit):
+        self._journal(wal.DISPATCH, incident.incident_id, unit.unit_id)
+        self.assignments[incident.incident_id] = unit.unit_id
+        _DISPATCHED.inc()
+        self.events.append(EventCode.INCIDENT_DISPATCHED, incident.incident_id, unit.unit_id)
+        if self.bus is not None:
+            self.bus.publish(UnitDispatched(unit.unit_id, unit.unit_type, incident.incident_id, incident.location,
+                                            incident.coordinates, unit.coordinates))
+
+    def _queue(self, incident:Incident):
+        queued_at = time.time()
+        self._journal(wal.QUEUE, incident.incident_id, queued_at)
+        self.scheduler.enqueue(incident, queued_at)
+        self.events.append(EventCode.INCIDENT_QUEUED, incident.incident_id)
+
+    def _on_unit_available(self, unit:EmergencyUnit):
+        #a freed unit takes the most urgent waiting incident it can handle
+        if self._replaying:
+            #the journal already holds the assignment that followed
+            return
+        #incidents this unit cannot serve (severity, supplies) stay queued for another unit
+        incident = next((i for i in self.scheduler.iter_for_unit_type(unit.unit_type) if unit.can_respond(i.severity)), None)
+        if incident is None:
+            return
+        if unit.respond_to_incident(incident.incident_id, incident.severity):
+            self._assign(incident, unit)
+            self.scheduler.cancel(incident.incident_id)
+
+    #plain dict form of the dispatch state (open incidents, assignments, waiting queue, history), used by snapshots
+    def export_state(self) -> dict:
+        return {
+            "active_incidents": [i.to_record() for i in self.active_incidents.values()],
+            "assignments": dict(self.assignments),
+            "queue": [[i.incident_id, queued_at] for i, queued_at in self.scheduler.entries()],
+            "history": [i.to_record() for i in self.repo.incident_history.values()],
+        }
+
+    def restore_state(self, state:dict):
+        #units are restored with their own status, so nothing is re-dispatched here
+        self.active_incidents = {r["incident_id"]: Incident.from_record(r) for r in state["active_incidents"]}
+        self.assignments = dict(state["assignments"])
+        self.scheduler = IncidentScheduler()
+        for incident_id, queued_at in state["queue"]:
+            self.scheduler.enqueue(self.active_incidents[incident_id], queued_at)
+        for record in state["history"]:
+            self.repo.incident_history[record["incident_id"]] = Incident.from_record(record)
+        return self
+
+    def resolve_incident(self, incident_id:str) -> bool:
+        incident = self.active_incidents.get(incident_id)
+        if incident is None:
+            return False
+        self._journal(wal.RESOLVE, incident_id)
+        del self.active_incidents[incident_id]
+        self.scheduler.cancel(incident_id)
+        self.repo.save_incident(incident)
+        unit_id = self.assignments.pop(incident_id, None)
+        unit = self.repo.get_unit_by_id(unit_id) if unit_id else None
+        if unit is not None and unit.status == UnitStatus.ON_SCENE:
+            unit.status = UnitStatus.IDLE
+        self._complete()
+        return True
+
+    def cancel_incident(self, incident_id:str) -> bool:
+        if incident_id not in self.scheduler:
+            return False
+        self._journal(wal.CANCEL, incident_id)
+        self.scheduler.cancel(incident_id)
+        self.active_incidents.pop(incident_id, None)
+        self.events.append(EventCode.INCIDENT_CANCELLED, incident_id)
+        self._complete()
+        return True
+
+    def reprioritize_incident(self, incident_id:str, severity:int) -> bool:
+        if not (1 <= severity <= 5):
+            raise ValueError("Severity must between 1 to 5")
+        if incident_id not in self.scheduler:
+            return False
+        self._journal(wal.SEVERITY, incident_id, severity)
+        self.scheduler.reprioritize(incident_id, severity)
+        self._complete()
+        return True
+
+    #write-ahead journal: every lifecycle change is appended before it is applied, replay rebuilds the state after a restart.
+    #with wait=True each operation returns only once its records are on disk (one commit per operation unless the
+    #journal's flusher is running). wait=False leaves that to the caller: wait_durable(journal_lsn) before acknowledging,
+    #as AsyncEmergencyService does off the event loop so concurrent requests share group commits
+    def use_journal(self, journal:"wal.IncidentJournal", replay:bool = True, wait:bool = True) -> int:
+        #units must already be registered, the journal only holds their status changes
+        replayed = 0
+        if replay:
+            self._replaying = True
+            try:
+                for record in journal.records():
+                    self._apply(record)
+                    replayed += 1
+            finally:
+                self._replaying = False
+        self.journal = journal
+        self.journal_lsn = journal.durable_lsn
+        self.commit_wait = wait
+        self.repo.add_change_listener(self._on_unit_changed)
+        return replayed
+
+    #publishes IncidentCreated, UnitDispatched and UnitStatusChanged, see app/core/event_bus.py
+    def attach_bus(self, bus):
+        self.bus = bus
+        self.repo.add_change_listener(self._publish_unit_change)
+        return self
+
+    def _publish_unit_change(self, unit:EmergencyUnit, field:str, old, new):
+        if field == "status" and self.bus is not None and not self._replaying:
+            self.bus.publish(UnitStatusChanged(unit.unit_id, unit.unit_type, unit.current_location, old.value, new.value))
+
+    def _journal(self, kind:str, *fields):
+        if self.journal is not None and not self._replaying:
+            self.journal_lsn = self.journal.append(kind, *fields)
+
+    def _on_unit_changed(self, unit:EmergencyUnit, field:str, old, new):
+        if field == "status":
+            self._journal(wal.UNIT_STATUS, unit.unit_id, new.value)
+
+    def _complete(self):
+        #only called once an operation is complete, so a checkpoint never holds half of one
+        if self.journal is None:
+            return
+        if self.commit_wait:
+            self.journal.wait_durable(self.journal_lsn)
+        if self.journal.compaction_due:
+            self.compact_journal()
+
+    def checkpoint_state(self) -> dict:
+        state = self.export_state()
+        state["units"] = {unit.unit_id: unit.status.value for unit in self.repo.get_all_unit()}
+        return state
+
+    def compact_journal(self, keep_history:Optional[int] = None) -> int:
+        return self.journal.compact(self.checkpoint_state(), keep_history)
+
+    def _apply(self, record:list):
+        kind = record[0]
+        if kind == wal.CHECKPOINT:
+            state = record[1]
+            self.restore_state(state)
+            for unit_id, status in state["units"].items():
+                self._set_unit_status(unit_id, status)
+        elif kind == wal.CREATE:
+            incident = Incident.from_record(record[1])
+            self.active_incidents[incident.incident_id] = incident
+        elif kind == wal.QUEUE:
+            self.scheduler.enqueue(self.active_incidents[record[1]], record[2])
+        elif kind == wal.DISPATCH:
+            self.scheduler.cancel(record[1])
+            self.assignments[record[1]] = record[2]
+        elif kind == wal.SEVERITY:
+            if not self.scheduler.reprioritize(record[1], record[2]):
+                self.active_incidents[record[1]].severity = record[2]
+        elif kind == wal.UNIT_STATUS:
+            self._set_unit_status(record[1], record[2])
+        elif kind == wal.RESOLVE:
+            incident = self.active_incidents.pop(record[1])
+            self.scheduler.cancel(record[1])
+            self.assignments.pop(record[1], None)
+            self.repo.incident_history[record[1]] = incident
+        elif kind == wal.CANCEL:
+            self.scheduler.cancel(record[1])
+            self.active_incidents.pop(record[1], None)
+        else:
+            raise wal.JournalError(f"Unknown journal record {kind}")
+
+    def _set_unit_status(self, unit_id:str, status:str):
+        unit = self.repo.get_unit_by_id(unit_id)
+        if unit is not None:
+            #units missing from this configuration are skipped
+            unit.status = UnitStatus(status)
+
+    @property
+    def queued_incidents(self):
+        return len(self.scheduler)
\ No newline at end of file
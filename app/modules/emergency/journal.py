@@ -0,0 +1,209 @@
+import json
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+#frame = length, crc32 of the payload, payload (compact json list: [kind, *fields])
+_FRAME = struct.Struct("<II")
+
+#record kinds
+CHECKPOINT = "checkpoint"
+CREATE = "create"
+QUEUE = "queue"
+DISPATCH = "dispatch"
+SEVERITY = "severity"
+UNIT_STATUS = "unit"
+RESOLVE = "resolve"
+CANCEL = "cancel"
+
+class JournalError(RuntimeError):
+    pass
+
+class IncidentJournal:
+    #append-only write-ahead journal for the incident lifecycle
+    #appends only buffer the encoded frame; commit() writes the whole group with one write and one fsync.
+    #a group is committed when group_size frames are pending, by the flusher thread every group_window
+    #seconds (start()), or explicitly. wait_durable(lsn) blocks until a record is on disk.
+    #a torn or corrupt tail left by a crash is cut off when the journal is opened
+    def __init__(self, path:str, group_size:int = 256, group_window:float = 0.005, fsync:bool = True,
+                 compact_every:int = 100_000):
+        self.path = path
+        self.group_size = group_size
+        self.group_window = group_window
+        self.fsync = fsync
+        #compaction is due once this many records follow the last checkpoint
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._durable = threading.Condition(self._lock)
+        self._pending:List[bytes] = []
+        self._next_lsn = 0
+        self._durable_lsn = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self.records_since_checkpoint = 0
+        self.commits = 0
+        self.truncated_bytes = 0
+        self._file = None
+        self._open()
+
+    def _open(self):
+        good, count = self._scan()
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if good < size:
+            self.truncated_bytes = size - good
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+        self._file = open(self.path, "ab")
+        self.records_since_checkpoint = count
+
+    def _scan(self) -> Tuple[int, int]:
+        #(offset after the last intact frame, records after the checkpoint)
+        good = count = 0
+        for offset, record in self._frames():
+            good = offset
+            count = 0 if record[0] == CHECKPOINT else count + 1
+        return good, count
+
+    def _frames(self) -> Iterator[Tuple[int, list]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + _FRAME.size <= len(data):
+            length, crc = _FRAME.unpack_from(data, offset)
+            start = offset + _FRAME.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            try:
+                record = json.loads(payload)
+            except ValueError:
+                return
+            offset = start + length
+            yield offset, record
+
+    @staticmethod
+    def _encode(record) -> bytes:
+        payload = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def append(self, kind:str, *fields) -> int:
+        frame = self._encode([kind, *fields])
+        with self._lock:
+            if self._file is None:
+                raise JournalError("journal is closed")
+            self._pending.append(frame)
+            self._next_lsn += 1
+            lsn = self._next_lsn
+            self.records_since_checkpoint += 1
+            if len(self._pending) >= self.group_size:
+                self._commit_locked()
+        return lsn
+
+    def commit(self) -> int:
+        with self._lock:
+            return self._commit_locked()
+
+    def _commit_locked(self) -> int:
+        if self._pending:
+            self._file.write(b"".join(self._pending))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._pending.clear()
+            self.commits += 1
+            self._durable_lsn = self._next_lsn
+            self._durable.notify_all()
+        return self._durable_lsn
+
+    @property
+    def durable_lsn(self) -> int:
+        return self._durable_lsn
+
+    def wait_durable(self, lsn:int, timeout:Optional[float] = None) -> bool:
+        with self._durable:
+            if self._thread is None and self._durable_lsn < lsn:
+                #nobody else will commit it
+                self._commit_locked()
+            return self._durable.wait_for(lambda: self._durable_lsn >= lsn, timeout)
+
+    def start(self):
+        #background group commits every group_window seconds
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="incident-journal", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.group_window):
+            with self._lock:
+                if self._file is not None:
+                    self._commit_locked()
+
+    def records(self) -> Iterator[list]:
+        #committed records in order, the latest checkpoint first; pending appends are committed first
+        self.commit()
+        records = []
+        for _, record in self._frames():
+            if record[0] == CHECKPOINT:
+                records.clear()
+            records.append(record)
+        return iter(records)
+
+    @property
+    def compaction_due(self) -> bool:
+        return self.records_since_checkpoint >= self.compact_every
+
+    def compact(self, state:dict, keep_history:Optional[int] = None) -> int:
+        #replaces the journal with a single checkpoint of the given state (EmergencyService.checkpoint_state)
+        #archived incidents beyond the newest keep_history go to <path>.archive (json lines, not replayed)
+        if keep_history is not None and len(state["history"]) > keep_history:
+            state = dict(state)
+            cut = len(state["history"]) - keep_history
+            old, state["history"] = state["history"][:cut], state["history"][cut:]
+            with open(self.path + ".archive", "a", encoding="utf-8") as archive:
+                archive.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in old)
+                archive.flush()
+                os.fsync(archive.fileno())
+        frame = self._encode([CHECKPOINT, state])
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            self._commit_locked()
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".journal-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(frame)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._file.close()
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            finally:
+                self._file = open(self.path, "ab")
+            self.records_since_checkpoint = 0
+        return len(frame)
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._file is not None:
+                self._commit_locked()
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,49 +1,166 @@
 # repository.py
-from app.modules.emergency.base import EmergencyUnit,Incident
-from typing import List,Optional,Dict
+from app.modules.emergency.base import EmergencyUnit,Incident,UnitStatus
+from app.modules.emergency.spatial import SpatialGrid
+from app.core.event_log import EventCode, EventLog
+from typing import Callable,List,Optional,Dict,Tuple
 class EmergencyRepository:
-    def __init__(self):
+    def __init__(self, cell_km:float = 1.0, event_log:Optional[EventLog] = None):
         self._units:Dict[str,EmergencyUnit] = {}
+        self._cell_km = cell_km
+        #buckets are kept in sync by the unit observer hook, dicts keep registration order
+        self._by_type:Dict[str,Dict[str,EmergencyUnit]] = {}
+        self._available_by_type:Dict[str,Dict[str,EmergencyUnit]] = {}
+        self._by_status:Dict[UnitStatus,Dict[str,EmergencyUnit]] = {status: {} for status in UnitStatus}
+        #one grid per (unit type, available), only units with coordinates are indexed
+        self._spatial:Dict[Tuple[str,bool],SpatialGrid] = {}
+        self._availability_listeners:List[Callable] = []
+        self._change_listeners:Tuple[Callable, ...] = ()
         self.incident_history:Dict[str,Incident] = {}
-        self.dispacth_log:List[str] = []
+        #bounded ring buffer, messages are only formatted when read
+        self.events = event_log if event_log is not None else EventLog()
 
     def add_unit(self, unit:EmergencyUnit):
         if unit.unit_id in self._units:
             raise ValueError(f"Unit {unit.unit_id} already exist")
         
         self._units[unit.unit_id] = unit
-        self.log_system_event(f"System : New Unit {unit.unit_id} registered")
+        self._index(unit, unit.unit_type, unit.status, unit.coordinates)
+        unit.add_observer(self._on_unit_changed)
+        self.events.append(EventCode.UNIT_REGISTERED, unit.unit_id)
+
+    def add_units(self, units) -> int:
+        #bulk registration (restores, imports), one log entry instead of one per unit
+        added = 0
+        for unit in units:
+            if unit.unit_id in self._units:
+                raise ValueError(f"Unit {unit.unit_id} already exist")
+            self._units[unit.unit_id] = unit
+            self._index(unit, unit.unit_type, unit.status, unit.coordinates)
+            unit.add_observer(self._on_unit_changed)
+            added += 1
+        self.events.append(EventCode.UNITS_BULK_REGISTERED, None, added)
+        return added
+
+    def remove_unit(self, unit_id:str) -> Optional[EmergencyUnit]:
+        unit = self._units.pop(unit_id, None)
+        if unit is None:
+            return None
+        unit.remove_observer(self._on_unit_changed)
+        self._unindex(unit, unit.unit_type, unit.status, unit.coordinates)
+        self.events.append(EventCode.UNIT_REMOVED, unit_id)
+        return unit
     
     def get_unit_by_id(self,unit_id:str):
         return self._units.get(unit_id)
 
+    def _grid_for(self, unit_type:str, available:bool) -> SpatialGrid:
+        grid = self._spatial.get((unit_type, available))
+        if grid is None:
+            grid = self._spatial[(unit_type, available)] = SpatialGrid(self._cell_km)
+        return grid
+
+    def _index(self, unit:EmergencyUnit, unit_type:str, status:UnitStatus, coordinates):
+        available = status == UnitStatus.IDLE
+        self._by_type.setdefault(unit_type, {})[unit.unit_id] = unit
+        self._available_by_type.setdefault(unit_type, {})
+        if available:
+            self._available_by_type[unit_type][unit.unit_id] = unit
+        self._by_status[status][unit.unit_id] = unit
+        if coordinates is not None:
+            self._grid_for(unit_type, available).insert(unit.unit_id, coordinates)
+
+    def _unindex(self, unit:EmergencyUnit, unit_type:str, status:UnitStatus, coordinates):
+        available = status == UnitStatus.IDLE
+        self._by_type[unit_type].pop(unit.unit_id, None)
+        self._available_by_type[unit_type].pop(unit.unit_id, None)
+        self._by_status[status].pop(unit.unit_id, None)
+        if coordinates is not None:
+            self._grid_for(unit_type, available).remove(unit.unit_id)
+
+    def _on_unit_changed(self, unit:EmergencyUnit, field:str, old, new):
+        for callback in self._change_listeners:
+            callback(unit, field, old, new)
+        if field == "status":
+            self._unindex(unit, unit.unit_type, old, unit.coordinates)
+            self._index(unit, unit.unit_type, new, unit.coordinates)
+            if new == UnitStatus.IDLE:
+                for callback in tuple(self._availability_listeners):
+                    callback(unit)
+        elif field == "unit_type":
+            self._unindex(unit, old, unit.status, unit.coordinates)
+            self._index(unit, new, unit.status, unit.coordinates)
+        elif field == "coordinates":
+            grid = self._grid_for(unit.unit_type, unit.availability)
+            if new is None:
+                grid.remove(unit.unit_id)
+            else:
+                grid.move(unit.unit_id, new)
+
+    def add_availability_listener(self, callback:Callable):
+        #callback(unit) runs whenever a registered unit returns to IDLE
+        self._availability_listeners.append(callback)
+
+    def add_change_listener(self, callback:Callable):
+        #callback(unit, field, old, new) for every change of any registered unit, before the indexes move
+        if callback not in self._change_listeners:
+            self._change_listeners += (callback,)
+
+    def move_unit(self, unit_id:str, coordinates:Tuple[float,float]):
+        unit = self._units.get(unit_id)
+        if unit is None:
+            raise KeyError(f"Unit {unit_id} not found")
+        unit.coordinates = coordinates
+
+    def matching_unit_types(self, incident_type:str) -> List[str]:
+        return [t for t in self._by_type if t in incident_type]
+
+    def find_nearest_units(self, incident_type:str, coordinates:Tuple[float,float], k:int = 1) -> List[Tuple[float,EmergencyUnit]]:
+        found = []
+        for unit_type in self.matching_unit_types(incident_type):
+            grid = self._spatial.get((unit_type, True))
+            if grid is not None:
+                found.extend((d, self._units[uid]) for d, uid in grid.nearest(coordinates, k))
+        found.sort(key=lambda pair: pair[0])
+        return found[:k]
+
     def get_all_unit(self):
         return list(self._units.values())
     
     def get_available_unit_by_type(self,unit_type:str) -> List[EmergencyUnit]:
-        return [
-            unit for unit in self._units.values()
-            if unit.unit_type == unit_type and unit.availability
-        ]
+        return list(self._available_by_type.get(unit_type, {}).values())
+
+    def get_available_units_for(self,incident_type:str) -> List[EmergencyUnit]:
+        units = []
+        for unit_type in self.matching_unit_types(incident_type):
+            units.extend(self._available_by_type[unit_type].values())
+        return units
+
+    def count_by_status(self) -> Dict[UnitStatus,int]:
+        return {status: len(bucket) for status, bucket in self._by_status.items()}
+
+    def count_available_by_type(self) -> Dict[str,int]:
+        return {unit_type: len(bucket) for unit_type, bucket in self._available_by_type.items()}
     
     def save_incident(self,incident:Incident):
         self.incident_history[incident.incident_id] = incident
-        self.log_system_event(f"Log: Incident {incident.incident_id} archived")
+        self.events.append(EventCode.INCIDENT_ARCHIVED, incident.incident_id)
     
     def get_incident_history(self):
         return list(self.incident_history.values())
     
     def log_system_event(self,message):
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.dispacth_log.append(f"[{timestamp}] {message}")
+        self.events.log(message)
+
+    def get_system_log(self, last:Optional[int] = None) -> List[str]:
+        return self.events.get_lines(last)
 
-    def get_system_log(self):
-        return self.dispacth_log
+    @property
+    def dispacth_log(self) -> List[str]:
+        return self.get_system_log()
     
     def operational_stats(self)-> dict:
         total = len(self._units)
-        available = len([u for u in self._units.values() if u.availability])
+        available = len(self._by_status[UnitStatus.IDLE])
         percentage = (available/total *100) if total > 0 else 0
         return{
             "total_units":total,
@@ -0,0 +1,290 @@
+import heapq
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from app.modules.emergency.spatial import SpatialGrid
+
+INF = float("inf")
+Destination = Union[str, Tuple[float,float]]
+
+class RoadGraph:
+    #directed road network, edge travel times are in minutes at free flow
+    def __init__(self):
+        self.nodes:Dict[str,Tuple[float,float]] = {}
+        self._names:Dict[str,str] = {}
+        #node id -> place name as given, used to match traffic lights by location
+        self.names:Dict[str,str] = {}
+        self._out:Dict[str,List[Tuple[str,int]]] = {}
+        self._in:Dict[str,List[Tuple[str,int]]] = {}
+        self.free_time:List[float] = []
+        self.capacity:List[float] = []
+        self.edge_sensor:List[Optional[str]] = []
+        self.edge_ends:List[Tuple[str,str]] = []
+
+    def add_node(self, node_id:str, lat:float, lon:float, name:Optional[str] = None):
+        self.nodes[node_id] = (lat, lon)
+        self._out.setdefault(node_id, [])
+        self._in.setdefault(node_id, [])
+        if name:
+            self._names[name.lower()] = node_id
+            self.names[node_id] = name
+
+    def add_edge(self, source:str, target:str, length_km:float, speed_kmh:float = 50.0, sensor:Optional[str] = None, capacity:float = 100.0) -> int:
+        if source not in self.nodes or target not in self.nodes:
+            raise ValueError(f"Unknown node in edge {source}->{target}")
+        if length_km < 0 or speed_kmh <= 0:
+            raise ValueError("Edge length must be >= 0 and speed > 0")
+        index = len(self.free_time)
+        self.free_time.append(length_km / speed_kmh * 60)
+        self.capacity.append(capacity)
+        self.edge_sensor.append(sensor)
+        self.edge_ends.append((source, target))
+        self._out[source].append((target, index))
+        self._in[target].append((source, index))
+        return index
+
+    def node_by_name(self, name:str) -> Optional[str]:
+        if name in self.nodes:
+            return name
+        return self._names.get(name.lower())
+
+    def out_edges(self, node_id:str) -> List[Tuple[str,int]]:
+        return self._out[node_id]
+
+    def in_edges(self, node_id:str) -> List[Tuple[str,int]]:
+        return self._in[node_id]
+
+    @classmethod
+    def load(cls, path:str) -> "RoadGraph":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        graph = cls()
+        for node in data["nodes"]:
+            graph.add_node(node["id"], node["lat"], node["lon"], node.get("name"))
+        for edge in data["edges"]:
+            args = (edge["length_km"], edge.get("speed_kmh", 50.0), edge.get("sensor"), edge.get("capacity", 100.0))
+            graph.add_edge(edge["from"], edge["to"], *args)
+            if not edge.get("oneway", False):
+                graph.add_edge(edge["to"], edge["from"], *args)
+        return graph
+
+class RouteEngine:
+    #A* with landmark (ALT) lower bounds; congestion only ever slows edges down,
+    #so landmark distances computed at free flow stay admissible
+    def __init__(self, graph:RoadGraph, landmarks:int = 4, cache_size:int = 10000, access_speed_kmh:float = 30.0):
+        self.graph = graph
+        self.weights:List[float] = list(graph.free_time)
+        self.version = 0
+        self.cache_size = cache_size
+        self.access_speed_kmh = access_speed_kmh
+        self._cache:"OrderedDict[Tuple[str,str],float]" = OrderedDict()
+        #the cache is shared with executor threads of the async service
+        self._cache_lock = threading.Lock()
+        self._sensor_edges:Dict[str,List[int]] = {}
+        for index, sensor in enumerate(graph.edge_sensor):
+            if sensor is not None:
+                self._sensor_edges.setdefault(sensor, []).append(index)
+        self._densities:Dict[str,int] = {sensor: 0 for sensor in self._sensor_edges}
+        self._snap = SpatialGrid(cell_km=0.5)
+        for node_id, coordinates in graph.nodes.items():
+            self._snap.insert(node_id, coordinates)
+        self._landmarks_from:List[Dict[str,float]] = []
+        self._landmarks_to:List[Dict[str,float]] = []
+        self._select_landmarks(landmarks)
+
+    @classmethod
+    def from_file(cls, path:str, **kwargs) -> "RouteEngine":
+        return cls(RoadGraph.load(path), **kwargs)
+
+    # --- live densities ---
+    @staticmethod
+    def congestion_factor(vehicle_count:float, capacity:float) -> float:
+        #BPR volume-delay curve
+        return 1.0 + 0.15 * (max(vehicle_count, 0) / capacity) ** 4
+
+    def update_densities(self, counts:Dict[str,int]) -> bool:
+        changed = False
+        for sensor, count in counts.items():
+            edges = self._sensor_edges.get(sensor)
+            if edges is None or self._densities.get(sensor) == count:
+                continue
+            self._densities[sensor] = count
+            for index in edges:
+                self.weights[index] = self.graph.free_time[index] * self.congestion_factor(count, self.graph.capacity[index])
+            changed = True
+        if changed:
+            self.version += 1
+            with self._cache_lock:
+                self._cache.clear()
+        return changed
+
+    def sync_sensors(self, sensors:Iterable) -> bool:
+        #accepts IntersectionSensor-like objects (element_id, vehicle_count)
+        return self.update_densities({s.element_id: s.vehicle_count for s in sensors})
+
+    # --- resolving endpoints ---
+    def resolve(self, place:Destination) -> Tuple[Optional[str],float]:
+        #returns graph node and the minutes needed to reach it off-network
+        if isinstance(place, str):
+            return self.graph.node_by_name(place), 0.0
+        if place is None:
+            return None, 0.0
+        hits = self._snap.nearest(place, 1)
+        if not hits:
+            return None, 0.0
+        distance, node_id = hits[0]
+        return node_id, distance / self.access_speed_kmh * 60
+
+    # --- queries ---
+    def eta(self, origin:Destination, destination:Destination) -> Optional[float]:
+        source, access_a = self.resolve(origin)
+        target, access_b = self.resolve(destination)
+        if source is None or target is None:
+            return None
+        minutes = self.shortest_time(source, target)
+        if minutes == INF:
+            return None
+        return minutes + access_a + access_b
+
+    def route(self, origin:Destination, destination:Destination) -> Optional[List[Tuple[str,float]]]:
+        #fastest path as (node, minutes after leaving origin) pairs, origin access time included
+        source, access_a = self.resolve(origin)
+        target, _ = self.resolve(destination)
+        if source is None or target is None:
+            return None
+        parents:Dict[str,Tuple[str,int]] = {}
+        if self._astar(source, target, parents) == INF:
+            return None
+        edges = []
+        node = target
+        while node != source:
+            node, index = parents[node]
+            edges.append(index)
+        weights = self.weights
+        minutes = access_a
+        path = [(source, minutes)]
+        for index in reversed(edges):
+            minutes += weights[index]
+            path.append((self.graph.edge_ends[index][1], minutes))
+        return path
+
+    def shortest_time(self, source:str, target:str) -> float:
+        key = (source, target)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        minutes = self._astar(source, target)
+        with self._cache_lock:
+            self._cache[key] = minutes
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return minutes
+
+    def eta_many(self, origins:Sequence[Destination], destination:Destination) -> List[Optional[float]]:
+        #one backward Dijkstra from the destination settles every origin at once
+        target, access_b = self.resolve(destination)
+        resolved = [self.resolve(o) for o in origins]
+        if target is None:
+            return [None] * len(origins)
+        wanted = {node for node, _ in resolved if node is not None}
+        dist = self._dijkstra(target, reverse=True, stop_at=wanted)
+        result = []
+        for node, access_a in resolved:
+            minutes = dist.get(node, INF) if node is not None else INF
+            result.append(None if minutes == INF else minutes + access_a + access_b)
+        return result
+
+    def rank_units(self, units:Sequence, destination:Destination) -> List[Tuple[float,object]]:
+        located = [u for u in units if u.coordinates is not None]
+        etas = self.eta_many([u.coordinates for u in located], destination)
+        ranked = [(eta, unit) for eta, unit in zip(etas, located) if eta is not None]
+        ranked.sort(key=lambda pair: pair[0])
+        return ranked
+
+    # --- search internals ---
+    def _heuristic(self, node:str, target:str) -> float:
+        best = 0.0
+        for d_from, d_to in zip(self._landmarks_from, self._landmarks_to):
+            a = d_from.get(target, INF) - d_from.get(node, INF)
+            b = d_to.get(node, INF) - d_to.get(target, INF)
+            for bound in (a, b):
+                if bound == bound and bound != INF and bound > best:   #skip nan/unreachable
+                    best = bound
+        return best
+
+    def _astar(self, source:str, target:str, parents:Optional[Dict[str,Tuple[str,int]]] = None) -> float:
+        #parents, when given, receives node -> (previous node, edge index) of the settled tree
+        if source == target:
+            return 0.0
+        weights = self.weights
+        graph = self.graph
+        dist = {source: 0.0}
+        heap = [(self._heuristic(source, target), 0.0, source)]
+        closed = set()
+        while heap:
+            _, d, node = heapq.heappop(heap)
+            if node == target:
+                return d
+            if node in closed:
+                continue
+            closed.add(node)
+            for neighbour, index in graph.out_edges(node):
+                nd = d + weights[index]
+                if nd < dist.get(neighbour, INF):
+                    dist[neighbour] = nd
+                    if parents is not None:
+                        parents[neighbour] = (node, index)
+                    heapq.heappush(heap, (nd + self._heuristic(neighbour, target), nd, neighbour))
+        return INF
+
+    def _dijkstra(self, source:str, reverse:bool = False, weights:Optional[List[float]] = None, stop_at:Optional[set] = None) -> Dict[str,float]:
+        weights = self.weights if weights is None else weights
+        edges = self.graph.in_edges if reverse else self.graph.out_edges
+        remaining = set(stop_at) if stop_at else None
+        dist = {source: 0.0}
+        done:Dict[str,float] = {}
+        heap = [(0.0, source)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done[node] = d
+            if remaining is not None:
+                remaining.discard(node)
+                if not remaining:
+                    break
+            for neighbour, index in edges(node):
+                nd = d + weights[index]
+                if nd < dist.get(neighbour, INF):
+                    dist[neighbour] = nd
+                    heapq.heappush(heap, (nd, neighbour))
+        return done
+
+    def _select_landmarks(self, count:int):
+        nodes = list(self.graph.nodes)
+        if not nodes or count <= 0:
+            return
+        free = self.graph.free_time
+        #farthest-first selection starting from an arbitrary node
+        spread = self._dijkstra(nodes[0], weights=free)
+        candidate = max(spread, key=spread.get)
+        min_dist = {n: INF for n in nodes}
+        for _ in range(min(count, len(nodes))):
+            d_from = self._dijkstra(candidate, weights=free)
+            d_to = self._dijkstra(candidate, reverse=True, weights=free)
+            self._landmarks_from.append(d_from)
+            self._landmarks_to.append(d_to)
+            for n in nodes:
+                d = d_from.get(n, INF)
+                if d < min_dist[n]:
+                    min_dist[n] = d
+            reachable = [n for n in nodes if min_dist[n] != INF]
+            if not reachable:
+                break
+            candidate = max(reachable, key=min_dist.get)
+            if min_dist[candidate] == 0:
+                break
@@ -0,0 +1,98 @@
+import heapq
+import itertools
+import time
+from typing import Dict, Iterator, List, Optional
+
+from app.modules.emergency.base import Incident
+
+class IncidentScheduler:
+    #waiting incidents, one heap per incident type keyed on (-severity, queued_at)
+    #cancel and reprioritize mark the old heap entry dead instead of searching the heap
+    _REMOVED = None
+
+    def __init__(self):
+        self._heaps:Dict[str,List[list]] = {}
+        self._entries:Dict[str,list] = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, incident_id):
+        return incident_id in self._entries
+
+    def enqueue(self, incident:Incident, queued_at:Optional[float] = None):
+        if incident.incident_id in self._entries:
+            self.cancel(incident.incident_id)
+        queued_at = time.time() if queued_at is None else queued_at
+        entry = [-incident.severity, queued_at, next(self._counter), incident]
+        self._entries[incident.incident_id] = entry
+        heapq.heappush(self._heaps.setdefault(incident.incident_type, []), entry)
+
+    def cancel(self, incident_id:str) -> Optional[Incident]:
+        entry = self._entries.pop(incident_id, None)
+        if entry is None:
+            return None
+        incident = entry[-1]
+        entry[-1] = self._REMOVED
+        return incident
+
+    def reprioritize(self, incident_id:str, severity:int) -> bool:
+        entry = self._entries.get(incident_id)
+        if entry is None:
+            return False
+        incident = self.cancel(incident_id)
+        incident.severity = severity
+        #keeps the original queue time so age is not reset
+        self.enqueue(incident, queued_at=entry[1])
+        return True
+
+    def _head(self, incident_type:str) -> Optional[list]:
+        heap = self._heaps.get(incident_type)
+        while heap and heap[0][-1] is self._REMOVED:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return heap[0]
+
+    def peek_for_unit_type(self, unit_type:str) -> Optional[Incident]:
+        #a unit can take any incident whose type names its unit type (same rule as dispatch)
+        best = None
+        for incident_type in self._heaps:
+            if unit_type not in incident_type:
+                continue
+            head = self._head(incident_type)
+            if head is not None and (best is None or head[:3] < best[:3]):
+                best = head
+        return None if best is None else best[-1]
+
+    def iter_for_unit_type(self, unit_type:str) -> Iterator[Incident]:
+        #waiting incidents a unit type may take, most urgent first; walks the heaps in order without copying them
+        #(a frontier of heap positions, children join it as their parent is passed), so the first few cost O(log n).
+        #the queue must not change while the iterator is in use
+        frontier = []
+        for incident_type, heap in self._heaps.items():
+            if unit_type in incident_type and heap:
+                frontier.append((heap[0][:3], 0, heap))
+        heapq.heapify(frontier)
+        while frontier:
+            _, position, heap = heapq.heappop(frontier)
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child][:3], child, heap))
+            incident = heap[position][-1]
+            if incident is not self._REMOVED:
+                yield incident
+
+    def pop_for_unit_type(self, unit_type:str) -> Optional[Incident]:
+        incident = self.peek_for_unit_type(unit_type)
+        if incident is not None:
+            self.cancel(incident.incident_id)
+        return incident
+
+    def entries(self) -> List[tuple]:
+        #(incident, queued_at) in priority order, re-enqueueing them in this order rebuilds the same queue
+        return [(entry[-1], entry[1]) for entry in sorted(self._entries.values(), key=lambda e: e[:3])]
+
+    def waiting(self) -> List[Incident]:
+        return [entry[-1] for entry in sorted(self._entries.values(), key=lambda e: e[:3])]
@@ -0,0 +1,139 @@
+import heapq
+import math
+from typing import Dict, Hashable, List, Optional, Tuple
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON = 111.320
+
+def distance_km(a:Tuple[float,float], b:Tuple[float,float]) -> float:
+    #equirectangular approximation, good enough inside a city
+    mean_lat = math.radians((a[0] + b[0]) / 2)
+    dy = (a[0] - b[0]) * KM_PER_DEG_LAT
+    dx = (a[1] - b[1]) * KM_PER_DEG_LON * math.cos(mean_lat)
+    return math.hypot(dx, dy)
+
+class SpatialGrid:
+    #uniform grid over (lat, lon) points projected to km around a reference latitude
+    def __init__(self, cell_km:float = 1.0, ref_lat:Optional[float] = None):
+        if cell_km <= 0:
+            raise ValueError("Cell size must be positive")
+        self.cell_km = cell_km
+        self._ref_lat = ref_lat
+        self._kx = None
+        self._cells:Dict[Tuple[int,int],Dict[Hashable,Tuple[float,float]]] = {}
+        self._points:Dict[Hashable,Tuple[Tuple[int,int],float,float]] = {}
+        self._bounds:Optional[List[int]] = None   #min_x, max_x, min_y, max_y of cells ever used
+        if ref_lat is not None:
+            self._set_reference(ref_lat)
+
+    def _set_reference(self, lat:float):
+        self._ref_lat = lat
+        self._kx = KM_PER_DEG_LON * math.cos(math.radians(lat))
+
+    def _project(self, coordinates:Tuple[float,float]) -> Tuple[float,float]:
+        if self._kx is None:
+            self._set_reference(coordinates[0])
+        return coordinates[1] * self._kx, coordinates[0] * KM_PER_DEG_LAT
+
+    def _cell_of(self, x:float, y:float) -> Tuple[int,int]:
+        return int(math.floor(x / self.cell_km)), int(math.floor(y / self.cell_km))
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def insert(self, key:Hashable, coordinates:Tuple[float,float]):
+        if key in self._points:
+            self.remove(key)
+        x, y = self._project(coordinates)
+        self._place(key, self._cell_of(x, y), x, y)
+
+    def _place(self, key, cell:Tuple[int,int], x:float, y:float):
+        self._cells.setdefault(cell, {})[key] = (x, y)
+        self._points[key] = (cell, x, y)
+        b = self._bounds
+        if b is None:
+            self._bounds = [cell[0], cell[0], cell[1], cell[1]]
+        else:
+            if cell[0] < b[0]: b[0] = cell[0]
+            if cell[0] > b[1]: b[1] = cell[0]
+            if cell[1] < b[2]: b[2] = cell[1]
+            if cell[1] > b[3]: b[3] = cell[1]
+
+    def remove(self, key:Hashable) -> bool:
+        entry = self._points.pop(key, None)
+        if entry is None:
+            return False
+        cell = entry[0]
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+        return True
+
+    def move(self, key:Hashable, coordinates:Tuple[float,float]):
+        entry = self._points.get(key)
+        if entry is None:
+            self.insert(key, coordinates)
+            return
+        x, y = self._project(coordinates)
+        cell = self._cell_of(x, y)
+        if cell == entry[0]:
+            self._cells[cell][key] = (x, y)
+            self._points[key] = (cell, x, y)
+        else:
+            self.remove(key)
+            self._place(key, cell, x, y)
+
+    def nearest(self, coordinates:Tuple[float,float], k:int = 1, max_km:Optional[float] = None) -> List[Tuple[float,Hashable]]:
+        #ring-by-ring search; stops once no unvisited cell can beat the current k-th best
+        if k <= 0 or not self._points:
+            return []
+        x, y = self._project(coordinates)
+        cx, cy = self._cell_of(x, y)
+        size = self.cell_km
+        best:List[Tuple[float,int,Hashable]] = []   #max-heap on distance via negation
+        seq = 0
+        max_ring = self._max_ring(cx, cy)
+        ring = 0
+        while ring <= max_ring:
+            #closest possible point of ring r is at least (r-1) cells away
+            ring_floor = (ring - 1) * size if ring > 0 else 0.0
+            if len(best) == k and ring_floor > -best[0][0]:
+                break
+            if max_km is not None and ring_floor > max_km:
+                break
+            for cell in self._ring_cells(cx, cy, ring):
+                bucket = self._cells.get(cell)
+                if not bucket:
+                    continue
+                for key, (px, py) in bucket.items():
+                    d = math.hypot(px - x, py - y)
+                    if max_km is not None and d > max_km:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, seq, key))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, seq, key))
+                    seq += 1
+            ring += 1
+        return sorted((-d, key) for d, _, key in best)
+
+    def _max_ring(self, cx:int, cy:int) -> int:
+        #furthest cell ever occupied bounds the search
+        b = self._bounds
+        return max(abs(b[0] - cx), abs(b[1] - cx), abs(b[2] - cy), abs(b[3] - cy))
+
+    @staticmethod
+    def _ring_cells(cx:int, cy:int, ring:int):
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for ix in range(cx - ring, cx + ring + 1):
+            yield (ix, cy - ring)
+            yield (ix, cy + ring)
+        for iy in range(cy - ring + 1, cy + ring):
+            yield (cx - ring, iy)
+            yield (cx + ring, iy)
@@ -0,0 +1,195 @@
+import math
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from app.core.event_bus import UnitEtaChanged
+from app.modules.emergency.base import EmergencyUnit
+from app.modules.emergency.spatial import KM_PER_DEG_LAT, KM_PER_DEG_LON, distance_km
+
+class EtaDrift(NamedTuple):
+    unit_id:str
+    incident_id:str
+    eta:float       #minutes to the incident from the last reported position
+    drift:float     #minutes later (+) or earlier (-) than the arrival planned at dispatch
+
+class Reassignment(NamedTuple):
+    incident_id:str
+    unit_id:str
+    candidate_id:str
+    eta:float
+    candidate_eta:float
+
+class _Track:
+    #one en-route unit, created when its assignment is first seen
+    __slots__ = ("incident_id", "planned", "eta", "published", "arrived")
+
+    def __init__(self, incident_id:str, planned:float, eta:float):
+        self.incident_id = incident_id
+        self.planned = planned
+        self.eta = eta
+        self.published = eta
+        self.arrived = False
+
+class TelemetryChannel:
+    #batched gps ingest for the whole fleet
+    #positions move units through the repository, so the spatial grids follow incrementally (a cell change at most);
+    #moves under min_move_km are gps jitter and are dropped before touching any index.
+    #en-route units (assigned, not yet at the scene) are re-evaluated every eta_interval seconds of telemetry time:
+    #live eta from the last position, drift against the arrival planned at dispatch, and idle units that would now
+    #get there reassign_margin minutes sooner. the cost per batch is one dict lookup and a compare per report
+    #plus the evaluation of en-route units only, not of the whole fleet
+    def __init__(self, service, min_move_km:float = 0.01, eta_interval:float = 5.0, drift_threshold:float = 2.0,
+                 reassign_margin:float = 2.0, arrive_km:float = 0.05, speed_kmh:float = 40.0, publish_delta:float = 0.5,
+                 candidates:int = 3):
+        self.service = service
+        self.repo = service.repo
+        self.min_move_km = min_move_km
+        self.eta_interval = eta_interval
+        self.drift_threshold = drift_threshold
+        self.reassign_margin = reassign_margin
+        self.arrive_km = arrive_km
+        #straight-line fallback when no route engine is set
+        self.speed_kmh = speed_kmh
+        #smallest eta change (minutes) published as UnitEtaChanged on the service bus
+        self.publish_delta = publish_delta
+        self.candidates = candidates
+        self.last_seen:Dict[str,float] = {}
+        self._tracks:Dict[str,_Track] = {}
+        self._last_eval:Optional[float] = None
+        self.received = 0
+        self.moved = 0
+        self.unknown = 0
+
+    # --- ingest ---
+    def ingest(self, unit_ids:Sequence[str], latitudes:Sequence[float], longitudes:Sequence[float],
+               timestamps:Union[None, float, Sequence[float]] = None) -> int:
+        #one report per unit per call is expected, a later report of the same unit wins. returns units moved
+        now = time.time() if timestamps is None else timestamps
+        per_report = not isinstance(now, (int, float))
+        get = self.repo.get_unit_by_id
+        last_seen = self.last_seen
+        #jitter threshold in degrees, longitude scaled at the first unit's latitude
+        dlat_min = self.min_move_km / KM_PER_DEG_LAT
+        dlon_min = None
+        moved = unknown = 0
+        latest = 0.0
+        for i, unit_id in enumerate(unit_ids):
+            unit = get(unit_id)
+            if unit is None:
+                unknown += 1
+                continue
+            lat = latitudes[i]
+            lon = longitudes[i]
+            stamp = now[i] if per_report else now
+            if stamp > latest:
+                latest = stamp
+            last_seen[unit_id] = stamp
+            old = unit.coordinates
+            if old is not None:
+                if dlon_min is None:
+                    dlon_min = self.min_move_km / (KM_PER_DEG_LON * max(0.1, abs(math.cos(math.radians(old[0])))))
+                if abs(lat - old[0]) < dlat_min and abs(lon - old[1]) < dlon_min:
+                    continue
+            unit.coordinates = (lat, lon)
+            moved += 1
+        self.received += len(unit_ids)
+        self.moved += moved
+        self.unknown += unknown
+        if latest and (self._last_eval is None or latest - self._last_eval >= self.eta_interval):
+            self.evaluate(latest)
+        return moved
+
+    # --- live eta ---
+    def _eta(self, origin:Tuple[float,float], destination:Tuple[float,float]) -> Optional[float]:
+        engine = EmergencyUnit.route_engine
+        if engine is not None:
+            return engine.eta(origin, destination)
+        return distance_km(origin, destination) / self.speed_kmh * 60
+
+    def evaluate(self, now:Optional[float] = None) -> List[EtaDrift]:
+        #refreshes every en-route unit, returns the ones off plan by drift_threshold minutes or more
+        now = time.time() if now is None else now
+        self._last_eval = now
+        service = self.service
+        tracks = self._tracks
+        active = {}
+        drifted = []
+        engine = EmergencyUnit.route_engine
+        bus = service.bus
+        for incident_id, unit_id in service.assignments.items():
+            incident = service.active_incidents.get(incident_id)
+            unit = self.repo.get_unit_by_id(unit_id)
+            if incident is None or unit is None or incident.coordinates is None or unit.coordinates is None:
+                continue
+            track = tracks.get(unit_id)
+            if track is not None and track.incident_id == incident_id and track.arrived:
+                active[unit_id] = track
+                continue
+            eta = self._eta(unit.coordinates, incident.coordinates)
+            if eta is None:
+                continue
+            if track is None or track.incident_id != incident_id:
+                #first sighting of this assignment, its eta is the plan
+                track = _Track(incident_id, now + eta * 60, eta)
+            active[unit_id] = track
+            track.eta = eta
+            if distance_km(unit.coordinates, incident.coordinates) <= self.arrive_km:
+                track.arrived = True
+                unit.current_location = incident.location
+                continue
+            if engine is not None:
+                #the free-text location follows the unit through named places of the road graph
+                node, _ = engine.resolve(unit.coordinates)
+                name = engine.graph.names.get(node)
+                if name and name != unit.current_location:
+                    unit.current_location = name
+            drift = (now + eta * 60 - track.planned) / 60
+            if abs(drift) >= self.drift_threshold:
+                drifted.append(EtaDrift(unit_id, incident_id, eta, drift))
+            if bus is not None and abs(eta - track.published) >= self.publish_delta:
+                track.published = eta
+                bus.publish(UnitEtaChanged(unit_id, unit.unit_type, incident_id, incident.location,
+                                           unit.coordinates, eta, drift, now))
+        #finished or reassigned missions drop out here
+        self._tracks = active
+        return drifted
+
+    @property
+    def drifts(self) -> Dict[str,float]:
+        #unit_id -> minutes off plan for units still on the way
+        now = self._last_eval
+        if now is None:
+            return {}
+        return {unit_id: (now + t.eta * 60 - t.planned) / 60 for unit_id, t in self._tracks.items() if not t.arrived}
+
+    def reassignment_candidates(self, drifted:Optional[List[EtaDrift]] = None) -> List[Reassignment]:
+        #idle units that would beat a late unit by reassign_margin minutes, best gain first
+        if drifted is None:
+            drifted = [EtaDrift(unit_id, self._tracks[unit_id].incident_id, self._tracks[unit_id].eta, drift)
+                       for unit_id, drift in self.drifts.items()]
+        found = []
+        for late in drifted:
+            if late.drift < self.drift_threshold:
+                continue
+            incident = self.service.active_incidents.get(late.incident_id)
+            if incident is None or incident.coordinates is None:
+                continue
+            nearby = [u for _, u in self.repo.find_nearest_units(incident.incident_type, incident.coordinates,
+                                                                   k=self.candidates)
+                      if u.can_respond(incident.severity)]
+            engine = EmergencyUnit.route_engine
+            if engine is not None:
+                etas = engine.eta_many([u.coordinates for u in nearby], incident.coordinates)
+            else:
+                etas = [self._eta(u.coordinates, incident.coordinates) for u in nearby]
+            best = min(((eta, u) for eta, u in zip(etas, nearby) if eta is not None),
+                       key=lambda pair: pair[0], default=None)
+            if best is not None and best[0] + self.reassign_margin <= late.eta:
+                found.append(Reassignment(late.incident_id, late.unit_id, best[1].unit_id, late.eta, best[0]))
+        found.sort(key=lambda r: r.candidate_eta - r.eta)
+        return found
+
+    def stale_units(self, max_age:float, now:Optional[float] = None) -> List[str]:
+        #units that reported before but not within max_age seconds
+        now = time.time() if now is None else now
+        return [unit_id for unit_id, seen in self.last_seen.items() if now - seen > max_age]
@@ -0,0 +1,161 @@
+"""
+TRAFİK MODÜLÜ - ASENKRON SERVİS KATMANI
+
+TrafficService'in asyncio sürümü. Binlerce cihazın eşzamanlı okuma
+göndermesi tek bir olay döngüsünde karşılanır:
+- Tekil sensör okumaları (submit_reading) döngünün bir turunda biriktirilir ve
+  tek bir toplu yazma (ingest_sensor_tick) olarak işlenir (micro-batching).
+- Toplu sınıflandırma ve koridor planlama gibi ağır işler havuzda çalışır.
+- Her isteğe zaman aşımı uygulanır; close() bekleyen okumaları yazıp kapanır.
+
+Örnek:
+    async with AsyncTrafficService(TrafficService(repo, SensorStore())) as service:
+        await asyncio.gather(*(service.submit_reading(s, c) for s, c in readings))
+        densities = await service.calculate_all_densities()
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Dict, List, Optional
+
+from app.core.executor import ServiceExecutor
+from .implementations import TrafficService
+
+
+class AsyncTrafficService:
+    """
+    Args:
+        service: Sarılan senkron TrafficService.
+        executor: Ağır işler için havuz (varsayılan: tek iş parçacığı; SensorStore
+            iş parçacığı güvenli olmadığından yazmalar sırayla yapılır).
+        timeout: İstek başına varsayılan zaman aşımı (sn).
+        batch_size: Bu sayıya ulaşan okuma tamponu tur beklenmeden yazılır.
+    """
+
+    def __init__(self, service: TrafficService, executor: Optional[Executor] = None,
+                 timeout: Optional[float] = 5.0, batch_size: int = 4096):
+        self.service = service
+        self.batch_size = batch_size
+        self.bridge = ServiceExecutor(executor, timeout, name="traffic")
+        self._ids: List[str] = []
+        self._counts: List[int] = []
+        self._timestamps: List[float] = []
+        self._batch: Optional[asyncio.Future] = None
+        self._flush_handle = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # --- CİHAZ OKUMALARI ---
+
+    async def submit_reading(self, sensor_id: str, count: int, timestamp: Optional[float] = None,
+                             timeout: Optional[float] = None) -> None:
+        """Tek bir sensör okumasını kuyruğa alır; içinde bulunduğu toplu yazma bitince döner."""
+        self.bridge.check_open()
+        loop = asyncio.get_running_loop()
+        if self._batch is None:
+            self._batch = loop.create_future()
+            self.bridge.track(self._batch)
+            self._flush_handle = loop.call_soon(self._start_flush)
+        batch = self._batch
+        self._ids.append(sensor_id)
+        self._counts.append(count)
+        self._timestamps.append(time.time() if timestamp is None else timestamp)
+        if len(self._ids) >= self.batch_size:
+            self._flush_handle.cancel()
+            self._start_flush()
+        await self.bridge.wait_shared(batch, timeout)
+
+    def _start_flush(self):
+        batch, self._batch = self._batch, None
+        if batch is None:
+            return
+        ids, counts, timestamps = self._ids, self._counts, self._timestamps
+        self._ids, self._counts, self._timestamps = [], [], []
+        task = asyncio.ensure_future(self._write(ids, counts, timestamps))
+        task.add_done_callback(lambda done: self._settle(batch, done))
+
+    async def _write(self, ids, counts, timestamps) -> int:
+        if self.service.sensor_store is not None:
+            # Kapatma sırasında da son tampon yazılabilsin diye havuz doğrudan kullanılır
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.bridge.executor, self.service.ingest_sensor_tick,
+                                              ids, counts, timestamps)
+        # Sütunsal depo yoksa nesneler döngüde doğrudan güncellenir (ucuz işlem); etiket
+        # değişimleri tekil hesaplama yolundaki gibi veriyoluna yayınlanır
+        written = self.service.update_sensor_counts(ids, counts, timestamps)
+        if self.service.history is not None or self.service.forecaster is not None:
+            # Geçmiş ve tahmin modeli de diğer yazmalar gibi havuzun iş parçacığında güncellenir
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.bridge.executor, self.service.record_readings, ids, counts, timestamps)
+        return written
+
+    @staticmethod
+    def _settle(batch: asyncio.Future, done: asyncio.Future):
+        if batch.done():
+            return
+        if done.cancelled():
+            batch.cancel()
+        elif done.exception() is not None:
+            batch.set_exception(done.exception())
+        else:
+            batch.set_result(done.result())
+
+    async def ingest_sensor_tick(self, sensor_ids, counts, timestamps=None, timeout: Optional[float] = None) -> int:
+        """Hazır bir ölçüm turunu havuzda tek seferde yazar."""
+        return await self.bridge.run(self.service.ingest_sensor_tick, sensor_ids, counts, timestamps,
+                                     timeout=timeout)
+
+    # --- HESAPLAMALAR ---
+
+    async def calculate_intersection_density(self, sensor_id: str) -> str:
+        self.bridge.check_open()
+        return self.service.calculate_intersection_density(sensor_id)
+
+    async def calculate_all_densities(self, timeout: Optional[float] = None) -> Dict[str, str]:
+        return await self.bridge.run(self.service.calculate_all_densities, timeout=timeout)
+
+    async def replan_corridors(self, optimizer, timeout: Optional[float] = None) -> int:
+        return await self.bridge.run(self.service.replan_corridors, optimizer, timeout=timeout)
+
+    async def density_history(self, start: float, end: Optional[float] = None, resolution: Optional[int] = None,
+                              timeout: Optional[float] = None, **series) -> dict:
+        """Geçmiş özeti (resolution verilirse kova kova); series: element_id= veya location=."""
+        return await self.bridge.run(self._history_summary, start, end, resolution, series, timeout=timeout)
+
+    async def flush_history(self, timeout: Optional[float] = None) -> None:
+        """Geçmiş tamponlarını diske yazar; yazmalarla aynı iş parçacığında sırayla çalışır."""
+        if self.service.history is None:
+            raise ValueError("Geçmiş için TimeSeriesStore tanımlanmalı.")
+        await self.bridge.run(self.service.history.flush, timeout=timeout)
+
+    def _history_summary(self, start, end, resolution, series) -> dict:
+        history = self.service.history
+        if history is None:
+            raise ValueError("Geçmiş için TimeSeriesStore tanımlanmalı.")
+        if resolution is None:
+            return history.aggregate(start, end, **series)
+        rows = history.downsample(start, end, resolution, **series)
+        return {name: column.tolist() for name, column in rows.items()}
+
+    async def optimize_light_timing(self, light_id: str, density: str, sensor_id: Optional[str] = None,
+                                    timeout: Optional[float] = None) -> str:
+        if sensor_id is None or self.service.forecaster is None:
+            self.bridge.check_open()
+            return self.service.optimize_light_timing(light_id, density)
+        # Tahmin modeli yazmalarla aynı iş parçacığında okunur
+        return await self.bridge.run(self.service.optimize_light_timing, light_id, density, sensor_id,
+                                     timeout=timeout)
+
+    # --- KAPATMA ---
+
+    async def close(self, grace: float = 5.0):
+        """Tampondaki okumaları yazar, süren işleri bekler ve havuzu kapatır."""
+        if self._batch is not None:
+            self._flush_handle.cancel()
+            self._start_flush()
+        await self.bridge.close(grace)
@@ -5,7 +5,28 @@ temel arayüzü ve ortak özellikleri tanımlar.
 """
 
 from abc import ABC, abstractmethod # 
+from operator import attrgetter
 from datetime import datetime
+import random
+import time
+
+def observed_field(name: str) -> property:
+    """
+    Atamada gözlemcileri (element, alan, eski, yeni) ile bilgilendiren özellik.
+    Değer "_<ad>" alanında tutulur; alt sınıflar bu alanı __slots__'a ekler.
+    Değer değişmediyse ya da gözlemci yoksa yalnızca atama yapılır.
+    """
+    slot = "_" + name
+
+    def fset(self, value):
+        old = getattr(self, slot, None)
+        setattr(self, slot, value)
+        if self._observers and old != value:
+            self._notify(name, old, value)
+
+    # Okuma sıcak yolda (ör. yoğunluk hesabı); attrgetter C düzeyinde çalışır
+    return property(attrgetter(slot), fset, doc=f"Gözlenen alan: {name}")
+
 
 class TrafficElement(ABC): # [cite: 73]
     """
@@ -14,6 +35,14 @@ class TrafficElement(ABC): # [cite: 73]
     """
     print
 
+    # Milyonlarca cihaz bellekte tutulabilsin diye __dict__ yerine sabit
+    # alanlar (__slots__) kullanılır; son güncelleme zamanı datetime yerine
+    # epoch saniyesi (float) olarak saklanır.
+    # rng / clock: Rastgelelik ve zaman kaynakları. Varsayılanlar gerçek saat ve
+    # global random modülüdür; simülasyon motoru her cihaza kendi tohumlu RNG
+    # akışını ve simülasyon saatini atar (tekrarlanabilir sonuçlar için).
+    __slots__ = ("_element_id", "_location", "_status", "_last_update", "_observers", "rng", "clock")
+
     def __init__(self, element_id: str, location: str, status: str = "Active"):
         """
         Başlangıç değerlerini atar. 
@@ -24,7 +53,12 @@ class TrafficElement(ABC): # [cite: 73]
         self._element_id = element_id
         self._location = location
         self._status = status
-        self._last_update = datetime.now()
+        self.rng = random
+        self.clock = time.time
+        self._last_update = self.clock()
+        # Durum değişikliklerini dinleyen geri çağırımlar (ör. repository indeksleri).
+        # Değişmez demet: gözlemcisi olmayan cihazlar ortak boş demeti paylaşır.
+        self._observers = ()
 
     # --- GETTER / SETTER ---
     @property
@@ -41,8 +75,34 @@ class TrafficElement(ABC): # [cite: 73]
 
     @status.setter
     def status(self, value):
+        old = self._status
         self._status = value
-        self._last_update = datetime.now()
+        self.touch()
+        if old != value:
+            self._notify("status", old, value)
+
+    @property
+    def last_update(self) -> datetime:
+        return datetime.fromtimestamp(self._last_update)
+
+    def touch(self):
+        """Son güncelleme zamanını cihazın saatine (gerçek veya simülasyon) göre yeniler."""
+        self._last_update = self.clock()
+
+    # --- GÖZLEMCİ (Observer) ---
+
+    def add_observer(self, callback):
+        """callback(element, alan, eski_değer, yeni_değer) şeklinde çağrılır."""
+        if callback not in self._observers:
+            self._observers += (callback,)
+
+    def remove_observer(self, callback):
+        if callback in self._observers:
+            self._observers = tuple(c for c in self._observers if c != callback)
+
+    def _notify(self, field: str, old, new):
+        for callback in self._observers:
+            callback(self, field, old, new)
 
     # --- SOYUT METOTLAR (Abstract Methods) ---
     # Bu metotlar tüm alt sınıflar tarafından override edilmek zorundadır. [cite: 28, 33]
@@ -57,6 +117,26 @@ class TrafficElement(ABC): # [cite: 73]
         """Cihazın mevcut durumu hakkında detaylı bir rapor döndürür."""
         pass
 
+    # --- KALICI DEPOLAMA (Serileştirme) ---
+
+    def to_record(self) -> dict:
+        """Cihazın kalıcı depolamaya yazılabilecek düz sözlük kaydını döndürür."""
+        return {
+            "type": type(self).__name__,
+            "element_id": self._element_id,
+            "location": self._location,
+            "status": self._status,
+            "last_update": self._last_update,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict):
+        """to_record çıktısından cihaz nesnesini yeniden oluşturur."""
+        element = cls(record["element_id"], record["location"])
+        element._status = record["status"]
+        element._last_update = record["last_update"]
+        return element
+
     # --- SINIF METOTLARI (Class Methods) ---
 
     @classmethod
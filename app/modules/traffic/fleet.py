@@ -0,0 +1,542 @@
+"""
+TRAFİK MODÜLÜ - SÜTUNSAL CİHAZ FİLOSU (STRUCT-OF-ARRAYS)
+
+Milyonlarca cihazı nesne başına bellek maliyeti olmadan tutmak için kompakt
+depo. Her alan ayrı bir `array` sütunudur; satır i, i. cihazdır:
+- Durum ve ışık rengi küçük tamsayı kodlarıyla (ElementStatus, LightColor),
+  konum ise konum tablosundaki sırasıyla saklanır.
+- Son güncelleme zamanı epoch saniyesi olarak `array("d")` içindedir.
+- Cihazlara sabit alanlı, hafif görünüm (view) nesneleriyle erişilir; görünümler
+  TrafficLight / SpeedCamera / IntersectionSensor ile aynı public özellikleri sunar.
+
+Görünümler gözlemci bildirimi yapmaz; repository indeksleri gereken yerlerde
+to_elements() ile gerçek nesnelere dönülür. remove() son satırı boşalan yere
+taşır, bu yüzden silme sonrası eldeki görünümler geçersiz olur.
+
+Örnek:
+    fleet = DeviceFleet.from_elements(repository.get_all())
+    for light in fleet.find_all_by_location("Merkez"):
+        light.timer = 45
+"""
+
+import time
+from array import array
+from datetime import datetime
+from enum import IntEnum
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .base import TrafficElement
+from .implementations import IntersectionSensor, SpeedCamera, TrafficLight
+
+
+class ElementStatus(IntEnum):
+    """Cihaz durum kodları; TrafficElement.is_valid_status ile aynı sıradadır."""
+    ACTIVE = 0
+    INACTIVE = 1
+    MAINTENANCE = 2
+
+
+class LightColor(IntEnum):
+    """Işık rengi kodları; TrafficLight.perform_action döngü sırasıyla aynıdır."""
+    RED = 0
+    YELLOW = 1
+    GREEN = 2
+
+
+STATUS_NAMES = ("Active", "Inactive", "Maintenance")
+COLOR_NAMES = ("Red", "Yellow", "Green")
+
+
+class Codebook:
+    """
+    Metin <-> küçük tamsayı kod tablosu.
+    Bilinen değerler sabit kodları alır; bilinmeyen bir değer ilk görüldüğünde
+    tabloya eklenir (ör. özel bir durum metni), böylece hiçbir değer kaybolmaz.
+    """
+
+    __slots__ = ("names", "codes")
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = list(names)
+        self.codes: Dict[str, int] = {name: code for code, name in enumerate(self.names)}
+
+    def encode(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def decode(self, code: int) -> str:
+        return self.names[code]
+
+    def __len__(self):
+        return len(self.names)
+
+
+# --- GÖRÜNÜMLER (Views) ---
+
+class ElementView:
+    """Filodaki tek bir satıra bakan hafif nesne (iki alan: filo ve satır)."""
+
+    __slots__ = ("_fleet", "_row")
+
+    def __init__(self, fleet: "DeviceFleet", row: int):
+        self._fleet = fleet
+        self._row = row
+
+    @property
+    def element_id(self) -> str:
+        return self._fleet._ids[self._row]
+
+    @property
+    def location(self) -> str:
+        fleet = self._fleet
+        return fleet.locations.names[fleet._location[self._row]]
+
+    @property
+    def status(self) -> str:
+        fleet = self._fleet
+        return fleet.statuses.names[fleet._status[self._row]]
+
+    @status.setter
+    def status(self, value: str):
+        fleet = self._fleet
+        fleet._status[self._row] = fleet.statuses.encode(value)
+        self.touch()
+
+    @property
+    def status_code(self) -> int:
+        return self._fleet._status[self._row]
+
+    @property
+    def last_update(self) -> datetime:
+        return datetime.fromtimestamp(self._fleet._last_update[self._row])
+
+    def touch(self):
+        self._fleet._last_update[self._row] = time.time()
+
+    def to_record(self) -> dict:
+        """Gerçek cihazın to_record çıktısının aynısı."""
+        fleet, row = self._fleet, self._row
+        return {
+            "type": self.element_type.__name__,
+            "element_id": fleet._ids[row],
+            "location": fleet.locations.names[fleet._location[row]],
+            "status": fleet.statuses.names[fleet._status[row]],
+            "last_update": fleet._last_update[row],
+        }
+
+    def to_element(self) -> TrafficElement:
+        """Satırı tam bir cihaz nesnesine dönüştürür (gözlemciler, perform_action vb. için)."""
+        return self.element_type.from_record(self.to_record())
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.element_id}>"
+
+
+class TrafficLightView(ElementView):
+    __slots__ = ()
+    element_type = TrafficLight
+
+    @property
+    def current_color(self) -> str:
+        fleet = self._fleet
+        return fleet.colors.names[fleet._color[fleet._sub[self._row]]]
+
+    @current_color.setter
+    def current_color(self, value: str):
+        fleet = self._fleet
+        fleet._color[fleet._sub[self._row]] = fleet.colors.encode(value)
+
+    @property
+    def timer(self) -> int:
+        fleet = self._fleet
+        return fleet._timer[fleet._sub[self._row]]
+
+    @timer.setter
+    def timer(self, value: int):
+        fleet = self._fleet
+        fleet._timer[fleet._sub[self._row]] = value
+
+    @property
+    def offset(self) -> int:
+        fleet = self._fleet
+        return fleet._offset[fleet._sub[self._row]]
+
+    @offset.setter
+    def offset(self, value: int):
+        fleet = self._fleet
+        fleet._offset[fleet._sub[self._row]] = value
+
+    def to_record(self) -> dict:
+        record = super().to_record()
+        record["current_color"] = self.current_color
+        record["timer"] = self.timer
+        record["offset"] = self.offset
+        return record
+
+
+class SpeedCameraView(ElementView):
+    __slots__ = ()
+    element_type = SpeedCamera
+
+    @property
+    def speed_limit(self) -> float:
+        fleet = self._fleet
+        return fleet._speed_limit[fleet._sub[self._row]]
+
+    @speed_limit.setter
+    def speed_limit(self, value: float):
+        fleet = self._fleet
+        fleet._speed_limit[fleet._sub[self._row]] = value
+
+    @property
+    def violation_count(self) -> int:
+        fleet = self._fleet
+        return fleet._violations[fleet._sub[self._row]]
+
+    @violation_count.setter
+    def violation_count(self, value: int):
+        fleet = self._fleet
+        fleet._violations[fleet._sub[self._row]] = value
+
+    def to_record(self) -> dict:
+        record = super().to_record()
+        record["speed_limit"] = self.speed_limit
+        record["violation_count"] = self.violation_count
+        return record
+
+
+class IntersectionSensorView(ElementView):
+    __slots__ = ()
+    element_type = IntersectionSensor
+
+    @property
+    def vehicle_count(self) -> int:
+        fleet = self._fleet
+        return fleet._vehicle_count[fleet._sub[self._row]]
+
+    @vehicle_count.setter
+    def vehicle_count(self, value: int):
+        fleet = self._fleet
+        fleet._vehicle_count[fleet._sub[self._row]] = value
+
+    def to_record(self) -> dict:
+        record = super().to_record()
+        record["vehicle_count"] = self.vehicle_count
+        return record
+
+
+# Satırdaki tip kodu -> görünüm sınıfı
+VIEW_TYPES = (TrafficLightView, SpeedCameraView, IntersectionSensorView)
+_KIND_CODES = {view.element_type.__name__: code for code, view in enumerate(VIEW_TYPES)}
+
+
+# --- FİLO ---
+
+class DeviceFleet:
+    """
+    Trafik cihazlarının sütunsal deposu.
+    Ortak alanlar her satır için, tipe özgü alanlar (renk, süre, hız limiti,
+    araç sayısı...) ise yalnızca o tipteki cihazlar için ayrı alt tablolarda
+    tutulur; _sub[satır] cihazın kendi alt tablosundaki sırasıdır.
+    Satır başına ~25 bayt sütun verisi + kimlik metni ve indeks girdisi.
+    """
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.locations = Codebook()
+        self.statuses = Codebook(STATUS_NAMES)
+        self.colors = Codebook(COLOR_NAMES)
+        self._kind = array("B")
+        self._sub = array("I")
+        self._location = array("I")
+        self._status = array("H")
+        self._last_update = array("d")
+        # Alt tablolar; ilk sütun alt satırdan ana satıra geri işaretçidir
+        self._color = array("B")
+        self._timer = array("i")
+        self._offset = array("i")
+        self._speed_limit = array("d")
+        self._violations = array("I")
+        self._vehicle_count = array("i")
+        self._tables = (
+            (array("I"), self._color, self._timer, self._offset),
+            (array("I"), self._speed_limit, self._violations),
+            (array("I"), self._vehicle_count),
+        )
+
+    @classmethod
+    def from_elements(cls, elements: Iterable[TrafficElement]) -> "DeviceFleet":
+        fleet = cls()
+        fleet.extend(elements)
+        return fleet
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "DeviceFleet":
+        fleet = cls()
+        for record in records:
+            fleet.add_record(record)
+        return fleet
+
+    def _columns(self):
+        return self._kind, self._sub, self._location, self._status, self._last_update
+
+    def _specific(self, kind: int, record: dict, colors: Codebook) -> tuple:
+        if kind == 0:
+            return (colors.encode(record["current_color"]), record["timer"], record.get("offset", 0))
+        if kind == 1:
+            return record["speed_limit"], record["violation_count"]
+        return (record["vehicle_count"],)
+
+    # --- EKLEME / SİLME ---
+
+    def add(self, element: TrafficElement) -> ElementView:
+        return self.add_record(element.to_record())
+
+    def extend(self, elements: Iterable[TrafficElement]) -> int:
+        added = 0
+        for element in elements:
+            self.add_record(element.to_record())
+            added += 1
+        return added
+
+    def add_record(self, record: dict) -> ElementView:
+        """to_record biçimindeki kaydı ekler; aynı kimlik varsa satırı günceller."""
+        kind = _KIND_CODES.get(record["type"])
+        if kind is None:
+            raise ValueError(f"Bilinmeyen cihaz tipi: {record['type']}")
+        element_id = record["element_id"]
+        specific = self._specific(kind, record, self.colors)
+        row = self._rows.get(element_id)
+        if row is not None and self._kind[row] != kind:
+            # Tip değiştiyse eski alt tablo satırı bırakılır
+            self.remove(element_id)
+            row = None
+        if row is None:
+            row = self._rows[element_id] = len(self._ids)
+            self._ids.append(element_id)
+            table = self._tables[kind]
+            self._kind.append(kind)
+            self._sub.append(len(table[0]))
+            table[0].append(row)
+            for column, value in zip(table[1:], specific):
+                column.append(value)
+            self._location.append(self.locations.encode(record["location"]))
+            self._status.append(self.statuses.encode(record["status"]))
+            self._last_update.append(record["last_update"])
+        else:
+            sub = self._sub[row]
+            for column, value in zip(self._tables[kind][1:], specific):
+                column[sub] = value
+            self._location[row] = self.locations.encode(record["location"])
+            self._status[row] = self.statuses.encode(record["status"])
+            self._last_update[row] = record["last_update"]
+        return VIEW_TYPES[kind](self, row)
+
+    def remove(self, element_id: str) -> bool:
+        """Satırı siler; son satır boşalan yere taşınır (eldeki görünümler geçersizleşir)."""
+        row = self._rows.pop(element_id, None)
+        if row is None:
+            return False
+        # Önce alt tablodaki son satır boşluğa taşınır
+        table = self._tables[self._kind[row]]
+        sub, last_sub = self._sub[row], len(table[0]) - 1
+        if sub != last_sub:
+            for column in table:
+                column[sub] = column[last_sub]
+            self._sub[table[0][sub]] = sub
+        for column in table:
+            column.pop()
+        # Sonra ana tablodaki son satır
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+            for column in self._columns():
+                column[row] = column[last]
+            self._tables[self._kind[row]][0][self._sub[row]] = row
+        self._ids.pop()
+        for column in self._columns():
+            column.pop()
+        return True
+
+    # --- ERİŞİM ---
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, element_id):
+        return element_id in self._rows
+
+    def __iter__(self) -> Iterator[ElementView]:
+        kinds = self._kind
+        for row in range(len(self._ids)):
+            yield VIEW_TYPES[kinds[row]](self, row)
+
+    def view(self, row: int) -> ElementView:
+        return VIEW_TYPES[self._kind[row]](self, row)
+
+    def get(self, element_id: str) -> Optional[ElementView]:
+        row = self._rows.get(element_id)
+        return None if row is None else VIEW_TYPES[self._kind[row]](self, row)
+
+    def _views(self, column: array, code: int) -> List[ElementView]:
+        kinds = self._kind
+        return [VIEW_TYPES[kinds[row]](self, row) for row, value in enumerate(column) if value == code]
+
+    def find_all_by_location(self, location: str) -> List[ElementView]:
+        code = self.locations.codes.get(location)
+        return [] if code is None else self._views(self._location, code)
+
+    def filter_by_status(self, status: str) -> List[ElementView]:
+        code = self.statuses.codes.get(status)
+        return [] if code is None else self._views(self._status, code)
+
+    def find_all_by_type(self, element_type: type) -> List[ElementView]:
+        code = _KIND_CODES.get(element_type.__name__)
+        return [] if code is None else self._views(self._kind, code)
+
+    def count_by_status(self) -> Dict[str, int]:
+        counts = [0] * len(self.statuses)
+        for code in self._status:
+            counts[code] += 1
+        return {name: count for name, count in zip(self.statuses.names, counts) if count}
+
+    # --- DÖNÜŞÜM ---
+
+    def records(self) -> Iterator[dict]:
+        for view in self:
+            yield view.to_record()
+
+    def to_elements(self) -> List[TrafficElement]:
+        return [view.to_element() for view in self]
+
+    def nbytes(self) -> int:
+        """Sütunların kapladığı bayt (kimlik metinleri ve sözlük hariç)."""
+        columns = list(self.column_map().values()) + [table[0] for table in self._tables]
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def column_map(self) -> Dict[str, array]:
+        """Sütun adı -> sütun; snapshot dosyası bu adlarla yazılır (bkz. COLUMN_NAMES)."""
+        return dict(zip(COLUMN_NAMES, (self._kind, self._sub, self._location, self._status, self._last_update,
+                                       self._color, self._timer, self._offset, self._speed_limit,
+                                       self._violations, self._vehicle_count)))
+
+    def ids(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def index_columns(self) -> Dict[str, tuple]:
+        """
+        İndeks adı -> (kod tablosu, kod sütunu): konum, durum ve tip. Repository
+        indekslerini nesne üretmeden, kod başına kova açarak kurmak için.
+        """
+        kinds = [view.element_type.__name__ for view in VIEW_TYPES]
+        return {"location": (self.locations.names, self._location), "status": (self.statuses.names, self._status),
+                "type": (kinds, self._kind)}
+
+
+# Snapshot dosyasındaki sütun adları; DeviceFleet.column_map sırasıyla aynıdır
+COLUMN_NAMES = ("kind", "sub", "location", "status", "last_update", "light.color", "light.timer",
+                "light.offset", "camera.speed_limit", "camera.violations", "sensor.vehicle_count")
+
+
+# --- SALT OKUNUR FİLO (eşlenmiş bellek) ---
+
+class IdTable:
+    """
+    Kimlik metinlerinin kompakt tablosu: birleşik UTF-8 blok, satır başlangıç
+    ofsetleri ve kimliğe göre sıralı satır numaraları (ikili arama için).
+    Metinler yalnızca okunduklarında çözülür.
+    """
+
+    __slots__ = ("_offsets", "_blob", "_order")
+
+    def __init__(self, offsets, blob, order):
+        self._offsets = offsets
+        self._blob = blob
+        self._order = order
+
+    @staticmethod
+    def build(ids: List[str]):
+        """Kimlik listesinden (ofsetler, blok, sıra) üçlüsünü üretir."""
+        encoded = [element_id.encode("utf-8") for element_id in ids]
+        offsets = array("Q", [0])
+        total = 0
+        for data in encoded:
+            total += len(data)
+            offsets.append(total)
+        order = array("I", sorted(range(len(encoded)), key=encoded.__getitem__))
+        return offsets, b"".join(encoded), order
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        offsets = self._offsets
+        return str(self._blob[offsets[row]:offsets[row + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tolist())
+
+    def tolist(self) -> List[str]:
+        """Tüm kimlikler; blok tek seferde çözülür (ASCII ise bayt ofsetleri karakter ofsetidir)."""
+        offsets, blob = self._offsets, self._blob
+        text = str(blob, "utf-8")
+        if len(text) != len(blob):
+            return [str(blob[offsets[row]:offsets[row + 1]], "utf-8") for row in range(len(offsets) - 1)]
+        return [text[offsets[row]:offsets[row + 1]] for row in range(len(offsets) - 1)]
+
+    def find(self, element_id: str) -> int:
+        """Kimliğin satırı; yoksa -1. UTF-8 bayt sırası kod noktası sırasıyla aynıdır."""
+        key = element_id.encode("utf-8")
+        offsets, blob, order = self._offsets, self._blob, self._order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = order[mid]
+            if bytes(blob[offsets[row]:offsets[row + 1]]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order):
+            row = order[lo]
+            if blob[offsets[row]:offsets[row + 1]] == key:
+                return row
+        return -1
+
+
+class MappedFleet(DeviceFleet):
+    """
+    Dış tamponlar (ör. mmap üzerindeki memoryview'ler) üzerinde salt okunur filo.
+    Yükleme maliyeti sütun sayısıyla sınırlıdır; satırlar yalnızca erişildiğinde
+    okunur. Görünümler üzerinden yazma tamponu değiştireceği için eşlenmiş
+    dosyalarda salt okunur tampon kullanılmalıdır.
+    """
+
+    def __init__(self, ids: IdTable, columns: Dict[str, object], locations: List[str],
+                 statuses: List[str], colors: List[str]):
+        self._ids = ids
+        self.locations = Codebook(locations)
+        self.statuses = Codebook(statuses)
+        self.colors = Codebook(colors)
+        (self._kind, self._sub, self._location, self._status, self._last_update, self._color, self._timer,
+         self._offset, self._speed_limit, self._violations, self._vehicle_count) = (
+            columns[name] for name in COLUMN_NAMES)
+        self._tables = ()
+
+    def __contains__(self, element_id):
+        return self._ids.find(element_id) >= 0
+
+    def get(self, element_id: str) -> Optional[ElementView]:
+        row = self._ids.find(element_id)
+        return None if row < 0 else VIEW_TYPES[self._kind[row]](self, row)
+
+    def add_record(self, record: dict) -> ElementView:
+        raise TypeError("Eşlenmiş filo salt okunurdur; değişiklikler repository üzerinden yapılır.")
+
+    def remove(self, element_id: str) -> bool:
+        raise TypeError("Eşlenmiş filo salt okunurdur; değişiklikler repository üzerinden yapılır.")
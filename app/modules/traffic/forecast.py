@@ -0,0 +1,325 @@
+"""
+TRAFİK MODÜLÜ - KAVŞAK YOĞUNLUK TAHMİNİ (CONGESTION FORECASTING)
+
+calculate_intersection_density yalnızca anlık araç sayısına bakar; bu modül
+her kavşak için 5-30 dk sonrasının araç sayısını tahmin eder. Böylece bir
+kavşak "Kritik" olmadan önce ışık süreleri ve acil durum rotaları ayarlanabilir.
+
+Model (sensör başına, tüm sensörler tek NumPy dizisinde):
+- Mevsimsel taban (seasonal baseline): haftanın her step saniyelik dilimi için
+  üstel ortalama araç sayısı. Dilimler arası doğrusal ara değer alınır.
+- Sapma: okumanın tabandan farkı üstel düzeltme (exponential smoothing) ile
+  izlenir; eğilimi (trend) sönümlü Holt yöntemiyle tutulur.
+- Tahmin(t + h) = taban(t + h) + sapma * persistence^k + eğilim * (sönümlü toplam),
+  k = h / step. Sapma zamanla tabana döner, eğilim sönümlenir.
+
+Eğitim artımlıdır: her ölçüm turu update() ile tüm sensörler için tek
+vektörel adımda işlenir. Geçmişten toplu eğitim (fit / fit_history) ve
+geriye dönük değerlendirme (backtest) de aynı vektörel adımı kullanır.
+
+Örnek:
+    forecaster = CongestionForecaster()
+    forecaster.fit_history(history, sensor_ids, start, end)
+    service = TrafficService(repo, SensorStore(), forecaster=forecaster,
+                             route_engine=EmergencyUnit.route_engine, forecast_horizon=600)
+    service.optimize_light_timing("TL-404", "Normal", sensor_id="TRF-99")
+    # Her ölçüm turundan sonra (forecast_interval'de bir) rota motoru da tahminle beslenir
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .implementations import CRITICAL_DENSITY_THRESHOLD, NORMAL_DENSITY_THRESHOLD
+from .sensor_store import DENSITY_LABELS
+
+WEEK = 7 * 86400
+# Işık zamanlaması için bakılan tahmin ufukları (sn)
+DEFAULT_HORIZONS = (300, 600, 900, 1200, 1500, 1800)
+
+
+class CongestionForecaster:
+    """
+    Args:
+        step: Mevsimsel dilim genişliği (sn); season'u tam bölmeli.
+        season: Mevsim uzunluğu (varsayılan bir hafta).
+        alpha: Sapma düzeyi için düzeltme katsayısı (step başına).
+        beta: Eğilim için düzeltme katsayısı.
+        gamma: Mevsimsel taban için öğrenme katsayısı; dilim 1/gamma okuma
+            görene kadar taban basit ortalamadır (ilk haftalarda hızlı öğrenme).
+        phi: Eğilim sönümü (step başına).
+        persistence: Sapmanın tabana dönüş hızı (step başına kalan oran).
+        capacity: Başlangıç sensör kapasitesi (diziler gerektikçe büyür).
+    """
+
+    def __init__(self, step: int = 900, season: int = WEEK, alpha: float = 0.8, beta: float = 0.1,
+                 gamma: float = 0.1, phi: float = 0.8, persistence: float = 0.8, capacity: int = 1024):
+        if season % step:
+            raise ValueError("season, step'in tam katı olmalı.")
+        self.step = step
+        self.season = season
+        self.slots = season // step
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.phi = phi
+        self.persistence = persistence
+        capacity = max(capacity, 1)
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        # Görülmemiş dilimler NaN; float32 ile 10 bin sensörlük haftalık taban ~27 MB
+        self._baseline = np.full((capacity, self.slots), np.nan, dtype=np.float32)
+        self._seen = np.zeros((capacity, self.slots), dtype=np.uint16)
+        self._level = np.zeros(capacity)
+        self._trend = np.zeros(capacity)
+        self._last_time = np.full(capacity, np.nan)
+        self._observations = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, sensor_id):
+        return sensor_id in self._index
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    # --- KAYIT ---
+
+    def _grow(self, needed: int):
+        capacity = len(self._level)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        baseline = np.full((capacity, self.slots), np.nan, dtype=np.float32)
+        baseline[:len(self._baseline)] = self._baseline
+        self._baseline = baseline
+        seen = np.zeros((capacity, self.slots), dtype=np.uint16)
+        seen[:len(self._seen)] = self._seen
+        self._seen = seen
+        self._level = np.resize(self._level, capacity)
+        self._trend = np.resize(self._trend, capacity)
+        last_time = np.full(capacity, np.nan)
+        last_time[:len(self._last_time)] = self._last_time
+        self._last_time = last_time
+        self._observations = np.resize(self._observations, capacity)
+
+    def rows_for(self, sensor_ids: Iterable[str]) -> np.ndarray:
+        """Kimlikleri satır indekslerine çevirir (bilinmeyenler kaydedilir)."""
+        rows = []
+        for sensor_id in sensor_ids:
+            row = self._index.get(sensor_id)
+            if row is None:
+                row = self._index[sensor_id] = len(self._ids)
+                self._ids.append(sensor_id)
+                self._grow(row + 1)
+                self._level[row] = self._trend[row] = 0.0
+                self._observations[row] = 0
+            rows.append(row)
+        return np.asarray(rows, dtype=np.int64)
+
+    # --- EĞİTİM ---
+
+    def _slot(self, times: np.ndarray) -> np.ndarray:
+        return (np.floor(times).astype(np.int64) % self.season) // self.step
+
+    def _baseline_at(self, rows: np.ndarray, times: np.ndarray) -> np.ndarray:
+        """Dilim merkezleri arasında doğrusal ara değerli taban (bir uç NaN ise diğeri)."""
+        position = (times % self.season) / self.step - 0.5
+        lower = np.floor(position)
+        weight = position - lower
+        first = self._baseline[rows, lower.astype(np.int64) % self.slots]
+        second = self._baseline[rows, (lower.astype(np.int64) + 1) % self.slots]
+        first = np.where(np.isnan(first), second, first)
+        second = np.where(np.isnan(second), first, second)
+        return first * (1 - weight) + second * weight
+
+    def update(self, sensor_ids: Sequence[str], counts: Sequence[float],
+               timestamps: Union[float, Sequence[float]]) -> int:
+        """
+        Bir ölçüm turunu modele ekler (SensorStore.ingest ile aynı imza).
+        Turdaki okumalar tek vektörel adımda işlenir; aynı sensör turda birden
+        çok kez geçiyorsa son okuma kullanılır.
+        """
+        rows = self.rows_for(sensor_ids)
+        counts = np.asarray(counts, dtype=np.float64)
+        if rows.shape != counts.shape:
+            raise ValueError("Kimlik ve araç sayısı dizileri aynı uzunlukta olmalı.")
+        times = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), rows.shape)
+        return self.update_rows(rows, counts, times)
+
+    def update_rows(self, rows: np.ndarray, counts: np.ndarray, times: np.ndarray) -> int:
+        """Satır indeksleri çözülmüş okumaları işler; NaN sayılar (eksik okuma) atlanır."""
+        keep = ~np.isnan(counts)
+        rows, counts, times = rows[keep], counts[keep], times[keep]
+        if not rows.size:
+            return 0
+        # Tekrarlanan satırlarda sonuncu kalsın
+        rows, last = np.unique(rows[::-1], return_index=True)
+        counts, times = counts[::-1][last], times[::-1][last]
+
+        slots = self._slot(times)
+        base = self._baseline[rows, slots].astype(np.float64)
+        seen = self._seen[rows, slots]
+        expected = self._baseline_at(rows, times).astype(np.float64)
+        # Dilim hiç görülmediyse okumanın kendisi taban kabul edilir
+        expected = np.where(np.isnan(expected), counts, expected)
+        deviation = counts - expected
+
+        level, trend = self._level[rows], self._trend[rows]
+        first = self._observations[rows] == 0
+        steps = np.where(first, 1.0, np.clip((times - self._last_time[rows]) / self.step, 1e-3, 96.0))
+        # Düzensiz aralıklar: step başına katsayılar geçen süreye göre ölçeklenir
+        alpha = 1 - (1 - self.alpha) ** steps
+        damped = self.phi * (1 - self.phi ** steps) / (1 - self.phi)
+        projected = level * self.persistence ** steps + trend * damped
+        new_level = np.where(first, deviation, alpha * deviation + (1 - alpha) * projected)
+        new_trend = np.where(first, 0.0, self.beta * (new_level - level) / steps + (1 - self.beta) * trend
+                             * self.phi ** steps)
+
+        self._level[rows] = new_level
+        self._trend[rows] = new_trend
+        rate = np.maximum(1.0 / (seen + 1.0), self.gamma)
+        self._baseline[rows, slots] = np.where(seen == 0, counts, base + rate * (counts - base))
+        self._seen[rows, slots] = np.minimum(seen + 1, np.iinfo(np.uint16).max)
+        self._last_time[rows] = np.fmax(self._last_time[rows], times)
+        self._observations[rows] += 1
+        return int(rows.size)
+
+    def fit(self, times: Sequence[float], counts: np.ndarray, sensor_ids: Sequence[str]) -> int:
+        """
+        Zaman sıralı bir okuma matrisinden toplu eğitim.
+
+        Args:
+            times: T uzunluğunda epoch zamanları.
+            counts: (T, N) araç sayıları; eksik okumalar NaN.
+            sensor_ids: N sensör kimliği (sütun sırası).
+        Returns:
+            int: İşlenen okuma sayısı.
+        """
+        rows = self.rows_for(sensor_ids)
+        counts = np.asarray(counts, dtype=np.float64)
+        processed = 0
+        for time_, row_counts in zip(np.asarray(times, dtype=np.float64), counts):
+            processed += self.update_rows(rows, row_counts, np.full(len(rows), time_))
+        return processed
+
+    def fit_history(self, history, sensor_ids: Sequence[str], start: float, end: Optional[float] = None) -> int:
+        """
+        TimeSeriesStore geçmişinden eğitir. Okumalar step (veya en yakın ince
+        özet) çözünürlüğündeki kova ortalamalarına indirgenir.
+        """
+        from .timeseries import RESOLUTIONS
+        resolution = max([r for r in RESOLUTIONS if self.step % r == 0] or [RESOLUTIONS[0]])
+        series = [history.downsample(start, end, resolution, element_id=sensor_id) for sensor_id in sensor_ids]
+        times = np.unique(np.concatenate([rows["time"] for rows in series] or [np.empty(0)]))
+        matrix = np.full((len(times), len(sensor_ids)), np.nan)
+        for column, rows in enumerate(series):
+            matrix[np.searchsorted(times, rows["time"]), column] = rows["mean"]
+        # Kova ortası, okumaların ortalama zamanıdır
+        return self.fit(times + resolution / 2, matrix, sensor_ids)
+
+    # --- TAHMİN ---
+
+    def forecast(self, horizons: Sequence[float] = DEFAULT_HORIZONS,
+                 sensor_ids: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Sensörlerin son okumalarından horizons saniye sonrası için araç sayısı tahmini.
+
+        Returns:
+            np.ndarray: (sensör, ufuk) şekilli tahminler; okuması olmayan sensörler NaN.
+        """
+        rows = (np.arange(len(self._ids)) if sensor_ids is None
+                else np.asarray([self._index.get(s, -1) for s in sensor_ids], dtype=np.int64))
+        known = rows >= 0
+        known[known] = self._observations[rows[known]] > 0
+        result = np.full((len(rows), len(horizons)), np.nan)
+        rows = rows[known]
+        if not rows.size:
+            return result
+        horizons = np.asarray(horizons, dtype=np.float64)
+        last = self._last_time[rows]
+        # Okumanın üzerinden geçen süre de ufka eklenir (tahmin her zaman son okumadan yapılır)
+        times = last[:, None] + horizons[None, :]
+        steps = horizons[None, :] / self.step
+        base = self._baseline_at(np.repeat(rows, len(horizons)), times.ravel()).reshape(times.shape)
+        current = self._baseline_at(rows, last)
+        base = np.where(np.isnan(base), current[:, None], base)
+        damped = self.phi * (1 - self.phi ** steps) / (1 - self.phi)
+        deviation = self._level[rows, None] * self.persistence ** steps + self._trend[rows, None] * damped
+        result[known] = np.maximum(base + deviation, 0.0)
+        return result
+
+    def predict(self, sensor_id: str, horizon: float = 900) -> Optional[float]:
+        """Tek sensör için horizon saniye sonrası tahmini (bilinmiyorsa None)."""
+        value = self.forecast([horizon], [sensor_id])[0, 0]
+        return None if np.isnan(value) else float(value)
+
+    def forecast_dict(self, horizon: float = 900) -> Dict[str, float]:
+        """Okuması olan tüm sensörler için {kimlik: tahmin}."""
+        values = self.forecast([horizon])[:, 0]
+        known = ~np.isnan(values)
+        return dict(zip(np.asarray(self._ids, dtype=object)[known].tolist(), values[known].tolist()))
+
+    @staticmethod
+    def density_codes(counts: np.ndarray) -> np.ndarray:
+        """Araç sayılarını 0/1/2 (Düşük/Normal/Kritik) kodlarına çevirir."""
+        return ((counts > NORMAL_DENSITY_THRESHOLD).astype(np.int8) + (counts > CRITICAL_DENSITY_THRESHOLD))
+
+    def forecast_labels(self, horizons: Sequence[float] = DEFAULT_HORIZONS) -> Dict[str, str]:
+        """Her sensör için ufuklar boyunca beklenen en kötü yoğunluk etiketi."""
+        predicted = self.forecast(horizons)
+        # Okuması olmayan sensörlerin tüm ufukları NaN'dır
+        known = ~np.isnan(predicted[:, 0])
+        labels = DENSITY_LABELS[self.density_codes(predicted[known].max(axis=1))]
+        return dict(zip(np.asarray(self._ids, dtype=object)[known].tolist(), labels.tolist()))
+
+    def forecast_label(self, sensor_id: str, horizons: Sequence[float] = DEFAULT_HORIZONS) -> Optional[str]:
+        values = self.forecast(horizons, [sensor_id])[0]
+        if np.isnan(values[0]):
+            return None
+        return str(DENSITY_LABELS[self.density_codes(values.max())])
+
+    def feed_route_engine(self, engine, horizon: float = 600) -> bool:
+        """
+        Rota motorunun (RouteEngine.update_densities) kenar yoğunluklarını
+        horizon saniye sonraki tahminlerle günceller: ETA, birimin yolda
+        olacağı andaki trafiğe göre hesaplanır.
+        """
+        return engine.update_densities({sensor: round(count) for sensor, count in self.forecast_dict(horizon).items()})
+
+    # --- DEĞERLENDİRME ---
+
+    def backtest(self, times: Sequence[float], counts: np.ndarray, sensor_ids: Sequence[str],
+                 horizon: float = 900) -> Dict[str, float]:
+        """
+        Okuma matrisi üzerinde ileriye doğru (walk-forward) değerlendirme: her
+        adımda önce horizon sonrası tahmin edilir, sonra okuma modele eklenir.
+        Zaman aralığı düzenli olmalı ve horizon bu aralığın katı olmalı.
+
+        Returns:
+            dict: model ve "son okuma aynen sürer" (persistence) tahmininin
+            ortalama mutlak hataları (mae, naive_mae) ve karşılaştırılan tahmin sayısı.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        counts = np.asarray(counts, dtype=np.float64)
+        interval = times[1] - times[0]
+        lag = int(round(horizon / interval))
+        if lag < 1 or not np.allclose(np.diff(times), interval):
+            raise ValueError("Düzenli aralıklı zamanlar ve aralığın katı bir ufuk gerekli.")
+        rows = self.rows_for(sensor_ids)
+        predictions = np.full(counts.shape, np.nan)
+        for i, (time_, row_counts) in enumerate(zip(times, counts)):
+            self.update_rows(rows, row_counts, np.full(len(rows), time_))
+            if i + lag < len(times):
+                predictions[i + lag] = self.forecast([horizon], sensor_ids)[:, 0]
+        naive = np.full(counts.shape, np.nan)
+        naive[lag:] = counts[:-lag]
+        valid = ~np.isnan(predictions) & ~np.isnan(counts) & ~np.isnan(naive)
+        return {
+            "mae": float(np.abs(predictions - counts)[valid].mean()) if valid.any() else float("nan"),
+            "naive_mae": float(np.abs(naive - counts)[valid].mean()) if valid.any() else float("nan"),
+            "samples": int(valid.sum()),
+        }
@@ -4,23 +4,55 @@ Bu dosya, somut trafik bileşenlerini ve trafik yönetimi için gerekli servisle
 Tüm sınıflar 'TrafficElement' base class'ından türetilmiştir. [cite: 31, 32]
 """
 
-from .base import TrafficElement
+from .base import TrafficElement, observed_field
+from app.core.event_bus import DensityChanged
+from app.core.metrics import REGISTRY
 from dataclasses import dataclass
 from datetime import datetime
-import random
+import time
+from typing import Optional
+
+# Yoğunluk sınıflandırma eşikleri (araç sayısı)
+CRITICAL_DENSITY_THRESHOLD = 80
+NORMAL_DENSITY_THRESHOLD = 40
+# Rota motoruna verilen tahminin en uzak ufku (sn); daha ötesi ETA için anlamsızdır
+MAX_ROUTE_FORECAST_HORIZON = 1800
+# Etiketlerin kötülük sırası (tahmin ile anlık durumu karşılaştırmak için)
+DENSITY_RANK = {"Düşük": 0, "Normal": 1, "Kritik": 2}
+DENSITY_BY_RANK = tuple(DENSITY_RANK)
+
+# Servis ölçümleri (bkz. app/core/metrics.py)
+DENSITY_LATENCY = REGISTRY.histogram("traffic_density_seconds", "Tekil kavşak yoğunluğu hesaplama süresi")
+INGEST_LATENCY = REGISTRY.histogram("traffic_ingest_seconds", "Toplu sensör okuması yazma süresi")
+CLASSIFY_LATENCY = REGISTRY.histogram("traffic_classify_seconds", "Tüm kavşakların toplu sınıflandırma süresi")
+REPLAN_LATENCY = REGISTRY.histogram("traffic_replan_seconds", "Koridor sinyal planlama süresi")
+# Tur başına tek artırım: etiket yazma yoludur (toplu depo / nesneler), sensör değil
+SENSOR_UPDATES = REGISTRY.rate_meter("traffic_sensor_update_rate", "Sensör okuma hızı (okuma/sn)",
+                                     label="path")
 
 # --- 1. ENTITIES / MODELS --- [cite: 37]
-@dataclass
+@dataclass(slots=True)
 class TrafficViolation:
     """
     Trafik ihlallerini temsil eden veri sınıfı. [cite: 38]
     Hız kameraları tarafından tespit edilen verileri standartlaştırır.
+    Milyonlarca kaydın bellekte tutulabilmesi için __slots__ kullanır ve
+    zamanı datetime nesnesi yerine epoch saniyesi olarak saklar.
     """
     violation_id: str
     vehicle_plate: str
     detected_speed: float
     limit: float
-    timestamp: datetime
+    timestamp: float
+    camera_id: str = ""
+
+    @property
+    def detected_at(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp)
+
+    @property
+    def excess_speed(self) -> float:
+        return self.detected_speed - self.limit
 
 # --- 2. SUBCLASSES (Inheritance & Polymorphism) --- [cite: 30]
 
@@ -29,11 +61,19 @@ class TrafficLight(TrafficElement):
     Trafik Işığı bileşeni. [cite: 78]
     Işık renk değişimi ve zamanlayıcı yönetimini sağlar.
     """
+    __slots__ = ("_current_color", "_timer", "_offset")
+
+    # Değişiklikler gözlemcilere (ör. kalıcı depo) bildirilir
+    current_color = observed_field("current_color")
+    timer = observed_field("timer")
+    offset = observed_field("offset")
+
     def __init__(self, element_id: str, location: str, current_color: str = "Red"):
         # Base class constructor'ını çağırıyoruz [cite: 13, 75]
         super().__init__(element_id, location)
         self.current_color = current_color
         self.timer = 30  # Saniye cinsinden varsayılan süre
+        self.offset = 0  # Koridor yeşil dalgası için döngü içi faz kayması (sn)
 
     def perform_action(self):
         """
@@ -60,11 +100,31 @@ class TrafficLight(TrafficElement):
             "last_update": datetime.now().strftime("%H:%M:%S")
         }
 
+    def to_record(self) -> dict:
+        record = super().to_record()
+        record["current_color"] = self.current_color
+        record["timer"] = self.timer
+        record["offset"] = self.offset
+        return record
+
+    @classmethod
+    def from_record(cls, record: dict):
+        light = super().from_record(record)
+        light.current_color = record["current_color"]
+        light.timer = record["timer"]
+        light.offset = record.get("offset", 0)
+        return light
+
 class SpeedCamera(TrafficElement):
     """
     Hız Kamerası bileşeni. [cite: 79]
     Araç hızlarını takip eder ve limit aşımında ihlal kaydı oluşturur.
     """
+    __slots__ = ("_speed_limit", "_violation_count")
+
+    speed_limit = observed_field("speed_limit")
+    violation_count = observed_field("violation_count")
+
     def __init__(self, element_id: str, location: str, speed_limit: float = 70.0):
         super().__init__(element_id, location)
         self.speed_limit = speed_limit
@@ -72,12 +132,19 @@ class SpeedCamera(TrafficElement):
 
     def perform_action(self):
         """Hız ölçümü yapar ve ihlal varsa tespit eder. [cite: 85]"""
-        simulated_speed = random.uniform(40.0, 110.0)
-        if simulated_speed > self.speed_limit:
-            self.violation_count += 1
+        simulated_speed = self.rng.uniform(40.0, 110.0)
+        if self.check_reading("BILINMIYOR", simulated_speed, self.clock()):
             return f"ALARM: {self.location} konumunda {simulated_speed:.2f} km/s hız tespiti!"
         return f"Normal Akış: {simulated_speed:.2f} km/s."
 
+    def check_reading(self, plate: str, speed: float, timestamp: float) -> Optional[TrafficViolation]:
+        """Tek bir ölçümü değerlendirir; limit aşıldıysa ihlal kaydı üretir."""
+        if speed <= self.speed_limit:
+            return None
+        self.violation_count += 1
+        return TrafficViolation(f"{self.element_id}-{self.violation_count}", plate,
+                                speed, self.speed_limit, timestamp, self.element_id)
+
     def get_status_report(self) -> dict:
         return {
             "type": "SpeedCamera",
@@ -86,18 +153,35 @@ class SpeedCamera(TrafficElement):
             "total_violations": self.violation_count
         }
 
+    def to_record(self) -> dict:
+        record = super().to_record()
+        record["speed_limit"] = self.speed_limit
+        record["violation_count"] = self.violation_count
+        return record
+
+    @classmethod
+    def from_record(cls, record: dict):
+        camera = super().from_record(record)
+        camera.speed_limit = record["speed_limit"]
+        camera.violation_count = record["violation_count"]
+        return camera
+
 class IntersectionSensor(TrafficElement):
     """
     Kavşak Yoğunluk Sensörü. [cite: 80]
     Anlık araç sayısını ölçerek trafik yoğunluğunu belirler.
     """
+    __slots__ = ("_vehicle_count",)
+
+    vehicle_count = observed_field("vehicle_count")
+
     def __init__(self, element_id: str, location: str):
         super().__init__(element_id, location)
         self.vehicle_count = 0
 
     def perform_action(self):
         """Araç sayısını günceller. [cite: 94]"""
-        self.vehicle_count = random.randint(0, 100)
+        self.vehicle_count = self.rng.randint(0, 100)
         return f"{self.location} sensörü {self.vehicle_count} araç algıladı."
 
     def get_status_report(self) -> dict:
@@ -107,34 +191,237 @@ class IntersectionSensor(TrafficElement):
             "vehicle_count": self.vehicle_count
         }
 
+    def to_record(self) -> dict:
+        record = super().to_record()
+        record["vehicle_count"] = self.vehicle_count
+        return record
+
+    @classmethod
+    def from_record(cls, record: dict):
+        sensor = super().from_record(record)
+        sensor.vehicle_count = record["vehicle_count"]
+        return sensor
+
 # --- 3. SERVICE LAYER --- [cite: 40]
 
 class TrafficService:
     """
     Trafik modülünün iş kurallarını yöneten ana servis. [cite: 41, 82]
     """
-    def __init__(self, repository):
+    def __init__(self, repository, sensor_store=None, history=None, forecaster=None, bus=None, preemption=None,
+                 route_engine=None, forecast_horizon: float = 600, forecast_interval: float = 60.0):
         self.repository = repository
+        # Toplu okuma yolu için isteğe bağlı SensorStore (NumPy gerektirir)
+        self.sensor_store = sensor_store
+        # Okuma geçmişi için isteğe bağlı TimeSeriesStore (bkz. timeseries.py)
+        self.history = history
+        # Yoğunluk tahmini için isteğe bağlı CongestionForecaster (bkz. forecast.py)
+        self.forecaster = forecaster
+        # Yoğunluk değişimleri için isteğe bağlı EventBus (bkz. app/core/event_bus.py)
+        self.bus = bus
+        # Tekil hesaplama yolunda son yayınlanan etiketler (sensör -> etiket)
+        self._published_density = {}
+        # Acil durum aracı önceliği için isteğe bağlı PreemptionController (bkz. preemption.py);
+        # öncelikteki ışıkların yeni süreleri öncelik bitince uygulanır
+        self.preemption = preemption
+        # Tahmin modeli varsa RouteEngine kenar yoğunlukları forecast_interval saniyede bir
+        # forecast_horizon sonrasının tahminiyle güncellenir (bkz. CongestionForecaster.feed_route_engine)
+        if not 0 < forecast_horizon <= MAX_ROUTE_FORECAST_HORIZON:
+            raise ValueError(f"Tahmin ufku 0-{MAX_ROUTE_FORECAST_HORIZON} sn arasında olmalı.")
+        self.route_engine = route_engine
+        self.forecast_horizon = forecast_horizon
+        self.forecast_interval = forecast_interval
+        self._route_fed_at = None
+
+    @property
+    def feeds_route_forecast(self) -> bool:
+        """RouteEngine ağırlıkları anlık okumalar yerine tahminlerden mi besleniyor?"""
+        return self.route_engine is not None and self.forecaster is not None
 
+    @DENSITY_LATENCY.timed
     def calculate_intersection_density(self, sensor_id: str):
-        """Kavşaktaki araç sayısına göre yoğunluk durumu belirler. [cite: 83]"""
+        """
+        Kavşaktaki araç sayısına göre yoğunluk durumu belirler. [cite: 83]
+        SensorStore bağlıysa sayının asıl kaynağı odur: ingest_sensor_tick yalnızca
+        depoya yazar, sensör nesneleri gerekirse SensorStore.apply_to ile eşitlenir.
+        """
         sensor = self.repository.get_by_id(sensor_id)
         if sensor and isinstance(sensor, IntersectionSensor):
-            if sensor.vehicle_count > 80:
-                return "Kritik"
-            elif sensor.vehicle_count > 40:
-                return "Normal"
-            else:
-                return "Düşük"
+            count = self.sensor_store.get_count(sensor_id) if self.sensor_store is not None else None
+            return self._classify_sensor(sensor, count=count)
         return "Bilinmiyor"
 
-    def optimize_light_timing(self, light_id: str, density: str):
-        """Yoğunluk durumuna göre ışık sürelerini ayarlar. [cite: 84]"""
+    def _classify_sensor(self, sensor, timestamp: Optional[float] = None, count: Optional[int] = None) -> str:
+        """Sensörün etiketini belirler; veriyolu tanımlıysa etiket değiştiğinde DensityChanged yayınlar."""
+        if count is None:
+            count = sensor.vehicle_count
+        if count > CRITICAL_DENSITY_THRESHOLD:
+            density = "Kritik"
+        elif count > NORMAL_DENSITY_THRESHOLD:
+            density = "Normal"
+        else:
+            density = "Düşük"
+        if self.bus is not None:
+            previous = self._published_density.get(sensor.element_id)
+            if previous != density:
+                self._published_density[sensor.element_id] = density
+                self.bus.publish(DensityChanged(sensor.element_id, sensor.location, count,
+                                                density, previous, time.time() if timestamp is None else timestamp))
+        return density
+
+    def update_sensor_counts(self, sensor_ids, counts, timestamps=None) -> int:
+        """
+        Sütunsal depo olmadan okumaları doğrudan sensör nesnelerine yazar.
+        Veriyolu tanımlıysa etiketi değişen sensörler için DensityChanged yayınlanır.
+        Returns: Güncellenen sensör sayısı.
+        """
+        get = self.repository.get_by_id
+        written = 0
+        for i, (sensor_id, count) in enumerate(zip(sensor_ids, counts)):
+            sensor = get(sensor_id)
+            if isinstance(sensor, IntersectionSensor):
+                sensor.vehicle_count = count
+                if self.bus is not None:
+                    self._classify_sensor(sensor, None if timestamps is None else timestamps[i])
+                written += 1
+        SENSOR_UPDATES.mark("objects", written)
+        return written
+
+    @INGEST_LATENCY.timed
+    def ingest_sensor_tick(self, sensor_ids, counts, timestamps=None) -> int:
+        """
+        Bir ölçüm turundaki tüm sensör okumalarını sütunsal depoya yazar.
+        Veriyolu tanımlıysa etiketi değişen sensörler için DensityChanged yayınlanır.
+        """
+        store = self._require_store()
+        if self.bus is None:
+            written = store.ingest(sensor_ids, counts, timestamps)
+        else:
+            rows = store.rows_for(sensor_ids)
+            previous = store.density_codes(rows)
+            written = store.ingest_rows(rows, counts, timestamps)
+            self._publish_density_changes(store, rows, previous)
+        self.record_readings(sensor_ids, counts, timestamps)
+        SENSOR_UPDATES.mark("store", len(sensor_ids))
+        return written
+
+    def record_readings(self, sensor_ids, counts, timestamps=None):
+        """Okumaları (varsa) geçmiş deposuna yazar ve tahmin modelini artımlı eğitir."""
+        if self.history is not None:
+            self.history.ingest(sensor_ids, counts, timestamps)
+        if self.forecaster is not None:
+            self.forecaster.update(sensor_ids, counts, time.time() if timestamps is None else timestamps)
+            if self.route_engine is not None:
+                self.feed_route_forecast()
+
+    def feed_route_forecast(self, force: bool = False) -> bool:
+        """
+        RouteEngine'i forecast_horizon sonrasının tahminleriyle günceller; son
+        beslemeden bu yana forecast_interval geçmediyse (force verilmedikçe) atlanır.
+        Returns: Yol ağırlıkları değiştiyse True.
+        """
+        now = time.monotonic()
+        if not force and self._route_fed_at is not None and now - self._route_fed_at < self.forecast_interval:
+            return False
+        self._route_fed_at = now
+        return self.forecaster.feed_route_engine(self.route_engine, self.forecast_horizon)
+
+    def _publish_density_changes(self, store, rows, previous):
+        current = store.density_codes(rows)
+        changed = (current != previous).nonzero()[0]
+        if not changed.size:
+            return
+        get = self.repository.get_by_id
+        ids = store.ids
+        counts = store.counts
+        timestamps = store.timestamps
+        events = []
+        for i in changed.tolist():
+            row = rows[i]
+            sensor_id = ids[row]
+            sensor = get(sensor_id)
+            events.append(DensityChanged(sensor_id, sensor.location if sensor is not None else None,
+                                         int(counts[row]), DENSITY_BY_RANK[current[i]],
+                                         DENSITY_BY_RANK[previous[i]], float(timestamps[row])))
+        self.bus.publish_many(events)
+
+    @CLASSIFY_LATENCY.timed
+    def calculate_all_densities(self) -> dict:
+        """Depodaki tüm kavşakların yoğunluk durumunu tek çağrıda hesaplar."""
+        return self._require_store().classify_dict()
+
+    def record_history(self, timestamp: Optional[float] = None) -> int:
+        """Depodaki sensörlerin araç sayılarını ve kameraların ihlal sayılarını geçmişe yazar."""
+        if self.history is None:
+            raise ValueError("Geçmiş için TimeSeriesStore tanımlanmalı.")
+        elements = self.repository.find_all_by_type(IntersectionSensor) + self.repository.find_all_by_type(SpeedCamera)
+        return self.history.record_elements(elements, timestamp)
+
+    def average_density(self, location: str, start: Optional[float] = None, end: Optional[float] = None):
+        """
+        Bir konumdaki sensörlerin aralıktaki ortalama araç sayısı ve yoğunluk etiketi.
+        Aralık verilmezse son 7 gün kullanılır.
+        """
+        if self.history is None:
+            raise ValueError("Geçmiş için TimeSeriesStore tanımlanmalı.")
+        end = time.time() if end is None else end
+        start = end - 7 * 86400 if start is None else start
+        average = self.history.average(start, end, location=location)
+        if average is None:
+            return None, "Bilinmiyor"
+        if average > CRITICAL_DENSITY_THRESHOLD:
+            return average, "Kritik"
+        if average > NORMAL_DENSITY_THRESHOLD:
+            return average, "Normal"
+        return average, "Düşük"
+
+    def _require_store(self):
+        if self.sensor_store is None:
+            raise ValueError("Toplu işlem için SensorStore tanımlanmalı.")
+        return self.sensor_store
+
+    @REPLAN_LATENCY.timed
+    def replan_corridors(self, optimizer) -> int:
+        """
+        Koridor optimizasyonunu güncel sensör verileriyle çalıştırır.
+        Yalnızca yoğunluğu değişen koridorlardaki ışıklar güncellenir.
+
+        Returns:
+            int: Süresi güncellenen ışık sayısı.
+        """
+        if self.sensor_store is not None:
+            densities = dict(zip(self.sensor_store.ids.tolist(), self.sensor_store.counts.tolist()))
+        else:
+            densities = {s.element_id: s.vehicle_count
+                         for s in self.repository.find_all_by_type(IntersectionSensor)}
+        rows = optimizer.update(densities)
+        return optimizer.apply(self.repository, rows, self.preemption)
+
+    def optimize_light_timing(self, light_id: str, density: str, sensor_id: Optional[str] = None):
+        """
+        Yoğunluk durumuna göre ışık sürelerini ayarlar. [cite: 84]
+        sensor_id verilirse ve tahmin modeli tanımlıysa, kavşağın önümüzdeki
+        30 dk içinde beklenen en kötü durumu anlık durumdan kötüyse o kullanılır.
+        """
         light = self.repository.get_by_id(light_id)
         if light and isinstance(light, TrafficLight):
-            if density == "Kritik":
-                light.timer = 60
+            forecast = self.forecast_density(sensor_id) if sensor_id is not None else None
+            if forecast is not None and DENSITY_RANK.get(forecast, 0) > DENSITY_RANK.get(density, 0):
+                density = forecast
+            timer = 60 if density == "Kritik" else 30
+            if self.preemption is not None and self.preemption.apply_timer(light_id, timer):
+                message = f"{light_id} acil durum önceliğinde; yeşil süre {timer} sn öncelik bitince uygulanacak."
             else:
-                light.timer = 30
-            return f"{light_id} için yeşil süre {light.timer} sn olarak güncellendi."
-        return "Işık bulunamadı."
\ No newline at end of file
+                if self.preemption is None:
+                    light.timer = timer
+                message = f"{light_id} için yeşil süre {timer} sn olarak güncellendi."
+            if forecast is not None:
+                message += f" (Tahmin: {forecast})"
+            return message
+        return "Işık bulunamadı."
+
+    def forecast_density(self, sensor_id: str) -> Optional[str]:
+        """Kavşağın 5-30 dk içinde beklenen en kötü yoğunluk etiketi (tahmin yoksa None)."""
+        if self.forecaster is None:
+            return None
+        return self.forecaster.forecast_label(sensor_id)
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""
+TRAFİK MODÜLÜ - ACİL DURUM ARAÇLARI İÇİN IŞIK ÖNCELİĞİ (SIGNAL PREEMPTION)
+
+Gönderilen ambulans/itfaiye aracının rotası (düğüm, tahmini varış) listesi
+olarak verilir; rota üzerindeki her TrafficLight için aracın varışından
+`lead` sn önce başlayıp `clearance` sn sonra biten bir yeşil penceresi
+planlanır. Pencere bitince ışık önceki rengine ve süresine döner. Aynı ışığı
+birden çok araç tutuyorsa sonuncusu geçene kadar yeşil kalır.
+
+Hızlı yol:
+- Düğüm -> yer adı eşlemesi bir kez verilir (index_locations); düğümün ışıkları
+  ilk planlamada deponun konum indeksinden okunup önbelleğe alınır. Depoya ışık
+  eklenince ya da silinince (repository.revision) önbellek boşaltılır. Rota
+  başına maliyet rotadaki düğüm sayısı kadar sözlük erişimidir. bind ile
+  düğümün ışıkları doğrudan da verilebilir.
+- Pencere başlangıç/bitişleri tek bir zaman yığınında (heap) tutulur;
+  advance() yalnızca vakti gelen adımları işler. Yeniden planlanan ya da
+  bırakılan aracın eski adımları silinmez, plan numarasıyla atlanır.
+
+Işık eşlemesi yol ağı düğümünün yer adı ile ışığın location alanı üzerinden
+yapılır (büyük/küçük harf duyarsız). Bir kenarın (u -> v) ışığı varış düğümü
+v'deki kavşaktadır. Bu modül acil durum modülünü içe aktarmaz; rota ve ETA
+çağıran taraftan gelir (bkz. app/core/reactions.py).
+
+Denetleyici iş parçacığı güvenlidir: advance() olay döngüsünde çalışırken
+set_plan / apply_timer havuzdaki koridor planlamasından çağrılabilir.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .implementations import TrafficLight
+
+# Aynı anda vakti gelen adımlarda önce bitişler işlenir
+_END = 0
+_START = 1
+
+
+class PreemptionController:
+    """
+    Rota boyunca zamanlanmış yeşil öncelik pencereleri.
+
+    Args:
+        repository: TransportRepository.
+        lead: Tahmini varıştan kaç sn önce yeşile geçileceği.
+        clearance: Tahmini varıştan sonra yeşilin kaç sn daha tutulacağı (ETA hatası payı).
+        green_seconds: Öncelik süresince ışığın timer değeri.
+        clock: Şimdiki zamanı (epoch sn) veren fonksiyon.
+    """
+
+    def __init__(self, repository, lead: float = 20.0, clearance: float = 10.0, green_seconds: int = 60,
+                 clock: Callable[[], float] = time.time):
+        self.repository = repository
+        self.lead = lead
+        self.clearance = clearance
+        self.green_seconds = green_seconds
+        self.clock = clock
+        # düğüm -> yer adı (casefold) / bind ile doğrudan verilen ışıklar
+        self._node_locations: Dict[str, str] = {}
+        self._lights_by_node: Dict[str, Tuple[str, ...]] = {}
+        # yer adından okunan ışıklar; depo revizyonu değişince boşaltılır
+        self._located: Dict[str, Tuple[str, ...]] = {}
+        self._revision = None
+        # ışık -> [önceki renk, önceki süre]; ışık -> onu tutan araçlar
+        self._saved: Dict[str, list] = {}
+        self._holders: Dict[str, Set[str]] = {}
+        # araç -> rota penceresi açık ışıklar / hold ile varış yerinde tutulan ışıklar
+        self._granted: Dict[str, Set[str]] = {}
+        self._pinned: Dict[str, Set[str]] = {}
+        # araç -> geçerli plan numarası ve planlanan pencereler
+        self._generation: Dict[str, int] = {}
+        self._windows: Dict[str, List[Tuple[str, float, float]]] = {}
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._plans = itertools.count(1)
+        self._lock = threading.RLock()
+
+    # --- İNDEKS ---
+
+    def index_locations(self, node_locations: Dict[str, str]) -> int:
+        """
+        Düğüm -> yer adı eşlemesini (ör. RoadGraph.names) kaydeder; düğümün
+        ışıkları depodan o yer adıyla okunur (bkz. lights_at).
+        Returns: şu an ışığı olan düğüm sayısı.
+        """
+        with self._lock:
+            for node_id, location in node_locations.items():
+                self._node_locations[node_id] = location.casefold()
+                self._located.pop(node_id, None)
+        return sum(1 for node_id in node_locations if self.lights_at(node_id))
+
+    def bind(self, node_id: str, light_ids: Sequence[str]):
+        """Düğümün ışıklarını doğrudan tanımlar (boş liste eşlemeyi kaldırır)."""
+        with self._lock:
+            if light_ids:
+                self._lights_by_node[node_id] = tuple(light_ids)
+            else:
+                self._lights_by_node.pop(node_id, None)
+                self._node_locations.pop(node_id, None)
+                self._located.pop(node_id, None)
+
+    def lights_at(self, node_id: str) -> Tuple[str, ...]:
+        """Düğümdeki ışıklar; depo değiştiyse (revision) yer adından yeniden okunur."""
+        with self._lock:
+            lights = self._lights_by_node.get(node_id)
+            if lights is not None:
+                return lights
+            revision = self.repository.revision
+            if revision != self._revision:
+                self._located = {}
+                self._revision = revision
+            lights = self._located.get(node_id)
+            if lights is None:
+                location = self._node_locations.get(node_id)
+                if location is None:
+                    return ()
+                found = self.repository.find_all_by_location(location)
+                lights = self._located[node_id] = tuple(e.element_id for e in found if isinstance(e, TrafficLight))
+            return lights
+
+    # --- PLANLAMA ---
+
+    def preempt(self, vehicle_id: str, passages: Iterable[Tuple[str, float]], now: Optional[float] = None) -> int:
+        """
+        Aracın rotası için yeşil pencerelerini planlar; önceki planı iptal edilir.
+
+        Args:
+            passages: Rota sırasıyla (düğüm, tahmini varış epoch sn) çiftleri.
+        Returns:
+            int: Planlanan pencere sayısı (süresi geçmişler hariç).
+        """
+        with self._lock:
+            now = self.clock() if now is None else now
+            self._cancel_plan(vehicle_id)
+            generation = self._generation[vehicle_id] = next(self._plans)
+            lights_at = self.lights_at
+            heap = self._heap
+            seq = self._seq
+            lead, clearance = self.lead, self.clearance
+            windows = []
+            for node_id, arrival in passages:
+                lights = lights_at(node_id)
+                if not lights:
+                    continue
+                start, end = arrival - lead, arrival + clearance
+                if end <= now:
+                    continue
+                for light_id in lights:
+                    windows.append((light_id, start, end))
+                    heapq.heappush(heap, (start, _START, next(seq), vehicle_id, generation, light_id))
+                    heapq.heappush(heap, (end, _END, next(seq), vehicle_id, generation, light_id))
+            self._windows[vehicle_id] = windows
+            self.advance(now)
+            return len(windows)
+
+    def hold(self, vehicle_id: str, light_ids: Iterable[str]) -> int:
+        """Işıkları araç bırakılana (release) kadar yeşilde tutar (ör. olay yerindeki kavşak)."""
+        with self._lock:
+            pinned = self._pinned.setdefault(vehicle_id, set())
+            held = 0
+            for light_id in light_ids:
+                if light_id not in pinned and self._grant(vehicle_id, light_id):
+                    pinned.add(light_id)
+                    held += 1
+            return held
+
+    def release(self, vehicle_id: str) -> int:
+        """Aracın planını iptal eder ve tuttuğu ışıkları bırakır. Returns: normal plana dönen ışık sayısı."""
+        with self._lock:
+            restored = self._cancel_plan(vehicle_id)
+            for light_id in self._pinned.pop(vehicle_id, ()):
+                restored += self._ungrant(vehicle_id, light_id)
+            self._windows.pop(vehicle_id, None)
+            return restored
+
+    def _cancel_plan(self, vehicle_id: str) -> int:
+        # yığındaki eski adımlar plan numarası eşleşmediği için atlanır
+        self._generation.pop(vehicle_id, None)
+        restored = 0
+        pinned = self._pinned.get(vehicle_id, ())
+        for light_id in self._granted.pop(vehicle_id, ()):
+            if light_id not in pinned:
+                restored += self._ungrant(vehicle_id, light_id)
+        return restored
+
+    # --- ZAMAN ---
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Vakti gelen pencere başlangıç/bitişlerini uygular. Returns: uygulanan adım sayısı."""
+        with self._lock:
+            now = self.clock() if now is None else now
+            heap = self._heap
+            generation = self._generation
+            applied = 0
+            while heap and heap[0][0] <= now:
+                _, kind, _, vehicle_id, plan, light_id = heapq.heappop(heap)
+                if generation.get(vehicle_id) != plan:
+                    continue
+                granted = self._granted.setdefault(vehicle_id, set())
+                if kind == _START:
+                    if light_id not in granted and (light_id in self._pinned.get(vehicle_id, ())
+                                                    or self._grant(vehicle_id, light_id)):
+                        granted.add(light_id)
+                elif light_id in granted:
+                    granted.discard(light_id)
+                    if light_id not in self._pinned.get(vehicle_id, ()):
+                        self._ungrant(vehicle_id, light_id)
+                applied += 1
+            return applied
+
+    @property
+    def next_due(self) -> Optional[float]:
+        """Sıradaki adımın zamanı (iptal edilmiş adımlar da sayılabilir); yoksa None."""
+        return self._heap[0][0] if self._heap else None
+
+    # --- IŞIK DURUMU ---
+
+    def _grant(self, vehicle_id: str, light_id: str) -> bool:
+        holders = self._holders.get(light_id)
+        if holders is None:
+            light = self.repository.get_by_id(light_id)
+            if not isinstance(light, TrafficLight):
+                return False
+            self._saved[light_id] = [light.current_color, light.timer]
+            light.current_color = "Green"
+            light.timer = self.green_seconds
+            holders = self._holders[light_id] = set()
+        holders.add(vehicle_id)
+        return True
+
+    def _ungrant(self, vehicle_id: str, light_id: str) -> int:
+        holders = self._holders.get(light_id)
+        if holders is None:
+            return 0
+        holders.discard(vehicle_id)
+        if holders:
+            return 0
+        del self._holders[light_id]
+        color, timer = self._saved.pop(light_id)
+        light = self.repository.get_by_id(light_id)
+        if light is None:
+            return 0
+        light.current_color = color
+        light.timer = timer
+        return 1
+
+    def set_plan(self, light_id: str, timer: int) -> bool:
+        """
+        Öncelikteki ışığın normal süresini günceller (öncelik bitince uygulanır).
+        Returns: ışık öncelikteyse True; değilse çağıran süreyi doğrudan yazmalıdır.
+        """
+        with self._lock:
+            saved = self._saved.get(light_id)
+            if saved is None:
+                return False
+            saved[1] = timer
+            return True
+
+    def apply_timer(self, light_id: str, timer: int) -> bool:
+        """
+        Işığın yeşil süresini öncelik durumuyla tutarlı yazar: öncelikteyse süre
+        öncelik bitince uygulanır (True), değilse hemen ışığa yazılır (False).
+        Kontrol ve yazma tek kilit altındadır; arada pencere açılıp kapanamaz.
+        """
+        with self._lock:
+            if self.set_plan(light_id, timer):
+                return True
+            light = self.repository.get_by_id(light_id)
+            if isinstance(light, TrafficLight):
+                light.timer = timer
+            return False
+
+    def is_preempted(self, light_id: str) -> bool:
+        return light_id in self._saved
+
+    @property
+    def preempted_lights(self) -> List[str]:
+        with self._lock:
+            return list(self._saved)
+
+    @property
+    def vehicles(self) -> List[str]:
+        """Planı ya da tuttuğu ışığı olan araçlar."""
+        with self._lock:
+            return list(self._generation.keys() | self._pinned.keys())
+
+    def schedule(self, vehicle_id: str) -> List[Tuple[str, float, float]]:
+        """Aracın planlanmış (ışık, başlangıç, bitiş) pencereleri."""
+        with self._lock:
+            return list(self._windows.get(vehicle_id, ()))
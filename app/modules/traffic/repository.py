@@ -5,9 +5,88 @@ Bu dosya, trafik modülündeki tüm nesnelerin (ışıklar, kameralar, sensörle
 bellek üzerinde (in-memory) yönetildiği, sorgulandığı ve depolandığı katmandır.
 """
 
-from typing import List, Optional, Dict
+from typing import Iterable, Iterator, List, Optional, Dict, Union
 from app.modules.traffic.base import TrafficElement
-import datetime
+from app.modules.traffic.fleet import DeviceFleet
+from app.modules.traffic.storage import InMemoryBackend, SQLiteBackend, StorageBackend, element_from_record
+from app.core.event_log import EventCode, EventLog
+
+class _FleetElements:
+    """
+    element_id -> TrafficElement eşlemesi (repository'nin _elements sözlüğü yerine).
+    Bir DeviceFleet'in (ör. snapshot'tan eşlenmiş salt okunur filo) satırlarını
+    ilk erişimde nesneye dönüştürür. Eklenen, değişen ve silinen kayıtlar yalnızca
+    bellekte tutulur; filonun kendisine yazılmaz.
+    """
+
+    def __init__(self, fleet: DeviceFleet, adopt):
+        self.fleet = fleet
+        self._adopt = adopt          # üretilen nesneyi depoya bağlar (gözlemci)
+        self._live: Dict[str, TrafficElement] = {}
+        self._taken = set()          # filodan çözülmüş (üretilmiş veya silinmiş) kimlikler
+
+    def _load(self, element_id: str) -> Optional[TrafficElement]:
+        if element_id in self._taken:
+            return None
+        view = self.fleet.get(element_id)
+        if view is None:
+            return None
+        element = self._live[element_id] = view.to_element()
+        self._taken.add(element_id)
+        self._adopt(element)
+        return element
+
+    def get(self, element_id: str, default=None):
+        element = self._live.get(element_id)
+        if element is None:
+            element = self._load(element_id)
+        return default if element is None else element
+
+    def __getitem__(self, element_id: str) -> TrafficElement:
+        element = self.get(element_id)
+        if element is None:
+            raise KeyError(element_id)
+        return element
+
+    def __setitem__(self, element_id: str, element: TrafficElement):
+        # _put önce get ile eski kaydı ürettiği için filodaki kimlik zaten çözülmüştür
+        self._live[element_id] = element
+
+    def __delitem__(self, element_id: str):
+        del self._live[element_id]
+
+    def __contains__(self, element_id) -> bool:
+        return element_id in self._live or (element_id not in self._taken and element_id in self.fleet)
+
+    def __len__(self):
+        return len(self._live) + len(self.fleet) - len(self._taken)
+
+    def __iter__(self) -> Iterator[str]:
+        # Önce filo sırası, ardından sonradan eklenen kayıtlar
+        live, taken = self._live, self._taken
+        for element_id in self.fleet.ids():
+            if element_id not in taken or element_id in live:
+                yield element_id
+        for element_id in live:
+            if element_id not in taken:
+                yield element_id
+
+    def values(self) -> List[TrafficElement]:
+        return [self.get(element_id) for element_id in self]
+
+    def records(self) -> Iterator[dict]:
+        """Kayıtlar; üretilmemiş satırlar nesneye dönüştürülmeden okunur."""
+        live, taken = self._live, self._taken
+        for view in self.fleet:
+            element_id = view.element_id
+            if element_id not in taken:
+                yield view.to_record()
+            elif element_id in live:
+                yield live[element_id].to_record()
+        for element_id, element in live.items():
+            if element_id not in taken:
+                yield element.to_record()
+
 
 class TransportRepository:
     """
@@ -16,15 +95,145 @@ class TransportRepository:
     ve filtrelenmesi işlemlerini yürütür.
     """
 
-    def __init__(self):
+    def __init__(self, backend: Optional[StorageBackend] = None, event_log: Optional[EventLog] = None,
+                 flush_size: int = 256):
         """
         Depo yapisini başlatır. Veriler hizli erişim için sözlük (dict) 
         yapisinda tutulur. [cite: 51]
+
+        Args:
+            backend (StorageBackend): Kalıcı kopya için arka uç. Verilmezse
+                veriler yalnızca bellekte tutulur. Arka uçta kayıt varsa
+                depo bu kayıtlarla açılır (soğuk başlangıç).
+            event_log (EventLog): İşlem günlüğü; verilmezse sabit kapasiteli
+                yeni bir günlük oluşturulur.
+            flush_size (int): Kalıcı arka uçta, kaydedildikten sonra alanı değişen
+                cihazlar bu sayıya ulaşınca toplu olarak yazılır (bkz. flush).
         """
         # Key: element_id, Value: TrafficElement nesnesi
         self._elements: Dict[str, TrafficElement] = {}
-        # İşlem günlüklerini tutmak için basit bir liste
-        self._logs: List[str] = []
+        # İşlem günlüğü: sabit kapasiteli halka tampon, metin okunurken üretilir
+        self.events: EventLog = event_log if event_log is not None else EventLog()
+        # İkincil indeksler: anahtar -> {element_id: None} (sıralı küme)
+        # Konum ve durum anahtarları büyük/küçük harf duyarsız (casefold) tutulur.
+        self._location_index: Dict[str, Dict[str, None]] = {}
+        self._status_index: Dict[str, Dict[str, None]] = {}
+        self._type_index: Dict[str, Dict[str, None]] = {}
+        # from_fleet ile açılan depolarda indeksler ilk sorgu/değişiklikte kurulur:
+        # ad -> (indeks, (kod tablosu, kod sütunu))
+        self._pending_indexes: Dict[str, tuple] = {}
+        self._fleet_ids: Optional[List[str]] = None
+        self.backend: StorageBackend = backend if backend is not None else InMemoryBackend()
+        # Setter ile değişen cihazlar (sıralı küme); yalnızca kalıcı arka uçta tutulur
+        self._persistent = not isinstance(self.backend, InMemoryBackend)
+        self._dirty: Dict[str, None] = {}
+        self.flush_size = flush_size
+        # Her ekleme/silmede artar; türetilmiş önbellekler (ör. ışık önceliği) bununla tazelenir
+        self.revision = 0
+        for record in self.backend.load_all():
+            self._put(element_from_record(record))
+
+    # --- İNDEKS YÖNETİMİ ---
+
+    def _build_fleet_indexes(self, *names: str):
+        """
+        Ertelenmiş indeksleri filo sütunlarından, nesne üretmeden kurar.
+        Sorgular yalnızca kullandıkları indeksi, değişiklikler hepsini kurar
+        (kurulmamış bir indeks değişiklikten sonra filodan doğru kurulamaz).
+        """
+        pending = self._pending_indexes
+        if self._fleet_ids is None:
+            self._fleet_ids = list(self._elements.fleet.ids())
+        ids = self._fleet_ids
+        for name in names or list(pending):
+            if name not in pending:
+                continue
+            index, (labels, codes) = pending.pop(name)
+            groups = [[] for _ in labels]
+            appenders = [group.append for group in groups]
+            for element_id, code in zip(ids, codes):
+                appenders[code](element_id)
+            for label, group in zip(labels, groups):
+                if not group:
+                    continue
+                # Farklı yazımlar (ör. "merkez" / "Merkez") aynı anahtarda birleşir
+                key = label.casefold()
+                if key in index:
+                    index[key].update(dict.fromkeys(group))
+                else:
+                    index[key] = dict.fromkeys(group)
+        if not pending:
+            self._fleet_ids = None
+
+    @staticmethod
+    def _add_key(index: Dict[str, Dict[str, None]], key: str, element_id: str):
+        bucket = index.get(key)
+        if bucket is None:
+            bucket = index[key] = {}
+        bucket[element_id] = None
+
+    @staticmethod
+    def _remove_key(index: Dict[str, Dict[str, None]], key: str, element_id: str):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(element_id, None)
+            if not bucket:
+                del index[key]
+
+    def _put(self, element: TrafficElement):
+        """Nesneyi sözlüğe ve tüm indekslere ekler; aynı ID'li eski kaydı çıkarır."""
+        if self._pending_indexes:
+            self._build_fleet_indexes()
+        previous = self._elements.get(element.element_id)
+        if previous is not None:
+            self._drop(previous)
+        element_id = element.element_id
+        self._elements[element_id] = element
+        self._add_key(self._location_index, element.location.casefold(), element_id)
+        self._add_key(self._status_index, element.status.casefold(), element_id)
+        self._add_key(self._type_index, type(element).__name__.casefold(), element_id)
+        element.add_observer(self._on_element_changed)
+        self.revision += 1
+
+    def _drop(self, element: TrafficElement):
+        if self._pending_indexes:
+            self._build_fleet_indexes()
+        element_id = element.element_id
+        element.remove_observer(self._on_element_changed)
+        del self._elements[element_id]
+        self._remove_key(self._location_index, element.location.casefold(), element_id)
+        self._remove_key(self._status_index, element.status.casefold(), element_id)
+        self._remove_key(self._type_index, type(element).__name__.casefold(), element_id)
+        self.revision += 1
+
+    def _on_element_changed(self, element: TrafficElement, field: str, old, new):
+        if field == "status":
+            if self._pending_indexes:
+                self._build_fleet_indexes()
+            self._remove_key(self._status_index, old.casefold(), element.element_id)
+            self._add_key(self._status_index, new.casefold(), element.element_id)
+        if self._persistent:
+            self._dirty[element.element_id] = None
+            if len(self._dirty) >= self.flush_size:
+                self.flush()
+
+    def flush(self) -> int:
+        """
+        Kaydedildikten sonra alanı değişen cihazları arka uca tek işlemde yazar.
+        Returns:
+            int: Yazılan cihaz sayısı.
+        """
+        if not self._dirty:
+            return 0
+        elements = self._elements
+        records = [elements[element_id].to_record() for element_id in self._dirty if element_id in elements]
+        self._dirty.clear()
+        return self.backend.upsert_many(records)
+
+    def close(self):
+        """Bekleyen değişiklikleri yazar ve arka ucu kapatır."""
+        self.flush()
+        self.backend.close()
 
     # --- TEMEL VERİ İŞLEMLERİ (CRUD) ---
 
@@ -40,11 +249,27 @@ class TransportRepository:
         if not element:
             return False
             
-        self._elements[element.element_id] = element
-        log_entry = f"[{datetime.datetime.now()}] KAYIT: {element.element_id} sisteme eklendi."
-        self._logs.append(log_entry)
+        self._put(element)
+        self._dirty.pop(element.element_id, None)
+        self.backend.upsert_many([element.to_record()])
+        self.events.append(EventCode.ELEMENT_SAVED, element.element_id)
         return True
 
+    def save_many(self, elements: Iterable[TrafficElement]) -> int:
+        """
+        Birden çok cihazı tek işlemde kaydeder (toplu upsert).
+
+        Returns:
+            int: Kaydedilen cihaz sayısı.
+        """
+        elements = [el for el in elements if el]
+        for el in elements:
+            self._put(el)
+            self._dirty.pop(el.element_id, None)
+        self.backend.upsert_many([el.to_record() for el in elements])
+        self.events.append(EventCode.ELEMENTS_BULK_SAVED, None, len(elements))
+        return len(elements)
+
     def get_by_id(self, element_id: str) -> Optional[TrafficElement]:
         """
         ID bazlı arama yapar. 
@@ -54,31 +279,89 @@ class TransportRepository:
     def delete(self, element_id: str) -> bool:
         """Sistemden bir cihaz kaydını siler."""
         if element_id in self._elements:
-            del self._elements[element_id]
+            self._drop(self._elements[element_id])
+            self._dirty.pop(element_id, None)
+            self.backend.delete(element_id)
+            self.events.append(EventCode.ELEMENT_DELETED, element_id)
             return True
         return False
 
+    def __len__(self):
+        return len(self._elements)
+
+    def iter_records(self) -> Iterator[dict]:
+        """Tüm cihaz kayıtları (to_record); filo destekli depoda satırlar nesneye dönüştürülmez."""
+        if isinstance(self._elements, _FleetElements):
+            return self._elements.records()
+        return (element.to_record() for element in self._elements.values())
+
+    def to_fleet(self) -> DeviceFleet:
+        """Deponun sütunsal kopyası (ör. snapshot yazmak için)."""
+        return DeviceFleet.from_records(self.iter_records())
+
+    def get_logs(self, last: Optional[int] = None) -> List[str]:
+        """Günlükteki son kayıtları biçimlendirilmiş metin olarak döndürür."""
+        return self.events.get_lines(last)
+
     # --- SORGULAMA VE FİLTRELEME METOTLARI ---
 
     def find_all_by_location(self, location: str) -> List[TrafficElement]:
         """
         Belirli bir lokasyondaki tüm cihazları listeler. [cite: 89, 116]
         """
-        results = [
-            el for el in self._elements.values() 
-            if el.location.lower() == location.lower()
-        ]
-        return results
+        if self._pending_indexes:
+            self._build_fleet_indexes("location")
+        return self._resolve(self._location_index.get(location.casefold(), {}))
 
     def filter_by_status(self, status: str) -> List[TrafficElement]:
         """
         Cihazları aktiflik durumuna göre filtreler. 
         """
+        if self._pending_indexes:
+            self._build_fleet_indexes("status")
+        return self._resolve(self._status_index.get(status.casefold(), {}))
+
+    def find_all_by_type(self, element_type: Union[str, type]) -> List[TrafficElement]:
+        """Cihazları sınıf tipine göre listeler (ör. SpeedCamera veya "SpeedCamera")."""
+        if self._pending_indexes:
+            self._build_fleet_indexes("type")
+        return self._resolve(self._type_index.get(self._type_key(element_type), {}))
+
+    def query(self, location: Optional[str] = None, status: Optional[str] = None,
+              element_type: Union[str, type, None] = None) -> List[TrafficElement]:
+        """
+        Birleşik sorgu: verilen tüm koşulları sağlayan cihazlar.
+        Tüm depoyu taramak yerine indeks kümelerini en küçüğünden başlayarak kesiştirir.
+        Örn: query(location="Sahil Yolu", status="Maintenance", element_type=SpeedCamera)
+        """
+        if self._pending_indexes:
+            self._build_fleet_indexes(*[name for name, value in (("location", location), ("status", status),
+                                                                 ("type", element_type)) if value is not None])
+        buckets = []
+        if location is not None:
+            buckets.append(self._location_index.get(location.casefold(), {}))
+        if status is not None:
+            buckets.append(self._status_index.get(status.casefold(), {}))
+        if element_type is not None:
+            buckets.append(self._type_index.get(self._type_key(element_type), {}))
+        if not buckets:
+            return list(self._elements.values())
+        buckets.sort(key=len)
+        smallest, others = buckets[0], buckets[1:]
         return [
-            el for el in self._elements.values() 
-            if el.status.lower() == status.lower()
+            self._elements[element_id] for element_id in smallest
+            if all(element_id in other for other in others)
         ]
 
+    def _resolve(self, bucket: Dict[str, None]) -> List[TrafficElement]:
+        elements = self._elements
+        return [elements[element_id] for element_id in bucket]
+
+    @staticmethod
+    def _type_key(element_type: Union[str, type]) -> str:
+        name = element_type if isinstance(element_type, str) else element_type.__name__
+        return name.casefold()
+
     # --- SINIF VE STATİK METOTLAR (PDF ŞARTLARI) ---
 
     @classmethod
@@ -87,16 +370,47 @@ class TransportRepository:
          Başlangıç verileriyle bir depo örneği oluşturur (Sınıf Metodu 1).
         """
         repo = cls()
-        for el in initial_elements:
-            repo.save(el)
+        repo.save_many(initial_elements)
         return repo
 
+    @classmethod
+    def from_fleet(cls, fleet: DeviceFleet, event_log: Optional[EventLog] = None):
+        """
+        Sütunsal filo üzerinde tembel (lazy) bir depo açar: cihaz nesneleri ilk
+        erişildiklerinde, indeksler ilk sorgu veya değişiklikte üretilir. Böylece
+        milyonlarca cihazlık bir snapshot'tan açılış, cihaz sayısından bağımsız sürer.
+        """
+        repo = cls(event_log=event_log)
+        repo._elements = _FleetElements(fleet, repo._adopt)
+        indexes = {"location": repo._location_index, "status": repo._status_index, "type": repo._type_index}
+        repo._pending_indexes = {name: (indexes[name], columns) for name, columns in fleet.index_columns().items()}
+        return repo
+
+    def _adopt(self, element: TrafficElement):
+        element.add_observer(self._on_element_changed)
+
+    @classmethod
+    def open_persistent(cls, path: str):
+        """SQLite dosyası üzerinde kalıcı bir depo açar (varsa mevcut kayıtlarla)."""
+        return cls(backend=SQLiteBackend(path))
+
+    @classmethod
+    def from_snapshot(cls, snapshot_path: str, path: str):
+        """Yedekten çalışma dosyasını oluşturup depoyu bu verilerle açar."""
+        return cls(backend=SQLiteBackend.restore_snapshot(snapshot_path, path))
+
     @classmethod
     def get_storage_type(cls):
         """
         Kullanılan depolama tipini döndürür (Sınıf Metodu 2). [cite: 50]
+        Varsayılan arka ucun adıdır; bir deponun gerçek arka ucu için storage_name.
         """
-        return "InMemory / Dictionary Based Storage"
+        return InMemoryBackend.name
+
+    @property
+    def storage_name(self) -> str:
+        """Bu deponun yapılandırılmış arka ucunun adı (ör. SQLite)."""
+        return self.backend.name
 
     @staticmethod
     def validate_element_data(data: dict) -> bool:
@@ -0,0 +1,160 @@
+"""
+TRAFİK MODÜLÜ - SÜTUNSAL SENSÖR DEPOSU
+
+Binlerce IntersectionSensor okumasını nesne başına güncellemek yerine
+NumPy dizilerinde (kimlik, araç sayısı, zaman damgası) tutar. Bir ölçüm
+turunun (tick) tamamı tek çağrıda alınır ve tüm kavşaklar tek seferde
+sınıflandırılır.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .implementations import (
+    CRITICAL_DENSITY_THRESHOLD,
+    NORMAL_DENSITY_THRESHOLD,
+    IntersectionSensor,
+)
+
+# Sınıflandırma kodu -> etiket (0: Düşük, 1: Normal, 2: Kritik)
+DENSITY_LABELS = np.array(["Düşük", "Normal", "Kritik"])
+
+
+class SensorStore:
+    """
+    Kavşak sensörleri için sütun tabanlı (struct-of-arrays) bellek deposu.
+    Her sensör sabit bir satır indeksine sahiptir; diziler gerektiğinde büyütülür.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._index: Dict[str, int] = {}
+        self._ids = np.empty(max(capacity, 1), dtype=object)
+        self._counts = np.zeros(max(capacity, 1), dtype=np.int32)
+        self._timestamps = np.zeros(max(capacity, 1), dtype=np.float64)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, sensor_id):
+        return sensor_id in self._index
+
+    # --- KAYIT ---
+
+    def _grow(self, needed: int):
+        capacity = len(self._counts)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self._ids = np.resize(self._ids, capacity)
+        self._counts = np.resize(self._counts, capacity)
+        self._timestamps = np.resize(self._timestamps, capacity)
+
+    def register(self, sensor_id: str) -> int:
+        """Sensörü depoya ekler ve satır indeksini döndürür."""
+        row = self._index.get(sensor_id)
+        if row is not None:
+            return row
+        row = self._size
+        self._grow(row + 1)
+        self._ids[row] = sensor_id
+        self._counts[row] = 0
+        self._timestamps[row] = 0.0
+        self._index[sensor_id] = row
+        self._size += 1
+        return row
+
+    def rows_for(self, sensor_ids: Iterable[str]) -> np.ndarray:
+        """Kimlik listesini satır indekslerine çevirir (bilinmeyenler kaydedilir)."""
+        index = self._index
+        register = self.register
+        return np.fromiter(
+            (index[s] if s in index else register(s) for s in sensor_ids),
+            dtype=np.int64,
+        )
+
+    @classmethod
+    def from_sensors(cls, sensors: Iterable[IntersectionSensor]) -> "SensorStore":
+        """Mevcut sensör nesnelerinden bir depo oluşturur."""
+        sensors = list(sensors)
+        store = cls(capacity=len(sensors))
+        rows = store.rows_for(s.element_id for s in sensors)
+        store._counts[rows] = [s.vehicle_count for s in sensors]
+        store._timestamps[rows] = time.time()
+        return store
+
+    # --- TOPLU VERİ ALIMI ---
+
+    def ingest(self, sensor_ids: Sequence[str], counts: Sequence[int],
+               timestamps: Union[None, float, Sequence[float]] = None) -> int:
+        """
+        Bir ölçüm turunu tek çağrıda işler.
+
+        Args:
+            sensor_ids: Okuma yapan sensörlerin kimlikleri.
+            counts: Aynı sırada araç sayıları.
+            timestamps: Tek bir epoch değeri, okuma başına dizi ya da None (şimdi).
+        Returns:
+            int: İşlenen okuma sayısı.
+        """
+        return self.ingest_rows(self.rows_for(sensor_ids), counts, timestamps)
+
+    def ingest_rows(self, rows: np.ndarray, counts: Sequence[int],
+                    timestamps: Union[None, float, Sequence[float]] = None) -> int:
+        """Satır indeksleri önceden çözülmüş okumaları tamamen vektörel işler."""
+        rows = np.asarray(rows, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.int32)
+        if rows.shape != counts.shape:
+            raise ValueError("Kimlik ve araç sayısı dizileri aynı uzunlukta olmalı.")
+        if rows.size and (rows.min() < 0 or rows.max() >= self._size):
+            raise IndexError("Geçersiz sensör satırı.")
+        self._counts[rows] = counts
+        self._timestamps[rows] = time.time() if timestamps is None else timestamps
+        return int(rows.size)
+
+    # --- SORGULAMA ---
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._size]
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts[:self._size]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[:self._size]
+
+    def get_count(self, sensor_id: str) -> Optional[int]:
+        row = self._index.get(sensor_id)
+        return None if row is None else int(self._counts[row])
+
+    def density_codes(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Tüm sensörler (ya da verilen satırlar) için 0/1/2 yoğunluk kodlarını döndürür."""
+        counts = self.counts if rows is None else self._counts[rows]
+        return ((counts > NORMAL_DENSITY_THRESHOLD).astype(np.int8)
+                + (counts > CRITICAL_DENSITY_THRESHOLD))
+
+    def classify(self) -> np.ndarray:
+        """Tüm kavşaklar için "Kritik"/"Normal"/"Düşük" etiketlerini tek seferde üretir."""
+        return DENSITY_LABELS[self.density_codes()]
+
+    def classify_dict(self) -> Dict[str, str]:
+        return dict(zip(self.ids.tolist(), self.classify().tolist()))
+
+    def critical_sensors(self) -> List[str]:
+        return self.ids[self.counts > CRITICAL_DENSITY_THRESHOLD].tolist()
+
+    def apply_to(self, sensors: Iterable[IntersectionSensor]) -> int:
+        """Depodaki sayıları sensör nesnelerine geri yazar."""
+        updated = 0
+        for sensor in sensors:
+            row = self._index.get(sensor.element_id)
+            if row is not None:
+                sensor.vehicle_count = int(self._counts[row])
+                updated += 1
+        return updated
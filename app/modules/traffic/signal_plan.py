@@ -0,0 +1,194 @@
+"""
+TRAFİK MODÜLÜ - KORİDOR SİNYAL ZAMANLAMA OPTİMİZASYONU
+
+Tek bir ışığın süresini yoğunluk etiketine göre ayarlamak yerine, bir
+koridordaki (ör. Atatürk Bulvarı boyunca) tüm TrafficLight'lar için ortak
+döngü süresi, yeşil süre paylaşımı (green split) ve yeşil dalga için faz
+kaymaları (offset) hesaplanır.
+
+Maliyet modeli (Webster):
+- Akış oranı y = araç sayısı / doygunluk akışı (ana yön ve ara sokak ayrı).
+- Koridor döngüsü C = (1.5 L + 5) / (1 - Y_max), Y_max koridorun kritik kavşağı.
+- Ana yön yeşil süresi (C - L) * y_ana / (y_ana + y_ara).
+- Offset = koridor başından kavşağa seyahat süresi mod C.
+
+Tüm kavşaklar tek NumPy dizisinde tutulur; yeniden planlama yalnızca yoğunluğu
+değişen kavşakların bulunduğu koridorları hesaplar.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .implementations import TrafficLight
+
+
+class Corridor:
+    """
+    Koridor tanımı.
+
+    Args:
+        corridor_id: Koridor adı.
+        light_ids: Işıklar, koridor yönünde sırayla.
+        main_sensors: Her ışık için ana yöndeki sensör kimliği.
+        cross_sensors: Her ışık için ara sokak sensörü (yoksa None).
+        distances_m: Bir önceki ışığa uzaklık (ilk eleman 0).
+        speed_kmh: Yeşil dalga için hedef seyir hızı.
+    """
+
+    def __init__(self, corridor_id: str, light_ids: Sequence[str], main_sensors: Sequence[str],
+                 cross_sensors: Optional[Sequence[Optional[str]]] = None,
+                 distances_m: Optional[Sequence[float]] = None, speed_kmh: float = 50.0):
+        n = len(light_ids)
+        if len(main_sensors) != n:
+            raise ValueError("Her ışık için bir ana yön sensörü gerekli.")
+        self.corridor_id = corridor_id
+        self.light_ids = list(light_ids)
+        self.main_sensors = list(main_sensors)
+        self.cross_sensors = list(cross_sensors) if cross_sensors is not None else [None] * n
+        self.distances_m = list(distances_m) if distances_m is not None else [0.0] + [300.0] * (n - 1)
+        if len(self.cross_sensors) != n or len(self.distances_m) != n:
+            raise ValueError("Koridor dizileri aynı uzunlukta olmalı.")
+        self.speed_kmh = speed_kmh
+
+
+class CorridorOptimizer:
+    """
+    Şehir genelindeki koridorlar için vektörel sinyal planlayıcı.
+
+    Args:
+        saturation: Tek ölçüm aralığında bir yaklaşımın taşıyabileceği araç sayısı.
+        lost_time: Döngü başına kayıp süre (sn), iki fazlı kavşak için.
+        min_cycle / max_cycle: Döngü süresi sınırları (sn).
+        min_green: Her faz için en kısa yeşil süre (sn).
+    """
+
+    def __init__(self, corridors: Sequence[Corridor], saturation: float = 180.0,
+                 lost_time: float = 10.0, min_cycle: float = 40.0, max_cycle: float = 150.0,
+                 min_green: float = 7.0):
+        self.corridors = list(corridors)
+        self.saturation = saturation
+        self.lost_time = lost_time
+        self.min_cycle = min_cycle
+        self.max_cycle = max_cycle
+        self.min_green = min_green
+
+        light_ids: List[str] = []
+        corridor_of: List[int] = []
+        travel: List[float] = []
+        main_sensors: List[str] = []
+        cross_sensors: List[Optional[str]] = []
+        for c_idx, corridor in enumerate(self.corridors):
+            elapsed = 0.0
+            for i, light_id in enumerate(corridor.light_ids):
+                elapsed += corridor.distances_m[i] / (corridor.speed_kmh / 3.6)
+                light_ids.append(light_id)
+                corridor_of.append(c_idx)
+                travel.append(elapsed)
+                main_sensors.append(corridor.main_sensors[i])
+                cross_sensors.append(corridor.cross_sensors[i])
+
+        self.light_ids = light_ids
+        self._row_of = {light_id: row for row, light_id in enumerate(light_ids)}
+        self.corridor_of = np.asarray(corridor_of, dtype=np.int64)
+        self.travel_time = np.asarray(travel, dtype=np.float64)
+        n = len(light_ids)
+        self.main_count = np.zeros(n)
+        self.cross_count = np.zeros(n)
+        self.cycle = np.full(len(self.corridors), self.min_cycle)
+        self.green_main = np.zeros(n)
+        self.green_cross = np.zeros(n)
+        self.offset = np.zeros(n)
+
+        # Sensör -> etkilediği kavşak satırları (bir sensör birden çok ışığı besleyebilir)
+        self._main_rows: Dict[str, List[int]] = {}
+        self._cross_rows: Dict[str, List[int]] = {}
+        for row, sensor in enumerate(main_sensors):
+            self._main_rows.setdefault(sensor, []).append(row)
+        for row, sensor in enumerate(cross_sensors):
+            if sensor is not None:
+                self._cross_rows.setdefault(sensor, []).append(row)
+        self._planned = False
+
+    # --- PLANLAMA ---
+
+    def update(self, densities: Dict[str, float]) -> np.ndarray:
+        """
+        Sensör okumalarını uygular ve değişen koridorları yeniden planlar.
+
+        Args:
+            densities: sensör_id -> araç sayısı (yalnızca değişenler yeterli).
+        Returns:
+            np.ndarray: Yeniden planlanan kavşak (ışık) satırları.
+        """
+        changed = np.zeros(len(self.light_ids), dtype=bool)
+        for sensor, count in densities.items():
+            for row in self._main_rows.get(sensor, ()):
+                if self.main_count[row] != count:
+                    self.main_count[row] = count
+                    changed[row] = True
+            for row in self._cross_rows.get(sensor, ()):
+                if self.cross_count[row] != count:
+                    self.cross_count[row] = count
+                    changed[row] = True
+        if not self._planned:
+            changed[:] = True
+            self._planned = True
+        if not changed.any():
+            return np.empty(0, dtype=np.int64)
+        corridors = np.unique(self.corridor_of[changed])
+        rows = np.flatnonzero(np.isin(self.corridor_of, corridors))
+        self._plan(rows, corridors)
+        return rows
+
+    def _plan(self, rows: np.ndarray, corridors: np.ndarray):
+        y_main = np.minimum(self.main_count[rows] / self.saturation, 0.95)
+        y_cross = np.minimum(self.cross_count[rows] / self.saturation, 0.95)
+        y_total = y_main + y_cross
+
+        # Koridorun kritik kavşağı (en yüksek toplam akış oranı) ortak döngüyü belirler
+        y_crit = np.zeros(len(self.corridors))
+        np.maximum.at(y_crit, self.corridor_of[rows], y_total)
+        y_crit = np.minimum(y_crit[corridors], 0.9)
+        cycle = (1.5 * self.lost_time + 5.0) / (1.0 - y_crit)
+        self.cycle[corridors] = np.clip(cycle, self.min_cycle, self.max_cycle)
+
+        row_cycle = self.cycle[self.corridor_of[rows]]
+        effective = row_cycle - self.lost_time
+        share = np.where(y_total > 0, y_main / np.where(y_total > 0, y_total, 1.0), 0.5)
+        green_main = np.clip(effective * share, self.min_green, effective - self.min_green)
+        self.green_main[rows] = green_main
+        self.green_cross[rows] = effective - green_main
+        self.offset[rows] = np.mod(self.travel_time[rows], row_cycle)
+
+    # --- UYGULAMA ---
+
+    def plan_for(self, light_id: str) -> Optional[dict]:
+        row = self._row_of.get(light_id)
+        if row is None:
+            return None
+        return {
+            "cycle": float(self.cycle[self.corridor_of[row]]),
+            "green": float(self.green_main[row]),
+            "cross_green": float(self.green_cross[row]),
+            "offset": float(self.offset[row]),
+        }
+
+    def apply(self, repository, rows: Optional[np.ndarray] = None, preemption=None) -> int:
+        """
+        Planı depodaki TrafficLight nesnelerine yazar (timer = ana yön yeşil süresi).
+        preemption verilirse acil durum önceliğindeki ışıkların süresi öncelik bitince uygulanır.
+        """
+        rows = np.arange(len(self.light_ids)) if rows is None else rows
+        applied = 0
+        for row in rows.tolist():
+            light = repository.get_by_id(self.light_ids[row])
+            if isinstance(light, TrafficLight):
+                timer = int(round(self.green_main[row]))
+                if preemption is None:
+                    light.timer = timer
+                else:
+                    preemption.apply_timer(light.element_id, timer)
+                light.offset = int(round(self.offset[row]))
+                applied += 1
+        return applied
@@ -0,0 +1,162 @@
+"""
+TRAFİK MODÜLÜ - AYRIK OLAY SİMÜLASYON MOTORU (DISCRETE-EVENT SIMULATION)
+
+Cihazların perform_action metotlarını gerçek zamanı beklemeden, bir olay
+yığını (heap) ve simülasyon saati üzerinden çalıştırır. Her cihaz kendi
+hızında tetiklenir (ışıklar timer süresinde, kameralar ve sensörler kendi
+örnekleme aralıklarında). Her cihaza tohumdan türetilmiş ayrı bir RNG akışı
+verildiği için aynı tohumla yapılan iki koşu birebir aynı sonucu üretir.
+
+Örnek: 24 saatlik bir şehir gününü tekrar oynatmak
+    engine = SimulationEngine(seed=42)
+    engine.attach_repository(repo)
+    engine.run(until=24 * 3600)
+"""
+
+import heapq
+import random
+from typing import Callable, Dict, Iterable, Optional
+
+from .base import TrafficElement
+from .implementations import IntersectionSensor, SpeedCamera, TrafficLight
+
+# Olay türleri
+_PERIODIC = 0
+_ONESHOT = 1
+
+# Varsayılan tetiklenme aralıkları (sn). None: ışığın kendi timer değeri kullanılır.
+DEFAULT_INTERVALS: Dict[type, Optional[float]] = {
+    TrafficLight: None,
+    SpeedCamera: 2.0,
+    IntersectionSensor: 10.0,
+}
+# Işık timer değerinden türetilen aralığın alt sınırı (sn); 0 süreli bir ışık
+# aynı anı sonsuza dek yeniden planlayıp saati ilerletmez
+MIN_TIMER_INTERVAL = 1.0
+
+
+class SimulationEngine:
+    """
+    Tek çekirdekli ayrık olay simülasyon motoru.
+
+    Args:
+        seed: Tüm RNG akışlarının türetildiği ana tohum.
+        start_time: Simülasyon saatinin başlangıcı (epoch saniyesi).
+    """
+
+    def __init__(self, seed: int = 0, start_time: float = 0.0):
+        self.seed = seed
+        self.now = start_time
+        self.processed = 0
+        self.actions: Dict[str, int] = {}
+        # Her periyodik tetiklenmeden sonra after_action(cihaz) çağrılır (ör. bölge olayları)
+        self.after_action: Optional[Callable[[TrafficElement], None]] = None
+        self._heap = []
+        self._seq = 0  # Aynı zamanlı olaylarda sabit sıra (determinizm)
+
+    def clock(self) -> float:
+        return self.now
+
+    def rng_for(self, key: str) -> random.Random:
+        """Anahtara özel, tohumdan türetilmiş bağımsız RNG akışı."""
+        return random.Random(f"{self.seed}:{key}")
+
+    # --- OLAY PLANLAMA ---
+
+    def attach(self, element: TrafficElement, interval: Optional[float] = None, phase: Optional[float] = None):
+        """
+        Cihazı simülasyona bağlar ve periyodik olarak tetiklenmesini planlar.
+
+        Args:
+            interval: Tetiklenme aralığı (sn); None ise tipine göre varsayılan.
+            phase: İlk tetiklenmeye kadar geçecek süre; None ise aralık içinde
+                cihazın RNG'sinden seçilir (cihazlar aynı anda tetiklenmesin diye).
+        """
+        if interval is None:
+            interval = DEFAULT_INTERVALS.get(type(element), 1.0)
+        elif interval <= 0:
+            raise ValueError("Tetiklenme aralığı pozitif olmalı.")
+        element.rng = self.rng_for(element.element_id)
+        element.clock = self.clock
+        element.touch()
+        if phase is None:
+            span = interval if interval is not None else max(element.timer, MIN_TIMER_INTERVAL)
+            phase = element.rng.random() * span
+        self._push(self.now + phase, _PERIODIC, element, interval)
+
+    def attach_repository(self, repository, intervals: Optional[Dict[type, Optional[float]]] = None) -> int:
+        """Depodaki tüm cihazları tiplerine göre aralıklarla bağlar."""
+        intervals = {**DEFAULT_INTERVALS, **(intervals or {})}
+        count = 0
+        for element_type, interval in intervals.items():
+            for element in repository.find_all_by_type(element_type):
+                self.attach(element, interval)
+                count += 1
+        return count
+
+    def schedule(self, delay: float, callback: Callable, *args):
+        """Tek seferlik bir olay planlar (ör. bakım, senaryo tetikleyicisi)."""
+        self._push(self.now + delay, _ONESHOT, callback, args)
+
+    def _push(self, when: float, kind: int, target, arg):
+        heapq.heappush(self._heap, (when, self._seq, kind, target, arg))
+        self._seq += 1
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    # --- ÇALIŞTIRMA ---
+
+    def run(self, until: Optional[float] = None, max_events: Optional[int] = None) -> int:
+        """
+        Olayları zaman sırasıyla işler.
+
+        Args:
+            until: Bu simülasyon zamanından sonraki olaylar işlenmez.
+            max_events: İşlenecek en fazla olay sayısı.
+        Returns:
+            int: Bu çağrıda işlenen olay sayısı.
+        """
+        heap = self._heap
+        pop = heapq.heappop
+        push = heapq.heappush
+        actions = self.actions
+        hook = self.after_action
+        seq = self._seq
+        processed = 0
+        try:
+            while heap:
+                if until is not None and heap[0][0] > until:
+                    break
+                if max_events is not None and processed >= max_events:
+                    break
+                when, _, kind, target, arg = pop(heap)
+                self.now = when
+                if kind == _PERIODIC:
+                    target.perform_action()
+                    name = type(target).__name__
+                    actions[name] = actions.get(name, 0) + 1
+                    interval = arg if arg is not None else max(target.timer, MIN_TIMER_INTERVAL)
+                    push(heap, (when + interval, seq, _PERIODIC, target, arg))
+                    seq += 1
+                    if hook is not None:
+                        self._seq = seq
+                        hook(target)
+                        seq = self._seq
+                else:
+                    self._seq = seq
+                    target(*arg)
+                    seq = self._seq
+                processed += 1
+        finally:
+            self._seq = seq
+            self.processed += processed
+        if until is not None and self.now < until and (not heap or heap[0][0] > until):
+            self.now = until
+        return processed
+
+    @staticmethod
+    def state_snapshot(elements: Iterable[TrafficElement]) -> list:
+        """Koşular arası karşılaştırma (regresyon testi) için cihaz durumları."""
+        return [element.to_record() for element in elements]
@@ -0,0 +1,144 @@
+"""
+TRAFİK MODÜLÜ - DEPOLAMA ARKA UÇLARI (STORAGE BACKENDS)
+
+TransportRepository, verileri her zaman bellekteki sözlükte tutar; bu dosyadaki
+arka uçlar ise kayıtların yeniden başlatmalarda kaybolmaması için kalıcı bir
+kopya sağlar. Arka uç değiştirilebilir (pluggable):
+- InMemoryBackend: Hiçbir şey yazmaz (varsayılan davranış).
+- SQLiteBackend: WAL kipinde SQLite dosyası; toplu upsert ve anlık yedek (snapshot).
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List
+
+from .base import TrafficElement
+from .implementations import IntersectionSensor, SpeedCamera, TrafficLight
+
+# Kayıttaki "type" alanından sınıfa eşleme
+ELEMENT_TYPES: Dict[str, type] = {
+    cls.__name__: cls for cls in (TrafficLight, SpeedCamera, IntersectionSensor)
+}
+
+
+def element_from_record(record: dict) -> TrafficElement:
+    """Depolanan kayıttan doğru alt sınıfın nesnesini üretir."""
+    cls = ELEMENT_TYPES.get(record["type"])
+    if cls is None:
+        raise ValueError(f"Bilinmeyen cihaz tipi: {record['type']}")
+    return cls.from_record(record)
+
+
+class StorageBackend(ABC):
+    """Kalıcı depolama arka uçları için ortak arayüz."""
+
+    name = "Abstract"
+
+    @abstractmethod
+    def load_all(self) -> Iterator[dict]:
+        """Kayıtlı tüm cihaz kayıtlarını döndürür (soğuk başlangıç)."""
+        pass
+
+    @abstractmethod
+    def upsert_many(self, records: List[dict]) -> int:
+        """Kayıtları tek işlemde ekler veya günceller."""
+        pass
+
+    @abstractmethod
+    def delete(self, element_id: str) -> bool:
+        pass
+
+    def close(self):
+        pass
+
+
+class InMemoryBackend(StorageBackend):
+    """Kalıcılık gerektirmeyen kullanım için boş arka uç."""
+
+    name = "InMemory / Dictionary Based Storage"
+
+    def load_all(self) -> Iterator[dict]:
+        return iter(())
+
+    def upsert_many(self, records: List[dict]) -> int:
+        return len(records)
+
+    def delete(self, element_id: str) -> bool:
+        return True
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    SQLite (WAL) tabanlı kalıcı arka uç.
+    WAL kipi okuma ve yazmanın birbirini bloklamamasını, synchronous=NORMAL
+    ise her commit'in ucuz olmasını sağlar.
+    """
+
+    name = "SQLite (WAL) Persistent Storage"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS elements ("
+            " element_id TEXT PRIMARY KEY,"
+            " type TEXT NOT NULL,"
+            " location TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " payload TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load_all(self) -> Iterator[dict]:
+        cursor = self._conn.execute("SELECT payload FROM elements ORDER BY rowid")
+        loads = json.loads
+        for (payload,) in cursor:
+            yield loads(payload)
+
+    def upsert_many(self, records: List[dict]) -> int:
+        dumps = json.dumps
+        rows = [
+            (r["element_id"], r["type"], r["location"], r["status"], dumps(r, ensure_ascii=False))
+            for r in records
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO elements (element_id, type, location, status, payload) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(element_id) DO UPDATE SET type=excluded.type, location=excluded.location, "
+                "status=excluded.status, payload=excluded.payload",
+                rows,
+            )
+        return len(rows)
+
+    def delete(self, element_id: str) -> bool:
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM elements WHERE element_id = ?", (element_id,))
+        return cursor.rowcount > 0
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM elements").fetchone()[0]
+
+    def snapshot(self, target_path: str):
+        """Çalışan veritabanının tutarlı bir kopyasını alır (online backup)."""
+        target = sqlite3.connect(target_path)
+        try:
+            self._conn.backup(target)
+        finally:
+            target.close()
+
+    @classmethod
+    def restore_snapshot(cls, snapshot_path: str, path: str) -> "SQLiteBackend":
+        """Yedek dosyasını çalışma konumuna kopyalayıp açar (hızlı soğuk başlangıç)."""
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        shutil.copyfile(snapshot_path, path)
+        return cls(path)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,640 @@
+"""
+TRAFİK MODÜLÜ - ZAMAN SERİSİ DEPOSU (CİHAZ GEÇMİŞİ)
+
+IntersectionSensor.vehicle_count her okumada üzerine yazılır, SpeedCamera ise
+yalnızca toplam ihlal sayısını tutar. Bu depo cihaz başına okumaları geçmişiyle
+birlikte diske yazar ve aralık / özet sorgularını yanıtlar.
+
+- Her seri (cihaz kimliği + ölçüm adı) önce bellekteki açık tampona yazılır.
+  Tampon chunk_size okumaya ulaşınca (veya flush() ile) sütunsal bir parça
+  (chunk) olarak tek bir sona ekleme dosyasına yazılır.
+- Parçalarda zaman damgaları (ms) fark-farkı (delta-of-delta), tam sayı
+  değerler fark (delta) olarak kodlanır ve sığan en dar tam sayı tipiyle
+  (int8/16/32/64) saklanır; özet sütunları da tam sayıysa dar tiple yazılır.
+  10 sn aralıklı bir sensör okuması özetleriyle birlikte ~3 bayttır.
+- Yazılan her ham parçadan 1 dk, 15 dk ve 1 sa özetleri (adet, toplam, en
+  küçük, en büyük) çıkarılır; özet satırları kendi parçalarında birikir.
+- Özet sorgularında aralık kaba çözünürlükten inceye doğru kapatılır: tam
+  saatler 1 sa özetinden, kenarlar 15 dk / 1 dk özetlerinden, en uçtaki
+  dakikalar ham veriden okunur. Sonuç ham veriyle birebir aynıdır ve bir
+  haftalık sorgu seri başına yalnızca birkaç küçük parça çözer.
+
+Dizin düzeni:
+    catalog.json   seri listesi: [cihaz kimliği, ölçüm, konum]
+    chunks.tsc     parçalar: [başlık 40 bayt][sütunlar]...
+
+Depo iş parçacığı güvenli değildir; TrafficService'te olduğu gibi yazmalar ve
+sorgular aynı iş parçacığından (tek işçili havuz) yapılmalıdır.
+
+Örnek:
+    store = TimeSeriesStore("history/")
+    store.register_elements(repository.find_all_by_type(IntersectionSensor))
+    store.ingest(sensor_ids, counts, timestamps)
+    store.average(time.time() - 7 * 86400, location="Merkez Meydan")
+"""
+
+import json
+import os
+import struct
+import tempfile
+import time
+import zlib
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .base import TrafficElement
+from .implementations import IntersectionSensor, SpeedCamera
+
+VEHICLE_COUNT = "vehicle_count"
+VIOLATION_COUNT = "violation_count"
+
+# Özet çözünürlükleri (sn); her biri bir sonrakini tam böler. Seviye 0 ham veridir.
+RESOLUTIONS = (60, 900, 3600)
+
+CATALOG_FILE = "catalog.json"
+CHUNK_FILE = "chunks.tsc"
+
+# Parça başlığı: yük uzunluğu, crc32, seri no, satır sayısı, seviye,
+# sütun tip kodları (ham: zaman, değer; özet: kova, adet, toplam, min, max),
+# dolgu, ilk / son zaman (ms)
+_CHUNK = struct.Struct("<IIIIB5s2xqq")
+_INT_CODES = "bhiq"
+# Ham parça yükünün başı: ilk zaman farkı (ms) ve ilk değer. Sütunlar farkları
+# bunlara göre tutar; düzenli aralıklı okumalarda zaman sütunu sıfırlardan oluşur.
+_RAW_BASE = struct.Struct("<qq")
+
+
+class TimeSeriesError(ValueError):
+    """Bozuk parça, bilinmeyen seri veya geçersiz sorgu."""
+
+
+# --- KODLAMA ---
+
+def _narrow(values: np.ndarray) -> Tuple[str, bytes]:
+    """Tam sayı dizisini değerlerin sığdığı en dar tiple bayta çevirir."""
+    if not len(values):
+        return "b", b""
+    low, high = int(values.min()), int(values.max())
+    for code in _INT_CODES:
+        info = np.iinfo(code)
+        if info.min <= low and high <= info.max:
+            return code, values.astype(code).tobytes()
+    raise TimeSeriesError("Değer 64 bit tam sayıya sığmıyor.")
+
+
+def _integral(values: np.ndarray) -> bool:
+    return bool(np.all(np.isfinite(values)) and np.all(values == np.round(values))
+                and np.abs(values).max() < 2 ** 53)
+
+
+def _encode_values(values: np.ndarray) -> Tuple[str, bytes]:
+    """Tam sayı değerli float sütunları dar tam sayı, diğerlerini float64 olarak kodlar."""
+    if _integral(values):
+        return _narrow(values.astype(np.int64))
+    return "d", values.tobytes()
+
+
+def _column(payload: bytes, code: str, rows: int, offset: int) -> Tuple[np.ndarray, int]:
+    column = np.frombuffer(payload, dtype=code, count=rows, offset=offset)
+    return column, offset + column.nbytes
+
+
+def _rollup(ts: np.ndarray, values: np.ndarray, step_ms: int) -> Tuple[np.ndarray, ...]:
+    """Zamana göre sıralı okumaları step_ms kovalarına özetler: (kova başı, adet, toplam, min, max)."""
+    buckets = ts // step_ms
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    counts = np.diff(np.append(starts, len(ts)))
+    return (buckets[starts] * step_ms, counts, np.add.reduceat(values, starts),
+            np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts))
+
+
+def _merge_rows(parts: Sequence[Tuple[np.ndarray, ...]]) -> Tuple[np.ndarray, ...]:
+    """Aynı kovaya düşen özet satırlarını birleştirir (parçalar arası ve seriler arası)."""
+    start, count, total, low, high = (np.concatenate(column) for column in zip(*parts))
+    order = np.argsort(start, kind="stable")
+    start, count, total, low, high = start[order], count[order], total[order], low[order], high[order]
+    if len(start) < 2 or np.all(start[1:] != start[:-1]):
+        return start, count, total, low, high
+    first = np.flatnonzero(np.diff(start, prepend=start[0] - 1))
+    return (start[first], np.add.reduceat(count, first), np.add.reduceat(total, first),
+            np.minimum.reduceat(low, first), np.maximum.reduceat(high, first))
+
+
+def _plan(start_ms: int, end_ms: int) -> List[Tuple[int, int, int]]:
+    """
+    [start, end) aralığını (seviye, başlangıç, bitiş) parçalarına böler:
+    özet seviyesinde tam kovalar, kalan kenarlar bir ince seviyede.
+    """
+    pieces = []
+
+    def cover(low: int, high: int, level: int):
+        if low >= high:
+            return
+        if level == 0:
+            pieces.append((0, low, high))
+            return
+        step = RESOLUTIONS[level - 1] * 1000
+        first, last = -(-low // step) * step, high // step * step
+        if first >= last:
+            cover(low, high, level - 1)
+            return
+        cover(low, first, level - 1)
+        pieces.append((level, first, last))
+        cover(last, high, level - 1)
+
+    cover(start_ms, end_ms, len(RESOLUTIONS))
+    return pieces
+
+
+class _Stats:
+    """Birleştirilebilir özet: adet, toplam, en küçük, en büyük."""
+    __slots__ = ("count", "total", "low", "high")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.low = float("inf")
+        self.high = float("-inf")
+
+    def add_values(self, values: np.ndarray):
+        if values.size:
+            self.count += int(values.size)
+            self.total += float(values.sum())
+            self.low = min(self.low, float(values.min()))
+            self.high = max(self.high, float(values.max()))
+
+    def add_rows(self, count: np.ndarray, total: np.ndarray, low: np.ndarray, high: np.ndarray):
+        if count.size:
+            self.count += int(count.sum())
+            self.total += float(total.sum())
+            self.low = min(self.low, float(low.min()))
+            self.high = max(self.high, float(high.max()))
+
+    def result(self) -> dict:
+        if not self.count:
+            return {"count": 0, "sum": 0.0, "mean": None, "min": None, "max": None}
+        return {"count": self.count, "sum": self.total, "mean": self.total / self.count,
+                "min": self.low, "max": self.high}
+
+
+class _Series:
+    """Tek serinin açık tamponu, bekleyen özet satırları ve diskteki parça dizini."""
+    __slots__ = ("number", "element_id", "metric", "location", "ts", "values", "rollups", "chunks", "spans")
+
+    def __init__(self, number: int, element_id: str, metric: str, location: str):
+        self.number = number
+        self.element_id = element_id
+        self.metric = metric
+        self.location = location
+        self.ts = array("q")
+        self.values = array("d")
+        # Seviye -> henüz diske yazılmamış özet satırı grupları
+        self.rollups: List[list] = [[] for _ in range(len(RESOLUTIONS) + 1)]
+        # Seviye -> ilk zamana göre sıralı (ilk, son, yük ofseti, yük uzunluğu, satır, tip kodları)
+        self.chunks: List[list] = [[] for _ in range(len(RESOLUTIONS) + 1)]
+        # Seviye -> en uzun parçanın süresi (ms); çakışan parçaları bisect ile bulmak için
+        self.spans = [0] * (len(RESOLUTIONS) + 1)
+
+    def head(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Kopya alınır: array nesnesi dışa aktarılan bir tamponla büyütülemez
+        return np.array(self.ts, dtype=np.int64), np.array(self.values, dtype=np.float64)
+
+    def pending_rows(self, level: int) -> int:
+        return sum(len(part[0]) for part in self.rollups[level])
+
+
+class TimeSeriesStore:
+    """
+    Cihaz okumaları için gömülü, sütunsal zaman serisi deposu.
+
+    Args:
+        path: Depo dizini (yoksa oluşturulur; varsa mevcut geçmiş açılır).
+        chunk_size: Ham tampon bu kadar okumaya ulaşınca parça olarak yazılır.
+        rollup_chunk_size: Özet satırları bu sayıya ulaşınca parça olarak yazılır.
+        cache_chunks: Çözülmüş parçalar için LRU önbellek boyutu.
+        fsync: flush() verinin diske ulaşmasını da bekler.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 4096, rollup_chunk_size: int = 1024,
+                 cache_chunks: int = 1024, fsync: bool = True):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.rollup_chunk_size = rollup_chunk_size
+        self.cache_chunks = cache_chunks
+        self.fsync = fsync
+        os.makedirs(path, exist_ok=True)
+        self._series: List[_Series] = []
+        self._by_key: Dict[Tuple[str, str], _Series] = {}
+        # casefold konum -> {seri: None}
+        self._by_location: Dict[str, Dict[_Series, None]] = {}
+        self._catalog_dirty = False
+        self._cache: "OrderedDict[int, tuple]" = OrderedDict()
+        self.truncated_bytes = 0
+        self._load_catalog()
+        self._chunk_path = os.path.join(path, CHUNK_FILE)
+        self._scan_chunks()
+        self._file = open(self._chunk_path, "ab")
+        self._reader = open(self._chunk_path, "rb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._series)
+
+    # --- KATALOG VE AÇILIŞ ---
+
+    def _load_catalog(self):
+        catalog_path = os.path.join(self.path, CATALOG_FILE)
+        if not os.path.exists(catalog_path):
+            return
+        with open(catalog_path, encoding="utf-8") as f:
+            catalog = json.load(f)
+        for element_id, metric, location in catalog["series"]:
+            self._add_series(element_id, metric, location)
+
+    def _save_catalog(self):
+        catalog = {"version": 1, "series": [[s.element_id, s.metric, s.location] for s in self._series]}
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=".catalog-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(catalog, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(self.path, CATALOG_FILE))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._catalog_dirty = False
+
+    def _scan_chunks(self):
+        """Yalnızca parça başlıklarını okuyarak dizini kurar; yarım kalmış son parçayı keser."""
+        if not os.path.exists(self._chunk_path):
+            return
+        size = os.path.getsize(self._chunk_path)
+        good = 0
+        with open(self._chunk_path, "rb") as f:
+            while True:
+                header = f.read(_CHUNK.size)
+                if len(header) < _CHUNK.size:
+                    break
+                length, crc, number, rows, level, codes, first, last = _CHUNK.unpack(header)
+                payload_offset = good + _CHUNK.size
+                if payload_offset + length > size:
+                    break
+                if payload_offset + length == size:
+                    # Son parça çökme anında yarım yazılmış olabilir
+                    if zlib.crc32(f.read(length)) != crc:
+                        break
+                else:
+                    f.seek(length, os.SEEK_CUR)
+                if number >= len(self._series):
+                    raise TimeSeriesError(f"{self._chunk_path}: katalogda olmayan seri {number}")
+                self._index_chunk(self._series[number], level, first, last, payload_offset, length, rows, codes)
+                good = payload_offset + length
+        if good < size:
+            self.truncated_bytes = size - good
+            with open(self._chunk_path, "r+b") as f:
+                f.truncate(good)
+
+    @staticmethod
+    def _index_chunk(series: _Series, level: int, first: int, last: int, offset: int, length: int,
+                     rows: int, codes: bytes):
+        insort(series.chunks[level], (first, last, offset, length, rows, codes))
+        series.spans[level] = max(series.spans[level], last - first)
+
+    # --- SERİ KAYDI ---
+
+    def _add_series(self, element_id: str, metric: str, location: str) -> _Series:
+        series = _Series(len(self._series), element_id, metric, location)
+        self._series.append(series)
+        self._by_key[(element_id, metric)] = series
+        self._by_location.setdefault(location.casefold(), {})[series] = None
+        return series
+
+    def register(self, element_id: str, location: str, metric: str = VEHICLE_COUNT) -> int:
+        """Seriyi konumuyla kaydeder (konum değiştiyse günceller); seri numarasını döndürür."""
+        series = self._by_key.get((element_id, metric))
+        if series is None:
+            series = self._add_series(element_id, metric, location)
+            self._catalog_dirty = True
+        elif series.location != location:
+            self._by_location[series.location.casefold()].pop(series, None)
+            series.location = location
+            self._by_location.setdefault(location.casefold(), {})[series] = None
+            self._catalog_dirty = True
+        return series.number
+
+    def register_elements(self, elements: Iterable[TrafficElement]) -> int:
+        """Sensör ve kameraları konumlarıyla kaydeder."""
+        registered = 0
+        for element in elements:
+            metric = self._metric_of(element)
+            if metric is not None:
+                self.register(element.element_id, element.location, metric)
+                registered += 1
+        return registered
+
+    @staticmethod
+    def _metric_of(element: TrafficElement) -> Optional[str]:
+        if isinstance(element, IntersectionSensor):
+            return VEHICLE_COUNT
+        if isinstance(element, SpeedCamera):
+            return VIOLATION_COUNT
+        return None
+
+    def _series_for(self, element_id: str, metric: str) -> _Series:
+        series = self._by_key.get((element_id, metric))
+        if series is None:
+            # Kaydedilmemiş cihaz: konumu sonradan register ile verilebilir
+            series = self._add_series(element_id, metric, "")
+            self._catalog_dirty = True
+        return series
+
+    # --- YAZMA ---
+
+    def append(self, element_id: str, value: float, timestamp: Optional[float] = None,
+               metric: str = VEHICLE_COUNT):
+        series = self._series_for(element_id, metric)
+        series.ts.append(round((time.time() if timestamp is None else timestamp) * 1000))
+        series.values.append(value)
+        if len(series.ts) >= self.chunk_size:
+            self._seal(series)
+
+    def ingest(self, element_ids: Sequence[str], values: Sequence[float],
+               timestamps: Union[None, float, Sequence[float]] = None, metric: str = VEHICLE_COUNT) -> int:
+        """
+        Bir ölçüm turunu geçmişe ekler (SensorStore.ingest ile aynı imza).
+
+        Args:
+            element_ids: Cihaz kimlikleri.
+            values: Aynı sırada ölçüm değerleri.
+            timestamps: Tek bir epoch değeri, okuma başına dizi ya da None (şimdi).
+            metric: Ölçüm adı.
+        Returns:
+            int: Yazılan okuma sayısı.
+        """
+        if len(element_ids) != len(values):
+            raise ValueError("Kimlik ve değer dizileri aynı uzunlukta olmalı.")
+        if timestamps is None or np.isscalar(timestamps):
+            stamp = round((time.time() if timestamps is None else float(timestamps)) * 1000)
+            stamps = [stamp] * len(element_ids)
+        else:
+            stamps = np.round(np.asarray(timestamps, dtype=np.float64) * 1000).astype(np.int64).tolist()
+        series_for = self._series_for
+        chunk_size = self.chunk_size
+        for element_id, value, stamp in zip(element_ids, np.asarray(values, dtype=np.float64).tolist(), stamps):
+            series = series_for(element_id, metric)
+            series.ts.append(stamp)
+            series.values.append(value)
+            if len(series.ts) >= chunk_size:
+                self._seal(series)
+        return len(element_ids)
+
+    def record_elements(self, elements: Iterable[TrafficElement], timestamp: Optional[float] = None) -> int:
+        """Sensörlerin anlık araç sayısını ve kameraların toplam ihlal sayısını geçmişe yazar."""
+        written = 0
+        for element in elements:
+            metric = self._metric_of(element)
+            if metric is None:
+                continue
+            self.register(element.element_id, element.location, metric)
+            value = element.vehicle_count if metric == VEHICLE_COUNT else element.violation_count
+            self.append(element.element_id, value, timestamp, metric)
+            written += 1
+        return written
+
+    def _write_chunk(self, series: _Series, level: int, rows: int, codes: str, first: int, last: int,
+                     payload: bytes):
+        if self._catalog_dirty:
+            # Parça, kataloğunda olmayan bir seriye işaret etmesin
+            self._save_catalog()
+        offset = self._file.tell() + _CHUNK.size
+        self._file.write(_CHUNK.pack(len(payload), zlib.crc32(payload), series.number, rows, level,
+                                     codes.encode("ascii"), first, last))
+        self._file.write(payload)
+        self._file.flush()
+        self._index_chunk(series, level, first, last, offset, len(payload), rows, codes.encode("ascii"))
+
+    def _seal(self, series: _Series):
+        """Açık ham tamponu sıkıştırılmış parça olarak yazar ve özetlerini çıkarır."""
+        ts, values = series.head()
+        series.ts, series.values = array("q"), array("d")
+        if not len(ts):
+            return
+        order = np.argsort(ts, kind="stable")
+        ts, values = ts[order], values[order]
+        first, last = int(ts[0]), int(ts[-1])
+        deltas = np.diff(ts)
+        first_delta = int(deltas[0]) if len(deltas) else 0
+        ts_code, ts_bytes = _narrow(np.diff(deltas, prepend=first_delta))
+        if _integral(values):
+            ints = values.astype(np.int64)
+            first_value = int(ints[0])
+            value_code, value_bytes = _narrow(np.diff(ints))
+        else:
+            first_value = 0
+            value_code, value_bytes = "d", values.tobytes()
+        self._write_chunk(series, 0, len(ts), ts_code + value_code + "   ", first, last,
+                          _RAW_BASE.pack(first_delta, first_value) + ts_bytes + value_bytes)
+        for level, resolution in enumerate(RESOLUTIONS, 1):
+            series.rollups[level].append(_rollup(ts, values, resolution * 1000))
+            if series.pending_rows(level) >= self.rollup_chunk_size:
+                self._seal_rollups(series, level)
+
+    def _seal_rollups(self, series: _Series, level: int):
+        parts, series.rollups[level] = series.rollups[level], []
+        if not parts:
+            return
+        start, count, total, low, high = _merge_rows(parts)
+        step = RESOLUTIONS[level - 1] * 1000
+        buckets = start // step
+        bucket_code, bucket_bytes = _narrow(np.diff(buckets, prepend=buckets[0]))
+        columns = [(bucket_code, bucket_bytes), _narrow(count)] + [_encode_values(c) for c in (total, low, high)]
+        self._write_chunk(series, level, len(start), "".join(code for code, _ in columns), int(start[0]),
+                          int(start[-1]), b"".join(data for _, data in columns))
+
+    def flush(self):
+        """Tüm açık tamponları ve bekleyen özetleri diske yazar (kapanışta ve düzenli aralıklarla)."""
+        for series in self._series:
+            if len(series.ts):
+                self._seal(series)
+            for level in range(1, len(RESOLUTIONS) + 1):
+                self._seal_rollups(series, level)
+        if self._catalog_dirty:
+            self._save_catalog()
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        self._reader.close()
+        self._cache.clear()
+
+    @property
+    def nbytes(self) -> int:
+        """Parça dosyasının boyutu (bayt)."""
+        return self._file.tell()
+
+    # --- OKUMA ---
+
+    def _decode(self, level: int, chunk: tuple) -> tuple:
+        first, _, offset, length, rows, codes = chunk
+        decoded = self._cache.get(offset)
+        if decoded is not None:
+            self._cache.move_to_end(offset)
+            return decoded
+        self._reader.seek(offset - _CHUNK.size)
+        crc = _CHUNK.unpack(self._reader.read(_CHUNK.size))[1]
+        payload = self._reader.read(length)
+        if zlib.crc32(payload) != crc:
+            raise TimeSeriesError(f"{self._chunk_path}: {offset} ofsetindeki parça bozuk")
+        codes = codes.decode("ascii")
+        if level == 0:
+            first_delta, first_value = _RAW_BASE.unpack_from(payload)
+            column, position = _column(payload, codes[0], rows - 1, _RAW_BASE.size)
+            ts = np.empty(rows, dtype=np.int64)
+            ts[0] = first
+            np.cumsum(np.cumsum(column, dtype=np.int64) + first_delta, out=ts[1:])
+            ts[1:] += first
+            if codes[1] == "d":
+                values = _column(payload, "d", rows, position)[0].copy()
+            else:
+                values = np.empty(rows, dtype=np.float64)
+                values[0] = first_value
+                values[1:] = np.cumsum(_column(payload, codes[1], rows - 1, position)[0], dtype=np.int64) + first_value
+            decoded = (ts, values)
+        else:
+            column, position = _column(payload, codes[0], rows, 0)
+            step = RESOLUTIONS[level - 1] * 1000
+            start = (np.cumsum(column, dtype=np.int64) + first // step) * step
+            count, position = _column(payload, codes[1], rows, position)
+            total, position = _column(payload, codes[2], rows, position)
+            low, position = _column(payload, codes[3], rows, position)
+            high, position = _column(payload, codes[4], rows, position)
+            decoded = (start, count.astype(np.int64), total.astype(np.float64), low.astype(np.float64),
+                       high.astype(np.float64))
+        self._cache[offset] = decoded
+        if len(self._cache) > self.cache_chunks:
+            self._cache.popitem(last=False)
+        return decoded
+
+    def _overlapping(self, series: _Series, level: int, low: int, high: int) -> Iterator[tuple]:
+        """[low, high) aralığıyla kesişen diskteki parçaları çözülmüş olarak döndürür."""
+        chunks = series.chunks[level]
+        for i in range(bisect_left(chunks, (low - series.spans[level],)), len(chunks)):
+            chunk = chunks[i]
+            if chunk[0] >= high:
+                break
+            if chunk[1] >= low:
+                yield self._decode(level, chunk)
+
+    def _rows(self, series: _Series, level: int, low: int, high: int) -> Iterator[tuple]:
+        """Başlangıcı [low, high) içinde olan özet satırları (disk + bekleyen)."""
+        for part in list(self._overlapping(series, level, low, high)) + series.rollups[level]:
+            mask = (part[0] >= low) & (part[0] < high)
+            yield tuple(column[mask] for column in part)
+
+    def _select(self, element_id: Optional[str], location: Optional[str], metric: str) -> List[_Series]:
+        if element_id is not None:
+            series = self._by_key.get((element_id, metric))
+            return [series] if series is not None else []
+        if location is not None:
+            return list(self._by_location.get(location.casefold(), ()))
+        raise TimeSeriesError("element_id veya location verilmeli.")
+
+    @staticmethod
+    def _range(start: float, end: Optional[float]) -> Tuple[int, int]:
+        low = round(start * 1000)
+        high = round((time.time() if end is None else end) * 1000)
+        if high < low:
+            raise TimeSeriesError("Bitiş zamanı başlangıçtan önce olamaz.")
+        return low, high
+
+    def query(self, element_id: str, start: float, end: Optional[float] = None,
+              metric: str = VEHICLE_COUNT) -> Tuple[np.ndarray, np.ndarray]:
+        """[start, end) aralığındaki ham okumalar: (epoch saniye dizisi, değer dizisi), zamana göre sıralı."""
+        low, high = self._range(start, end)
+        parts = []
+        for series in self._select(element_id, None, metric):
+            parts.extend(self._overlapping(series, 0, low, high))
+            parts.append(series.head())
+        if not parts:
+            return np.empty(0), np.empty(0)
+        ts = np.concatenate([part[0] for part in parts])
+        values = np.concatenate([part[1] for part in parts])
+        mask = (ts >= low) & (ts < high)
+        ts, values = ts[mask], values[mask]
+        order = np.argsort(ts, kind="stable")
+        return ts[order] / 1000.0, values[order]
+
+    def aggregate(self, start: float, end: Optional[float] = None, element_id: Optional[str] = None,
+                  location: Optional[str] = None, metric: str = VEHICLE_COUNT) -> dict:
+        """
+        [start, end) aralığının özeti (tek cihaz veya bir konumdaki tüm cihazlar).
+
+        Returns:
+            dict: count, sum, mean, min, max (veri yoksa mean/min/max None).
+        """
+        low, high = self._range(start, end)
+        plan = _plan(low, high)
+        stats = _Stats()
+        for series in self._select(element_id, location, metric):
+            for level, piece_low, piece_high in plan:
+                if level == 0:
+                    for ts, values in self._overlapping(series, 0, piece_low, piece_high):
+                        stats.add_values(values[(ts >= piece_low) & (ts < piece_high)])
+                else:
+                    for _, count, total, row_low, row_high in self._rows(series, level, piece_low, piece_high):
+                        stats.add_rows(count, total, row_low, row_high)
+            # Açık tampon henüz özetlenmedi; diske yazılmış okumalardan ayrı bir kümedir
+            ts, values = series.head()
+            stats.add_values(values[(ts >= low) & (ts < high)])
+        return stats.result()
+
+    def average(self, start: float, end: Optional[float] = None, element_id: Optional[str] = None,
+                location: Optional[str] = None, metric: str = VEHICLE_COUNT) -> Optional[float]:
+        """Aralıktaki ortalama değer (ör. bir konumun geçen haftaki ortalama yoğunluğu)."""
+        return self.aggregate(start, end, element_id, location, metric)["mean"]
+
+    def downsample(self, start: float, end: Optional[float] = None, resolution: int = 3600,
+                   element_id: Optional[str] = None, location: Optional[str] = None,
+                   metric: str = VEHICLE_COUNT) -> Dict[str, np.ndarray]:
+        """
+        Aralığı resolution saniyelik kovalara özetler (aralık kova sınırlarına genişletilir).
+
+        Returns:
+            dict: time (kova başı, epoch sn), count, mean, min, max dizileri.
+        """
+        if resolution not in RESOLUTIONS:
+            raise TimeSeriesError(f"Çözünürlük {RESOLUTIONS} değerlerinden biri olmalı.")
+        level = RESOLUTIONS.index(resolution) + 1
+        step = resolution * 1000
+        low, high = self._range(start, end)
+        low, high = low // step * step, -(-high // step) * step
+        parts = []
+        for series in self._select(element_id, location, metric):
+            parts.extend(self._rows(series, level, low, high))
+            ts, values = series.head()
+            mask = (ts >= low) & (ts < high)
+            if mask.any():
+                order = np.argsort(ts[mask], kind="stable")
+                parts.append(_rollup(ts[mask][order], values[mask][order], step))
+        parts = [part for part in parts if len(part[0])]
+        if not parts:
+            return {"time": np.empty(0), "count": np.empty(0, dtype=np.int64), "mean": np.empty(0),
+                    "min": np.empty(0), "max": np.empty(0)}
+        start_ms, count, total, row_low, row_high = _merge_rows(parts)
+        return {"time": start_ms / 1000.0, "count": count, "mean": total / count, "min": row_low, "max": row_high}
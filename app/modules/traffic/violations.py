@@ -0,0 +1,220 @@
+"""
+TRAFİK MODÜLÜ - HIZ İHLALİ AKIŞ HATTI (STREAMING PIPELINE)
+
+Hız kamerası ölçümlerini (kamera_id, plaka, hız, zaman) akış halinde
+TrafficViolation kayıtlarına dönüştürür. Kayıtlar toplu halde yalnızca
+sona ekleme yapılan bir dosyaya yazılır ve her kamera için kayan pencere
+istatistikleri tutulur.
+
+Geri basınç (backpressure):
+- Senkron yol (process) çekme tabanlıdır; üretici, tüketici hızında okunur.
+- Asenkron yol (consume) sınırlı bir asyncio.Queue kullanır; kuyruk dolunca
+  üreticinin `await queue.put(...)` çağrısı bekler.
+"""
+
+import asyncio
+import csv
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .implementations import SpeedCamera, TrafficViolation
+
+# (kamera_id, plaka, hız km/s, epoch zaman damgası)
+Reading = Tuple[str, str, float, float]
+
+
+class ViolationFileSink:
+    """
+    İhlalleri toplu halde sona ekleme (append-only) CSV dosyasına yazar.
+    Sütunlar: zaman, kamera, ihlal kimliği, plaka, hız, limit. Virgül ya da
+    tırnak içeren alanlar csv modülü tarafından tırnaklanır.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", newline="", buffering=1 << 16)
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self.written = 0
+
+    def write_batch(self, violations: List[TrafficViolation]):
+        self._writer.writerows(
+            (f"{v.timestamp:.3f}", v.camera_id, v.violation_id, v.vehicle_plate,
+             f"{v.detected_speed:.1f}", f"{v.limit:.1f}")
+            for v in violations
+        )
+        self.written += len(violations)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            self._file.close()
+
+    @staticmethod
+    def read_all(path: str) -> Iterator[TrafficViolation]:
+        """Dosyadaki kayıtları tekrar TrafficViolation nesnelerine çevirir."""
+        with open(path, encoding="utf-8", newline="") as f:
+            for ts, camera_id, violation_id, plate, speed, limit in csv.reader(f):
+                yield TrafficViolation(violation_id, plate, float(speed), float(limit), float(ts), camera_id)
+
+
+class CameraStats:
+    """
+    Tek kamera için saniyelik kovalardan oluşan kayan pencere istatistiği.
+    Güncelleme O(1)'dir; pencere dışına çıkan kovalar yeniden kullanılır.
+    Kovalar mutlak saniyeyle etiketlidir; sıra dışı gelen okumalar kendi
+    saniyesine yazılır, pencereden eski olanlar daha yeni kovayı ezmez.
+    """
+    __slots__ = ("window", "_second", "_readings", "_violations", "_speed_sum", "_max_speed")
+
+    def __init__(self, window_seconds: int = 60):
+        self.window = window_seconds
+        self._second = [-1] * window_seconds
+        self._readings = [0] * window_seconds
+        self._violations = [0] * window_seconds
+        self._speed_sum = [0.0] * window_seconds
+        self._max_speed = [0.0] * window_seconds
+
+    def observe(self, timestamp: float, speed: float, violated: bool):
+        second = int(timestamp)
+        slot = second % self.window
+        current = self._second[slot]
+        if current != second:
+            if second < current:
+                # Kova daha yeni bir saniyeye ait: okuma pencerenin gerisinde kaldı, atılır
+                return
+            self._second[slot] = second
+            self._readings[slot] = 0
+            self._violations[slot] = 0
+            self._speed_sum[slot] = 0.0
+            self._max_speed[slot] = 0.0
+        self._readings[slot] += 1
+        self._speed_sum[slot] += speed
+        if violated:
+            self._violations[slot] += 1
+        if speed > self._max_speed[slot]:
+            self._max_speed[slot] = speed
+
+    def snapshot(self, now: float) -> dict:
+        """Son `window` saniyenin özetini döndürür."""
+        oldest = int(now) - self.window
+        readings = violations = 0
+        speed_sum = max_speed = 0.0
+        for slot, second in enumerate(self._second):
+            if second > oldest:
+                readings += self._readings[slot]
+                violations += self._violations[slot]
+                speed_sum += self._speed_sum[slot]
+                max_speed = max(max_speed, self._max_speed[slot])
+        return {
+            "readings": readings,
+            "violations": violations,
+            "avg_speed": round(speed_sum / readings, 2) if readings else 0.0,
+            "max_speed": round(max_speed, 2),
+            "violation_rate": round(violations / readings, 4) if readings else 0.0,
+        }
+
+
+class ViolationPipeline:
+    """
+    Kamera ölçümlerini ihlal kayıtlarına dönüştüren akış hattı.
+
+    Args:
+        cameras: kamera_id -> SpeedCamera eşlemesi.
+        sink: write_batch(list) metodu olan hedef (ör. ViolationFileSink) veya None.
+        batch_size: Hedefe tek seferde yazılacak ihlal sayısı.
+        window_seconds: Kamera istatistik penceresi.
+    """
+
+    def __init__(self, cameras: Dict[str, SpeedCamera], sink=None,
+                 batch_size: int = 4096, window_seconds: int = 60):
+        self.cameras = cameras
+        self.sink = sink
+        self.batch_size = batch_size
+        self.window_seconds = window_seconds
+        self.stats: Dict[str, CameraStats] = {}
+        self.processed = 0
+        self.unknown_camera = 0
+        self._pending: List[TrafficViolation] = []
+
+    @classmethod
+    def from_repository(cls, repository, **kwargs) -> "ViolationPipeline":
+        """Depodaki tüm hız kameralarıyla bir akış hattı kurar."""
+        cameras = {camera.element_id: camera for camera in repository.find_all_by_type(SpeedCamera)}
+        return cls(cameras, **kwargs)
+
+    def detect(self, readings: Iterable[Reading]) -> Iterator[TrafficViolation]:
+        """Ölçüm akışını tüketir, yalnızca ihlalleri üretir (generator)."""
+        cameras = self.cameras
+        stats = self.stats
+        window = self.window_seconds
+        processed = 0
+        try:
+            for camera_id, plate, speed, timestamp in readings:
+                processed += 1
+                camera = cameras.get(camera_id)
+                if camera is None:
+                    self.unknown_camera += 1
+                    continue
+                camera_stats = stats.get(camera_id)
+                if camera_stats is None:
+                    camera_stats = stats[camera_id] = CameraStats(window)
+                if speed > camera.speed_limit:
+                    camera_stats.observe(timestamp, speed, True)
+                    yield camera.check_reading(plate, speed, timestamp)
+                else:
+                    camera_stats.observe(timestamp, speed, False)
+        finally:
+            self.processed += processed
+
+    def _emit(self, violation: TrafficViolation):
+        self._pending.append(violation)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def process(self, readings: Iterable[Reading],
+                on_violation: Optional[Callable[[TrafficViolation], None]] = None) -> int:
+        """Senkron akış: tüm ölçümleri işler, ihlal sayısını döndürür."""
+        count = 0
+        for violation in self.detect(readings):
+            self._emit(violation)
+            if on_violation is not None:
+                on_violation(violation)
+            count += 1
+        self.flush()
+        return count
+
+    async def consume(self, queue: "asyncio.Queue", idle_flush: float = 0.5) -> int:
+        """
+        Sınırlı asyncio kuyruğundan ölçüm listeleri (tick) okur; None gelince durur.
+        Kuyruk uzun süre boş kalırsa bekleyen ihlaller hedefe yazılır.
+        """
+        count = 0
+        while True:
+            try:
+                batch = await asyncio.wait_for(queue.get(), timeout=idle_flush)
+            except asyncio.TimeoutError:
+                self.flush()
+                continue
+            try:
+                if batch is None:
+                    break
+                for violation in self.detect(batch):
+                    self._emit(violation)
+                    count += 1
+            finally:
+                queue.task_done()
+        self.flush()
+        return count
+
+    def flush(self):
+        if not self._pending:
+            return
+        if self.sink is not None:
+            self.sink.write_batch(self._pending)
+        self._pending = []
+
+    def camera_report(self, camera_id: str, now: float) -> Optional[dict]:
+        camera_stats = self.stats.get(camera_id)
+        return None if camera_stats is None else camera_stats.snapshot(now)
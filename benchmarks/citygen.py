@@ -0,0 +1,108 @@
+"""
+SENTETİK ŞEHİR ÜRETECİ
+
+Benchmark'lar için tohumlu (tekrarlanabilir) şehir verisi üretir: trafik
+cihazları (ışık, kamera, sensör) ve koordinatlı acil durum birimleri.
+Konumlar "Bölge-<i>/Cadde-<j>" biçimindedir; konum sayısı cihaz sayısının
+kareköküyle büyür, böylece konum başına düşen cihaz sayısı gerçekçi kalır.
+"""
+
+import math
+import random
+from typing import List, Tuple
+
+from app.modules.emergency.implementations import Ambulance, FireDepartment, HazmatUnit, PoliceUnit
+from app.modules.emergency.repository import EmergencyRepository
+from app.modules.traffic.base import TrafficElement
+from app.modules.traffic.implementations import IntersectionSensor, SpeedCamera, TrafficLight
+from app.modules.traffic.repository import TransportRepository
+
+CITY_CENTER = (39.92, 32.85)
+CITY_RADIUS_DEG = 0.2   # yaklaşık 20 km
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+
+
+def parse_size(text: str) -> int:
+    """'1k', '100k', '1M' veya düz sayı."""
+    if text in SIZES:
+        return SIZES[text]
+    multiplier = {"k": 1_000, "K": 1_000, "m": 1_000_000, "M": 1_000_000}.get(text[-1:])
+    return int(float(text[:-1]) * multiplier) if multiplier else int(text)
+
+
+def size_label(size: int) -> str:
+    for label, value in SIZES.items():
+        if value == size:
+            return label
+    return str(size)
+
+
+class SyntheticCity:
+    """
+    Args:
+        devices: Trafik cihazı sayısı (üç tipe eşit bölünür).
+        units: Acil durum birimi sayısı; None ise cihaz sayısının onda biri.
+        seed: Tohum; aynı tohum aynı şehri üretir.
+    """
+
+    def __init__(self, devices: int, units: int = None, seed: int = 1):
+        self.devices = devices
+        self.units = max(4, devices // 10) if units is None else units
+        self.rng = random.Random(seed)
+        self.locations = self._make_locations(max(4, int(math.sqrt(devices))))
+
+    @staticmethod
+    def _make_locations(count: int) -> List[str]:
+        districts = max(1, int(math.sqrt(count)))
+        return [f"Bölge-{i % districts}/Cadde-{i // districts}" for i in range(count)]
+
+    def random_coordinates(self) -> Tuple[float, float]:
+        lat, lon = CITY_CENTER
+        return (lat + self.rng.uniform(-CITY_RADIUS_DEG, CITY_RADIUS_DEG),
+                lon + self.rng.uniform(-CITY_RADIUS_DEG, CITY_RADIUS_DEG))
+
+    def traffic_elements(self) -> List[TrafficElement]:
+        rng = self.rng
+        locations = self.locations
+        elements = []
+        for i in range(self.devices):
+            location = locations[rng.randrange(len(locations))]
+            kind = i % 3
+            if kind == 0:
+                element = TrafficLight(f"TL-{i}", location, rng.choice(("Red", "Green")))
+            elif kind == 1:
+                element = SpeedCamera(f"CAM-{i}", location, speed_limit=rng.choice((50, 70, 90)))
+            else:
+                element = IntersectionSensor(f"SEN-{i}", location)
+                element.vehicle_count = rng.randint(0, 100)
+            if rng.random() < 0.05:
+                element.status = "Maintenance"
+            elements.append(element)
+        return elements
+
+    def emergency_units(self) -> list:
+        rng = self.rng
+        units = []
+        for i in range(self.units):
+            location = self.locations[rng.randrange(len(self.locations))]
+            coordinates = self.random_coordinates()
+            kind = i % 4
+            if kind == 0:
+                units.append(FireDepartment(f"F-{i}", location, rng.choice((3000, 5000, 10000)), coordinates))
+            elif kind == 1:
+                units.append(Ambulance(f"A-{i}", location, rng.choice(("Basic", "Advanced")), coordinates))
+            elif kind == 2:
+                units.append(PoliceUnit(f"P-{i}", location, f"Zone-{i % 50}", coordinates))
+            else:
+                units.append(HazmatUnit(f"H-{i}", location, rng.choice(("A", "B", "C")), coordinates))
+        return units
+
+    def build(self) -> Tuple[TransportRepository, EmergencyRepository, List[TrafficElement], list]:
+        elements = self.traffic_elements()
+        units = self.emergency_units()
+        transport = TransportRepository()
+        transport.save_many(elements)
+        emergency = EmergencyRepository()
+        for unit in units:
+            emergency.add_unit(unit)
+        return transport, emergency, elements, units
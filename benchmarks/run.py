@@ -0,0 +1,376 @@
+"""
+SICAK YOL (HOT PATH) BENCHMARK PAKETİ
+
+Sentetik şehirler üzerinde repository, sevk ve trafik servislerinin sık
+çağrılan metotlarını ölçer; sonuçları sürümler arasında karşılaştırılabilen
+bir JSON dosyasına yazar.
+
+Kullanım:
+    python -m benchmarks.run --sizes 1k,100k --out bench.json
+    python -m benchmarks.run --sizes 1M --no-memory
+    python -m benchmarks.run --compare eski.json yeni.json --threshold 0.15
+
+Her durum (case) için en iyi tekrar süresi raporlanır (işlem başına µs).
+Bellek tepe değeri tracemalloc ile ayrı bir koşuda ölçülür; tracemalloc
+ölçümü yavaşlattığı için süre ölçümlerine karışmaz.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Optional
+
+from app.core.event_bus import DensityChanged, EventBus
+from app.modules.emergency.base import UnitStatus
+from app.modules.emergency.implementations import EmergencyService
+from app.modules.emergency.telemetry import TelemetryChannel
+from app.modules.traffic.implementations import IntersectionSensor, TrafficLight, TrafficService
+from app.modules.traffic.preemption import PreemptionController
+from app.modules.traffic.repository import TransportRepository
+
+from .citygen import SyntheticCity, parse_size, size_label
+
+SCHEMA_VERSION = 1
+
+
+class Case:
+    """
+    Tek bir ölçüm durumu.
+
+    Args:
+        name: Sonuç dosyasındaki kimlik (ör. "transport.save").
+        setup: city -> durum; süre ölçümüne dahil değildir.
+        run: durum -> yapılan işlem sayısı; ölçülen kısım.
+        teardown: durum -> None; sonraki tekrar için şehri eski haline getirir.
+    """
+
+    def __init__(self, name: str, setup: Callable, run: Callable, teardown: Optional[Callable] = None):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.teardown = teardown
+
+
+# --- DURUMLAR ---
+
+def _save_setup(city):
+    return {"elements": city.elements, "repository": None}
+
+
+def _save_run(state):
+    repository = state["repository"] = TransportRepository()
+    for element in state["elements"]:
+        repository.save(element)
+    return len(state["elements"])
+
+
+def _save_teardown(state):
+    # Yeni repository'nin cihazlara eklediği gözlemci bir sonraki tekrara taşınmasın
+    callback = state["repository"]._on_element_changed
+    for element in state["elements"]:
+        element.remove_observer(callback)
+
+
+def _by_location_setup(city):
+    rng = random.Random(2)
+    return city.transport, [rng.choice(city.generator.locations) for _ in range(1000)]
+
+
+def _by_location_run(state):
+    repository, queries = state
+    for location in queries:
+        repository.find_all_by_location(location)
+    return len(queries)
+
+
+def _by_status_setup(city):
+    return city.transport, ["Maintenance", "Active"] * 5
+
+
+def _by_status_run(state):
+    repository, statuses = state
+    for status in statuses:
+        repository.filter_by_status(status)
+    return len(statuses)
+
+
+def _stats_run(city):
+    stats = city.emergency.operational_stats
+    for _ in range(10000):
+        stats()
+    return 10000
+
+
+def _dispatch_setup(city):
+    generator = city.generator
+    service = EmergencyService(city.emergency)
+    incident_types = ["Fire", "Medical", "Security", "Radiation"]
+    incidents = [
+        service.create_incident_report(f"BENCH-{i}", incident_types[i % 4], 1 + i % 5, "Bench",
+                                       generator.random_coordinates())
+        for i in range(1000)
+    ]
+    return service, incidents
+
+
+def _dispatch_run(state):
+    service, incidents = state
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        for incident in incidents:
+            service.dispatch_nearest_unit(incident)
+    return len(incidents)
+
+
+def _dispatch_teardown(state):
+    service, incidents = state
+    # Önce kuyruk boşaltılır; yoksa boşa çıkan birim bekleyen olaylara atanır
+    for incident in incidents:
+        service.scheduler.cancel(incident.incident_id)
+    for unit_id in service.assignments.values():
+        service.repo.get_unit_by_id(unit_id).status = UnitStatus.IDLE
+    service.assignments.clear()
+
+
+def _density_setup(city):
+    rng = random.Random(3)
+    sensors = [e.element_id for e in city.elements if isinstance(e, IntersectionSensor)]
+    return TrafficService(city.transport), [rng.choice(sensors) for _ in range(10000)]
+
+
+def _density_run(state):
+    service, sensor_ids = state
+    for sensor_id in sensor_ids:
+        service.calculate_intersection_density(sensor_id)
+    return len(sensor_ids)
+
+
+def _bus_setup(city):
+    # Konum filtreli senkron abone + toplu (batch) abone; yayın başına iki teslim
+    sensors = [e for e in city.elements if isinstance(e, IntersectionSensor)][:1000]
+    bus = EventBus()
+    received = []
+    bus.subscribe(lambda event: None, DensityChanged, locations={s.location for s in sensors[::2]})
+    bus.subscribe(received.extend, DensityChanged, mode="batch", overflow="drop_oldest")
+    events = [DensityChanged(s.element_id, s.location, 90, "Kritik", "Normal", 0.0) for s in sensors]
+    return bus, events * (100000 // max(len(events), 1)), received
+
+
+def _bus_run(state):
+    bus, events, received = state
+    bus.publish_many(events)
+    bus.pump()
+    received.clear()
+    return len(events)
+
+
+def _preempt_setup(city):
+    # 50 araç, her biri 40 kavşaklık rota; düğüm i -> i. ışık
+    lights = [e.element_id for e in city.elements if isinstance(e, TrafficLight)]
+    controller = PreemptionController(city.transport, clock=lambda: 0.0)
+    for i, light_id in enumerate(lights):
+        controller.bind(f"N{i}", [light_id])
+    rng = random.Random(5)
+    routes = [[(f"N{rng.randrange(len(lights))}", 30.0 * k) for k in range(40)] for _ in range(50)]
+    return controller, routes
+
+
+def _preempt_run(state):
+    # Tüm pencereler açılıp kapanana kadar saniyelik adımlarla ilerler
+    controller, routes = state
+    for vehicle, route in enumerate(routes):
+        controller.preempt(f"V-{vehicle}", route, 0.0)
+    for second in range(1300):
+        controller.advance(float(second))
+    return len(routes)
+
+
+def _telemetry_setup(city):
+    # Tüm filo için saniyelik konum paketleri; birimlerin yarısı titreşim eşiğinin üstünde yer değiştirir
+    units = [unit for unit in city.emergency.get_all_unit() if unit.coordinates is not None][:10000]
+    channel = TelemetryChannel(EmergencyService(city.emergency))
+    ids = [unit.unit_id for unit in units]
+    origin = [unit.coordinates for unit in units]
+    ticks = []
+    for tick in range(1, 6):
+        step = 0.0005 * tick
+        ticks.append(([lat + (step if i % 2 else 0.0) for i, (lat, _) in enumerate(origin)],
+                      [lon for _, lon in origin], float(tick)))
+    return channel, ids, origin, ticks
+
+
+def _telemetry_run(state):
+    channel, ids, _, ticks = state
+    for latitudes, longitudes, stamp in ticks:
+        channel.ingest(ids, latitudes, longitudes, stamp)
+    return len(ids) * len(ticks)
+
+
+def _telemetry_teardown(state):
+    channel, ids, origin, _ = state
+    repository = channel.repo
+    for unit_id, coordinates in zip(ids, origin):
+        repository.move_unit(unit_id, coordinates)
+
+
+CASES = [
+    Case("transport.save", _save_setup, _save_run, _save_teardown),
+    Case("transport.find_all_by_location", _by_location_setup, _by_location_run),
+    Case("transport.filter_by_status", _by_status_setup, _by_status_run),
+    Case("emergency.operational_stats", lambda city: city, _stats_run),
+    Case("emergency.dispatch_nearest_unit", _dispatch_setup, _dispatch_run, _dispatch_teardown),
+    Case("traffic.calculate_intersection_density", _density_setup, _density_run),
+    Case("event_bus.publish", _bus_setup, _bus_run),
+    Case("traffic.preempt_route", _preempt_setup, _preempt_run),
+    Case("emergency.telemetry_ingest", _telemetry_setup, _telemetry_run, _telemetry_teardown),
+]
+
+class City:
+    """Üretilmiş şehir ve repository'leri."""
+
+    def __init__(self, generator: SyntheticCity):
+        self.generator = generator
+        self.transport, self.emergency, self.elements, self.units = generator.build()
+
+
+# --- ÇALIŞTIRMA ---
+
+def measure(case: Case, city: City, repeat: int, memory: bool) -> dict:
+    state = case.setup(city)
+    best = float("inf")
+    ops = 0
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        ops = case.run(state)
+        best = min(best, time.perf_counter() - started)
+        if case.teardown:
+            case.teardown(state)
+    result = {
+        "case": case.name,
+        "ops": ops,
+        "seconds": round(best, 6),
+        "us_per_op": round(best / ops * 1e6, 3),
+        "ops_per_sec": round(ops / best, 1) if best > 0 else None,
+    }
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        case.run(state)
+        result["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+        if case.teardown:
+            case.teardown(state)
+    return result
+
+
+def run_suite(sizes: List[int], repeat: int = 3, memory: bool = True, cases: Optional[List[str]] = None,
+              seed: int = 1, log=print) -> dict:
+    selected = [case for case in CASES if not cases or case.name in cases]
+    report = {
+        "schema": SCHEMA_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "revision": _git_revision(),
+        "sizes": {},
+        "results": [],
+    }
+    for size in sizes:
+        label = size_label(size)
+        gc.collect()
+        if memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        city = City(SyntheticCity(size, seed=seed))
+        build = {"seconds": round(time.perf_counter() - started, 3), "traced": memory,
+                 "devices": size, "units": city.generator.units}
+        if memory:
+            build["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            tracemalloc.stop()
+        report["sizes"][label] = build
+        log(f"[{label}] şehir kuruldu: {build}")
+
+        for case in selected:
+            result = measure(case, city, repeat, memory)
+            result["size"] = label
+            report["results"].append(result)
+            log(f"[{label}] {case.name:<42} {result['us_per_op']:>12.3f} µs/işlem"
+                + (f"  tepe {result['peak_kb']} KB" if "peak_kb" in result else ""))
+        del city
+    return report
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(old: dict, new: dict, threshold: float = 0.10) -> List[dict]:
+    """
+    İki sonuç dosyasını (size, case) bazında karşılaştırır.
+
+    Returns:
+        list: Her ortak ölçüm için oran ve gerileme (regression) işareti.
+    """
+    baseline = {(r["size"], r["case"]): r for r in old["results"]}
+    rows = []
+    for result in new["results"]:
+        before = baseline.get((result["size"], result["case"]))
+        if before is None:
+            continue
+        ratio = result["us_per_op"] / before["us_per_op"] if before["us_per_op"] else float("inf")
+        row = {"size": result["size"], "case": result["case"], "old_us": before["us_per_op"],
+               "new_us": result["us_per_op"], "ratio": round(ratio, 3), "regression": ratio > 1 + threshold}
+        if "peak_kb" in result and "peak_kb" in before:
+            row["peak_kb_delta"] = round(result["peak_kb"] - before["peak_kb"], 1)
+        rows.append(row)
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Akıllı Şehir sıcak yol benchmark'ları")
+    parser.add_argument("--sizes", default="1k,100k", help="Virgülle ayrılmış boyutlar (1k, 100k, 1M)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--case", action="append", help="Yalnızca bu durum(lar)ı çalıştır")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc ölçümünü atla")
+    parser.add_argument("--out", help="Sonuç JSON dosyası")
+    parser.add_argument("--compare", nargs=2, metavar=("ESKI", "YENI"), help="İki sonuç dosyasını karşılaştır")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Gerileme sayılacak yavaşlama oranı")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            new = json.load(f)
+        rows = compare(old, new, args.threshold)
+        for row in rows:
+            flag = "GERİLEME" if row["regression"] else ""
+            print(f"{row['size']:>5} {row['case']:<42} {row['old_us']:>12.3f} -> {row['new_us']:>12.3f} µs "
+                  f"x{row['ratio']:<6} {flag}")
+        return 1 if any(row["regression"] for row in rows) else 0
+
+    sizes = [parse_size(text.strip()) for text in args.sizes.split(",") if text.strip()]
+    report = run_suite(sizes, args.repeat, not args.no_memory, args.case)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
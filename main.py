@@ -23,6 +23,10 @@ from app.modules.emergency.implementations import (
     )
 from app.modules.emergency.repository import EmergencyRepository
 
+# Modüller arası olay veriyolu
+from app.core.event_bus import EventBus
+from app.core.reactions import CityReactions
+
 # NOT: Diğer modüller (Enerji, Acil Durum, Sosyal Hizmetler) henüz tam yazılmadığı 
 # için bu aşamada 'Mock' (geçici/taslak) yapılar veya temel sınıflar kullanılabilir.
 
@@ -33,14 +37,23 @@ def display_welcome_message():
     print(f"{'Sistem Saati: ' + datetime.now().strftime('%Y-%m-%d %H:%M:%S'):^60}")
     print("="*60)
 
-def simulate_emergency_interaction(location, density_level):
+def simulate_emergency_interaction(location, density_level, bus=None, reactions=None):
     """
     MODÜLLER ARASI ETKİLEŞİM SENARYOSU
-    Trafik yoğunluğu arttığında acil durum birimlerine haber verilmesini simüle eder.
+    Trafik servisi yoğunluk değişimini veriyoluna yayınlar; bekleyen (batch)
+    tepkiler burada işletilir ve yapılan aksiyonlar yazdırılır.
     """
     print(f"\n[SİSTEM MESAJI] Etkileşim Tetiklendi: Trafik Modülü -> Acil Durum Modülü")
     print(f"[BİLGİ] {location} bölgesinde yoğunluk {density_level} seviyesine ulaştı.")
-    print(f"[AKSİYON] Acil Durum birimleri (Ambulans/İtfaiye) alternatif rotalara yönlendiriliyor.")
+    if bus is None or reactions is None:
+        return
+    before = len(reactions.actions)
+    bus.pump()
+    actions = list(reactions.actions)[before:]
+    for action in actions:
+        print(f"[AKSİYON] {action}")
+    if not actions:
+        print(f"[AKSİYON] Olay veriyoluna bildirildi; etkilenen ışık ya da birim yok.")
 
 def display_menu():
     print("\n---Ana Menu ---")
@@ -49,7 +62,7 @@ def display_menu():
     print("3. Cikis")
     return input("Seciminizi yapin: ")
 
-def traffic_module_menu(traffic_manager,main_sensor,pedestrian_light):
+def traffic_module_menu(traffic_manager,main_sensor,pedestrian_light,reactions=None):
     # Simülasyon için araç sayısını doğrudan yüksek bir değere ayarlıyoruz
     main_sensor.vehicle_count = 92 
     
@@ -61,7 +74,7 @@ def traffic_module_menu(traffic_manager,main_sensor,pedestrian_light):
     
     # Eğer yoğunluk "Kritik" ise (92 araç ile öyle olmalı), tüm süreci yazdır
     if current_density == "Kritik":
-        simulate_emergency_interaction(main_sensor.location, current_density)
+        simulate_emergency_interaction(main_sensor.location, current_density, traffic_manager.bus, reactions)
         
         # Trafik ışığı optimizasyonu
         opt_msg = traffic_manager.optimize_light_timing(pedestrian_light.element_id, current_density)
@@ -142,7 +155,8 @@ def main():
     # ---------------------------------------------------------
     # Repository ve Servis başlatma
     traffic_db = TransportRepository()
-    traffic_manager = TrafficService(traffic_db)
+    bus = EventBus()
+    traffic_manager = TrafficService(traffic_db, bus=bus)
 
     # 2. CİHAZ KAYITLARI (MODÜL ÖĞELERİNİN OLUŞTURULMASI)
     # ---------------------------------------------------------
@@ -155,13 +169,15 @@ def main():
 
     #Acil durum modulu
     emergency_db = EmergencyRepository()
-    emergency_service = EmergencyService(emergency_db)
+    emergency_service = EmergencyService(emergency_db).attach_bus(bus)
+    # Yoğunluk -> ışık süreleri, sevk -> ışık önceliği tepkileri
+    reactions = CityReactions(bus, traffic_db, emergency_service, traffic_manager)
 
     while True:
         choice = display_menu()
 
         if choice == "1":
-            traffic_module_menu(traffic_manager,main_sensor,pedestrian_light)
+            traffic_module_menu(traffic_manager,main_sensor,pedestrian_light,reactions)
         elif choice == "2":
             emergency_module_menu(emergency_service)
         elif choice == "3":
@@ -0,0 +1,209 @@
+"""
+PROJE İSMİ: AKILLI ŞEHİR YÖNETİM SİSTEMİ (SMART CITY MANAGEMENT SYSTEM)
+DOSYA: server.py - ETKİLEŞİMSİZ SUNUCU GİRİŞ NOKTASI
+
+main.py'deki konsol menüleri yerine trafik ve acil durum işlemlerini yerel
+bir HTTP/JSON API üzerinden sunar (bkz. app/api/server.py).
+
+Kullanım:
+    python server.py --port 8080
+    curl -s localhost:8080/traffic/density/TRF-99
+    python server.py --metrics-file /var/lib/node_exporter/smartcity.prom
+    python server.py --snapshot /var/lib/smartcity/city.snap --snapshot-interval 300
+    python server.py --history /var/lib/smartcity/history --history-interval 30
+    python server.py --journal /var/lib/smartcity/incidents.wal
+    python server.py --road-graph /var/lib/smartcity/roads.json --history /var/lib/smartcity/history
+    curl -sG localhost:8080/traffic/history --data-urlencode "location=Merkez Meydan Kavşağı"
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import time
+
+from app.api.server import ApiServer
+from app.core.event_bus import EventBus
+from app.core.metrics import REGISTRY
+from app.core.reactions import CityReactions
+from app.core.snapshot import CitySnapshot, write_snapshot
+from app.modules.emergency.async_service import AsyncEmergencyService
+from app.modules.emergency.base import EmergencyUnit
+from app.modules.emergency.implementations import EmergencyService
+from app.modules.emergency.journal import IncidentJournal
+from app.modules.emergency.repository import EmergencyRepository
+from app.modules.emergency.routing import RouteEngine
+from app.modules.traffic.async_service import AsyncTrafficService
+from app.modules.traffic.implementations import IntersectionSensor, TrafficLight, TrafficService
+from app.modules.traffic.repository import TransportRepository
+
+
+def build_services(timeout: float, snapshot: str = None, history: str = None, journal: str = None,
+                   road_graph: str = None):
+    """
+    Servisleri kurar. Snapshot dosyası varsa şehir durumu oradan (eşlenmiş,
+    tembel) geri yüklenir; yoksa main.py ile aynı başlangıç cihazları kullanılır.
+    history verilirse sensör okumaları o dizindeki zaman serisi deposuna da yazılır
+    ve bu geçmişle eğitilen yoğunluk tahmini ışık zamanlamasında kullanılır.
+    Servisler olay veriyoluyla bağlanır (yoğunluk -> ışık süreleri, sevk -> ışık önceliği);
+    veriyolunun işçileri ve öncelik pencerelerini işleten görev run() içinde başlatılır.
+    journal verilirse olay kayıtları önce o günlükten yeniden oynatılır (snapshot'tan
+    daha yeni durum günlüktedir), günlük güncel durumun checkpoint'iyle sıkıştırılır
+    ve her olay işlemi yanıt verilmeden önce diske yazılır (grup commit).
+    road_graph verilirse yol ağı (RoadGraph.load biçimi) rota motoruna yüklenir: birim
+    ETA'ları, ışık önceliği rotaları ve yoğunluğa göre yeniden rotalama bu motoru kullanır;
+    tahmin modeli varsa kenar yoğunlukları 10 dk sonrasının tahminiyle beslenir.
+    """
+    if snapshot and os.path.exists(snapshot):
+        traffic_db, emergency_service = CitySnapshot.open(snapshot).restore()
+        if emergency_service is None:
+            emergency_service = EmergencyService(EmergencyRepository())
+    else:
+        traffic_db = TransportRepository()
+        traffic_db.save(IntersectionSensor("TRF-99", "Merkez Meydan Kavşağı"))
+        traffic_db.save(TrafficLight("TL-404", "Atatürk Bulvarı", "Red"))
+        emergency_service = EmergencyService(EmergencyRepository())
+    if journal:
+        incident_journal = IncidentJournal(journal)
+        replayed = emergency_service.use_journal(incident_journal, wait=False)
+        # Günlük bundan sonra güncel durumdan başlar; ilk açılışta snapshot'taki olaylar da checkpoint'e girer
+        emergency_service.compact_journal()
+        incident_journal.start()
+        print(f"Olay günlüğü: {journal} ({replayed} kayıt yeniden oynatıldı)")
+    history_store = forecaster = None
+    if history:
+        # NumPy yalnızca geçmiş tutulurken gerekir
+        from app.modules.traffic.timeseries import TimeSeriesStore
+        from app.modules.traffic.forecast import CongestionForecaster
+        sensors = traffic_db.find_all_by_type(IntersectionSensor)
+        history_store = TimeSeriesStore(history)
+        history_store.register_elements(sensors)
+        # Tahmin modeli son 4 haftanın geçmişiyle ısıtılır, sonra her okumayla güncellenir
+        forecaster = CongestionForecaster()
+        forecaster.fit_history(history_store, [s.element_id for s in sensors], time.time() - 28 * 86400)
+    route_engine = None
+    if road_graph:
+        route_engine = RouteEngine.from_file(road_graph)
+        EmergencyUnit.use_route_engine(route_engine)
+        print(f"Yol ağı: {road_graph} ({len(route_engine.graph.nodes)} düğüm)")
+    bus = EventBus()
+    traffic_service = TrafficService(traffic_db, history=history_store, forecaster=forecaster, bus=bus,
+                                     route_engine=route_engine)
+    emergency_service.attach_bus(bus)
+    CityReactions(bus, traffic_db, emergency_service, traffic_service, route_engine)
+    traffic = AsyncTrafficService(traffic_service, timeout=timeout)
+    emergency = AsyncEmergencyService(emergency_service, timeout=timeout)
+    return traffic, emergency
+
+
+def save_snapshot(path: str, traffic: AsyncTrafficService, emergency: AsyncEmergencyService) -> dict:
+    """Şehir durumunu yazar. Olay döngüsünde çalışır; yazım boyunca istekler bekler."""
+    return write_snapshot(path, traffic.service.repository, emergency.service)
+
+
+async def snapshot_periodically(path: str, interval: float, traffic, emergency):
+    """Yük devri (failover) için durumu düzenli aralıklarla diske yazar."""
+    while True:
+        await asyncio.sleep(interval)
+        save_snapshot(path, traffic, emergency)
+
+
+async def flush_history_periodically(traffic: AsyncTrafficService, interval: float):
+    """
+    Okuma geçmişinin açık tamponlarını düzenli aralıklarla diske yazar; çökmede
+    kaybolan geçmiş en fazla interval sn olur. Yazmalarla aynı havuzda çalışır.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await traffic.flush_history(timeout=interval)
+        except asyncio.TimeoutError:
+            print(f"Uyarı: geçmiş {interval} sn içinde diske yazılamadı, sonraki turda yeniden denenecek")
+
+
+async def advance_preemption(preemption, interval: float = 0.5):
+    """Acil durum araçlarının ışık önceliği pencerelerini zamanında açar ve kapatır."""
+    while True:
+        preemption.advance()
+        await asyncio.sleep(interval)
+
+
+async def export_metrics(path: str, interval: float):
+    """Ölçümleri node_exporter textfile collector için dosyaya yazar."""
+    while True:
+        REGISTRY.write_textfile(path)
+        await asyncio.sleep(interval)
+
+
+async def run(host: str, port: int, timeout: float, metrics_file: str = None, metrics_interval: float = 15.0,
+              snapshot: str = None, snapshot_interval: float = 0.0, history: str = None, journal: str = None,
+              road_graph: str = None, history_interval: float = 60.0):
+    traffic, emergency = build_services(timeout, snapshot, history, journal, road_graph)
+    bus = traffic.service.bus.start()
+    server = await ApiServer(traffic, emergency, host=host, port=port).start()
+    print(f"API sunucusu dinlemede: http://{server.host}:{server.port}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+    serving = asyncio.create_task(server.serve_forever())
+    preempting = asyncio.create_task(advance_preemption(traffic.service.preemption))
+    exporter = asyncio.create_task(export_metrics(metrics_file, metrics_interval)) if metrics_file else None
+    flusher = None
+    if traffic.service.history is not None and history_interval > 0:
+        flusher = asyncio.create_task(flush_history_periodically(traffic, history_interval))
+    snapshotter = None
+    if snapshot and snapshot_interval > 0:
+        snapshotter = asyncio.create_task(snapshot_periodically(snapshot, snapshot_interval, traffic, emergency))
+    await stop.wait()
+    print("Sunucu kapatılıyor...")
+    if snapshotter is not None:
+        snapshotter.cancel()
+    if flusher is not None:
+        flusher.cancel()
+    await server.close()
+    serving.cancel()
+    preempting.cancel()
+    await bus.close()
+    if exporter is not None:
+        exporter.cancel()
+        REGISTRY.write_textfile(metrics_file)
+    if traffic.service.history is not None:
+        traffic.service.history.close()
+    if emergency.service.journal is not None:
+        emergency.service.journal.close()
+    if snapshot:
+        meta = save_snapshot(snapshot, traffic, emergency)
+        print(f"Snapshot yazıldı: {snapshot} ({meta['devices']} cihaz, {meta['units']} birim)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Akıllı Şehir Yönetim Sistemi API sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--timeout", type=float, default=5.0, help="İstek başına zaman aşımı (sn)")
+    parser.add_argument("--metrics-file", help="Prometheus metin dosyası (textfile collector)")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, help="Metrik dosyası yazma aralığı (sn)")
+    parser.add_argument("--snapshot", help="Şehir durumu dosyası: varsa açılışta yüklenir, kapanışta yazılır")
+    parser.add_argument("--snapshot-interval", type=float, default=0.0,
+                        help="Snapshot yazma aralığı (sn); 0 ise yalnızca kapanışta")
+    parser.add_argument("--history", help="Sensör okuma geçmişi dizini (zaman serisi deposu ve yoğunluk tahmini, NumPy gerektirir)")
+    parser.add_argument("--history-interval", type=float, default=60.0,
+                        help="Geçmiş tamponlarını diske yazma aralığı (sn); 0 ise yalnızca kapanışta")
+    parser.add_argument("--journal", help="Olay günlüğü (write-ahead journal): açılışta yeniden oynatılır, her işlem yanıttan önce diske yazılır")
+    parser.add_argument("--road-graph", help="Yol ağı JSON dosyası: ETA, ışık önceliği rotaları ve yoğunluğa göre yeniden rotalama")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.host, args.port, args.timeout, args.metrics_file, args.metrics_interval,
+                        args.snapshot, args.snapshot_interval, args.history, args.journal, args.road_graph,
+                        args.history_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+API SUNUCUSU TESTLERİ
+
+Sunucu rastgele bir portta başlatılır ve ham soket üzerinden HTTP/1.1
+istekleri gönderilir (keep-alive, toplu uç noktalar, günlük akışı).
+"""
+
+import asyncio
+import json
+import unittest
+
+from app.api.server import ApiServer
+from app.modules.emergency.async_service import AsyncEmergencyService
+from app.modules.emergency.implementations import Ambulance, EmergencyService
+from app.modules.emergency.repository import EmergencyRepository
+from app.modules.traffic.async_service import AsyncTrafficService
+from app.modules.traffic.implementations import IntersectionSensor, TrafficLight, TrafficService
+from app.modules.traffic.repository import TransportRepository
+
+
+class HttpClient:
+    """Testler için tek bağlantılı, keep-alive destekli küçük istemci."""
+
+    def __init__(self, port):
+        self.port = port
+
+    async def __aenter__(self):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.writer.close()
+
+    def send(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                          + body)
+
+    async def receive(self):
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode().strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.lower()] = value.strip()
+        if headers.get("transfer-encoding") == "chunked":
+            body = b""
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    return status, body.decode()
+                body += chunk[:-2]
+        return status, json.loads(await self.reader.readexactly(int(headers["content-length"])))
+
+    async def request(self, method, path, payload=None):
+        self.send(method, path, payload)
+        return await self.receive()
+
+
+class TestApiServer(unittest.TestCase):
+
+    def setUp(self):
+        self.traffic_db = TransportRepository()
+        self.traffic_db.save_many([IntersectionSensor(f"SN-{i}", "Kızılay") for i in range(10)]
+                                  + [TrafficLight("TL-1", "Kızılay")])
+        self.emergency_db = EmergencyRepository()
+        self.emergency_db.add_unit(Ambulance("A-1", "Merkez", "ALS", coordinates=(39.92, 32.85)))
+
+    def run_with_server(self, scenario):
+        async def main():
+            server = ApiServer(AsyncTrafficService(TrafficService(self.traffic_db)),
+                               AsyncEmergencyService(EmergencyService(self.emergency_db)), port=0)
+            await server.start()
+            try:
+                async with HttpClient(server.port) as client:
+                    return await scenario(client)
+            finally:
+                await server.close()
+        return asyncio.run(main())
+
+    def test_keep_alive_pipelining(self):
+        """Tek bağlantı üzerinden ardışık gönderilen istekler sırayla yanıtlanır."""
+        async def scenario(client):
+            for i in range(20):
+                client.send("GET", f"/traffic/elements/SN-{i % 10}")
+            client.send("GET", "/traffic/elements/YOK")
+            return [await client.receive() for _ in range(21)]
+        responses = self.run_with_server(scenario)
+        self.assertEqual([body["element_id"] for _, body in responses[:3]], ["SN-0", "SN-1", "SN-2"])
+        self.assertEqual(responses[-1][0], 404)
+
+    def test_batch_readings_and_incidents(self):
+        async def scenario(client):
+            readings = [{"sensor_id": f"SN-{i}", "count": 90 if i < 3 else 10} for i in range(10)]
+            accepted = await client.request("POST", "/traffic/readings", readings)
+            density = await client.request("GET", "/traffic/density/SN-0")
+            incidents = [{"incident_id": f"I-{i}", "type": "Medical", "severity": 4 - i,
+                          "location": "Merkez", "coordinates": [39.92, 32.85]} for i in range(2)]
+            created = await client.request("POST", "/emergency/incidents?dispatch=batch", incidents)
+            bad = await client.request("POST", "/emergency/incidents", {"incident_id": "X"})
+            stats = await client.request("GET", "/emergency/stats")
+            return accepted, density, created, bad, stats
+        accepted, density, created, bad, stats = self.run_with_server(scenario)
+        self.assertEqual(accepted, (200, {"accepted": 10}))
+        self.assertEqual(density[1]["density"], "Kritik")
+        self.assertEqual([entry["unit_id"] for entry in created[1]], ["A-1", None])
+        self.assertEqual(bad[0], 400)
+        self.assertIn("error", bad[1])
+        self.assertEqual(stats[1]["queued_incidents"], 1)
+
+    def test_mixed_incident_list(self):
+        """Listedeki geçersiz öğeler tek tek hata döner; geçerli olanlar kaydedilir."""
+        async def scenario(client):
+            items = [{"incident_id": "I-1", "type": "Medical", "severity": 3, "location": "Merkez"},
+                     1, "x", {"incident_id": "I-2"}]
+            return await client.request("POST", "/emergency/incidents?dispatch=none", items)
+        status, body = self.run_with_server(scenario)
+        self.assertEqual(status, 200)
+        self.assertEqual([entry["incident_id"] for entry in body], ["I-1", None, None, "I-2"])
+        self.assertEqual(["error" in entry for entry in body], [False, True, True, True])
+
+    def test_malformed_content_length(self):
+        """Sayı olmayan Content-Length bağlantıyı düşürmez, 400 ile yanıtlanır."""
+        async def scenario(client):
+            client.writer.write(b"POST /traffic/readings HTTP/1.1\r\nHost: test\r\nContent-Length: abc\r\n\r\n")
+            return await client.receive()
+        status, body = self.run_with_server(scenario)
+        self.assertEqual(status, 400)
+        self.assertIn("Content-Length", body["error"])
+
+    def test_telemetry_batch(self):
+        async def scenario(client):
+            positions = [{"unit_id": "A-1", "lat": 39.93, "lon": 32.85}, {"unit_id": "YOK", "lat": 0, "lon": 0}]
+            accepted = await client.request("POST", "/emergency/telemetry", {"positions": positions})
+            bad = await client.request("POST", "/emergency/telemetry", [{"unit_id": "A-1"}])
+            units = await client.request("GET", "/emergency/units")
+            state = await client.request("GET", "/emergency/telemetry")
+            return accepted, bad, units, state
+        accepted, bad, units, state = self.run_with_server(scenario)
+        self.assertEqual(accepted, (200, {"accepted": 1, "moved": 1}))
+        self.assertEqual(bad[0], 400)
+        self.assertEqual(units[1][0]["coordinates"], [39.93, 32.85])
+        self.assertEqual((state[1]["received"], state[1]["unknown"], state[1]["reassignments"]), (2, 1, []))
+
+    def test_metrics_endpoint(self):
+        async def scenario(client):
+            await client.request("GET", "/traffic/density/SN-1")
+            client.send("GET", "/metrics")
+            status = int((await client.reader.readline()).split()[1])
+            return status, (await client.reader.read(1 << 16)).decode()
+        status, text = self.run_with_server(scenario)
+        self.assertEqual(status, 200)
+        self.assertIn("# TYPE traffic_density_seconds histogram", text)
+        self.assertIn('api_responses_total{status="200"}', text)
+
+    def test_log_stream_is_chunked(self):
+        async def scenario(client):
+            await client.request("POST", "/emergency/incidents?dispatch=none",
+                                 {"incident_id": "L-1", "type": "Fire", "severity": 2, "location": "Ulus"})
+            return await client.request("GET", "/logs?source=emergency&last=5")
+        status, text = self.run_with_server(scenario)
+        self.assertEqual(status, 200)
+        self.assertIn("Incident L-1 registered", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,593 @@
+"""
+ORTAK ALTYAPI BİRİM TESTLERİ
+
+app/core altındaki modüller arası paylaşılan bileşenleri test eder.
+"""
+
+import asyncio
+import contextlib
+import os
+import tempfile
+import threading
+import unittest
+
+from app.core.districts import DistrictMap, DistrictSimulation
+from app.core.event_bus import (BusFullError, DensityChanged, Event, EventBus, IncidentCreated, UnitDispatched,
+                                UnitStatusChanged)
+from app.core.event_log import EventCode, EventLog, RotatingFileSpill
+from app.core.metrics import Registry, bucket_bounds, bucket_index
+from app.core.reactions import CityReactions
+from app.core.snapshot import SNAPSHOT_MAGIC, CitySnapshot, SnapshotError, write_snapshot
+from app.modules.emergency.base import UnitStatus
+from app.modules.emergency.implementations import Ambulance, EmergencyService, FireDepartment, unit_from_record
+from app.modules.emergency.implementations import PoliceUnit
+from app.modules.emergency.repository import EmergencyRepository
+from app.modules.emergency.routing import RoadGraph, RouteEngine
+from app.modules.emergency.telemetry import TelemetryChannel
+from app.modules.traffic.implementations import IntersectionSensor, SpeedCamera, TrafficLight, TrafficService
+from app.modules.traffic.repository import TransportRepository
+
+try:
+    from app.modules.traffic.sensor_store import SensorStore
+except ImportError:  # NumPy kurulu değilse vektörel testler atlanır
+    SensorStore = None
+
+
+class TestEventLog(unittest.TestCase):
+    """Halka tamponlu olay günlüğü testleri."""
+
+    def test_ring_buffer_keeps_last_records(self):
+        log = EventLog(capacity=4)
+        for i in range(10):
+            log.append(EventCode.ELEMENT_SAVED, f"TL-{i}", timestamp=100.0 + i)
+        self.assertEqual(len(log), 4)
+        self.assertEqual(log.total_events, 10)
+        self.assertEqual([r.subject for r in log.tail(2)], ["TL-8", "TL-9"])
+        self.assertTrue(log.get_lines(1)[0].endswith("KAYIT: TL-9 sisteme eklendi."))
+
+    def test_range_query(self):
+        log = EventLog(capacity=8)
+        for i in range(12):
+            log.append(EventCode.MESSAGE, f"m{i}", timestamp=float(i))
+        self.assertEqual([r.subject for r in log.range(5.0, 7.0)], ["m5", "m6", "m7"])
+        self.assertEqual([r.subject for r in log.range(0.0, 4.5)], ["m4"])  # 0-3 ezildi
+
+    def test_spill_to_rotating_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "events.log")
+            log = EventLog(capacity=4, spill=RotatingFileSpill(path, max_bytes=200, backups=2), spill_batch=2)
+            for i in range(20):
+                log.append(EventCode.UNIT_REGISTERED, f"U-{i}")
+            log.close()
+            self.assertTrue(os.path.exists(path + ".1"))
+            self.assertFalse(os.path.exists(path + ".3"))
+            with open(path, encoding="utf-8") as f:
+                self.assertIn("U-19", f.read())
+
+    def test_spill_limit_counts_utf8_bytes(self):
+        """Çok baytlı karakterlerde de döndürülen dosyalar bayt sınırını aşmaz."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "events.log")
+            log = EventLog(capacity=4, spill=RotatingFileSpill(path, max_bytes=280, backups=5), spill_batch=1)
+            for i in range(12):
+                log.append(EventCode.ELEMENT_DELETED, f"IŞIK-ÇĞÜŞÖ-{i}")
+            log.close()
+            sizes = [os.path.getsize(p) for p in [path] + [f"{path}.{i}" for i in range(1, 6)] if os.path.exists(p)]
+            self.assertGreater(len(sizes), 1)
+            self.assertTrue(all(size <= 280 for size in sizes), sizes)
+
+
+class TestMetrics(unittest.TestCase):
+    """Ölçüm katmanı testleri."""
+
+    def test_hdr_buckets_cover_values(self):
+        """Her değer kendi kovasının sınırları içinde, göreli hata %7'nin altında."""
+        for value in list(range(200)) + [10 ** 3, 12345, 10 ** 6, 987654321]:
+            low, high = bucket_bounds(bucket_index(value))
+            self.assertTrue(low <= value < high)
+            self.assertLess((high - low) / max(value, 1), 0.07 if value >= 32 else 1.01)
+
+    def test_histogram_percentiles_and_export(self):
+        registry = Registry()
+        latency = registry.histogram("op_seconds", "İşlem süresi")
+        for _ in range(99):
+            latency.record(2_000)          # 2 µs
+        latency.record(3_000_000)          # 3 ms
+        self.assertAlmostEqual(latency.percentile(50), 2e-6, delta=2e-7)
+        self.assertAlmostEqual(latency.percentile(100), 3e-3, delta=2e-4)
+
+        text = registry.render()
+        self.assertIn("# TYPE op_seconds histogram", text)
+        self.assertIn('op_seconds_bucket{le="5e-06"} 99', text)
+        self.assertIn('op_seconds_bucket{le="0.005"} 100', text)
+        self.assertIn("op_seconds_count 100", text)
+
+    def test_counters_gauges_rates(self):
+        registry = Registry()
+        results = registry.counter("dispatch_total", "Sonuçlar", ("result",))
+        ok = results.labels("dispatched")
+        for _ in range(3):
+            ok.inc()
+        results.labels("failed").inc()
+        depth = registry.gauge("queue_depth")
+        queue = [1, 2]
+        depth.set_function(lambda: len(queue))
+        rates = registry.rate_meter("updates", label="sensor")
+        rates.update_rates(now=0.0)
+        rates.mark_many(["SN-1", "SN-1", "SN-2"])
+        rates.update_rates(now=2.0)
+
+        self.assertEqual(results.get("dispatched"), 3)
+        self.assertEqual(rates.top(), [("SN-1", 1.0), ("SN-2", 0.5)])
+        text = registry.render()
+        self.assertIn('dispatch_total{result="failed"} 1', text)
+        self.assertIn("queue_depth 2", text)
+        self.assertIs(registry.counter("dispatch_total"), results)
+
+    def test_gauge_functions_per_label(self):
+        """Her servis örneği kendi satırını yazar; kapanan örneğin satırı kaybolur."""
+        import gc
+        from app.modules.emergency.implementations import ACTIVE_INCIDENTS
+        first = EmergencyService(EmergencyRepository(), name="north")
+        second = EmergencyService(EmergencyRepository(), name="south")
+        first.create_incident_report("I-1", "Fire", 3, "Kızılay")
+        self.assertEqual((ACTIVE_INCIDENTS.get("north"), ACTIVE_INCIDENTS.get("south")), (1, 0))
+        self.assertIn('emergency_active_incidents{service="north"} 1', "\n".join(ACTIVE_INCIDENTS.render()))
+        del first
+        gc.collect()
+        self.assertNotIn('service="north"', "\n".join(ACTIVE_INCIDENTS.render()))
+        self.assertIn('emergency_active_incidents{service="south"} 0', "\n".join(ACTIVE_INCIDENTS.render()))
+        with self.assertRaises(ValueError):
+            ACTIVE_INCIDENTS.set_function(lambda: 0)
+
+    def test_textfile_export_is_atomic(self):
+        registry = Registry()
+        registry.counter("runs_total").inc()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "smartcity.prom")
+            registry.write_textfile(path)
+            with open(path, encoding="utf-8") as f:
+                self.assertIn("runs_total 1", f.read())
+            self.assertEqual(os.listdir(tmp), ["smartcity.prom"])
+
+
+class TestDistrictSimulation(unittest.TestCase):
+    """Bölge bazlı çok süreçli simülasyon testleri."""
+
+    def setUp(self):
+        self.districts = DistrictMap({"Merkez": ["Kızılay", "Ulus"], "Batı": ["Eryaman"], "Doğu": ["Mamak"]},
+                                     neighbours={"Merkez": ["Batı", "Doğu"]})
+        self.transport = TransportRepository()
+        self.emergency = EmergencyRepository()
+        elements = []
+        for i, location in enumerate(["Kızılay", "Ulus", "Eryaman", "Mamak"] * 3):
+            elements += [TrafficLight(f"TL-{i}", location), SpeedCamera(f"CM-{i}", location),
+                         IntersectionSensor(f"SN-{i}", location)]
+        self.transport.save_many(elements)
+        for i, location in enumerate(["Kızılay", "Eryaman", "Mamak"] * 4):
+            self.emergency.add_unit(Ambulance(f"AMB-{i}", location, "ALS"))
+
+    def test_district_map(self):
+        self.assertEqual(self.districts.district_of("ulus"), "Merkez")
+        self.assertEqual(self.districts.neighbours_of("Batı"), ["Merkez"])
+        self.assertIn(self.districts.district_of("Bilinmeyen"), self.districts.names)
+
+    def test_unit_record_roundtrip(self):
+        unit = FireDepartment("F-1", "Ulus", 3000, coordinates=(39.9, 32.8))
+        unit.current_water = 1200
+        copy = unit_from_record(unit.to_record())
+        self.assertEqual(copy.to_record(), unit.to_record())
+        self.assertEqual(copy.coordinates, (39.9, 32.8))
+
+    def test_processes_match_inline_run(self):
+        """Süreçlere bölünmüş koşu, tek süreçteki koşu ile birebir aynı sonucu verir."""
+        sim = DistrictSimulation(self.districts, seed=5, epoch=60, patrol_interval=120, cross_prob=0.5)
+        inline = sim.run(self.transport, self.emergency, until=1800, processes=False, include_state=True)
+        sharded = sim.run(self.transport, self.emergency, until=1800, processes=True, include_state=True)
+
+        self.assertEqual(inline["units"], 12)   # sınırı geçen birimler kaybolmaz
+        self.assertGreater(inline["messages"], 0)
+        self.assertEqual(inline["events"], sharded["events"])
+        for name in self.districts.names:
+            a, b = inline["districts"][name], sharded["districts"][name]
+            self.assertEqual(a["elements_state"], b["elements_state"])
+            self.assertEqual(a["units_state"], b["units_state"])
+        self.assertEqual(inline["districts"]["Batı"]["elements"], 9)   # Eryaman'daki cihazlar
+
+
+
+class TestEventBus(unittest.TestCase):
+    """Olay veriyolu yönlendirme, kuyruk ve taşma testleri."""
+
+    def density(self, sensor_id="SN-1", location="Kızılay", count=90):
+        return DensityChanged(sensor_id, location, count, "Kritik", "Normal")
+
+    def test_topic_and_location_filters(self):
+        bus = EventBus()
+        everything, densities, kizilay = [], [], []
+        bus.subscribe(everything.append)
+        bus.subscribe(densities.append, DensityChanged)
+        bus.subscribe(kizilay.append, [DensityChanged, IncidentCreated], locations=["kızılay"])
+        self.assertEqual(bus.publish(self.density()), 3)
+        self.assertEqual(bus.publish(self.density(location="Ulus")), 2)
+        self.assertEqual(bus.publish(IncidentCreated("I-1", "Fire", 3, "Kızılay")), 2)
+        self.assertEqual(bus.publish(UnitStatusChanged("A-1", "Medical", "Ulus", "Idle", "On Scene")), 1)
+        self.assertEqual(bus.publish(self.density(location=None)), 2)
+        self.assertEqual((len(everything), len(densities), len(kizilay)), (5, 3, 2))
+        self.assertEqual([type(e) for e in kizilay], [DensityChanged, IncidentCreated])
+
+        subscription = bus.subscribe(lambda e: None, Event)
+        subscription.cancel()
+        self.assertEqual(bus.publish(self.density()), 3)
+
+    def test_batch_overflow_policies(self):
+        bus = EventBus()
+        batches, newest, first = [], [], []
+        batch = bus.subscribe(batches.append, DensityChanged, mode="batch", batch_size=2)
+        oldest = bus.subscribe(lambda es: newest.extend(es), mode="batch", queue_size=3, overflow="drop_oldest")
+        new = bus.subscribe(lambda es: first.extend(es), mode="batch", queue_size=3, overflow="drop_new")
+        for i in range(5):
+            bus.publish(self.density(count=i))
+        self.assertEqual((len(batch), len(oldest), len(new)), (5, 3, 3))
+        self.assertEqual(bus.pump(), 11)
+        self.assertEqual([[e.vehicle_count for e in b] for b in batches], [[0, 1], [2, 3], [4]])
+        self.assertEqual([e.vehicle_count for e in newest], [2, 3, 4])
+        self.assertEqual([e.vehicle_count for e in first], [0, 1, 2])
+        self.assertEqual((oldest.dropped, new.dropped, batch.dropped), (2, 2, 0))
+
+    def test_block_policy_applies_backpressure(self):
+        bus = EventBus()
+        seen = []
+        # Düz işleyici: dolu kuyruk yayınlayan tarafından boşaltılır, olay kaybolmaz
+        blocked = bus.subscribe(lambda es: seen.extend(es), mode="batch", queue_size=4)
+        for i in range(10):
+            bus.publish(self.density(count=i))
+        self.assertLessEqual(len(blocked), 4)
+        bus.pump()
+        self.assertEqual([e.vehicle_count for e in seen], list(range(10)))
+        self.assertEqual(blocked.dropped, 0)
+
+        async def slow(event):
+            await asyncio.sleep(0)
+
+        bus.subscribe(slow, mode="async", queue_size=2)
+        bus.publish(self.density())
+        bus.publish(self.density())
+        with self.assertRaises(BusFullError):
+            bus.publish(self.density())
+
+    def test_async_workers(self):
+        async def scenario():
+            bus = EventBus()
+            received, batches = [], []
+
+            async def handler(event):
+                await asyncio.sleep(0)
+                received.append(event.vehicle_count)
+
+            bus.subscribe(handler, DensityChanged, mode="async", queue_size=8)
+            bus.subscribe(batches.append, DensityChanged, mode="batch", queue_size=8, batch_size=5)
+            async with bus:
+                for i in range(100):
+                    await bus.publish_async(self.density(count=i))
+                await bus.join()
+            return bus, received, batches
+
+        bus, received, batches = asyncio.run(scenario())
+        self.assertEqual(received, list(range(100)))
+        self.assertEqual(sum(len(b) for b in batches), 100)
+        self.assertTrue(all(len(b) <= 5 for b in batches))
+        self.assertTrue(all(s["dropped"] == 0 and s["queued"] == 0 for s in bus.stats()["subscriptions"]))
+
+    def test_publish_from_worker_thread(self):
+        async def scenario():
+            bus = EventBus()
+            threads = []
+            bus.subscribe(lambda event: threads.append(threading.get_ident()))
+            async with bus:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, bus.publish, self.density())
+                await asyncio.sleep(0)
+            return threads
+
+        self.assertEqual(asyncio.run(scenario()), [threading.get_ident()])
+
+    def test_handler_errors_are_isolated(self):
+        bus = EventBus()
+        received = []
+
+        def broken(event):
+            raise RuntimeError("arıza")
+
+        failing = bus.subscribe(broken)
+        bus.subscribe(received.append)
+        bus.publish(self.density())
+        self.assertEqual(len(received), 1)
+        self.assertEqual((failing.errors, bus.errors), (1, 1))
+        self.assertIsInstance(failing.last_error, RuntimeError)
+
+    @unittest.skipIf(SensorStore is None, "NumPy gerekli")
+    def test_sensor_tick_publishes_only_changes(self):
+        transport = TransportRepository()
+        transport.save_many([IntersectionSensor(f"SN-{i}", "Kızılay") for i in range(4)])
+        bus = EventBus()
+        events = []
+        bus.subscribe(events.append, DensityChanged)
+        service = TrafficService(transport, sensor_store=SensorStore(), bus=bus)
+        ids = [f"SN-{i}" for i in range(4)]
+        service.ingest_sensor_tick(ids, [10, 50, 90, 0], 100.0)
+        self.assertEqual([(e.sensor_id, e.density, e.previous) for e in events],
+                         [("SN-1", "Normal", "Düşük"), ("SN-2", "Kritik", "Düşük")])
+        events.clear()
+        service.ingest_sensor_tick(ids, [20, 55, 30, 0], 160.0)
+        self.assertEqual([(e.sensor_id, e.location, e.vehicle_count, e.density, e.previous, e.timestamp)
+                          for e in events], [("SN-2", "Kızılay", 30, "Düşük", "Kritik", 160.0)])
+
+
+class TestCityReactions(unittest.TestCase):
+    """Veriyolu üzerinden trafik ve acil durum modülleri arasındaki tepkiler."""
+
+    def setUp(self):
+        self.transport = TransportRepository()
+        self.light = TrafficLight("TL-1", "Kızılay", "Red")
+        self.other = TrafficLight("TL-2", "Ulus", "Red")
+        self.sensor = IntersectionSensor("SN-1", "Kızılay")
+        self.transport.save_many([self.light, self.other, self.sensor])
+
+        graph = RoadGraph()
+        graph.add_node("N1", 40.50, 34.95)
+        graph.add_node("N2", 40.51, 34.95)
+        graph.add_edge("N1", "N2", 1.0, 60.0, sensor="SN-1", capacity=50)
+        self.engine = RouteEngine(graph, landmarks=1)
+
+        self.bus = EventBus()
+        repository = EmergencyRepository()
+        repository.add_unit(Ambulance("A-1", "Ulus", "Advanced", (40.50, 34.95)))
+        repository.add_unit(PoliceUnit("P-1", "Ulus", "Merkez", (40.50, 34.95)))
+        self.emergency = EmergencyService(repository).attach_bus(self.bus)
+        self.traffic = TrafficService(self.transport, bus=self.bus)
+        self.reactions = CityReactions(self.bus, self.transport, self.emergency, self.traffic, self.engine)
+        self.dispatched = []
+        self.bus.subscribe(self.dispatched.append, UnitDispatched)
+
+    def dispatch(self, incident_id, kind):
+        incident = self.emergency.create_incident_report(incident_id, kind, 3, "Kızılay", (40.51, 34.95))
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            self.emergency.dispatch_nearest_unit(incident)
+
+    def test_ambulance_gets_green_until_it_leaves(self):
+        self.dispatch("I-1", "Security")
+        self.assertEqual(self.light.current_color, "Red")
+        self.dispatch("I-2", "Medical")
+        self.assertEqual([e.unit_id for e in self.dispatched], ["P-1", "A-1"])
+        self.assertEqual((self.light.current_color, self.light.timer), ("Green", 60))
+        self.assertEqual((self.other.current_color, self.other.timer), ("Red", 30))
+        self.assertEqual(self.reactions.preempted_lights, ["TL-1"])
+
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            self.emergency.resolve_incident("I-2")
+        self.assertEqual((self.light.current_color, self.light.timer), ("Red", 30))
+        self.assertEqual(self.reactions.preempted_lights, [])
+
+    def test_green_phases_follow_the_route(self):
+        self.reactions.close()
+        graph = RoadGraph()
+        graph.add_node("N1", 40.50, 34.95, "Ulus")
+        graph.add_node("N2", 40.51, 34.95, "Kızılay")
+        graph.add_edge("N1", "N2", 1.0, 60.0)
+        # Trafik servisi ilk tepki kümesinin denetleyicisini paylaşıyor
+        self.assertIs(self.traffic.preemption, self.reactions.preemption)
+        reactions = CityReactions(self.bus, self.transport, self.emergency, self.traffic,
+                                  RouteEngine(graph, landmarks=1), preemption=self.traffic.preemption)
+        self.dispatch("I-1", "Medical")
+        departure = self.dispatched[-1].timestamp
+        # Ulus (çıkış) hemen, Kızılay (olay yeri) varıştan önce ve görev bitene kadar yeşil
+        self.assertEqual([w[0] for w in reactions.preemption.schedule("A-1")], ["TL-2", "TL-1"])
+        self.assertAlmostEqual(reactions.preemption.schedule("A-1")[1][1], departure + 60 - 20)
+        self.assertEqual((self.other.current_color, self.light.current_color), ("Green", "Green"))
+        reactions.preemption.advance(departure + 75)
+        self.assertEqual((self.other.current_color, self.light.current_color), ("Red", "Green"))
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            self.emergency.resolve_incident("I-1")
+        self.assertEqual((self.light.current_color, self.light.timer), ("Red", 30))
+
+    def test_live_position_moves_green_windows(self):
+        self.reactions.close()
+        graph = RoadGraph()
+        graph.add_node("N1", 40.50, 34.95, "Ulus")
+        graph.add_node("N2", 40.51, 34.95, "Kızılay")
+        graph.add_edge("N1", "N2", 1.0, 60.0)
+        reactions = CityReactions(self.bus, self.transport, self.emergency, self.traffic,
+                                  RouteEngine(graph, landmarks=1), preemption=self.traffic.preemption)
+        self.dispatch("I-1", "Medical")
+        departure = self.dispatched[-1].timestamp
+        self.assertEqual([w[0] for w in reactions.preemption.schedule("A-1")], ["TL-2", "TL-1"])
+
+        # Ambulans Ulus'u geçti; pencereler son konumdan yeniden planlanır
+        telemetry = TelemetryChannel(self.emergency, eta_interval=0)
+        telemetry.ingest(["A-1"], [40.50], [34.95], departure)
+        telemetry.ingest(["A-1"], [40.507], [34.95], departure + 60)
+        self.assertLess(reactions.etas["I-1"], 0.75)
+        self.assertEqual([w[0] for w in reactions.preemption.schedule("A-1")], ["TL-1"])
+        self.assertGreater(reactions.preemption.schedule("A-1")[0][2], departure + 60)
+        self.assertEqual((self.other.current_color, self.light.current_color), ("Red", "Green"))
+
+    def test_density_change_retimes_lights_and_reroutes(self):
+        self.dispatch("I-1", "Security")
+        free_flow = self.reactions.etas["I-1"]
+        self.sensor.vehicle_count = 95
+        self.assertEqual(self.traffic.calculate_intersection_density("SN-1"), "Kritik")
+        # Aynı etiket tekrar yayınlanmaz
+        self.traffic.calculate_intersection_density("SN-1")
+        self.assertEqual(len(self.reactions.subscriptions[0]), 1)
+
+        self.bus.pump()
+        self.assertEqual(self.light.timer, 60)
+        self.assertGreater(self.reactions.etas["I-1"], free_flow + 1)
+        self.assertEqual(self.reactions.rerouted, 1)
+        self.assertTrue(any("Reroute: P-1 -> I-1" in line for line in self.emergency.activity_log))
+
+        self.reactions.close()
+        self.sensor.vehicle_count = 10
+        self.traffic.calculate_intersection_density("SN-1")
+        self.bus.pump()
+        self.assertEqual(self.light.timer, 60)
+
+    @unittest.skipIf(SensorStore is None, "NumPy gerekli")
+    def test_forecasts_drive_route_weights(self):
+        """Tahmin modeli varsa okumalar rotayı tahminle besler; anlık sayılar ağırlıkları ezmez."""
+        from app.modules.traffic.forecast import CongestionForecaster
+        self.reactions.close()
+        store = SensorStore()
+        traffic = TrafficService(self.transport, store, forecaster=CongestionForecaster(), bus=self.bus,
+                                 route_engine=self.engine, forecast_horizon=900, forecast_interval=3600)
+        reactions = CityReactions(self.bus, self.transport, self.emergency, traffic, self.engine)
+        self.dispatch("I-1", "Security")
+        free_flow = reactions.etas["I-1"]
+        # Kenar yoğunluğu anlık 95 değil, 15 dk sonrasının tahminidir
+        traffic.ingest_sensor_tick(["SN-1"], [95], 1_700_000_000.0)
+        self.assertEqual(self.engine._densities["SN-1"], round(traffic.forecaster.predict("SN-1", 900)))
+        self.bus.pump()
+        self.assertGreater(reactions.etas["I-1"], free_flow + 1)
+        version = self.engine.version
+        # Aralık dolmadan yeni okuma rotayı değiştirmez; force ile hemen beslenir
+        traffic.ingest_sensor_tick(["SN-1"], [5], 1_700_000_060.0)
+        self.bus.pump()
+        self.assertEqual(self.engine.version, version)
+        self.assertTrue(traffic.feed_route_forecast(force=True))
+        with self.assertRaises(ValueError):
+            TrafficService(self.transport, route_engine=self.engine, forecast_horizon=7200)
+
+    @unittest.skipIf(SensorStore is None, "NumPy gerekli")
+    def test_engine_given_only_to_reactions_is_fed_by_forecasts(self):
+        """Motor yalnızca tepki kümesine verilse de ağırlıkların tek sahibi tahmin servisidir."""
+        from app.modules.traffic.forecast import CongestionForecaster
+        self.reactions.close()
+        traffic = TrafficService(self.transport, SensorStore(), forecaster=CongestionForecaster(), bus=self.bus,
+                                 forecast_horizon=900, forecast_interval=0)
+        reactions = CityReactions(self.bus, self.transport, self.emergency, traffic, self.engine)
+        self.assertIs(traffic.route_engine, self.engine)
+        for minute, count in enumerate([5, 5, 5, 95]):
+            traffic.ingest_sensor_tick(["SN-1"], [count], 1_700_000_000.0 + 60 * minute)
+        forecast = round(traffic.forecaster.predict("SN-1", 900))
+        self.bus.pump()
+        # Yayınlanan anlık 95, tahmin ağırlığının üzerine yazılmaz
+        self.assertEqual(self.engine._densities["SN-1"], forecast)
+        self.assertNotEqual(forecast, 95)
+
+
+class TestCitySnapshot(unittest.TestCase):
+    """İkili snapshot yazma ve eşlenmiş, tembel geri yükleme testleri."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "city.snap")
+        self.transport = TransportRepository()
+        elements = []
+        for i in range(30):
+            location = ["Kızılay", "Ulus", "Çankaya"][i % 3]
+            if i % 3 == 0:
+                element = TrafficLight(f"TL-{i}", location, "Green")
+                element.timer = 40 + i
+            elif i % 3 == 1:
+                element = SpeedCamera(f"CM-{i}", location, speed_limit=50.0 + i)
+                element.violation_count = i
+            else:
+                element = IntersectionSensor(f"SN-{i}", location)
+                element.vehicle_count = i * 3
+            elements.append(element)
+        elements[4].status = "Maintenance"
+        self.transport.save_many(elements)
+
+        repository = EmergencyRepository()
+        repository.add_unit(FireDepartment("F-1", "Kızılay", 5000, (39.92, 32.85)))
+        repository.add_unit(Ambulance("A-1", "Ulus", "Advanced", (39.94, 32.86)))
+        self.service = EmergencyService(repository)
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            for incident_id, kind, severity in [("I-1", "Fire", 3), ("I-2", "Medical", 2), ("I-3", "Fire", 5),
+                                                ("I-4", "Fire", 2), ("I-5", "Medical", 1)]:
+                incident = self.service.create_incident_report(incident_id, kind, severity, "Kızılay", (39.93, 32.85))
+                self.service.dispatch_nearest_unit(incident)
+            self.service.resolve_incident("I-2")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        meta = write_snapshot(self.path, self.transport, self.service)
+        self.assertEqual((meta["devices"], meta["units"]), (30, 2))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(8), SNAPSHOT_MAGIC)
+
+        snapshot = CitySnapshot.open(self.path)
+        transport, service = snapshot.restore()
+        self.assertEqual(list(transport.iter_records()), list(self.transport.iter_records()))
+        self.assertEqual(len(transport), 30)
+        self.assertEqual(transport.get_by_id("TL-0").timer, 40)
+        self.assertEqual(transport.get_by_id("CM-1").violation_count, 1)
+        self.assertEqual([e.element_id for e in transport.filter_by_status("maintenance")], ["CM-4"])
+        self.assertEqual([e.element_id for e in transport.query(location="Ulus", element_type=SpeedCamera)],
+                         [e.element_id for e in self.transport.query(location="Ulus", element_type=SpeedCamera)])
+
+        # Açık olaylar, atamalar, kuyruk sırası ve geçmiş korunur
+        self.assertEqual(sorted(service.active_incidents), sorted(self.service.active_incidents))
+        self.assertEqual(service.assignments, self.service.assignments)
+        self.assertEqual([i.incident_id for i in service.scheduler.waiting()],
+                         [i.incident_id for i in self.service.scheduler.waiting()])
+        self.assertEqual([i.incident_id for i in service.repo.get_incident_history()], ["I-2"])
+        self.assertEqual(service.repo.get_unit_by_id("F-1").status, UnitStatus.ON_SCENE)
+        self.assertEqual(service.repo.operational_stats(), self.service.repo.operational_stats())
+
+        # Geri yüklenen servis çalışmaya devam eder: boşalan itfaiye sıradaki en acil olayı alır
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            service.resolve_incident("I-1")
+        self.assertEqual(service.assignments.get("I-3"), "F-1")
+
+    def test_restore_is_lazy(self):
+        write_snapshot(self.path, self.transport)
+        snapshot = CitySnapshot.open(self.path)
+        transport = snapshot.transport_repository()
+        elements = transport._elements
+        self.assertEqual(len(elements._live), 0)
+        self.assertIsNone(transport.get_by_id("YOK"))
+        sensor = transport.get_by_id("SN-2")
+        self.assertEqual(sensor.vehicle_count, 6)
+        self.assertIs(transport.get_by_id("SN-2"), sensor)
+        self.assertEqual(len(elements._live), 1)
+        self.assertEqual(set(transport._pending_indexes), {"location", "status", "type"})
+        transport.find_all_by_type(SpeedCamera)
+        self.assertEqual(set(transport._pending_indexes), {"location", "status"})
+
+    def test_changes_after_restore(self):
+        write_snapshot(self.path, self.transport)
+        transport = CitySnapshot.open(self.path).transport_repository()
+        transport.get_by_id("TL-3").status = "Inactive"
+        self.assertTrue(transport.delete("SN-5"))
+        transport.save(IntersectionSensor("SN-99", "Ulus"))
+        self.assertEqual([e.element_id for e in transport.filter_by_status("Inactive")], ["TL-3"])
+        self.assertNotIn("SN-5", [e.element_id for e in transport.find_all_by_location("Çankaya")])
+        self.assertEqual(len(transport), 30)
+
+        # Tembel depodan yeniden yazılan snapshot değişiklikleri içerir
+        second = os.path.join(self.tmp.name, "second.snap")
+        write_snapshot(second, transport)
+        reopened = CitySnapshot.open(second).transport_repository()
+        self.assertEqual(reopened.get_by_id("TL-3").status, "Inactive")
+        self.assertIsNone(reopened.get_by_id("SN-5"))
+        self.assertEqual(reopened.get_by_id("SN-99").location, "Ulus")
+
+    def test_rejects_foreign_and_newer_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot" * 4)
+        with self.assertRaises(SnapshotError):
+            CitySnapshot.open(self.path)
+        write_snapshot(self.path, self.transport)
+        with open(self.path, "r+b") as f:
+            f.seek(8)
+            f.write((99).to_bytes(4, "little"))
+        with self.assertRaises(SnapshotError):
+            CitySnapshot.open(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,6 +14,15 @@ from app.modules.emergency.repository import (
     EmergencyRepository,
     EmergencyUnit
     )
+from app.modules.emergency.spatial import SpatialGrid
+from app.modules.emergency.routing import RoadGraph, RouteEngine
+from app.modules.emergency.async_service import AsyncEmergencyService
+from app.modules.emergency.journal import IncidentJournal, CREATE
+from app.modules.emergency.telemetry import TelemetryChannel
+from app.core.event_bus import EventBus, UnitEtaChanged
+import asyncio
+import os
+import tempfile
 class TestEmergencyModule(unittest.TestCase):
     def setUp(self):
         self.repo = EmergencyRepository()
@@ -39,6 +48,18 @@ class TestEmergencyModule(unittest.TestCase):
         self.fire_unit.status = UnitStatus.IDLE
         self.assertTrue(self.fire_unit.availability)
 
+    def test_units_are_slotted(self):
+        #no per-unit __dict__, public properties and observers still work
+        self.assertFalse(hasattr(self.fire_unit, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.fire_unit.crew = 4
+        seen = []
+        self.fire_unit.add_observer(lambda unit, field, old, new: seen.append(field))
+        self.fire_unit.status = UnitStatus.ON_SCENE
+        self.fire_unit.current_water = -1
+        self.assertEqual(seen, ["status", "status"])
+        self.assertEqual(self.fire_unit.current_water, 0)
+
     def test_repo_filtering(self):
         fire_unit = self.repo.get_available_unit_by_type("Fire")
         self.assertEqual(len(fire_unit),1)
@@ -68,5 +89,422 @@ class TestEmergencyModule(unittest.TestCase):
         self.assertIn("PLAN ID",plan)
         self.assertIn("safety perimeter",plan)
 
+    def test_dispatch_picks_nearest_unit(self):
+        far = FireDepartment("F-FAR","Uzak",water_capacity=5000,coordinates=(40.60,34.90))
+        near = FireDepartment("F-NEAR","Yakin",water_capacity=5000,coordinates=(40.551,34.955))
+        self.repo.add_unit(far)
+        self.repo.add_unit(near)
+
+        vaka = Incident("V-03","Fire",3,"Market","Kitchen Fire",coordinates=(40.55,34.95))
+        result = self.service.dispatch_nearest_unit(vaka)
+
+        self.assertIn("F-NEAR",result)
+        self.assertEqual(near.status,UnitStatus.ON_SCENE)
+        self.assertEqual(far.status,UnitStatus.IDLE)
+
+    def test_nearest_skips_busy_units(self):
+        near = Ambulance("A-NEAR","Yakin","A",coordinates=(40.551,34.955))
+        other = Ambulance("A-OTHER","Orta","A",coordinates=(40.57,34.97))
+        self.repo.add_unit(near)
+        self.repo.add_unit(other)
+        near.status = UnitStatus.ON_SCENE
+
+        nearest = self.repo.find_nearest_units("Medical",(40.55,34.95),k=1)
+        self.assertEqual(nearest[0][1].unit_id,"A-OTHER")
+
+    def test_status_buckets_follow_setter(self):
+        counts = self.repo.count_by_status()
+        self.assertEqual(counts[UnitStatus.IDLE],2)
+
+        self.fire_unit.status = UnitStatus.MAINTENANCE
+        self.assertEqual(self.repo.get_available_unit_by_type("Fire"),[])
+        counts = self.repo.count_by_status()
+        self.assertEqual(counts[UnitStatus.IDLE],1)
+        self.assertEqual(counts[UnitStatus.MAINTENANCE],1)
+
+        self.fire_unit.status = UnitStatus.IDLE
+        self.assertEqual(self.repo.count_available_by_type()["Fire"],1)
+
+    def test_removed_unit_is_not_tracked(self):
+        self.repo.remove_unit("P-TEST")
+        self.police_unit.status = UnitStatus.ON_SCENE
+        self.assertEqual(self.repo.operational_stats()["total_units"],1)
+        self.assertEqual(self.repo.operational_stats()["readiness_percentage"],100.0)
+
+    def test_waiting_incidents_get_freed_unit_by_priority(self):
+        first = self.service.create_incident_report("F-1","Fire",3,"Mall")
+        self.service.dispatch_nearest_unit(first)
+        self.assertEqual(self.service.assignments["F-1"],"F-TEST")
+
+        low = self.service.create_incident_report("F-2","Fire",2,"Park")
+        high = self.service.create_incident_report("F-3","Fire",5,"Factory")
+        self.assertIn("queued",self.service.dispatch_nearest_unit(low))
+        self.service.dispatch_nearest_unit(high)
+        self.assertEqual(self.service.queued_incidents,2)
+
+        self.service.resolve_incident("F-1")
+        self.assertEqual(self.service.assignments.get("F-3"),"F-TEST")
+        self.assertEqual(self.fire_unit.status,UnitStatus.ON_SCENE)
+        self.assertIn("F-1",self.repo.incident_history)
+        self.assertEqual(self.repo.get_available_unit_by_type("Fire"),[])
+
+    def test_freed_unit_skips_incidents_it_cannot_serve(self):
+        weak = HazmatUnit("H-B","Depot","B")
+        self.repo.add_unit(weak)
+        weak.status = UnitStatus.MAINTENANCE
+        for incident_id, severity in (("R-1",5),("R-2",4),("R-3",2),("R-4",1)):
+            self.service.dispatch_nearest_unit(self.service.create_incident_report(incident_id,"Radiation",severity,"Plant"))
+        self.assertEqual(self.service.queued_incidents,4)
+
+        #level B protection cannot take R-1/R-2, the most urgent one it can serve is R-3
+        weak.status = UnitStatus.IDLE
+        self.assertEqual(self.service.assignments,{"R-3":"H-B"})
+        self.assertEqual([i.incident_id for i in self.service.scheduler.waiting()],["R-1","R-2","R-4"])
+        self.assertEqual([i.incident_id for i in self.service.scheduler.iter_for_unit_type("Radiation")],["R-1","R-2","R-4"])
+
+    def test_reprioritize_and_cancel_queue(self):
+        self.fire_unit.status = UnitStatus.MAINTENANCE
+        a = self.service.create_incident_report("Q-1","Fire",2,"A")
+        b = self.service.create_incident_report("Q-2","Fire",3,"B")
+        c = self.service.create_incident_report("Q-3","Fire",4,"C")
+        for vaka in (a,b,c):
+            self.service.dispatch_nearest_unit(vaka)
+
+        self.service.reprioritize_incident("Q-1",5)
+        self.assertTrue(self.service.cancel_incident("Q-3"))
+        self.assertEqual([i.incident_id for i in self.service.scheduler.waiting()],["Q-1","Q-2"])
+
+        self.fire_unit.status = UnitStatus.IDLE
+        self.assertEqual(self.service.assignments.get("Q-1"),"F-TEST")
+
+    def test_batch_dispatch_minimizes_total_eta(self):
+        self.repo.remove_unit("F-TEST")
+        u1 = FireDepartment("F-1","A",5000,coordinates=(40.500,34.95))
+        u2 = FireDepartment("F-2","B",5000,coordinates=(40.590,34.95))
+        self.repo.add_unit(u1)
+        self.repo.add_unit(u2)
+        north = Incident("B-1","Fire",3,"North","d",coordinates=(40.509,34.95))
+        south = Incident("B-2","Fire",3,"South","d",coordinates=(40.491,34.95))
+
+        #greedy would give F-1 to B-1 and send F-2 eleven km south
+        result = self.service.dispatch_batch([north,south])
+        self.assertEqual(result,{"B-1":"F-2","B-2":"F-1"})
+
+    def test_batch_dispatch_respects_capabilities(self):
+        weak = HazmatUnit("H-B","Depot","B",coordinates=(40.50,34.95))
+        strong = HazmatUnit("H-A","Depot","A",coordinates=(40.60,34.95))
+        dry = FireDepartment("F-DRY","Depot",5000,coordinates=(40.50,34.95))
+        dry.current_water = 100
+        for unit in (weak,strong,dry):
+            self.repo.add_unit(unit)
+        self.repo.remove_unit("F-TEST")
+
+        leak = Incident("R-1","Radiation",5,"Plant","d",coordinates=(40.50,34.95))
+        fire = Incident("R-2","Fire",2,"Plant","d",coordinates=(40.50,34.95))
+        result = self.service.dispatch_batch([leak,fire])
+        self.assertEqual(result["R-1"],"H-A")
+        self.assertIsNone(result["R-2"])
+        self.assertIn("R-2",self.service.scheduler)
+
+class TestIncidentJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name,"incidents.wal")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def city(self):
+        repo = EmergencyRepository()
+        for i in range(2):
+            repo.add_unit(Ambulance(f"A-{i}","Center","ALS",coordinates=(40.5 + i * 0.01,34.95)))
+        return EmergencyService(repo)
+
+    def run_day(self, service):
+        for i in range(4):
+            incident = service.create_incident_report(f"M-{i}","Medical",2 + i % 3,"Center",(40.5,34.95))
+            service.dispatch_nearest_unit(incident)
+        service.reprioritize_incident("M-3",5)
+        service.resolve_incident("M-0")
+        service.cancel_incident("M-2")
+
+    def state(self, service):
+        state = service.checkpoint_state()
+        return state["active_incidents"],state["assignments"],[i for i,_ in state["queue"]],state["history"],state["units"]
+
+    def test_replay_rebuilds_state(self):
+        service = self.city()
+        journal = IncidentJournal(self.path)
+        service.use_journal(journal)
+        self.run_day(service)
+        expected = self.state(service)
+        journal.close()
+
+        restarted = self.city()
+        with IncidentJournal(self.path) as journal:
+            self.assertGreater(restarted.use_journal(journal),0)
+            self.assertEqual(self.state(restarted),expected)
+            self.assertEqual(restarted.assignments,{"M-1":"A-1","M-3":"A-0"})
+            #replayed service keeps journaling
+            restarted.resolve_incident("M-1")
+        again = self.city()
+        with IncidentJournal(self.path) as journal:
+            again.use_journal(journal)
+        self.assertNotIn("M-1",again.active_incidents)
+        self.assertEqual(again.repo.get_unit_by_id("A-1").status,UnitStatus.IDLE)
+
+    def test_acknowledged_incidents_survive_a_crash(self):
+        service = self.city()
+        service.use_journal(IncidentJournal(self.path))
+        for i in range(10):
+            service.create_incident_report(f"K-{i}","Medical",3,"Center",(40.5,34.95))
+        #no close(): the process dies here
+        restarted = self.city()
+        with IncidentJournal(self.path) as journal:
+            self.assertEqual(restarted.use_journal(journal),10)
+        self.assertEqual(len(restarted.active_incidents),10)
+
+    def test_async_replies_wait_for_group_commit(self):
+        service = self.city()
+        journal = IncidentJournal(self.path,group_window=0.001).start()
+        service.use_journal(journal,wait=False)
+        async def scenario():
+            async with AsyncEmergencyService(service) as front:
+                await asyncio.gather(*(front.report_incident(f"G-{i}","Medical",3,"Center",(40.5,34.95)) for i in range(20)))
+        asyncio.run(scenario())
+        self.assertEqual(journal.durable_lsn,service.journal_lsn)
+        restarted = self.city()
+        with IncidentJournal(self.path) as replay:
+            restarted.use_journal(replay)
+        self.assertEqual(restarted.assignments,service.assignments)
+        self.assertEqual(restarted.queued_incidents,18)
+        journal.close()
+
+    def test_group_commit(self):
+        with IncidentJournal(self.path,group_size=4) as journal:
+            lsns = [journal.append(CREATE,{"n":i}) for i in range(10)]
+            self.assertEqual(journal.commits,2)
+            self.assertEqual(journal.durable_lsn,8)
+            self.assertTrue(journal.wait_durable(lsns[-1],timeout=1.0))
+            self.assertEqual(journal.commits,3)
+            self.assertEqual([r[1]["n"] for r in journal.records()],list(range(10)))
+
+    def test_background_flusher(self):
+        with IncidentJournal(self.path,group_window=0.001).start() as journal:
+            lsn = journal.append(CREATE,{"n":1})
+            self.assertTrue(journal.wait_durable(lsn,timeout=2.0))
+
+    def test_torn_tail_is_truncated(self):
+        with IncidentJournal(self.path) as journal:
+            for i in range(3):
+                journal.append(CREATE,{"n":i})
+        size = os.path.getsize(self.path)
+        with open(self.path,"ab") as f:
+            f.write(b"\x40\x00\x00\x00garbage")
+        with IncidentJournal(self.path) as journal:
+            self.assertEqual(journal.truncated_bytes,11)
+            self.assertEqual(len(list(journal.records())),3)
+            journal.append(CREATE,{"n":3})
+        self.assertGreater(os.path.getsize(self.path),size)
+        with IncidentJournal(self.path) as journal:
+            self.assertEqual(journal.truncated_bytes,0)
+            self.assertEqual(len(list(journal.records())),4)
+
+    def test_compaction(self):
+        service = self.city()
+        journal = IncidentJournal(self.path,compact_every=10)
+        service.use_journal(journal)
+        self.run_day(service)
+        for i in range(20):
+            service.create_incident_report(f"X-{i}","Medical",1,"Center",(40.5,34.95))
+            service.cancel_incident(f"X-{i}") or service.resolve_incident(f"X-{i}")
+        self.assertLess(journal.records_since_checkpoint,10)
+        expected = self.state(service)
+        service.compact_journal(keep_history=1)
+        journal.close()
+        with open(self.path + ".archive",encoding="utf-8") as archive:
+            self.assertEqual(len(archive.readlines()),len(expected[3]) - 1)
+
+        restarted = self.city()
+        with IncidentJournal(self.path) as journal:
+            self.assertEqual(restarted.use_journal(journal),1)
+        self.assertEqual(self.state(restarted)[:3],expected[:3])
+        self.assertEqual(len(restarted.repo.incident_history),1)
+
+class TestAsyncEmergencyService(unittest.TestCase):
+    def setUp(self):
+        self.repo = EmergencyRepository()
+        self.service = EmergencyService(self.repo)
+        for i in range(3):
+            self.repo.add_unit(Ambulance(f"A-{i}","Center","ALS",coordinates=(40.5 + i * 0.01,34.95)))
+
+    def test_concurrent_reports(self):
+        async def scenario():
+            async with AsyncEmergencyService(self.service) as service:
+                return await asyncio.gather(*(service.report_incident(f"M-{i}","Medical",1 + i % 5,"Center",(40.5,34.95))
+                                              for i in range(50)))
+        results = asyncio.run(scenario())
+        self.assertEqual(len(results),50)
+        self.assertEqual(len(self.service.assignments),3)
+        self.assertEqual(self.service.queued_incidents,47)
+        self.assertTrue(results[0][1].startswith("Dispatch Successful A-0"))
+
+    def test_async_batch_matches_sync(self):
+        incidents = [self.service.create_incident_report(f"B-{i}","Medical",3,"Center",(40.5 + i * 0.01,34.95)) for i in range(2)]
+        async def scenario():
+            async with AsyncEmergencyService(self.service) as service:
+                return await service.dispatch_batch()
+        self.assertEqual(asyncio.run(scenario()),{"B-0":"A-0","B-1":"A-1"})
+        self.assertIn(incidents[0].incident_id,self.service.assignments)
+
+class TestTelemetryChannel(unittest.TestCase):
+    def setUp(self):
+        self.repo = EmergencyRepository()
+        self.service = EmergencyService(self.repo)
+        self.late = Ambulance("A-LATE","Uzak","A",coordinates=(40.50,34.95))
+        self.spare = Ambulance("A-SPARE","Yakin","A",coordinates=(40.56,34.95))
+        self.repo.add_unit(self.late)
+        self.repo.add_unit(self.spare)
+        self.incident = self.service.create_incident_report("M-1","Medical",3,"Hastane",(40.55,34.95))
+        self.service.dispatch_to(self.incident,[self.late])
+        self.telemetry = TelemetryChannel(self.service,eta_interval=0)
+
+    def test_positions_move_the_spatial_index(self):
+        moved = self.telemetry.ingest(["A-SPARE","A-LATE","X-1"],[40.40,40.50001,40.0],[34.95,34.95,34.0],1000.0)
+        #A-LATE moved about a metre, under the jitter threshold
+        self.assertEqual(moved,1)
+        self.assertEqual(self.late.coordinates,(40.50,34.95))
+        self.assertEqual((self.telemetry.received,self.telemetry.unknown),(3,1))
+        self.assertEqual(self.repo.find_nearest_units("Medical",(40.40,34.95))[0][1].unit_id,"A-SPARE")
+        self.assertEqual(self.telemetry.stale_units(30,now=1060.0),["A-SPARE","A-LATE"])
+
+    def test_drift_and_reassignment_candidates(self):
+        self.telemetry.ingest(["A-LATE"],[40.50],[34.95],1000.0)
+        planned = self.telemetry.drifts["A-LATE"]
+        self.assertAlmostEqual(planned,0.0)
+        self.assertEqual(self.telemetry.reassignment_candidates(),[])
+
+        #five minutes later the unit is stuck where it started
+        drifted = self.telemetry.evaluate(1300.0)
+        self.assertEqual([(d.unit_id,d.incident_id) for d in drifted],[("A-LATE","M-1")])
+        self.assertAlmostEqual(drifted[0].drift,5.0)
+        candidates = self.telemetry.reassignment_candidates()
+        self.assertEqual([(c.unit_id,c.candidate_id) for c in candidates],[("A-LATE","A-SPARE")])
+        self.assertLess(candidates[0].candidate_eta + 2,candidates[0].eta)
+
+    def test_arrival_updates_current_location(self):
+        bus = EventBus()
+        self.service.attach_bus(bus)
+        events = []
+        bus.subscribe(events.append,UnitEtaChanged)
+        self.telemetry.ingest(["A-LATE"],[40.50],[34.95],1000.0)
+        self.telemetry.ingest(["A-LATE"],[40.53],[34.95],1120.0)
+        self.assertEqual([e.unit_id for e in events],["A-LATE"])
+        self.assertLess(events[0].eta,4.0)
+        self.telemetry.ingest(["A-LATE"],[40.5501],[34.95],1240.0)
+        self.assertEqual(self.late.current_location,"Hastane")
+        self.assertNotIn("A-LATE",self.telemetry.drifts)
+
+    def test_ten_thousand_units_per_tick(self):
+        import random, time
+        rng = random.Random(3)
+        units = [Ambulance(f"F-{i}","Merkez","A",coordinates=(40.4 + rng.random() * 0.2,34.8 + rng.random() * 0.2))
+                 for i in range(10000)]
+        self.repo.add_units(units)
+        ids = [u.unit_id for u in units]
+        lats = [u.coordinates[0] + 0.001 for u in units]
+        lons = [u.coordinates[1] for u in units]
+        started = time.perf_counter()
+        self.assertEqual(self.telemetry.ingest(ids,lats,lons,1000.0),10000)
+        self.assertLess(time.perf_counter() - started,1.0)
+        self.assertEqual(self.repo.find_nearest_units("Medical",(lats[0],lons[0]))[0][1].unit_id,"F-0")
+
+class TestSpatialGrid(unittest.TestCase):
+    def test_matches_brute_force(self):
+        import random
+        rng = random.Random(7)
+        grid = SpatialGrid(cell_km=0.5)
+        points = {}
+        for i in range(500):
+            p = (40.5 + rng.random() * 0.1, 34.9 + rng.random() * 0.1)
+            points[i] = p
+            grid.insert(i,p)
+
+        query = (40.55,34.95)
+        def planar_sq(i):
+            lat, lon = points[i]
+            return ((lat - query[0]) * 110.574) ** 2 + ((lon - query[1]) * grid._kx) ** 2
+        expected = sorted(points, key=planar_sq)[:5]
+        self.assertEqual([key for _, key in grid.nearest(query,k=5)],expected)
+
+    def test_move_and_remove(self):
+        grid = SpatialGrid()
+        grid.insert("U1",(40.0,35.0))
+        grid.move("U1",(40.2,35.2))
+        self.assertEqual(grid.nearest((40.2,35.2))[0][1],"U1")
+        self.assertTrue(grid.remove("U1"))
+        self.assertEqual(grid.nearest((40.2,35.2)),[])
+
+class TestRouteEngine(unittest.TestCase):
+    GRAPH = {
+        "nodes": [
+            {"id": "A", "lat": 40.550, "lon": 34.950, "name": "Merkez Meydan"},
+            {"id": "B", "lat": 40.550, "lon": 34.962},
+            {"id": "C", "lat": 40.559, "lon": 34.962},
+            {"id": "D", "lat": 40.559, "lon": 34.950, "name": "Hastane"}
+        ],
+        "edges": [
+            {"from": "A", "to": "B", "length_km": 1.0, "speed_kmh": 60, "sensor": "SN-AB"},
+            {"from": "B", "to": "C", "length_km": 1.0, "speed_kmh": 60},
+            {"from": "A", "to": "D", "length_km": 1.0, "speed_kmh": 30, "sensor": "SN-AD"},
+            {"from": "D", "to": "C", "length_km": 1.0, "speed_kmh": 60}
+        ]
+    }
+
+    def setUp(self):
+        import json, os, tempfile
+        handle, self.path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(handle, "w", encoding="utf-8") as f:
+            json.dump(self.GRAPH, f)
+        self.engine = RouteEngine.from_file(self.path, landmarks=2)
+
+    def tearDown(self):
+        import os
+        os.remove(self.path)
+        EmergencyUnit.use_route_engine(None)
+
+    def test_shortest_time_and_congestion(self):
+        self.assertAlmostEqual(self.engine.eta("Merkez Meydan","C"),2.0)
+        self.engine.update_densities({"SN-AB": 200})
+        #A-B is now 1 * (1 + 0.15 * 16) = 3.4 min, so A-D-C (3 min) wins
+        self.assertAlmostEqual(self.engine.eta("A","C"),3.0)
+
+    def test_cache_invalidated_on_density_change(self):
+        self.engine.eta("A","C")
+        version = self.engine.version
+        self.assertFalse(self.engine.update_densities({"SN-AB": 0}))
+        self.assertTrue(self.engine.update_densities({"SN-AB": 150}))
+        self.assertGreater(self.engine.version,version)
+        self.assertEqual(len(self.engine._cache),0)
+
+    def test_units_use_engine_and_rank(self):
+        EmergencyUnit.use_route_engine(self.engine)
+        near = Ambulance("A-1","Merkez","A",coordinates=(40.550,34.950))
+        far = Ambulance("A-2","Hastane","A",coordinates=(40.559,34.950))
+        self.assertAlmostEqual(near.calculate_eta("B"),1.0)
+
+        ranked = self.engine.rank_units([far,near],"B")
+        self.assertEqual([u.unit_id for _, u in ranked],["A-1","A-2"])
+        self.assertAlmostEqual(ranked[1][0],2.0)   #D-C-B beats the slow D-A road
+
+    def test_route_lists_nodes_with_arrival_times(self):
+        route = self.engine.route("Merkez Meydan","C")
+        self.assertEqual([node for node, _ in route],["A","B","C"])
+        self.assertEqual([round(minutes,6) for _, minutes in route],[0.0,1.0,2.0])
+        self.engine.update_densities({"SN-AB": 200})
+        self.assertEqual([node for node, _ in self.engine.route("A","C")],["A","D","C"])
+        self.assertEqual(self.engine.route("A","A"),[("A",0.0)])
+        self.assertEqual(self.engine.graph.names,{"A": "Merkez Meydan","D": "Hastane"})
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
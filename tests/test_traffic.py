@@ -5,11 +5,29 @@ Bu dosya, Trafik Yönetim Modülü'nün tüm bileşenlerinin
 doğru çalışıp çalışmadığını test eder.
 """
 
+import asyncio
+import time
 import unittest
 from datetime import datetime
+from app.core.executor import ServiceClosedError
 from app.modules.traffic.base import TrafficElement
 from app.modules.traffic.implementations import TrafficLight, SpeedCamera, IntersectionSensor, TrafficService
 from app.modules.traffic.repository import TransportRepository
+from app.modules.traffic.storage import SQLiteBackend
+from app.modules.traffic.violations import CameraStats, ViolationPipeline, ViolationFileSink
+from app.modules.traffic.simulation import SimulationEngine
+from app.modules.traffic.async_service import AsyncTrafficService
+from app.modules.traffic.fleet import DeviceFleet, ElementStatus, TrafficLightView
+from app.modules.traffic.preemption import PreemptionController
+
+try:
+    from app.modules.traffic.sensor_store import SensorStore
+    from app.modules.traffic.signal_plan import Corridor, CorridorOptimizer
+    from app.modules.traffic.timeseries import TimeSeriesStore
+    from app.modules.traffic.forecast import CongestionForecaster
+    import numpy as np
+except ImportError:  # NumPy kurulu değilse vektörel testler atlanır
+    SensorStore = None
 
 class TestTrafficModule(unittest.TestCase):
     """Trafik modülü için test senaryoları sınıfı."""
@@ -40,6 +58,26 @@ class TestTrafficModule(unittest.TestCase):
         results = self.repo.find_all_by_location("Test Kavşağı")
         self.assertEqual(len(results), 2) # Işık ve Sensör
 
+    def test_status_index_follows_setter(self):
+        """Durum değişince filtre sonuçları güncellenir."""
+        self.camera.status = "Maintenance"
+        self.assertEqual(self.repo.filter_by_status("maintenance"), [self.camera])
+        self.assertNotIn(self.camera, self.repo.filter_by_status("Active"))
+
+    def test_compound_query_and_delete(self):
+        """Birleşik sorgu indeks kesişimiyle çalışır, silme indeksleri temizler."""
+        other = SpeedCamera("CM-2", "Test Yolu", 50.0)
+        self.repo.save(other)
+        other.status = "Maintenance"
+        results = self.repo.query(location="TEST YOLU", status="Maintenance", element_type=SpeedCamera)
+        self.assertEqual(results, [other])
+        self.assertEqual(len(self.repo.find_all_by_type("SpeedCamera")), 2)
+
+        self.repo.delete("CM-2")
+        self.assertEqual(self.repo.query(location="Test Yolu", status="Maintenance"), [])
+        other.status = "Active"  # silinen nesne artık izlenmemeli
+        self.assertEqual(self.repo.find_all_by_location("Test Yolu"), [self.camera])
+
     # 2. SİMÜLASYON TESTLERİ [cite: 92, 94]
     def test_traffic_light_action(self):
         """Trafik ışığı renk değişim döngüsü test edilir."""
@@ -74,5 +112,726 @@ class TestTrafficModule(unittest.TestCase):
         is_valid = TrafficElement.is_valid_status("Active")
         self.assertTrue(is_valid)
 
+@unittest.skipIf(SensorStore is None, "NumPy gerekli")
+class TestSensorStore(unittest.TestCase):
+    """Sütunsal sensör deposu ve vektörel sınıflandırma testleri."""
+
+    def setUp(self):
+        self.store = SensorStore(capacity=2)
+        self.service = TrafficService(TransportRepository(), sensor_store=self.store)
+
+    def test_bulk_ingest_and_classify(self):
+        """Tek turda gelen okumalar eşiklere göre etiketlenir."""
+        ids = [f"SN-{i}" for i in range(5)]
+        self.service.ingest_sensor_tick(ids, [95, 81, 80, 41, 3], timestamps=1000.0)
+        densities = self.service.calculate_all_densities()
+        self.assertEqual(densities, {
+            "SN-0": "Kritik", "SN-1": "Kritik", "SN-2": "Normal",
+            "SN-3": "Normal", "SN-4": "Düşük",
+        })
+        self.assertEqual(self.store.timestamps.tolist(), [1000.0] * 5)
+
+    def test_matches_single_sensor_service(self):
+        """Vektörel sonuç, tekil calculate_intersection_density ile aynı olmalı."""
+        repo = TransportRepository()
+        sensors = [IntersectionSensor(f"SN-{i}", "Kavşak") for i in range(50)]
+        for i, sensor in enumerate(sensors):
+            sensor.vehicle_count = i * 2
+            repo.save(sensor)
+        service = TrafficService(repo, sensor_store=SensorStore.from_sensors(sensors))
+        batch = service.calculate_all_densities()
+        for sensor in sensors:
+            self.assertEqual(batch[sensor.element_id], service.calculate_intersection_density(sensor.element_id))
+
+    def test_single_density_reads_store(self):
+        """Depo üzerinden gelen okuma, nesne güncellenmese de tekil yoğunluğa yansır."""
+        sensor = IntersectionSensor("SN-1", "Kavşak")
+        self.service.repository.save(sensor)
+        self.service.ingest_sensor_tick(["SN-1"], [95], timestamps=1000.0)
+        self.assertEqual(sensor.vehicle_count, 0)
+        self.assertEqual(self.service.calculate_intersection_density("SN-1"), "Kritik")
+        self.assertEqual(self.service.calculate_all_densities()["SN-1"], "Kritik")
+
+@unittest.skipIf(SensorStore is None, "NumPy gerekli")
+class TestCorridorOptimizer(unittest.TestCase):
+    """Koridor sinyal planlama testleri."""
+
+    def setUp(self):
+        self.repo = TransportRepository()
+        self.service = TrafficService(self.repo)
+        for i in range(3):
+            self.repo.save(TrafficLight(f"TL-{i}", "Bulvar"))
+            self.repo.save(IntersectionSensor(f"SN-{i}", "Bulvar"))
+            self.repo.save(IntersectionSensor(f"SX-{i}", "Ara Sokak"))
+        self.repo.save(TrafficLight("TL-Y", "Sahil"))
+        self.repo.save(IntersectionSensor("SN-Y", "Sahil"))
+        self.optimizer = CorridorOptimizer([
+            Corridor("Bulvar", ["TL-0", "TL-1", "TL-2"], ["SN-0", "SN-1", "SN-2"],
+                     ["SX-0", "SX-1", "SX-2"], distances_m=[0, 250, 250], speed_kmh=45),
+            Corridor("Sahil", ["TL-Y"], ["SN-Y"]),
+        ])
+
+    def test_green_wave_offsets_and_splits(self):
+        """Yoğun ana yön daha uzun yeşil alır, offsetler seyahat süresini izler."""
+        self.repo.get_by_id("SN-1").vehicle_count = 90
+        self.repo.get_by_id("SX-1").vehicle_count = 20
+        self.assertEqual(self.service.replan_corridors(self.optimizer), 4)
+        plan = self.optimizer.plan_for("TL-1")
+        self.assertGreater(plan["green"], plan["cross_green"])
+        self.assertAlmostEqual(plan["offset"], 20.0)  # 250 m / 12.5 m/s
+        self.assertEqual(self.repo.get_by_id("TL-1").timer, round(plan["green"]))
+
+    def test_incremental_replan(self):
+        """Yalnızca yoğunluğu değişen koridor yeniden planlanır."""
+        self.service.replan_corridors(self.optimizer)
+        self.repo.get_by_id("SN-Y").vehicle_count = 70
+        self.assertEqual(self.service.replan_corridors(self.optimizer), 1)
+        self.assertEqual(self.service.replan_corridors(self.optimizer), 0)
+
+class TestSimulationEngine(unittest.TestCase):
+    """Ayrık olay simülasyon motoru testleri."""
+
+    @staticmethod
+    def build_city():
+        repo = TransportRepository()
+        repo.save_many([TrafficLight(f"TL-{i}", "Bulvar") for i in range(5)]
+                       + [SpeedCamera(f"CM-{i}", "Sahil Yolu") for i in range(5)]
+                       + [IntersectionSensor(f"SN-{i}", "Merkez") for i in range(5)])
+        return repo
+
+    def run_day(self, seed):
+        repo = self.build_city()
+        engine = SimulationEngine(seed=seed)
+        engine.attach_repository(repo)
+        engine.run(until=3600)
+        return engine, SimulationEngine.state_snapshot(repo.query())
+
+    def test_same_seed_same_result(self):
+        """Aynı tohumla iki koşu birebir aynı durumu üretir."""
+        first_engine, first = self.run_day(7)
+        second_engine, second = self.run_day(7)
+        self.assertEqual(first, second)
+        self.assertEqual(first_engine.actions, second_engine.actions)
+        _, other = self.run_day(8)
+        self.assertNotEqual(first, other)
+
+    def test_devices_run_at_their_rates(self):
+        """Işıklar timer süresinde, kameralar kendi aralığında tetiklenir."""
+        engine, _ = self.run_day(1)
+        self.assertEqual(engine.now, 3600)
+        self.assertEqual(engine.actions["TrafficLight"], 5 * 120)   # 30 sn'de bir
+        self.assertEqual(engine.actions["SpeedCamera"], 5 * 1800)   # 2 sn'de bir
+
+    def test_oneshot_event_uses_simulated_clock(self):
+        """Tek seferlik olaylar simülasyon saatinde çalışır."""
+        engine = SimulationEngine(start_time=1000.0)
+        seen = []
+        engine.schedule(50.0, lambda tag: seen.append((tag, engine.now)), "bakım")
+        engine.run(until=2000.0)
+        self.assertEqual(seen, [("bakım", 1050.0)])
+
+    def test_zero_timer_does_not_stall_the_clock(self):
+        """Süresi 0 olan ışık en az 1 sn aralıkla tetiklenir; saat ilerler."""
+        light = TrafficLight("TL-0", "Bulvar")
+        light.timer = 0
+        engine = SimulationEngine()
+        engine.attach(light, phase=0)
+        self.assertEqual(engine.run(until=10), 11)
+        self.assertEqual(engine.now, 10)
+        with self.assertRaises(ValueError):
+            engine.attach(TrafficLight("TL-1", "Bulvar"), interval=0)
+
+class TestDeviceFleet(unittest.TestCase):
+    """Kompakt gösterim: sabit alanlı sınıflar ve sütunsal filo testleri."""
+
+    def setUp(self):
+        self.elements = [TrafficLight("TL-1", "Bulvar", "Green"), SpeedCamera("CM-1", "Sahil Yolu", 82.5),
+                         IntersectionSensor("SN-1", "Merkez"), IntersectionSensor("SN-2", "Merkez")]
+        self.elements[0].timer = 45
+        self.elements[2].vehicle_count = 77
+        self.elements[3].status = "Maintenance"
+        self.fleet = DeviceFleet.from_elements(self.elements)
+
+    def test_elements_are_slotted(self):
+        """Cihazlar __dict__ taşımaz; last_update yine datetime olarak okunur."""
+        light = self.elements[0]
+        self.assertFalse(hasattr(light, "__dict__"))
+        with self.assertRaises(AttributeError):
+            light.renk = "Mavi"
+        self.assertIsInstance(light.last_update, datetime)
+        self.assertIsInstance(light.to_record()["last_update"], float)
+
+    def test_views_expose_same_properties(self):
+        """Görünümler gerçek nesnelerle aynı kaydı ve özellikleri verir."""
+        for element in self.elements:
+            view = self.fleet.get(element.element_id)
+            self.assertEqual(view.to_record(), element.to_record())
+            self.assertEqual(view.location, element.location)
+            self.assertEqual(view.status, element.status)
+        light = self.fleet.get("TL-1")
+        self.assertIsInstance(light, TrafficLightView)
+        self.assertEqual((light.current_color, light.timer), ("Green", 45))
+        self.assertEqual(self.fleet.get("SN-1").vehicle_count, 77)
+        self.assertEqual(self.fleet.get("CM-1").speed_limit, 82.5)
+
+    def test_writes_and_queries(self):
+        """Yazmalar sütunlara gider; durum kodlanır, bilinmeyen durumlar da korunur."""
+        sensor = self.fleet.get("SN-1")
+        sensor.vehicle_count = 12
+        sensor.status = "Offline"
+        self.assertEqual(self.fleet.get("SN-1").vehicle_count, 12)
+        self.assertEqual([v.element_id for v in self.fleet.filter_by_status("Offline")], ["SN-1"])
+        self.assertEqual(self.fleet.get("SN-2").status_code, ElementStatus.MAINTENANCE)
+        self.assertEqual(len(self.fleet.find_all_by_location("Merkez")), 2)
+        self.assertEqual(self.fleet.count_by_status(), {"Active": 2, "Maintenance": 1, "Offline": 1})
+
+        element = self.fleet.get("TL-1").to_element()
+        self.assertIsInstance(element, TrafficLight)
+        self.assertEqual(element.timer, 45)
+
+    def test_remove_moves_last_row(self):
+        self.assertTrue(self.fleet.remove("TL-1"))
+        self.assertFalse(self.fleet.remove("TL-1"))
+        self.assertEqual(len(self.fleet), 3)
+        self.assertNotIn("TL-1", self.fleet)
+        self.assertEqual(self.fleet.get("SN-2").status, "Maintenance")
+        self.assertEqual(sorted(v.element_id for v in self.fleet), ["CM-1", "SN-1", "SN-2"])
+
+    def test_fleet_is_smaller_than_objects(self):
+        """Satır başına bellek, nesne + kimlik indeksi maliyetinden belirgin biçimde azdır."""
+        import tracemalloc
+        ids = [f"SN-{i}" for i in range(5000)]
+        tracemalloc.start()
+        sensors = [IntersectionSensor(element_id, "Merkez") for element_id in ids]
+        index = {sensor.element_id: sensor for sensor in sensors}
+        objects = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+        fleet = DeviceFleet.from_elements(sensors)
+        columns = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        self.assertEqual(len(fleet), len(index))
+        self.assertLess(columns, objects * 0.75)
+
+class TestAsyncTrafficService(unittest.TestCase):
+    """Asenkron servis katmanı testleri."""
+
+    def setUp(self):
+        self.repo = TransportRepository()
+        self.sensors = [IntersectionSensor(f"SN-{i}", "Kavşak") for i in range(500)]
+        self.repo.save_many(self.sensors)
+
+    def test_concurrent_readings_are_applied(self):
+        """Eşzamanlı binlerce okuma tek döngüde işlenir."""
+        async def scenario():
+            async with AsyncTrafficService(TrafficService(self.repo)) as service:
+                await asyncio.gather(*(service.submit_reading(f"SN-{i % 500}", i % 100)
+                                       for i in range(2000)))
+                return await service.calculate_intersection_density("SN-99")
+        self.assertEqual(asyncio.run(scenario()), "Kritik")
+        self.assertEqual(self.repo.get_by_id("SN-7").vehicle_count, 7)
+
+    def test_object_path_publishes_density_changes(self):
+        """Sütunsal depo yokken de etiketi değişen sensörler veriyoluna yayınlanır."""
+        from app.core.event_bus import DensityChanged, EventBus
+        bus = EventBus()
+        events = []
+        bus.subscribe(events.append, DensityChanged)
+
+        async def scenario():
+            async with AsyncTrafficService(TrafficService(self.repo, bus=bus)) as service:
+                await asyncio.gather(service.submit_reading("SN-1", 90, 5.0), service.submit_reading("SN-2", 10, 5.0))
+                await service.submit_reading("SN-1", 95, 6.0)
+        asyncio.run(scenario())
+        self.assertEqual([(e.sensor_id, e.density, e.timestamp) for e in events],
+                         [("SN-1", "Kritik", 5.0), ("SN-2", "Düşük", 5.0)])
+
+    @unittest.skipIf(SensorStore is None, "NumPy gerekli")
+    def test_readings_are_micro_batched(self):
+        """Aynı turda gelen okumalar tek toplu yazmaya dönüşür."""
+        store = SensorStore()
+        service = TrafficService(self.repo, sensor_store=store)
+        calls = []
+        original = service.ingest_sensor_tick
+        service.ingest_sensor_tick = lambda *args: calls.append(len(args[0])) or original(*args)
+
+        async def scenario():
+            async with AsyncTrafficService(service, batch_size=300) as async_service:
+                await asyncio.gather(*(async_service.submit_reading(s.element_id, 90, 1.0)
+                                       for s in self.sensors))
+                return await async_service.calculate_all_densities()
+        densities = asyncio.run(scenario())
+        self.assertEqual(calls, [300, 200])
+        self.assertEqual(set(densities.values()), {"Kritik"})
+
+    @unittest.skipIf(SensorStore is None, "NumPy gerekli")
+    def test_history_flush_runs_in_pool(self):
+        """Geçmiş tamponları havuzda diske yazılır; yeniden açılan depo okumaları görür."""
+        import tempfile
+        with tempfile.TemporaryDirectory() as path:
+            history = TimeSeriesStore(path)
+            service = TrafficService(self.repo, history=history)
+
+            async def scenario():
+                async with AsyncTrafficService(service) as async_service:
+                    await async_service.submit_reading("SN-1", 42, 100.0)
+                    await async_service.flush_history()
+            asyncio.run(scenario())
+            with TimeSeriesStore(path) as reopened:
+                self.assertEqual(reopened.aggregate(0, 200, element_id="SN-1")["count"], 1)
+            history.close()
+        with self.assertRaises(ValueError):
+            asyncio.run(AsyncTrafficService(TrafficService(self.repo)).flush_history())
+
+    def test_timeout_and_close(self):
+        """Yavaş iş zaman aşımına uğrar, kapatılan servis istek kabul etmez."""
+        class SlowOptimizer:
+            def update(self, densities):
+                time.sleep(0.3)
+                return []
+
+            def apply(self, repository, rows):
+                return 0
+
+        async def scenario():
+            service = AsyncTrafficService(TrafficService(self.repo), timeout=0.05)
+            with self.assertRaises(TimeoutError):
+                await service.replan_corridors(SlowOptimizer())
+            await service.close()
+            with self.assertRaises(ServiceClosedError):
+                await service.submit_reading("SN-1", 10)
+        asyncio.run(scenario())
+
+class TestPersistentRepository(unittest.TestCase):
+    """SQLite arka uçlu kalıcı depo testleri."""
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = f"{self.tmpdir.name}/traffic.db"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_state_survives_restart(self):
+        """Kaydedilen cihazlar yeni depo örneğinde aynı alanlarla geri gelir."""
+        repo = TransportRepository.open_persistent(self.path)
+        light = TrafficLight("TL-1", "Atatürk Bulvarı", "Green")
+        light.timer = 45
+        camera = SpeedCamera("CM-1", "Sahil Yolu", 50.0)
+        camera.violation_count = 3
+        repo.save_many([light, camera, IntersectionSensor("SN-1", "Merkez")])
+        repo.delete("SN-1")
+        repo.backend.close()
+
+        reopened = TransportRepository.open_persistent(self.path)
+        self.assertIsNone(reopened.get_by_id("SN-1"))
+        restored_light = reopened.get_by_id("TL-1")
+        self.assertIsInstance(restored_light, TrafficLight)
+        self.assertEqual((restored_light.current_color, restored_light.timer), ("Green", 45))
+        self.assertEqual(reopened.get_by_id("CM-1").violation_count, 3)
+        self.assertEqual(len(reopened.find_all_by_location("sahil yolu")), 1)
+        reopened.backend.close()
+
+    def test_setter_changes_are_persisted(self):
+        """Kayıttan sonra setter ile değişen alanlar toplu yazılır ve yeniden açılışta gelir."""
+        repo = TransportRepository.open_persistent(self.path)
+        self.assertEqual(repo.storage_name, "SQLite (WAL) Persistent Storage")
+        self.assertEqual(TransportRepository.get_storage_type(), "InMemory / Dictionary Based Storage")
+        light = TrafficLight("TL-1", "Atatürk Bulvarı")
+        sensor = IntersectionSensor("SN-1", "Merkez")
+        repo.save_many([light, sensor])
+        light.timer = 55
+        light.offset = 12
+        sensor.vehicle_count = 90
+        sensor.status = "Maintenance"
+        self.assertEqual(repo.flush(), 2)
+        self.assertEqual(repo.flush(), 0)
+        sensor.vehicle_count = 91
+        repo.close()
+
+        reopened = TransportRepository.open_persistent(self.path)
+        self.assertEqual((reopened.get_by_id("TL-1").timer, reopened.get_by_id("TL-1").offset), (55, 12))
+        self.assertEqual(reopened.get_by_id("SN-1").vehicle_count, 91)
+        self.assertEqual([e.element_id for e in reopened.filter_by_status("maintenance")], ["SN-1"])
+        reopened.backend.close()
+
+        # flush_size'a ulaşınca close beklenmeden yazılır
+        batched = TransportRepository(SQLiteBackend(self.path), flush_size=1)
+        batched.get_by_id("TL-1").current_color = "Green"
+        reader = TransportRepository.open_persistent(self.path)
+        self.assertEqual(reader.get_by_id("TL-1").current_color, "Green")
+        reader.backend.close()
+        self.assertEqual(TransportRepository().storage_name, "InMemory / Dictionary Based Storage")
+        batched.close()
+
+    def test_snapshot_restore(self):
+        """Yedekten açılan depo, yedek anındaki durumu içerir."""
+        repo = TransportRepository.open_persistent(self.path)
+        repo.save(IntersectionSensor("SN-1", "Merkez"))
+        snapshot = f"{self.tmpdir.name}/snapshot.db"
+        repo.backend.snapshot(snapshot)
+        repo.save(IntersectionSensor("SN-2", "Merkez"))
+        repo.backend.close()
+
+        restored = TransportRepository.from_snapshot(snapshot, f"{self.tmpdir.name}/restored.db")
+        self.assertIsNotNone(restored.get_by_id("SN-1"))
+        self.assertIsNone(restored.get_by_id("SN-2"))
+        restored.backend.close()
+
+@unittest.skipIf(SensorStore is None, "NumPy gerekli")
+class TestTimeSeriesStore(unittest.TestCase):
+    """Okuma geçmişi deposu testleri (parçalar, özetler, yeniden açılış)."""
+
+    DAY = 86400.0
+
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = f"{self.tmpdir.name}/history"
+        rng = np.random.default_rng(7)
+        # 3 sensör, 3 gün boyunca ~40 sn aralıklı okumalar; bir kısmı sırasız gelir
+        self.start = 1_700_000_000.0
+        self.ts = np.sort(self.start + rng.uniform(0, 3 * self.DAY, 6000)).round(3)
+        self.ids = rng.choice(["SN-1", "SN-2", "SN-3"], size=len(self.ts))
+        self.counts = rng.integers(0, 100, size=len(self.ts))
+        self.ts[4000:4100] = self.ts[4000:4100][::-1].copy()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def open_store(self):
+        store = TimeSeriesStore(self.path, chunk_size=300, rollup_chunk_size=40)
+        store.register("SN-1", "Merkez Meydan")
+        store.register("SN-2", "Merkez Meydan")
+        store.register("SN-3", "Sahil Yolu")
+        return store
+
+    def fill(self, store):
+        for i in range(0, len(self.ts), 500):
+            store.ingest(self.ids[i:i + 500].tolist(), self.counts[i:i + 500], self.ts[i:i + 500])
+
+    def expected(self, start, end, ids):
+        mask = (self.ts >= start) & (self.ts < end) & np.isin(self.ids, ids)
+        values = self.counts[mask]
+        return len(values), int(values.sum()), int(values.min()), int(values.max())
+
+    def check_ranges(self, store):
+        rng = np.random.default_rng(3)
+        ranges = [(self.start, self.start + 3 * self.DAY)]
+        ranges += [tuple(sorted(self.start + rng.uniform(0, 3 * self.DAY, 2))) for _ in range(20)]
+        for start, end in ranges:
+            result = store.aggregate(start, end, location="merkez meydan")
+            self.assertEqual((result["count"], round(result["sum"]), result["min"], result["max"]),
+                             self.expected(start, end, ["SN-1", "SN-2"]))
+            result = store.aggregate(start, end, element_id="SN-3")
+            self.assertEqual(result["count"], self.expected(start, end, ["SN-3"])[0])
+
+    def test_aggregates_match_raw_readings(self):
+        """Özet + ham parça planı, ham okumalardan hesaplanan sonuçla birebir aynıdır."""
+        store = self.open_store()
+        self.fill(store)
+        self.assertGreater(len(store._by_key[("SN-1", "vehicle_count")].chunks[3]), 0)
+        self.check_ranges(store)
+        ts, values = store.query("SN-2", self.start, self.start + self.DAY)
+        mask = (self.ts < self.start + self.DAY) & (self.ids == "SN-2")
+        self.assertEqual(values.tolist(), self.counts[mask][np.argsort(self.ts[mask], kind="stable")].tolist())
+        self.assertTrue(np.all(np.diff(ts) >= 0))
+        store.close()
+
+    def test_reopen_and_torn_tail(self):
+        """Kapatılan depo aynı geçmişle açılır; yarım kalmış son parça kesilir."""
+        store = self.open_store()
+        self.fill(store)
+        store.close()
+        with open(f"{self.path}/chunks.tsc", "ab") as f:
+            f.write(b"\x10\x00\x00\x00yarim")
+        with TimeSeriesStore(self.path) as reopened:
+            self.assertEqual(reopened.truncated_bytes, 9)
+            self.assertEqual(len(reopened), 3)
+            self.check_ranges(reopened)
+            hourly = reopened.downsample(self.start, self.start + self.DAY, 3600, element_id="SN-1")
+            first = (self.ts >= hourly["time"][0]) & (self.ts < hourly["time"][0] + 3600) & (self.ids == "SN-1")
+            self.assertEqual(hourly["count"][0], first.sum())
+            self.assertAlmostEqual(hourly["mean"][0], self.counts[first].mean())
+
+    def test_delta_encoding_is_compact(self):
+        """Düzenli aralıklı araç sayıları okuma başına birkaç bayta sığar."""
+        with TimeSeriesStore(self.path) as store:
+            stamps = self.start + np.arange(20000) * 10.0
+            store.ingest(["SN-1"] * len(stamps), np.resize(self.counts, len(stamps)), stamps)
+            store.flush()
+            self.assertLess(store.nbytes / len(stamps), 3.5)
+
+    def test_service_average_density(self):
+        """TrafficService okumaları geçmişe de yazar ve konum ortalamasını etiketler."""
+        repo = TransportRepository()
+        repo.save_many([IntersectionSensor("SN-1", "Merkez Meydan"), IntersectionSensor("SN-2", "Merkez Meydan")])
+        with TimeSeriesStore(self.path) as history:
+            history.register_elements(repo.find_all_by_type(IntersectionSensor))
+            service = TrafficService(repo, SensorStore(), history=history)
+            now = time.time()
+            for minute in range(60):
+                service.ingest_sensor_tick(["SN-1", "SN-2"], [90, 60 + minute % 2], now - 3600 + minute * 60)
+            average, label = service.average_density("Merkez Meydan")
+            self.assertAlmostEqual(average, 75.25)
+            self.assertEqual(label, "Normal")
+            self.assertEqual(service.average_density("Sahil"), (None, "Bilinmiyor"))
+
+@unittest.skipIf(SensorStore is None, "NumPy gerekli")
+class TestCongestionForecaster(unittest.TestCase):
+    """Kavşak yoğunluk tahmini testleri."""
+
+    DAY = 86400
+
+    def rush_hour(self, days, sensors=1, seed=5):
+        """5 dk aralıklı okumalar: her gün 08:00 civarında Kritik'e çıkan yoğunluk."""
+        rng = np.random.default_rng(seed)
+        times = 1_700_006_400 + np.arange(days * self.DAY // 300) * 300.0
+        hour = (times % self.DAY) / 3600
+        base = 30 + 70 * np.exp(-((hour - 8.5) / 1.0) ** 2)
+        counts = base[:, None] + rng.normal(0, 3, (len(times), sensors))
+        return times, np.clip(counts, 0, None), [f"SN-{i}" for i in range(sensors)]
+
+    def test_backtest_beats_persistence(self):
+        """30 dk ufukta model, "son okuma sürer" tahmininden daha az hata yapar."""
+        times, counts, ids = self.rush_hour(21, sensors=20)
+        forecaster = CongestionForecaster(season=self.DAY)
+        forecaster.fit(times[:4032], counts[:4032], ids)
+        result = forecaster.backtest(times[4032:], counts[4032:], ids, horizon=1800)
+        self.assertGreater(result["samples"], 20000)
+        self.assertLess(result["mae"], result["naive_mae"] * 0.8)
+
+    def test_acts_before_critical(self):
+        """Kavşak henüz Normal iken yaklaşan Kritik durum için ışık süresi uzatılır."""
+        times, counts, ids = self.rush_hour(14)
+        repo = TransportRepository()
+        repo.save_many([IntersectionSensor("SN-0", "Merkez"), TrafficLight("TL-1", "Merkez")])
+        forecaster = CongestionForecaster(season=self.DAY)
+        forecaster.fit(times, counts, ids)
+        service = TrafficService(repo, SensorStore(), forecaster=forecaster)
+        # 15. gün 07:35, okuma 60 araç (Normal); zirve 08:30'da
+        now = times[0] + 14 * self.DAY + 7 * 3600 + 35 * 60
+        service.ingest_sensor_tick(["SN-0"], [60], now)
+        repo.get_by_id("SN-0").vehicle_count = 60
+        self.assertEqual(service.calculate_intersection_density("SN-0"), "Normal")
+        self.assertEqual(service.forecast_density("SN-0"), "Kritik")
+        self.assertGreater(forecaster.predict("SN-0", 1800), 80)
+        message = service.optimize_light_timing("TL-1", "Normal", sensor_id="SN-0")
+        self.assertEqual(repo.get_by_id("TL-1").timer, 60)
+        self.assertIn("Tahmin: Kritik", message)
+        self.assertIsNone(service.forecast_density("SN-X"))
+
+    def test_fit_from_history(self):
+        """Geçmiş deposundaki okumalar 15 dk kova ortalamaları olarak eğitime girer."""
+        import tempfile
+        times, counts, _ = self.rush_hour(14)
+        with tempfile.TemporaryDirectory() as path, TimeSeriesStore(path) as history:
+            history.ingest(["SN-0"] * len(times), np.round(counts[:, 0]), times)
+            forecaster = CongestionForecaster(season=self.DAY)
+            self.assertEqual(forecaster.fit_history(history, ["SN-0", "SN-X"], times[0], times[-1] + 1), 14 * 96)
+        forecaster.update(["SN-0"], [60], times[0] + 14 * self.DAY + 7 * 3600 + 35 * 60)
+        self.assertEqual(forecaster.forecast_label("SN-0"), "Kritik")
+
+    def test_incremental_updates_are_vectorized(self):
+        """Bir tur tek çağrıda işlenir; bilinmeyen sensörler eklenir, tekrarlarda son okuma geçerlidir."""
+        forecaster = CongestionForecaster(capacity=1)
+        self.assertEqual(forecaster.update(["A", "B", "A"], [10, 20, 30], 1_700_000_000.0), 2)
+        self.assertEqual(len(forecaster), 2)
+        self.assertAlmostEqual(forecaster.predict("A", 300), 30)
+        self.assertEqual(forecaster.forecast([300, 600], ["B", "C"]).shape, (2, 2))
+        self.assertTrue(np.isnan(forecaster.forecast([300], ["C"])[0, 0]))
+        self.assertEqual(forecaster.forecast_labels(), {"A": "Düşük", "B": "Düşük"})
+
+    def test_feeds_emergency_eta(self):
+        """Rota motoru, birimin yolda olacağı andaki tahmini yoğunlukla ETA hesaplar."""
+        from app.modules.emergency.routing import RoadGraph, RouteEngine
+        graph = RoadGraph()
+        graph.add_node("N1", 40.50, 34.95)
+        graph.add_node("N2", 40.51, 34.95)
+        graph.add_edge("N1", "N2", 1.0, 60.0, sensor="SN-0", capacity=50)
+        engine = RouteEngine(graph, landmarks=1)
+        free_flow = engine.shortest_time("N1", "N2")
+        forecaster = CongestionForecaster(season=self.DAY)
+        forecaster.update(["SN-0"], [90], 1_700_000_000.0)
+        self.assertTrue(forecaster.feed_route_engine(engine, horizon=600))
+        self.assertGreater(engine.shortest_time("N1", "N2"), free_flow)
+
+class TestPreemptionController(unittest.TestCase):
+    """Acil durum aracı rotası boyunca zamanlanmış ışık önceliği testleri."""
+
+    def setUp(self):
+        self.repo = TransportRepository()
+        self.lights = [TrafficLight(f"TL-{i}", f"Kavşak {i}", "Red") for i in range(4)]
+        self.repo.save_many(self.lights)
+        self.now = 1000.0
+        self.controller = PreemptionController(self.repo, lead=20, clearance=10, green_seconds=90,
+                                               clock=lambda: self.now)
+        self.assertEqual(self.controller.index_locations({f"N{i}": f"kavşak {i}" for i in range(5)}), 4)
+
+    def colors(self):
+        return [light.current_color for light in self.lights]
+
+    def test_green_wave_follows_arrivals(self):
+        # N0 şimdi, N1 60 sn, N2 120 sn sonra; N4'te ışık yok
+        windows = self.controller.preempt("A-1", [("N0", 1000), ("N1", 1060), ("N2", 1120), ("N4", 1180)])
+        self.assertEqual(windows, 3)
+        self.assertEqual(self.colors(), ["Green", "Red", "Red", "Red"])
+        self.assertEqual(self.lights[0].timer, 90)
+        # Pencereler: varıştan 20 sn önce başlar, 10 sn sonra biter
+        self.controller.advance(1040)
+        self.assertEqual(self.colors(), ["Red", "Green", "Red", "Red"])
+        self.assertEqual(self.controller.preempted_lights, ["TL-1"])
+        self.controller.advance(1100)
+        self.assertEqual(self.colors(), ["Red", "Red", "Green", "Red"])
+        self.controller.advance(1131)
+        self.assertEqual(self.colors(), ["Red"] * 4)
+        self.assertEqual(self.lights[2].timer, 30)
+        self.assertEqual(self.controller.preempted_lights, [])
+
+    def test_shared_intersection_and_release(self):
+        self.controller.preempt("A-1", [("N1", 1010)])
+        self.controller.preempt("F-1", [("N1", 1030)])
+        self.controller.hold("F-1", ["TL-3"])
+        self.controller.advance(1021)
+        self.assertEqual(self.lights[1].current_color, "Green")   # A-1 geçti, F-1 hâlâ bekliyor
+        self.controller.advance(1041)
+        self.assertEqual(self.lights[1].current_color, "Red")
+        self.assertEqual(self.lights[3].current_color, "Green")
+        self.assertEqual(self.controller.release("F-1"), 1)
+        self.assertEqual(self.colors(), ["Red"] * 4)
+
+    def test_replan_and_deferred_timing(self):
+        service = TrafficService(self.repo, preemption=self.controller)
+        self.controller.preempt("A-1", [("N0", 1000), ("N1", 1300)])
+        self.assertIn("öncelik bitince", service.optimize_light_timing("TL-0", "Kritik"))
+        self.assertEqual(self.lights[0].timer, 90)
+        # Yeni rota eski pencereleri iptal eder
+        self.controller.preempt("A-1", [("N2", 1005)])
+        self.assertEqual(self.colors(), ["Red", "Red", "Green", "Red"])
+        self.assertEqual(self.lights[0].timer, 60)   # ertelenen Kritik planı uygulandı
+        self.controller.advance(1400)
+        self.assertEqual(self.colors(), ["Red"] * 4)
+        self.assertEqual([w[0] for w in self.controller.schedule("A-1")], ["TL-2"])
+
+    def test_lights_saved_later_are_found(self):
+        """Işıklar planlama anında depodan okunur; sonradan eklenen/silinen ışıklar hesaba katılır."""
+        self.repo.save(TrafficLight("TL-9", "KAVŞAK 4", "Red"))
+        self.repo.delete("TL-1")
+        self.assertEqual(self.controller.lights_at("N4"), ("TL-9",))
+        self.assertEqual(self.controller.preempt("A-1", [("N1", 1000), ("N4", 1000)]), 1)
+        self.assertEqual(self.repo.get_by_id("TL-9").current_color, "Green")
+        self.controller.bind("N4", [])
+        self.assertEqual(self.controller.lights_at("N4"), ())
+
+    def test_timer_writes_from_another_thread(self):
+        """Havuzdan gelen süre yazmaları pencere açılıp kapanırken kaybolmaz."""
+        import threading
+        light = self.lights[0]
+
+        def replan():
+            for i in range(3000):
+                self.controller.apply_timer("TL-0", 31 + i % 2)
+        worker = threading.Thread(target=replan)
+        worker.start()
+        while worker.is_alive():
+            self.controller.hold("A-1", ["TL-0"])
+            self.controller.release("A-1")
+        worker.join()
+        self.assertEqual((light.current_color, light.timer), ("Red", 32))
+        self.assertFalse(self.controller.apply_timer("TL-0", 45))
+        self.controller.hold("A-1", ["TL-0"])
+        self.assertTrue(self.controller.apply_timer("TL-0", 50))
+        self.assertEqual(light.timer, 90)
+        self.controller.release("A-1")
+        self.assertEqual(light.timer, 50)
+
+    def test_dozens_of_vehicles_stay_cheap(self):
+        repo = TransportRepository()
+        repo.save_many([TrafficLight(f"TL-{i}", f"Kavşak {i}") for i in range(2000)])
+        controller = PreemptionController(repo, clock=lambda: 0.0)
+        controller.index_locations({f"N{i}": f"Kavşak {i}" for i in range(2000)})
+        started = time.perf_counter()
+        for vehicle in range(50):
+            controller.preempt(f"V-{vehicle}", [(f"N{(vehicle * 37 + k) % 2000}", 30.0 * k) for k in range(40)], 0.0)
+        for second in range(0, 1300, 1):
+            controller.advance(float(second))
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(controller.preempted_lights, [])
+
+
+class TestViolationPipeline(unittest.TestCase):
+    """Hız ihlali akış hattı testleri."""
+
+    def setUp(self):
+        import os, tempfile
+        handle, self.path = tempfile.mkstemp(suffix=".log")
+        os.close(handle)
+        self.camera = SpeedCamera("CM-1", "Sahil Yolu", 70.0)
+        self.sink = ViolationFileSink(self.path)
+        self.pipeline = ViolationPipeline({"CM-1": self.camera}, sink=self.sink, batch_size=2)
+
+    def tearDown(self):
+        import os
+        self.sink.close()
+        os.remove(self.path)
+
+    def test_readings_become_violation_records(self):
+        """Limit aşan ölçümler kayda dönüşür, dosyaya toplu yazılır."""
+        readings = [("CM-1", "34ABC01", 95.0, 1000.0), ("CM-1", "34ABC02", 60.0, 1000.5),
+                    ("CM-1", "34ABC03", 71.0, 1001.0), ("CM-X", "06XYZ", 150.0, 1001.0)]
+        self.assertEqual(self.pipeline.process(readings), 2)
+        self.assertEqual(self.camera.violation_count, 2)
+        self.assertEqual(self.pipeline.unknown_camera, 1)
+
+        self.sink.flush()
+        stored = list(ViolationFileSink.read_all(self.path))
+        self.assertEqual([v.vehicle_plate for v in stored], ["34ABC01", "34ABC03"])
+        self.assertEqual(stored[0].camera_id, "CM-1")
+        self.assertFalse(hasattr(stored[0], "__dict__"))
+
+        report = self.pipeline.camera_report("CM-1", now=1001.0)
+        self.assertEqual(report["readings"], 3)
+        self.assertEqual(report["violations"], 2)
+
+    def test_stats_with_shuffled_timestamps(self):
+        """Sıra dışı okumalar pencereyi bozmaz; pencereden eskiler sayılmaz."""
+        import random
+        readings = [(1000.0 + i * 0.7, 50.0 + i % 40, i % 3 == 0) for i in range(300)]
+        random.Random(5).shuffle(readings)
+        stats = CameraStats(window_seconds=60)
+        for timestamp, speed, violated in readings:
+            stats.observe(timestamp, speed, violated)
+        now = 1000.0 + 299 * 0.7
+        recent = [r for r in readings if int(r[0]) > int(now) - 60]
+        report = stats.snapshot(now)
+        self.assertEqual(report["readings"], len(recent))
+        self.assertEqual(report["violations"], sum(r[2] for r in recent))
+        self.assertEqual(report["max_speed"], max(r[1] for r in recent))
+        self.assertEqual(report["avg_speed"], round(sum(r[1] for r in recent) / len(recent), 2))
+
+    def test_fields_with_commas_round_trip(self):
+        """Virgül ve tırnak içeren alanlar CSV kurallarıyla yazılıp aynen okunur."""
+        from app.modules.traffic.implementations import TrafficViolation
+        self.sink.write_batch([TrafficViolation('V-1,"A"', "34 ABC, 01", 95.0, 70.0, 1000.0, "CM-1")])
+        self.sink.flush()
+        stored = list(ViolationFileSink.read_all(self.path))
+        self.assertEqual((stored[0].violation_id, stored[0].vehicle_plate), ('V-1,"A"', "34 ABC, 01"))
+
+    def test_async_consume_with_bounded_queue(self):
+        """Sınırlı kuyruk üzerinden asenkron tüketim."""
+        import asyncio
+
+        async def scenario():
+            queue = asyncio.Queue(maxsize=2)
+            consumer = asyncio.create_task(self.pipeline.consume(queue))
+            for i in range(10):
+                await queue.put([("CM-1", f"PL{i}", 80.0 + i, 2000.0 + i)])
+            await queue.put(None)
+            return await consumer
+
+        self.assertEqual(asyncio.run(scenario()), 10)
+        self.assertEqual(self.sink.written, 10)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file